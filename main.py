@@ -4,6 +4,8 @@ Applicazione principale del Password Manager.
 
 import sys
 import os
+# Primo import: fa partire il cronometro dei tempi di avvio
+from src.utils import timing
 from PySide6.QtCore import Qt # Import Qt for cursor
 # --- ADD HASHING/SALT IMPORTS --- 
 import hashlib
@@ -26,6 +28,7 @@ from src.core.credential_manager import CredentialManager
 from src.ui.auth_dialog import AuthDialog
 from src.ui.registration_dialog import RegistrationDialog
 from src.ui.main_window import MainWindow
+from src.ui.style import apply_app_stylesheet
 # --- REMOVE UNUSED/NON-EXISTENT IMPORT --- 
 # from src.ui.signal_emitter import signal_emitter # Import corrected
 # --- END REMOVE --- 
@@ -33,17 +36,19 @@ from src.ui.main_window import MainWindow
 from src.core import hotkey_listener
 # Importa il MasterPasswordDialog per gestire il caso in cui la password sia impostata ma non verificata
 from src.ui.master_password_dialog import MasterPasswordDialog
-from src.utils.sync_manager import SyncManager # Added import
+from src.utils.sync_manager import SyncManager, preload_google_api # Added import
 # --- MODIFY HOTKEY IMPORT --- 
 # Import the module itself, not a non-existent class
 from src.core import hotkey_listener 
 # --- END MODIFY HOTKEY IMPORT --- 
+timing.mark("imports")
 
 
 def main():
     # Configure logging level for production builds
     logging.basicConfig(level=logging.CRITICAL)
     app = QApplication(sys.argv)
+    apply_app_stylesheet(app) # Un solo foglio di stile per tutta l'app (anche login/registrazione)
 
     # --- Manager Instantiation --- 
     sync_manager = SyncManager() # Instantiate SyncManager first
@@ -61,13 +66,14 @@ def main():
         if auth_dialog.exec() == QDialog.Accepted:
             verified_password = auth_dialog.password # Get verified password from dialog
             print("Master password verified by user.")
-            # The _verify_session_master_password call below is sufficient to set the state
-            # No need to call it twice.
-            if not sync_manager._verify_session_master_password(verified_password):
+            # AuthDialog ha già verificato la password (e impostato lo stato di sessione):
+            # ripetere la derivazione PBKDF2 costerebbe un altro mezzo secondo all'avvio.
+            if not sync_manager._session_password_verified and not sync_manager._verify_session_master_password(verified_password):
                  print("[main] CRITICAL ERROR: AuthDialog accepted but SyncManager verification failed!")
                  QMessageBox.critical(None, "Errore Verifica Interna", "Verifica password fallita dopo l'autenticazione. L'applicazione terminerà.")
                  sys.exit(1)
             # REMOVED REDUNDANT VERIFICATION CALL
+            timing.mark("unlock")
         else:
             print("Authentication cancelled or failed. Exiting.")
             sys.exit(0)
@@ -144,6 +150,9 @@ def main():
         sync_manager.load_settings() # Now this can potentially decrypt client_secret using verified session pwd
         profile_manager.load_profiles() # Now this can decrypt profiles using verified session pwd
         print("[main] Settings and profiles loaded.")
+        timing.mark("settings and profiles loaded")
+        if sync_manager.sync_enabled:
+            preload_google_api() # Solo con la sync attiva: lo stack Google si carica in background
     except Exception as load_err:
          print(f"[main] CRITICAL ERROR loading settings/profiles after auth: {load_err}")
          QMessageBox.critical(None, "Errore Caricamento Dati", f"Impossibile caricare i dati dopo l'autenticazione: {load_err}. L'applicazione terminerà.")
@@ -154,6 +163,7 @@ def main():
 
     # --- Pass SyncManager to MainWindow --- 
     window = MainWindow(profile_manager=profile_manager, sync_manager=sync_manager)
+    timing.mark("main window built")
     # --- End Pass SyncManager --- 
 
     # --- REMOVE Hotkey Listener INSTANCE --- 
@@ -193,6 +203,11 @@ def main():
          exit_code = 1 # Segnala errore
 
     # --- Cleanup --- 
+    print("[main] Flushing credential usage events...")
+    try:
+        window.credential_manager.flush_usage()
+    except Exception as usage_err:
+        print(f"[main] Error flushing usage events: {usage_err}")
     print("[main] Stopping hotkey listener...")
     try:
         # --- CALL MODULE FUNCTION --- 
@@ -0,0 +1,356 @@
+"""
+Associa la finestra attiva (nome processo + titolo) alle credenziali salvate.
+
+L'indice mappa token (nomi di processo, parole del titolo, domini normalizzati)
+alle credenziali con un peso. È tenuto interamente in memoria per una ricerca
+in pochi microsecondi e salvato nella tabella `context_index`, così non va
+ricostruito a ogni avvio. Oltre ai token derivati dalla credenziale (nome app,
+URL) l'indice impara le associazioni confermate dall'utente (credenziale
+copiata dal popup mentre era attiva una certa finestra). I token appresi vengono
+dal titolo della finestra e sono salvati solo come HMAC con una chiave derivata
+dalla master password (la stessa delle impronte delle password): la ricerca
+confronta i token per uguaglianza, quindi basta calcolare lo stesso HMAC sui
+token della finestra attiva.
+"""
+
+import hashlib
+import hmac
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .credential import Credential
+from .database_manager import DatabaseManager, get_db_manager
+
+# --- Pesi ---
+APP_TOKEN_WEIGHT = 2.0 # Parola del nome dell'app
+DOMAIN_WEIGHT = 4.0 # Dominio normalizzato (es. "github.com")
+LEARNED_WEIGHT_STEP = 1.0 # Incremento per ogni uso confermato
+LEARNED_WEIGHT_MAX = 8.0
+
+MIN_TOKEN_LENGTH = 2
+MAX_LEARNED_TOKENS = 6 # Limita quanto testo del titolo viene memorizzato per associazione
+LEARNED_TOKEN_PREFIX = "h:" # Token appreso salvato come HMAC (i token in chiaro non contengono ':')
+LEARNED_TOKEN_LABEL = b"PsW context token v1"
+
+# Processi il cui nome non dice nulla sul sito/app: conta solo il titolo
+BROWSER_PROCESSES = frozenset({
+    "chrome", "msedge", "firefox", "opera", "brave", "vivaldi", "iexplore", "safari", "chromium", "waterfox",
+})
+GENERIC_PROCESSES = BROWSER_PROCESSES | frozenset({"unknown", "explorer", "applicationframehost", "python", "pythonw"})
+
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "www", "http", "https", "com", "net", "org", "exe", "app",
+    "login", "log", "sign", "signin", "home", "new", "tab", "page", "account", "welcome",
+    "di", "del", "della", "il", "la", "le", "per", "con", "accedi", "accesso", "nuova", "scheda", "pagina",
+})
+
+# Estensioni di file che nei titoli ("report.docx - Word") sembrerebbero domini
+FILE_EXTENSIONS = frozenset({
+    "txt", "doc", "docx", "xls", "xlsx", "ppt", "pptx", "pdf", "odt", "csv", "json", "xml", "log",
+    "png", "jpg", "jpeg", "gif", "zip", "rar", "exe", "ini", "cfg", "html", "htm", "py", "js", "ts", "md",
+})
+
+# Secondi livelli "pubblici" (es. example.co.uk): il dominio registrabile ha tre etichette
+PUBLIC_SECOND_LEVELS = frozenset({"co", "com", "org", "net", "gov", "ac", "edu"})
+
+_TITLE_SEPARATORS = re.compile(r"\s+[-–—|·:]\s+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_DOMAIN_RE = re.compile(r"(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z]{2,}")
+
+
+@dataclass
+class ContextMatch:
+    """Credenziale candidata per la finestra attiva."""
+    credential_id: int
+    profile_id: int
+    score: float
+
+
+def normalize_domain(value: str) -> Optional[str]:
+    """
+    Riduce un URL o un host al dominio registrabile ("https://accounts.google.com/x" -> "google.com").
+
+    Returns:
+        Il dominio normalizzato o None se il testo non contiene un dominio.
+    """
+    if not value:
+        return None
+    host = value.strip().lower()
+    host = host.split("://", 1)[-1].split("/", 1)[0].split("@")[-1].split(":", 1)[0]
+    match = _DOMAIN_RE.fullmatch(host)
+    if not match:
+        return None
+    labels = host.split(".")
+    if labels[-1] in FILE_EXTENSIONS:
+        return None
+    if labels[0] == "www":
+        labels = labels[1:]
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in PUBLIC_SECOND_LEVELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def _words(text: str) -> List[str]:
+    """Parole significative del testo; i domini sono esclusi (li gestisce _domain_tokens)."""
+    text = _DOMAIN_RE.sub(" ", text.lower())
+    return [word for word in _WORD_RE.findall(text)
+            if len(word) >= MIN_TOKEN_LENGTH and word not in STOPWORDS]
+
+
+def _domain_tokens(text: str) -> Set[str]:
+    """Domini normalizzati presenti nel testo, più la loro etichetta principale ("github.com" -> "github")."""
+    tokens = set()
+    for candidate in _DOMAIN_RE.findall(text.lower()):
+        domain = normalize_domain(candidate)
+        if domain:
+            tokens.add(domain)
+            tokens.add(domain.split(".")[0])
+    return tokens
+
+
+def _process_token(process_name: Optional[str]) -> Optional[str]:
+    if not process_name:
+        return None
+    name = process_name.strip().lower()
+    if name.endswith(".exe"):
+        name = name[:-4]
+    return name or None
+
+
+def _title_segments(title: str, is_browser: bool) -> List[str]:
+    """Spezza il titolo ("Pull requests · GitHub - Google Chrome"); nei browser scarta il nome del browser."""
+    segments = [segment for segment in _TITLE_SEPARATORS.split(title or "") if segment.strip()]
+    if is_browser and len(segments) > 1:
+        segments = segments[:-1]
+    return segments
+
+
+def credential_tokens(credential: Credential) -> List[Tuple[str, str, float]]:
+    """Token derivati da una credenziale: (token, source, weight)."""
+    entries: Dict[Tuple[str, str], float] = {}
+    for text in (credential.app_name or "", getattr(credential, "url", None) or ""):
+        for domain in _domain_tokens(text):
+            entries[(domain, "domain")] = DOMAIN_WEIGHT
+        for word in _words(text):
+            entries.setdefault((word, "app"), APP_TOKEN_WEIGHT)
+    return [(token, source, weight) for (token, source), weight in entries.items()]
+
+
+def context_tokens(process_name: Optional[str], window_title: Optional[str]) -> Set[str]:
+    """Token usati per la ricerca a partire dalla finestra attiva."""
+    process = _process_token(process_name)
+    is_browser = process in BROWSER_PROCESSES
+    tokens = set()
+    if process and process not in GENERIC_PROCESSES:
+        tokens.add(process)
+    for segment in _title_segments(window_title or "", is_browser):
+        tokens.update(_words(segment))
+        tokens.update(_domain_tokens(segment))
+    return tokens
+
+
+def _learnable_tokens(process_name: Optional[str], window_title: Optional[str]) -> List[str]:
+    """
+    Token da memorizzare per un'associazione confermata: il processo (se significativo),
+    i domini e le parole dell'ultimo segmento del titolo (di solito il nome del sito/app),
+    non l'intero titolo che può contenere testo personale.
+    """
+    process = _process_token(process_name)
+    is_browser = process in BROWSER_PROCESSES
+    tokens = []
+    if process and process not in GENERIC_PROCESSES:
+        tokens.append(process)
+    segments = _title_segments(window_title or "", is_browser)
+    if segments:
+        tokens.extend(sorted(_domain_tokens(" ".join(segments))))
+        tokens.extend(_words(segments[-1]))
+    unique = list(dict.fromkeys(tokens))
+    return unique[:MAX_LEARNED_TOKENS]
+
+
+def learned_token(token: str, key: bytes) -> str:
+    """Forma salvata di un token appreso: HMAC del token con la chiave dei token appresi."""
+    return LEARNED_TOKEN_PREFIX + hmac.new(key, token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+class ContextMatcher:
+    """Indice token -> credenziali, in memoria e persistito in SQLite."""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None,
+                 key_provider: Optional[Callable[[], Optional[bytes]]] = None):
+        """
+        Args:
+            db_manager: Database dell'indice (default: quello globale).
+            key_provider: Restituisce la chiave HMAC delle impronte delle password, o None se
+                          la sessione non è sbloccata (in quel caso non si impara nulla).
+        """
+        self.db_manager = db_manager or get_db_manager()
+        self.key_provider = key_provider
+        # {token: {credential_id: peso totale}}
+        self._index: Dict[str, Dict[int, float]] = {}
+        # {credential_id: {(token, source): peso}}
+        self._entries: Dict[int, Dict[Tuple[str, str], float]] = {}
+        self._profiles: Dict[int, int] = {} # credential_id -> profile_id
+        self._loaded = False
+
+    # --- Caricamento ---
+    def load(self):
+        """Carica l'indice da SQLite e indicizza le credenziali che non vi compaiono ancora."""
+        self._index.clear()
+        self._entries.clear()
+        self._profiles.clear()
+        for row in self._hash_plain_learned(self.db_manager.get_context_index_rows()):
+            self._add_entry(row['credential_id'], row['profile_id'], row['token'], row['source'], row['weight'])
+        # Credenziali create prima dell'indice: il nome app è in chiaro, nessuna decifratura necessaria
+        pending = self.db_manager.get_unindexed_credentials()
+        for row in pending:
+            self.index_credential(Credential(id=row['id'], profile_id=row['profile_id'], app_name=row['app_name'],
+                                             username='', password=''))
+        self._loaded = True
+        print(f"[ContextMatcher] Loaded {len(self._index)} tokens for {len(self._profiles)} credentials "
+              f"({len(pending)} newly indexed).")
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _hash_plain_learned(self, rows: List[dict]) -> List[dict]:
+        """
+        Sostituisce (in memoria e su disco) i token appresi salvati in chiaro dalle versioni
+        precedenti con il loro HMAC. Senza chiave restano come sono: trovano ancora la
+        finestra, e verranno convertiti al prossimo caricamento con la sessione sbloccata.
+        """
+        kept, plain = {}, []
+        for row in rows:
+            if row['source'] == "learned" and not row['token'].startswith(LEARNED_TOKEN_PREFIX):
+                plain.append(row)
+            else:
+                kept[(row['token'], row['credential_id'], row['source'])] = row
+        key = self._token_key() if plain else None
+        if key is None:
+            return rows
+        for row in plain:
+            hashed = dict(row, token=learned_token(row['token'], key))
+            existing = kept.get((hashed['token'], row['credential_id'], "learned"))
+            if existing is None or existing['weight'] < hashed['weight']:
+                kept[(hashed['token'], row['credential_id'], "learned")] = hashed
+        self.db_manager.hash_learned_context_tokens(
+            [(row['token'], learned_token(row['token'], key), row['credential_id']) for row in plain])
+        print(f"[ContextMatcher] Converted {len(plain)} plaintext learned tokens to keyed hashes.")
+        return list(kept.values())
+
+    def _token_key(self) -> Optional[bytes]:
+        """Chiave dei token appresi, separata da quella delle impronte (None se la sessione non è sbloccata)."""
+        key = self.key_provider() if self.key_provider else None
+        return hmac.new(key, LEARNED_TOKEN_LABEL, hashlib.sha256).digest() if key else None
+
+    # --- Gestione indice in memoria ---
+    def _add_entry(self, credential_id: int, profile_id: int, token: str, source: str, weight: float):
+        self._entries.setdefault(credential_id, {})[(token, source)] = weight
+        self._profiles[credential_id] = profile_id
+        postings = self._index.setdefault(token, {})
+        postings[credential_id] = postings.get(credential_id, 0.0) + weight
+
+    def _drop_entries(self, credential_id: int, keep_learned: bool):
+        entries = self._entries.get(credential_id, {})
+        for (token, source), weight in list(entries.items()):
+            if keep_learned and source == "learned":
+                continue
+            del entries[(token, source)]
+            postings = self._index.get(token)
+            if postings is None:
+                continue
+            remaining = postings.get(credential_id, 0.0) - weight
+            if remaining > 1e-9:
+                postings[credential_id] = remaining
+            else:
+                postings.pop(credential_id, None)
+                if not postings:
+                    del self._index[token]
+        if not entries:
+            self._entries.pop(credential_id, None)
+            self._profiles.pop(credential_id, None)
+
+    # --- API ---
+    def index_credential(self, credential: Credential):
+        """(Re)indicizza i token derivati da una credenziale, mantenendo le associazioni apprese."""
+        try:
+            credential_id, profile_id = int(credential.id), int(credential.profile_id)
+        except (TypeError, ValueError):
+            return
+        self._drop_entries(credential_id, keep_learned=True)
+        tokens = credential_tokens(credential)
+        for token, source, weight in tokens:
+            self._add_entry(credential_id, profile_id, token, source, weight)
+        # Le associazioni apprese seguono la credenziale se cambia profilo
+        if credential_id in self._entries:
+            self._profiles[credential_id] = profile_id
+        self.db_manager.replace_context_entries(
+            credential_id, [(token, profile_id, source, weight) for token, source, weight in tokens])
+
+    def remove_credential(self, credential_id):
+        """Rimuove una credenziale dall'indice (anche le associazioni apprese)."""
+        try:
+            credential_id = int(credential_id)
+        except (TypeError, ValueError):
+            return
+        self._drop_entries(credential_id, keep_learned=False)
+        self.db_manager.replace_context_entries(credential_id, [], keep_learned=False)
+
+    def learn(self, credential: Credential, process_name: Optional[str], window_title: Optional[str]):
+        """Rafforza l'associazione tra la finestra attiva e la credenziale scelta dall'utente."""
+        self.ensure_loaded()
+        try:
+            credential_id, profile_id = int(credential.id), int(credential.profile_id)
+        except (TypeError, ValueError):
+            return
+        key = self._token_key()
+        if key is None:
+            print("[ContextMatcher] Session not unlocked: association not learned.")
+            return
+        entries = self._entries.get(credential_id, {})
+        updates = []
+        for token in (learned_token(token, key) for token in _learnable_tokens(process_name, window_title)):
+            current = entries.get((token, "learned"), 0.0)
+            weight = min(current + LEARNED_WEIGHT_STEP, LEARNED_WEIGHT_MAX)
+            if weight == current:
+                continue
+            if current:
+                self._index[token][credential_id] += weight - current
+                entries[(token, "learned")] = weight
+            else:
+                self._add_entry(credential_id, profile_id, token, "learned", weight)
+                entries = self._entries[credential_id]
+            updates.append((token, credential_id, profile_id, "learned", weight))
+        if updates:
+            self.db_manager.set_context_weights(updates)
+
+    def match(self, process_name: Optional[str], window_title: Optional[str],
+              profile_ids: Optional[Iterable[int]] = None, limit: int = 10) -> List[ContextMatch]:
+        """
+        Credenziali candidate per la finestra attiva, dalla più probabile.
+
+        Args:
+            process_name: Nome del processo in primo piano (es. "chrome.exe").
+            window_title: Titolo della finestra in primo piano.
+            profile_ids: Se indicato, limita la ricerca a questi profili.
+            limit: Numero massimo di risultati.
+        """
+        self.ensure_loaded()
+        key = self._token_key()
+        scores: Dict[int, float] = {}
+        for token in context_tokens(process_name, window_title):
+            for lookup in (token, learned_token(token, key)) if key else (token,):
+                postings = self._index.get(lookup)
+                if postings:
+                    for credential_id, weight in postings.items():
+                        scores[credential_id] = scores.get(credential_id, 0.0) + weight
+        if not scores:
+            return []
+        allowed = set(profile_ids) if profile_ids is not None else None
+        matches = [ContextMatch(credential_id, self._profiles[credential_id], score)
+                   for credential_id, score in scores.items()
+                   if allowed is None or self._profiles[credential_id] in allowed]
+        matches.sort(key=lambda m: (-m.score, m.credential_id))
+        return matches[:limit]
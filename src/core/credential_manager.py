@@ -2,10 +2,10 @@
 Modulo per la gestione delle credenziali.
 """
 
+import copy
 import json
-import re
 import hashlib
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from ..core.profile_manager import Profile
 from ..core.credential import Credential
@@ -13,7 +13,12 @@ import os
 import uuid
 from PySide6.QtCore import QObject, Signal
 from ..utils.sync_manager import SyncManager
-from ..core.database_manager import get_db_manager, DatabaseManager
+from ..core.database_manager import get_db_manager, DatabaseManager, FINGERPRINT_TABLES
+from ..core.password_strength import estimate_strength, StrengthResult
+from ..core.password_generator import PasswordPolicy, generate_password
+from ..core.context_matcher import ContextMatcher, ContextMatch
+from ..core.usage_tracker import UsageTracker
+from ..utils.crypto import compute_password_fingerprint, decrypt_data
 
 class CredentialManager(QObject):
     """
@@ -33,10 +38,53 @@ class CredentialManager(QObject):
         super().__init__()
         self.sync_manager = sync_manager
         self.db_manager: DatabaseManager = get_db_manager()
+        # Cache per profilo delle credenziali già decrittate: {profile_id: [Credential, ...]}
+        self._credentials_cache: Dict[int, List[Credential]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Indice finestra attiva -> credenziali (caricato al primo utilizzo; token appresi con la chiave delle impronte)
+        self.context_matcher = ContextMatcher(self.db_manager, self.sync_manager.get_password_fingerprint_key)
+        # Punteggi frecency (uso frequente/recente), scritti su disco in background
+        self.usage_tracker = UsageTracker(self.db_manager)
+        # Esiti HaveIBeenPwned per SHA-1 della password: evita di ripetere la richiesta a ogni refresh
+        self._pwned_cache: Dict[str, bool] = {}
+        # Le credenziali in chiaro non devono sopravvivere al blocco/cambio della master password
+        self.sync_manager.register_session_reset_callback(self.clear_cache)
         print("[CredentialManager] Initialized.")
+
+    # --- Credential Cache ---
+    @staticmethod
+    def _cache_key(profile_id) -> Optional[int]:
+        try:
+            return int(profile_id)
+        except (TypeError, ValueError):
+            return None
+
+    def invalidate_profile(self, profile_id):
+        """Rimuove dalla cache le credenziali di un singolo profilo."""
+        self._credentials_cache.pop(self._cache_key(profile_id), None)
+
+    def clear_cache(self):
+        """Svuota la cache delle credenziali (chiamata al blocco della sessione)."""
+        if self._credentials_cache:
+            print(f"[CredentialManager] Evicting credential cache ({len(self._credentials_cache)} profiles).")
+        self._credentials_cache.clear()
+        self._pwned_cache.clear() # Anche gli hash SHA-1 delle password sono legati alla sessione
+
+    def get_cache_stats(self) -> dict:
+        """Statistiche della cache per profilo (profili in cache, hit, miss)."""
+        return {"profiles": len(self._credentials_cache), "hits": self.cache_hits, "misses": self.cache_misses}
         
     def get_profile_credentials(self, profile_id: int) -> List[Credential]:
-        """Restituisce le credenziali per un ID profilo specifico leggendo dal DB."""
+        """Restituisce le credenziali per un ID profilo specifico (dalla cache, o leggendo dal DB)."""
+        cache_key = self._cache_key(profile_id)
+        cached = self._credentials_cache.get(cache_key)
+        if cached is not None:
+            self.cache_hits += 1
+            # Copie: i chiamanti modificano gli oggetti (es. dialog di modifica) prima di salvarli
+            return [copy.copy(cred) for cred in cached]
+        self.cache_misses += 1
+
         print(f"[CredentialManager] Getting credentials for profile_id: {profile_id}")
         credentials_list = []
         verified_password = self.sync_manager._get_verified_password_for_session()
@@ -77,7 +125,9 @@ class CredentialManager(QObject):
                 except Exception as e:
                     print(f"[CredentialManager] Error converting DB data to Credential object for profile {profile_id}: {e} - Data: {cred_dict}")
             print(f"[CredentialManager] Found {len(credentials_list)} credentials for profile {profile_id}.")
-            return credentials_list
+            if cache_key is not None:
+                self._credentials_cache[cache_key] = credentials_list
+            return [copy.copy(cred) for cred in credentials_list]
         except Exception as e:
              print(f"[CredentialManager] Error fetching credentials from DB for profile {profile_id}: {e}")
              return []
@@ -103,13 +153,18 @@ class CredentialManager(QObject):
             'email': credential.email,
             'username': credential.username,
             'password': credential.password,
-            'notes': credential.notes
+            'notes': credential.notes,
+            'password_fingerprint': self._password_fingerprint(credential.password)
         }
         
         try:
             new_id = self.db_manager.add_credential(cred_data_dict, verified_password, salt_bytes)
             if new_id is not None:
                 print(f"[CredentialManager] Credential '{credential.app_name}' added successfully to DB with ID {new_id}.")
+                self.invalidate_profile(credential.profile_id)
+                indexed = copy.copy(credential)
+                indexed.id = new_id
+                self.context_matcher.index_credential(indexed)
                 self.credential_changed.emit()
                 return True # Return True only if ID is received
             else:
@@ -145,13 +200,16 @@ class CredentialManager(QObject):
             'email': updated_credential.email,
             'username': updated_credential.username,
             'password': updated_credential.password,
-            'notes': updated_credential.notes
+            'notes': updated_credential.notes,
+            'password_fingerprint': self._password_fingerprint(updated_credential.password)
         }
         
         try:
             success = self.db_manager.update_credential(credential_id, cred_data_dict, verified_password, salt_bytes)
             if success:
                 print(f"[CredentialManager] Credential ID {credential_id} ('{updated_credential.app_name}') updated successfully in DB.")
+                self.invalidate_profile(updated_credential.profile_id)
+                self.context_matcher.index_credential(updated_credential)
                 self.credential_changed.emit()
                 return True # Return True on success
             else:
@@ -173,6 +231,9 @@ class CredentialManager(QObject):
             success = self.db_manager.delete_credential(credential_id)
             if success:
                 print(f"[CredentialManager] Credential ID {credential_id} deleted successfully from DB.")
+                self.invalidate_profile(credential_to_delete.profile_id)
+                self.context_matcher.remove_credential(credential_id)
+                self.usage_tracker.forget(credential_id)
                 self.credential_changed.emit()
                 return True # Return True on success
             else:
@@ -221,19 +282,43 @@ class CredentialManager(QObject):
         return None
         
     def search_credentials(self, query: str) -> List[Credential]:
-        """Searches credentials across all profiles based on query."""
-        # This requires significant refactoring for DB search.
-        # Needs to potentially join profiles and credentials tables,
-        # and handle decryption for searching sensitive fields if password is known.
-        print("[CredentialManager] WARNING: search_credentials() needs refactoring for DB access.")
-        return []
-        # Simple search on non-encrypted fields for now
-        # query = query.lower()
-        # results = []
-        # for cred in self.get_all_credentials(): # Inefficient
-        #     if query in cred.app_name.lower():
-        #         results.append(cred)
-        # return results
+        """
+        Cerca le credenziali di tutti i profili per app, username o email (case-insensitive).
+        I risultati sono ordinati per frecency: prima le più usate di recente.
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+        results = []
+        for profile_id in self.db_manager.get_credential_profile_ids():
+            for cred in self.get_profile_credentials(profile_id):
+                if any(query in (value or "").lower() for value in (cred.app_name, cred.username, cred.email)):
+                    results.append(cred)
+        return self.rank_by_usage(results)
+
+    # --- Usage Ranking (frecency) ---
+    def record_usage(self, credential: Credential, event: str = "copy_password"):
+        """Registra l'uso di una credenziale (aggiornamento in memoria, scrittura su disco asincrona)."""
+        self.usage_tracker.record(credential, event)
+
+    def rank_by_usage(self, credentials: List[Credential]) -> List[Credential]:
+        """Ordina per frecency decrescente; a parità resta l'ordine originale (per nome app)."""
+        return self.usage_tracker.rank(credentials)
+
+    def flush_usage(self):
+        """Scrive gli eventi di utilizzo in coda e ferma il thread di scrittura (alla chiusura)."""
+        self.usage_tracker.stop()
+
+    # --- Context Matching (finestra attiva) ---
+    def match_context(self, process_name: Optional[str], window_title: Optional[str],
+                      profile_ids: Optional[List[int]] = None) -> List[ContextMatch]:
+        """Credenziali candidate per la finestra in primo piano, dalla più probabile (nessuna decifratura)."""
+        return self.context_matcher.match(process_name, window_title, profile_ids)
+
+    def record_context_use(self, credential: Credential, process_name: Optional[str], window_title: Optional[str]):
+        """Memorizza che la credenziale è stata usata con questa finestra in primo piano."""
+        if process_name or window_title:
+            self.context_matcher.learn(credential, process_name, window_title)
 
     @staticmethod
     def validate_credential(credential: Credential) -> bool:
@@ -244,9 +329,12 @@ class CredentialManager(QObject):
         return True
     
     def is_password_compromised(self, password: str) -> bool:
-        """Checks if a password has been compromised using HaveIBeenPwned API."""
+        """Checks if a password has been compromised using HaveIBeenPwned API (successful lookups are cached)."""
         if not password: return False
         sha1pwd = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+        cached = self._pwned_cache.get(sha1pwd)
+        if cached is not None:
+            return cached
         head, tail = sha1pwd[:5], sha1pwd[5:]
         api_url = f'https://api.pwnedpasswords.com/range/{head}'
         try:
@@ -256,7 +344,9 @@ class CredentialManager(QObject):
             response.raise_for_status() # Raise exception for bad status codes
             
             # Efficiently check if the tail exists in the response
-            return tail in response.text
+            compromised = tail in response.text
+            self._pwned_cache[sha1pwd] = compromised
+            return compromised
             
         except ImportError:
              print("[CredentialManager] 'requests' library not installed. Cannot check pwned passwords.")
@@ -269,36 +359,70 @@ class CredentialManager(QObject):
         return False
         
     def is_password_secure(self, password: str) -> bool:
-        """Checks if a password meets basic security criteria (length, complexity)."""
-        if not password or len(password) < 10: # Example: Minimum length
-            return False
-        has_upper = bool(re.search(r'[A-Z]', password))
-        has_lower = bool(re.search(r'[a-z]', password))
-        has_digit = bool(re.search(r'\d', password))
-        has_symbol = bool(re.search(r'[!@#$%^&*(),.?":{}|<>]', password))
-        return has_upper and has_lower and has_digit and has_symbol
+        """Checks if a password is strong enough (entropy-based estimate, results cached per password)."""
+        return estimate_strength(password).is_secure
+
+    def get_password_strength(self, password: str) -> StrengthResult:
+        """Returns the full strength estimate (score, entropy, crack time, feedback) for a password."""
+        return estimate_strength(password)
         
     def generate_password(self, length: int = 16, use_special_chars: bool = True) -> str:
-        """Generates a secure random password."""
-        import string
-        import secrets
-        
-        chars = string.ascii_letters + string.digits
-        if use_special_chars:
-            # Define allowed special characters explicitly
-            allowed_special = "!@#$%^&*()" 
-            chars += allowed_special
-            
-        while True:
-            password = ''.join(secrets.choice(chars) for _ in range(length))
-            # Ensure the generated password meets complexity requirements if needed
-            # (e.g., must contain at least one of each type)
-            # For simplicity now, we just generate and return.
-            # Add checks here if stricter generation is required.
-            if self.is_password_secure(password): # Check if generated meets criteria
-                 return password
-            # else: print("DEBUG: Regenerating password...") # Optional debug
+        """Generates a secure random password (one of each character class, no regeneration loop)."""
+        policy = PasswordPolicy(
+            length=length,
+            use_symbols=use_special_chars,
+            symbols="!@#$%^&*()" # Allowed special characters for credentials
+        )
+        return generate_password(policy)
         
+    # --- Password Reuse (fingerprint based) ---
+    def _password_fingerprint(self, password: Optional[str]) -> Optional[str]:
+        """Calcola l'impronta keyed di una password per la sessione corrente (None se non sbloccata)."""
+        if not password:
+            return None
+        return compute_password_fingerprint(password, self.sync_manager.get_password_fingerprint_key())
+
+    def backfill_password_fingerprints(self) -> int:
+        """
+        Calcola le impronte mancanti (righe create prima della migrazione o dopo un cambio
+        di master password). Decifra solo le righe senza impronta, una volta.
+
+        Returns:
+            Numero di righe aggiornate.
+        """
+        verified_password = self.sync_manager._get_verified_password_for_session()
+        salt_bytes = self.sync_manager.get_master_password_salt()
+        fingerprint_key = self.sync_manager.get_password_fingerprint_key()
+        if not verified_password or not salt_bytes or not fingerprint_key:
+            print("[CredentialManager] Cannot backfill fingerprints: session not unlocked.")
+            return 0
+
+        updated = 0
+        for table in FINGERPRINT_TABLES:
+            pending = []
+            for row in self.db_manager.get_rows_missing_fingerprint(table):
+                plain = decrypt_data(row['encrypted_password'], verified_password, salt_bytes)
+                fingerprint = compute_password_fingerprint(plain, fingerprint_key)
+                if fingerprint:
+                    pending.append((fingerprint, row['id']))
+            if pending and self.db_manager.set_password_fingerprints(table, pending):
+                updated += len(pending)
+        if updated:
+            print(f"[CredentialManager] Backfilled {updated} password fingerprints.")
+        return updated
+
+    def get_reused_passwords(self) -> List[dict]:
+        """
+        Restituisce i gruppi di password riutilizzate (stessa impronta su più credenziali/profili).
+        Nessuna password viene decifrata: il confronto avviene sull'indice delle impronte.
+        """
+        self.backfill_password_fingerprints()
+        return self.db_manager.get_reused_password_groups()
+
+    def count_reused_passwords(self) -> int:
+        """Numero di elementi (credenziali + profili) che condividono la password con almeno un altro."""
+        return sum(group['count'] for group in self.get_reused_passwords())
+
     def attempt_decryption(self):
         """
         Placeholder method to trigger credential loading/decryption.
@@ -5,16 +5,47 @@ Gestisce l'interazione con il database SQLite locale crittografato (a livello ap
 import sqlite3
 import os
 import json # For potential complex settings or token storage
+import time
+import uuid
 from typing import Optional, List, Dict, Any, Tuple
 
 # Import encryption utilities
 from ..utils.crypto import encrypt_data, decrypt_data
+from ..utils import timing
+from ..utils.hlc import HybridLogicalClock, field_stamps, decode_field_stamps, compact_field_stamps, encode_field_stamps
 
 DATABASE_FILE = "data/pswcursor_data.db"
 
 # Set of setting keys that should be encrypted/decrypted
 ENCRYPTED_SETTINGS = {'encrypted_client_secret', 'google_token_json'}
 
+# Tables that carry a password_fingerprint column (whitelist for dynamic SQL)
+FINGERPRINT_TABLES = ('credentials', 'profiles')
+
+# Tables whose rows are exchanged record by record by the delta sync engine
+SYNC_TABLES = ('profiles', 'credentials')
+SYNC_RECORD_TYPES = {'profiles': 'profile', 'credentials': 'credential'}
+# Content fields merged one by one (last writer wins per field, ordered by HLC timestamps)
+SYNC_FIELDS = {
+    'profiles': ('name', 'last_name', 'url', 'username', 'email', 'phone', 'address', 'encrypted_password', 'notes'),
+    'credentials': ('app_name', 'first_name', 'last_name', 'email', 'username', 'encrypted_password', 'notes'),
+}
+# Fields whose concurrent edits on two devices are recorded in sync_conflicts (the losing value must not vanish silently)
+SECRET_SYNC_FIELDS = ('encrypted_password', 'notes')
+
+# Settings shared between devices through sync. Everything else (master password hash/salt,
+# Google token, Drive folder, hotkey, client secret, sync state) stays local to the device.
+SYNCED_SETTINGS = {'sync_interval', 'client_id'}
+
+# Change-data-capture journal (change_log), filled by triggers
+CHANGE_LOG_TABLES = ('profiles', 'credentials')
+# Columns whose updates alone are bookkeeping, not data changes (timestamp trigger, sync state, derived fingerprint)
+CHANGE_LOG_IGNORED_COLUMNS = {'updated_at', 'sync_pending', 'password_fingerprint'}
+CHANGE_LOG_RETENTION_SECONDS = 30 * 86400 # Entries older than this are compacted even if a consumer lags behind
+CHANGE_LOG_MAX_ROWS = 50000
+CHANGE_LOG_COMPACT_INTERVAL_SECONDS = 600
+_SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)" # Unix timestamp in SQL (anche su SQLite senza unixepoch())
+
 class DatabaseManager:
     """Gestisce la connessione e le operazioni CRUD sul database SQLite."""
 
@@ -27,10 +58,14 @@ class DatabaseManager:
         """
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
+        self.device_id: Optional[str] = None # Identità di questo dispositivo per la sync (creata al primo avvio)
+        self.clock: Optional[HybridLogicalClock] = None # Timestamp HLC delle modifiche locali (condiviso col thread di sync)
         # Ensure the data directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        self._connect()
-        self._create_tables()
+        with timing.measure("DB open"):
+            self._connect()
+            self._create_tables()
+            self.compact_change_log()
 
     def _connect(self):
         """Stabilisce la connessione al database."""
@@ -118,6 +153,165 @@ class DatabaseManager:
             END;
             """)
             print("[DatabaseManager] 'credentials' table checked/created/updated (using app_name).")
+
+            # --- Password fingerprint columns (HMAC of the plaintext, keyed from the session key) ---
+            for table in FINGERPRINT_TABLES:
+                self._ensure_column(cursor, table, 'password_fingerprint', 'TEXT')
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_password_fingerprint ON {table} (password_fingerprint)")
+            print("[DatabaseManager] Password fingerprint columns/indexes checked/created.")
+
+            # --- Delta Sync (identità stabile e versione per record, tombstone per le eliminazioni) ---
+            cursor.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('sync_device_id', ?)", (uuid.uuid4().hex,))
+            cursor.execute("SELECT value FROM settings WHERE key = 'sync_device_id'")
+            self.device_id = cursor.fetchone()['value']
+            for table in SYNC_TABLES:
+                self._ensure_column(cursor, table, 'sync_id', 'TEXT')
+                self._ensure_column(cursor, table, 'sync_version', 'INTEGER NOT NULL DEFAULT 1')
+                self._ensure_column(cursor, table, 'sync_device', 'TEXT')
+                self._ensure_column(cursor, table, 'sync_pending', 'INTEGER NOT NULL DEFAULT 1') # 1 = modifica locale non ancora inviata
+                # Righe create prima della migrazione: sync_id casuale, attribuite a questo dispositivo
+                cursor.execute(f"UPDATE {table} SET sync_id = lower(hex(randomblob(16))) WHERE sync_id IS NULL")
+                cursor.execute(f"UPDATE {table} SET sync_device = ? WHERE sync_device IS NULL", (self.device_id,))
+                cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_sync_id ON {table} (sync_id)")
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_sync_pending ON {table} (sync_pending)")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_tombstones (
+                sync_id TEXT PRIMARY KEY,
+                record_type TEXT NOT NULL, -- 'profile' o 'credential'
+                sync_version INTEGER NOT NULL, -- Versione del record alla cancellazione (+1)
+                sync_device TEXT NOT NULL,
+                deleted_at REAL NOT NULL, -- Unix timestamp
+                sync_pending INTEGER NOT NULL DEFAULT 1
+            )
+            """)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_setting_versions (
+                key TEXT PRIMARY KEY, -- Solo chiavi in SYNCED_SETTINGS
+                sync_version INTEGER NOT NULL,
+                sync_device TEXT NOT NULL,
+                sync_pending INTEGER NOT NULL DEFAULT 1
+            )
+            """)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_peers (
+                device_id TEXT PRIMARY KEY,
+                last_seq INTEGER NOT NULL DEFAULT 0, -- Ultimo blocco di modifiche applicato da quel dispositivo
+                last_pulled_at REAL
+            )
+            """)
+            self._ensure_column(cursor, 'sync_peers', 'checked_snapshot', 'TEXT') # Ultimo snapshot Merkle confrontato
+            print("[DatabaseManager] Sync columns and 'sync_tombstones'/'sync_setting_versions'/'sync_peers' tables checked/created.")
+
+            # --- Timestamp HLC per record e per campo (merge deterministico, vedi utils/hlc.py) ---
+            for table in SYNC_TABLES:
+                self._ensure_column(cursor, table, 'sync_hlc', 'TEXT') # Modifica più recente del record
+                self._ensure_column(cursor, table, 'sync_field_hlc', 'TEXT') # JSON campo -> HLC, solo i campi più vecchi di sync_hlc
+                # JSON campo segreto -> HLC che aveva all'ultima sincronizzazione, per i campi modificati qui e non ancora inviati
+                self._ensure_column(cursor, table, 'sync_base_field_hlc', 'TEXT')
+            for table in ('sync_tombstones', 'sync_setting_versions'):
+                self._ensure_column(cursor, table, 'sync_hlc', 'TEXT')
+            cursor.execute("""SELECT MAX(stamp) AS last_stamp FROM (
+                                  SELECT MAX(sync_hlc) AS stamp FROM profiles UNION ALL SELECT MAX(sync_hlc) FROM credentials
+                                  UNION ALL SELECT MAX(sync_hlc) FROM sync_tombstones UNION ALL SELECT MAX(sync_hlc) FROM sync_setting_versions)""")
+            self.clock = HybridLogicalClock(self.device_id, cursor.fetchone()['last_stamp'])
+            # Righe precedenti alla migrazione: un unico timestamp locale
+            migration_stamp = self.clock.now()
+            hlc_migrated = False
+            for table in SYNC_TABLES + ('sync_tombstones', 'sync_setting_versions'):
+                cursor.execute(f"UPDATE {table} SET sync_hlc = ? WHERE sync_hlc IS NULL", (migration_stamp,))
+                hlc_migrated = hlc_migrated or cursor.rowcount > 0
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_conflicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                record_type TEXT NOT NULL, -- 'profile' o 'credential'
+                sync_id TEXT NOT NULL,
+                field TEXT NOT NULL, -- Solo campi in SECRET_SYNC_FIELDS
+                local_value TEXT, -- Valore come nel record (encrypted_password resta cifrata)
+                local_hlc TEXT,
+                remote_value TEXT,
+                remote_hlc TEXT,
+                winner TEXT NOT NULL, -- 'local' o 'remote'
+                detected_at REAL NOT NULL, -- Unix timestamp
+                resolved INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_conflicts_resolved ON sync_conflicts (resolved)")
+            print("[DatabaseManager] HLC columns and 'sync_conflicts' table checked/created.")
+
+            # --- Change Log (journal delle modifiche, numerato in modo monotono, scritto dai trigger) ---
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, -- AUTOINCREMENT: mai riusato, anche dopo la compattazione
+                table_name TEXT NOT NULL,
+                row_key TEXT NOT NULL, -- id per profiles/credentials, key per settings
+                op TEXT NOT NULL, -- 'I' insert, 'U' update, 'D' delete
+                changed_at REAL NOT NULL -- Unix timestamp
+            )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log (changed_at)")
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS change_log_consumers (
+                name TEXT PRIMARY KEY,
+                last_seq INTEGER NOT NULL DEFAULT 0 -- Ultima modifica elaborata dal consumer
+            )
+            """)
+            self._create_change_log_triggers(cursor)
+            print("[DatabaseManager] 'change_log' table and triggers checked/created.")
+
+            # --- Merkle tree sui record sincronizzati (vedi utils/merkle_index.py) ---
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'merkle_nodes'")
+            merkle_is_new = cursor.fetchone() is None
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS merkle_nodes (
+                node_key TEXT PRIMARY KEY, -- '' radice, 'h:a'/'h:ab' bucket, 'p:'/'t:'/'s:' partizioni
+                parent_key TEXT,
+                hash TEXT NOT NULL
+            )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_merkle_nodes_parent_key ON merkle_nodes (parent_key)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS merkle_dirty (partition TEXT PRIMARY KEY)") # Partizioni da ricalcolare
+            self._create_merkle_triggers(cursor)
+            if merkle_is_new or hlc_migrated:
+                # Prima costruzione (o foglie calcolate prima dei timestamp HLC): tutte le partizioni esistenti vanno calcolate
+                cursor.execute("INSERT OR IGNORE INTO merkle_dirty (partition) SELECT 'p:' || sync_id FROM profiles")
+                cursor.execute("INSERT OR IGNORE INTO merkle_dirty (partition) SELECT 't:' || sync_id FROM sync_tombstones")
+                cursor.execute("INSERT OR IGNORE INTO merkle_dirty (partition) VALUES ('s:')")
+            print("[DatabaseManager] 'merkle_nodes'/'merkle_dirty' tables and triggers checked/created.")
+
+            # --- Context Index (token della finestra attiva -> credenziale) ---
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS context_index (
+                token TEXT NOT NULL,
+                credential_id INTEGER NOT NULL,
+                profile_id INTEGER NOT NULL,
+                source TEXT NOT NULL, -- 'app', 'domain' (derivati dalla credenziale) o 'learned'
+                weight REAL NOT NULL,
+                PRIMARY KEY (token, credential_id, source)
+            )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_context_index_credential_id ON context_index (credential_id)")
+            print("[DatabaseManager] 'context_index' table checked/created.")
+
+            # --- Usage Tables (eventi di utilizzo + punteggio frecency decaduto) ---
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS credential_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                credential_id INTEGER NOT NULL,
+                profile_id INTEGER NOT NULL,
+                event TEXT NOT NULL, -- es. 'copy_password', 'copy_username'
+                used_at REAL NOT NULL -- Unix timestamp
+            )
+            """)
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS credential_frecency (
+                credential_id INTEGER PRIMARY KEY,
+                profile_id INTEGER NOT NULL,
+                score REAL NOT NULL, -- Punteggio al momento last_used_at (decade da lì in poi)
+                last_used_at REAL NOT NULL,
+                use_count INTEGER NOT NULL DEFAULT 0
+            )
+            """)
+            print("[DatabaseManager] 'credential_usage'/'credential_frecency' tables checked/created.")
             
             # --- Pre-populate default settings if table is newly created? ---
             cursor.execute("SELECT 1 FROM settings WHERE key = 'initialized'")
@@ -150,6 +344,92 @@ class DatabaseManager:
         finally:
             cursor.close()
 
+    def _ensure_column(self, cursor: sqlite3.Cursor, table: str, column: str, column_type: str):
+        """Aggiunge una colonna a una tabella esistente se non è ancora presente (migrazione leggera)."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing_columns = {row['name'] for row in cursor.fetchall()}
+        if column not in existing_columns:
+            print(f"[DatabaseManager] Migrating: adding column '{column}' to '{table}'.")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _create_change_log_triggers(self, cursor: sqlite3.Cursor):
+        """Crea i trigger che scrivono in change_log (ricreati a ogni avvio: le colonne possono cambiare con le migrazioni)."""
+        for table in CHANGE_LOG_TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [row['name'] for row in cursor.fetchall() if row['name'] not in CHANGE_LOG_IGNORED_COLUMNS]
+            changed = " OR ".join(f"NEW.{column} IS NOT OLD.{column}" for column in columns)
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS change_log_{table}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, op, changed_at) VALUES ('{table}', NEW.id, 'I', {_SQL_NOW});
+            END;
+            """)
+            # Solo se cambia un dato: l'aggiornamento di updated_at fatto dal trigger del timestamp non conta
+            cursor.execute(f"DROP TRIGGER IF EXISTS change_log_{table}_update")
+            cursor.execute(f"""
+            CREATE TRIGGER change_log_{table}_update AFTER UPDATE ON {table}
+            WHEN {changed}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, op, changed_at) VALUES ('{table}', NEW.id, 'U', {_SQL_NOW});
+            END;
+            """)
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS change_log_{table}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key, op, changed_at) VALUES ('{table}', OLD.id, 'D', {_SQL_NOW});
+            END;
+            """)
+        # Settings: scritte con INSERT OR REPLACE, che non attiva i trigger di DELETE/UPDATE.
+        # Il trigger BEFORE INSERT confronta con il valore attuale e registra solo i cambiamenti reali.
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS change_log_settings_upsert BEFORE INSERT ON settings
+        WHEN NEW.value IS NOT (SELECT value FROM settings WHERE key = NEW.key)
+          OR NOT EXISTS (SELECT 1 FROM settings WHERE key = NEW.key)
+        BEGIN
+            INSERT INTO change_log (table_name, row_key, op, changed_at)
+            VALUES ('settings', NEW.key, CASE WHEN EXISTS (SELECT 1 FROM settings WHERE key = NEW.key) THEN 'U' ELSE 'I' END, {_SQL_NOW});
+        END;
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS change_log_settings_update AFTER UPDATE ON settings
+        WHEN NEW.value IS NOT OLD.value
+        BEGIN
+            INSERT INTO change_log (table_name, row_key, op, changed_at) VALUES ('settings', NEW.key, 'U', {_SQL_NOW});
+        END;
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS change_log_settings_delete AFTER DELETE ON settings
+        BEGIN
+            INSERT INTO change_log (table_name, row_key, op, changed_at) VALUES ('settings', OLD.key, 'D', {_SQL_NOW});
+        END;
+        """)
+
+    def _create_merkle_triggers(self, cursor: sqlite3.Cursor):
+        """
+        Crea i trigger che segnano come sporche le partizioni del Merkle tree toccate da una scrittura.
+
+        Niente INSERT OR IGNORE nei trigger: dentro un upsert (INSERT ... ON CONFLICT DO UPDATE)
+        la clausola del trigger viene ignorata e il duplicato farebbe fallire la scrittura.
+        I trigger sono ricreati a ogni avvio.
+        """
+        mark = "INSERT INTO merkle_dirty (partition) SELECT {partition} AS partition WHERE partition IS NOT NULL AND partition NOT IN (SELECT partition FROM merkle_dirty);"
+        partitions = {
+            'profiles': "'p:' || {row}.sync_id",
+            'credentials': "(SELECT 'p:' || sync_id FROM profiles WHERE id = {row}.profile_id)",
+            'sync_tombstones': "'t:' || {row}.sync_id",
+            'sync_setting_versions': "'s:'",
+        }
+        for table, partition in partitions.items():
+            for event, rows in (('INSERT', ('NEW',)), ('UPDATE', ('OLD', 'NEW')), ('DELETE', ('OLD',))):
+                body = " ".join(mark.format(partition=partition.format(row=row)) for row in rows)
+                cursor.execute(f"DROP TRIGGER IF EXISTS merkle_{table}_{event.lower()}")
+                cursor.execute(f"""
+                CREATE TRIGGER merkle_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    {body}
+                END;
+                """)
+
     def close(self):
         """Chiude la connessione al database."""
         if self.conn:
@@ -229,6 +509,16 @@ class DatabaseManager:
 
         cursor = conn.cursor()
         try:
+            if key in SYNCED_SETTINGS:
+                # Nuova versione solo se il valore cambia davvero (save_settings riscrive tutte le chiavi)
+                cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+                row = cursor.fetchone()
+                if row is None or row['value'] != value_to_store:
+                    cursor.execute("""INSERT INTO sync_setting_versions (key, sync_version, sync_device, sync_pending, sync_hlc)
+                                      VALUES (?, 1, ?, 1, ?)
+                                      ON CONFLICT (key) DO UPDATE SET sync_version = sync_version + 1,
+                                          sync_device = excluded.sync_device, sync_pending = 1, sync_hlc = excluded.sync_hlc""",
+                                   (key, self.device_id, self.clock.now()))
             # Use INSERT OR REPLACE (UPSERT)
             cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value_to_store))
             # print(f"[DatabaseManager.set_setting] Setting '{key}' set successfully.")
@@ -241,6 +531,24 @@ class DatabaseManager:
             cursor.close()
 
     # --- Profile CRUD Methods --- 
+    PROFILE_COLUMNS = """id, name, last_name, url, username, email, phone, address, 
+                                 encrypted_password, notes, created_at, updated_at"""
+
+    def _profile_row_to_dict(self, row: sqlite3.Row, master_password: Optional[str], salt: Optional[bytes]) -> Dict[str, Any]:
+        """Converts a profiles row to a dict, decrypting the password."""
+        profile_dict = dict(row)
+        encrypted_pwd = profile_dict.pop('encrypted_password', None)
+        if encrypted_pwd:
+            decrypted_pwd = decrypt_data(encrypted_pwd, master_password, salt)
+            if decrypted_pwd is None:
+                print(f"[DatabaseManager] WARNING: Failed to decrypt password for profile ID {profile_dict.get('id')}. Setting password to None.")
+                profile_dict['password'] = None # Indicate decryption failure
+            else:
+                profile_dict['password'] = decrypted_pwd
+        else:
+            profile_dict['password'] = '' # No encrypted password stored
+        return profile_dict
+
     def get_all_profiles(self, master_password: Optional[str], salt: Optional[bytes]) -> List[Dict[str, Any]]:
         """Retrieves all profiles, decrypting passwords."""
         conn = self.get_connection()
@@ -250,25 +558,10 @@ class DatabaseManager:
             
         cursor = conn.cursor()
         try:
-            cursor.execute("""SELECT id, name, last_name, url, username, email, phone, address, 
-                                 encrypted_password, notes, created_at, updated_at 
-                             FROM profiles ORDER BY name ASC""")
+            cursor.execute(f"SELECT {self.PROFILE_COLUMNS} FROM profiles ORDER BY name ASC")
             rows = cursor.fetchall()
             for row in rows:
-                profile_dict = dict(row)
-                # Decrypt password
-                encrypted_pwd = profile_dict.pop('encrypted_password', None)
-                if encrypted_pwd:
-                    decrypted_pwd = decrypt_data(encrypted_pwd, master_password, salt)
-                    if decrypted_pwd is None:
-                        print(f"[DatabaseManager] WARNING: Failed to decrypt password for profile ID {profile_dict.get('id')}. Setting password to None.")
-                        profile_dict['password'] = None # Indicate decryption failure
-                    else:
-                        profile_dict['password'] = decrypted_pwd
-                else:
-                    profile_dict['password'] = '' # No encrypted password stored
-                    
-                profiles.append(profile_dict)
+                profiles.append(self._profile_row_to_dict(row, master_password, salt))
             return profiles
         except sqlite3.Error as e:
             print(f"[DatabaseManager.get_all_profiles] Error retrieving profiles: {e}")
@@ -276,6 +569,22 @@ class DatabaseManager:
         finally:
             cursor.close()
 
+    def get_profile(self, profile_id: int, master_password: Optional[str], salt: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """Retrieves a single profile by ID, decrypting only its password. Returns None if not found."""
+        conn = self.get_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT {self.PROFILE_COLUMNS} FROM profiles WHERE id = ?", (profile_id,))
+            row = cursor.fetchone()
+            return self._profile_row_to_dict(row, master_password, salt) if row else None
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_profile] Error retrieving profile ID {profile_id}: {e}")
+            return None
+        finally:
+            cursor.close()
+
     def add_profile(self, profile_data: Dict[str, Any], master_password: Optional[str], salt: Optional[bytes]) -> Optional[int]:
         """Adds a new profile, encrypting the password. Returns the new profile ID or None."""
         conn = self.get_connection()
@@ -290,8 +599,9 @@ class DatabaseManager:
              return None
 
         # Aggiungi last_name a SQL e params
-        sql = """INSERT INTO profiles (name, last_name, url, username, email, phone, address, encrypted_password, notes) 
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+        sql = """INSERT INTO profiles (name, last_name, url, username, email, phone, address, encrypted_password, notes, password_fingerprint,
+                                       sync_id, sync_version, sync_device, sync_pending, sync_hlc) 
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, 1, ?)"""
         params = (
             profile_data.get('name'),
             profile_data.get('last_name'), # Nuovo campo
@@ -301,7 +611,11 @@ class DatabaseManager:
             profile_data.get('phone'),
             profile_data.get('address'),
             encrypted_pwd,
-            profile_data.get('notes')
+            profile_data.get('notes'),
+            profile_data.get('password_fingerprint'),
+            uuid.uuid4().hex,
+            self.device_id,
+            self.clock.now()
         )
         
         cursor = conn.cursor()
@@ -344,16 +658,22 @@ class DatabaseManager:
                  return False
              fields_to_update.append("encrypted_password = ?")
              params.append(encrypted_pwd)
+             fields_to_update.append("password_fingerprint = ?")
+             params.append(profile_data.get('password_fingerprint'))
              
          if not fields_to_update:
              print("[DatabaseManager.update_profile] No fields provided for update.")
              return False # Nothing to update
              
+         # Nuova versione del record, da inviare alla prossima sincronizzazione
+         fields_to_update.append("sync_version = sync_version + 1, sync_device = ?, sync_pending = 1, sync_hlc = ?, sync_field_hlc = ?, sync_base_field_hlc = ?")
+         params.append(self.device_id)
          sql = f"UPDATE profiles SET {', '.join(fields_to_update)}, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-         params.append(profile_id) # Add the ID for the WHERE clause
          
          cursor = conn.cursor()
          try:
+            params.extend(self._stamp_update(cursor, 'profiles', profile_id, profile_data))
+            params.append(profile_id) # Add the ID for the WHERE clause
             cursor.execute(sql, tuple(params))
             updated_rows = cursor.rowcount
             if updated_rows > 0:
@@ -377,8 +697,11 @@ class DatabaseManager:
          sql = "DELETE FROM profiles WHERE id = ?"
          cursor = conn.cursor()
          try:
+            cursor.execute("BEGIN")
+            self._record_tombstone(cursor, 'profiles', profile_id)
             cursor.execute(sql, (profile_id,))
             deleted_rows = cursor.rowcount
+            cursor.execute("COMMIT")
             if deleted_rows > 0:
                  print(f"[DatabaseManager.delete_profile] Profile ID {profile_id} deleted successfully.")
                  return True
@@ -387,6 +710,8 @@ class DatabaseManager:
                  return False
          except sqlite3.Error as e:
             print(f"[DatabaseManager.delete_profile] Error deleting profile ID {profile_id}: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
             return False
          finally:
             cursor.close()
@@ -441,8 +766,9 @@ class DatabaseManager:
             return None
             
         # Aggiungi first_name, last_name, email a SQL e params
-        sql = """INSERT INTO credentials (profile_id, app_name, first_name, last_name, email, username, encrypted_password, notes) 
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+        sql = """INSERT INTO credentials (profile_id, app_name, first_name, last_name, email, username, encrypted_password, notes, password_fingerprint,
+                                          sync_id, sync_version, sync_device, sync_pending, sync_hlc) 
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, 1, ?)"""
         params = (
             cred_data.get('profile_id'),
             cred_data.get('app_name', 'default'),
@@ -451,7 +777,11 @@ class DatabaseManager:
             cred_data.get('email'), # Nuovo
             cred_data.get('username'),
             encrypted_pwd,
-            cred_data.get('notes')
+            cred_data.get('notes'),
+            cred_data.get('password_fingerprint'),
+            uuid.uuid4().hex,
+            self.device_id,
+            self.clock.now()
         )
 
         cursor = conn.cursor()
@@ -492,16 +822,22 @@ class DatabaseManager:
                 return False
             fields_to_update.append("encrypted_password = ?")
             params.append(encrypted_pwd)
+            fields_to_update.append("password_fingerprint = ?")
+            params.append(cred_data.get('password_fingerprint'))
 
         if not fields_to_update:
             print("[DatabaseManager.update_credential] No fields provided for update.")
             return False # Nothing to update
 
+        # Nuova versione del record, da inviare alla prossima sincronizzazione
+        fields_to_update.append("sync_version = sync_version + 1, sync_device = ?, sync_pending = 1, sync_hlc = ?, sync_field_hlc = ?, sync_base_field_hlc = ?")
+        params.append(self.device_id)
         sql = f"UPDATE credentials SET {', '.join(fields_to_update)}, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        params.append(credential_id) # Add the ID for the WHERE clause
 
         cursor = conn.cursor()
         try:
+            params.extend(self._stamp_update(cursor, 'credentials', credential_id, cred_data))
+            params.append(credential_id) # Add the ID for the WHERE clause
             cursor.execute(sql, tuple(params))
             updated_rows = cursor.rowcount
             if updated_rows > 0:
@@ -525,8 +861,11 @@ class DatabaseManager:
         sql = "DELETE FROM credentials WHERE id = ?"
         cursor = conn.cursor()
         try:
+            cursor.execute("BEGIN")
+            self._record_tombstone(cursor, 'credentials', credential_id)
             cursor.execute(sql, (credential_id,))
             deleted_rows = cursor.rowcount
+            cursor.execute("COMMIT")
             if deleted_rows > 0:
                 print(f"[DatabaseManager.delete_credential] Credential ID {credential_id} deleted successfully.")
                 return True
@@ -535,7 +874,469 @@ class DatabaseManager:
                 return False
         except sqlite3.Error as e:
             print(f"[DatabaseManager.delete_credential] Error deleting credential ID {credential_id}: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return False
+        finally:
+            cursor.close()
+
+    def _stamp_update(self, cursor: sqlite3.Cursor, table: str, row_id: int, data: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+        """
+        Timestamp HLC per una modifica locale: i campi presenti in data ricevono un
+        nuovo timestamp, gli altri conservano il proprio. Alla prima modifica di un campo
+        segreto dopo l'ultima sincronizzazione ne viene conservato il timestamp precedente
+        (base): il merge lo usa per riconoscere i conflitti veri.
+
+        Returns:
+            (sync_hlc, sync_field_hlc, sync_base_field_hlc) da scrivere nel record.
+        """
+        stamp = self.clock.now()
+        cursor.execute(f"SELECT sync_hlc, sync_field_hlc, sync_base_field_hlc FROM {table} WHERE id = ?", (row_id,))
+        row = cursor.fetchone()
+        if row is None or not row['sync_hlc']:
+            return stamp, None, None
+        stamps = field_stamps(row['sync_hlc'], decode_field_stamps(row['sync_field_hlc']), SYNC_FIELDS[table])
+        bases = decode_field_stamps(row['sync_base_field_hlc'])
+        for key in data:
+            field = 'encrypted_password' if key == 'password' else key
+            if field in stamps:
+                if field in SECRET_SYNC_FIELDS:
+                    bases.setdefault(field, stamps[field])
+                stamps[field] = stamp
+        return compact_field_stamps(stamps) + (encode_field_stamps(bases),)
+
+    def _record_tombstone(self, cursor: sqlite3.Cursor, table: str, row_id: int):
+        """Registra la cancellazione di un record sincronizzato (da chiamare prima del DELETE, nella stessa transazione)."""
+        cursor.execute(f"""INSERT OR REPLACE INTO sync_tombstones (sync_id, record_type, sync_version, sync_device, deleted_at, sync_pending, sync_hlc)
+                           SELECT sync_id, ?, sync_version + 1, ?, ?, 1, ? FROM {table} WHERE id = ? AND sync_id IS NOT NULL""",
+                       (SYNC_RECORD_TYPES[table], self.device_id, time.time(), self.clock.now(), row_id))
+
+    # --- Sync Conflict Methods ---
+    def get_sync_conflicts(self, include_resolved: bool = False) -> List[Dict[str, Any]]:
+        """Returns the conflicts on secret fields detected by sync (newest first). Values are stored as in the record (passwords encrypted)."""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        sql = """SELECT id, record_type, sync_id, field, local_value, local_hlc, remote_value, remote_hlc, winner, detected_at, resolved
+                 FROM sync_conflicts"""
+        if not include_resolved:
+            sql += " WHERE resolved = 0"
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql + " ORDER BY detected_at DESC")
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_sync_conflicts] Error reading sync conflicts: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def resolve_sync_conflict(self, conflict_id: int) -> bool:
+        """Marks a sync conflict as reviewed by the user."""
+        conn = self.get_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("UPDATE sync_conflicts SET resolved = 1 WHERE id = ?", (conflict_id,))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.resolve_sync_conflict] Error resolving sync conflict {conflict_id}: {e}")
+            return False
+        finally:
+            cursor.close()
+
+    # --- Password Fingerprint Methods ---
+    def get_reused_password_groups(self) -> List[Dict[str, Any]]:
+        """Finds passwords shared by more than one credential/profile using only the fingerprint index.
+
+        Returns:
+            A list of groups, most reused first: {'fingerprint', 'count', 'credential_ids', 'profile_ids'}.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return []
+
+        sql = """WITH fingerprints AS (
+                     SELECT password_fingerprint AS fp, 'credential' AS kind, id FROM credentials
+                     WHERE password_fingerprint IS NOT NULL AND password_fingerprint != ''
+                     UNION ALL
+                     SELECT password_fingerprint AS fp, 'profile' AS kind, id FROM profiles
+                     WHERE password_fingerprint IS NOT NULL AND password_fingerprint != ''
+                 )
+                 SELECT fp, COUNT(*) AS uses, group_concat(kind || ':' || id) AS members
+                 FROM fingerprints GROUP BY fp HAVING COUNT(*) > 1 ORDER BY uses DESC"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            groups = []
+            for row in cursor.fetchall():
+                group = {'fingerprint': row['fp'], 'count': row['uses'], 'credential_ids': [], 'profile_ids': []}
+                for member in (row['members'] or '').split(','):
+                    kind, _, member_id = member.partition(':')
+                    if kind == 'credential':
+                        group['credential_ids'].append(int(member_id))
+                    elif kind == 'profile':
+                        group['profile_ids'].append(int(member_id))
+                groups.append(group)
+            return groups
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_reused_password_groups] Error querying fingerprints: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_rows_missing_fingerprint(self, table: str) -> List[Dict[str, Any]]:
+        """Returns id/encrypted_password of rows that have a password but no fingerprint yet (for backfill)."""
+        if table not in FINGERPRINT_TABLES:
+            raise ValueError(f"Unsupported table for fingerprints: {table}")
+        conn = self.get_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""SELECT id, encrypted_password FROM {table}
+                               WHERE password_fingerprint IS NULL
+                               AND encrypted_password IS NOT NULL AND encrypted_password != ''""")
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_rows_missing_fingerprint] Error reading '{table}': {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def set_password_fingerprints(self, table: str, fingerprints: List[Tuple[str, int]]) -> bool:
+        """Stores (fingerprint, id) pairs for a table in a single transaction."""
+        if table not in FINGERPRINT_TABLES:
+            raise ValueError(f"Unsupported table for fingerprints: {table}")
+        conn = self.get_connection()
+        if not conn or not fingerprints:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            cursor.executemany(f"UPDATE {table} SET password_fingerprint = ? WHERE id = ?", fingerprints)
+            cursor.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.set_password_fingerprints] Error updating '{table}': {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return False
+        finally:
+            cursor.close()
+
+    def clear_password_fingerprints(self) -> bool:
+        """Clears all fingerprints (they are keyed from the master password and become stale when it changes)."""
+        conn = self.get_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            for table in FINGERPRINT_TABLES:
+                cursor.execute(f"UPDATE {table} SET password_fingerprint = NULL WHERE password_fingerprint IS NOT NULL")
+            print("[DatabaseManager.clear_password_fingerprints] Fingerprints cleared.")
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.clear_password_fingerprints] Error clearing fingerprints: {e}")
+            return False
+        finally:
+            cursor.close()
+
+    # --- Context Index Methods ---
+    def get_context_index_rows(self) -> List[Dict[str, Any]]:
+        """Returns every context index row (token, credential_id, profile_id, source, weight).
+
+        Rows of credentials that no longer exist are purged first.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM context_index WHERE credential_id NOT IN (SELECT id FROM credentials)")
+            if cursor.rowcount:
+                print(f"[DatabaseManager.get_context_index_rows] Purged {cursor.rowcount} stale context entries.")
+            cursor.execute("SELECT token, credential_id, profile_id, source, weight FROM context_index")
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_context_index_rows] Error reading context index: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_unindexed_credentials(self) -> List[Dict[str, Any]]:
+        """Returns id/profile_id/app_name of credentials with no derived context entries yet (for backfill)."""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""SELECT id, profile_id, app_name FROM credentials
+                              WHERE id NOT IN (SELECT credential_id FROM context_index WHERE source != 'learned')""")
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_unindexed_credentials] Error reading credentials: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def replace_context_entries(self, credential_id: int, entries: List[Tuple[str, int, str, float]], keep_learned: bool = True) -> bool:
+        """Replaces the context entries of a credential in a single transaction.
+
+        Args:
+            credential_id: The credential whose entries are replaced.
+            entries: (token, profile_id, source, weight) tuples to store.
+            keep_learned: If True, only derived entries are replaced and learned ones are kept.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            if keep_learned:
+                cursor.execute("DELETE FROM context_index WHERE credential_id = ? AND source != 'learned'", (credential_id,))
+                # Il profilo può essere cambiato: le associazioni apprese lo seguono
+                if entries:
+                    cursor.execute("UPDATE context_index SET profile_id = ? WHERE credential_id = ?", (entries[0][1], credential_id))
+            else:
+                cursor.execute("DELETE FROM context_index WHERE credential_id = ?", (credential_id,))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO context_index (token, credential_id, profile_id, source, weight) VALUES (?, ?, ?, ?, ?)",
+                [(token, credential_id, profile_id, source, weight) for token, profile_id, source, weight in entries])
+            cursor.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.replace_context_entries] Error updating context index for credential {credential_id}: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return False
+        finally:
+            cursor.close()
+
+    def set_context_weights(self, entries: List[Tuple[str, int, int, str, float]]) -> bool:
+        """Upserts (token, credential_id, profile_id, source, weight) rows in a single transaction."""
+        conn = self.get_connection()
+        if not conn or not entries:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            cursor.executemany("""INSERT INTO context_index (token, credential_id, profile_id, source, weight) VALUES (?, ?, ?, ?, ?)
+                                  ON CONFLICT (token, credential_id, source) DO UPDATE SET weight = excluded.weight, profile_id = excluded.profile_id""",
+                               entries)
+            cursor.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.set_context_weights] Error updating context weights: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return False
+        finally:
+            cursor.close()
+
+    def hash_learned_context_tokens(self, entries: List[Tuple[str, str, int]]) -> bool:
+        """Replaces plaintext learned tokens with their keyed hashes in a single transaction.
+
+        Args:
+            entries: (plaintext token, hashed token, credential_id) tuples. If the hashed
+                     entry already exists the higher weight is kept.
+        """
+        conn = self.get_connection()
+        if not conn or not entries:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            for token, hashed, credential_id in entries:
+                cursor.execute("""INSERT INTO context_index (token, credential_id, profile_id, source, weight)
+                                  SELECT ?, credential_id, profile_id, source, weight FROM context_index
+                                  WHERE token = ? AND credential_id = ? AND source = 'learned'
+                                  ON CONFLICT (token, credential_id, source) DO UPDATE SET weight = MAX(weight, excluded.weight)""",
+                               (hashed, token, credential_id))
+                cursor.execute("DELETE FROM context_index WHERE token = ? AND credential_id = ? AND source = 'learned'", (token, credential_id))
+            cursor.execute("COMMIT")
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.hash_learned_context_tokens] Error converting learned tokens: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return False
+        finally:
+            cursor.close()
+
+    def clear_learned_context_entries(self) -> bool:
+        """Deletes the learned context entries (their tokens are keyed from the master password and become stale when it changes)."""
+        conn = self.get_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM context_index WHERE source = 'learned'")
+            print(f"[DatabaseManager.clear_learned_context_entries] Cleared {cursor.rowcount} learned entries.")
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.clear_learned_context_entries] Error clearing learned entries: {e}")
+            return False
+        finally:
+            cursor.close()
+
+    # --- Usage Methods ---
+    def get_frecency_scores(self) -> List[Dict[str, Any]]:
+        """Returns the stored frecency rows (credential_id, profile_id, score, last_used_at, use_count).
+
+        Rows of credentials that no longer exist are purged first.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM credential_frecency WHERE credential_id NOT IN (SELECT id FROM credentials)")
+            cursor.execute("SELECT credential_id, profile_id, score, last_used_at, use_count FROM credential_frecency")
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_frecency_scores] Error reading frecency scores: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_credential_profile_ids(self) -> List[int]:
+        """Returns the IDs of the profiles that own at least one credential."""
+        conn = self.get_connection()
+        if not conn:
+            return []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT DISTINCT profile_id FROM credentials ORDER BY profile_id")
+            return [row['profile_id'] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_credential_profile_ids] Error reading profile IDs: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    # --- Change Log (consumer API) ---
+    def get_change_log_high_water(self) -> int:
+        """Sequence number of the latest logged change (0 if nothing was ever logged)."""
+        conn = self.get_connection()
+        if not conn:
+            return 0
+        cursor = conn.cursor()
+        try:
+            # sqlite_sequence keeps the last seq even when compaction emptied the table
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+            row = cursor.fetchone()
+            return row['seq'] if row else 0
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_change_log_high_water] Error reading change log: {e}")
+            return 0
+        finally:
+            cursor.close()
+
+    def get_changes_since(self, seq: int, tables: Optional[Tuple[str, ...]] = None,
+                          limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Returns the changes logged after `seq`, oldest first.
+
+        Args:
+            seq: Last sequence number already processed by the caller (0 = from the start).
+            tables: Optional table names to filter on ('profiles', 'credentials', 'settings').
+            limit: Optional maximum number of changes to return (process in pages).
+
+        Returns:
+            List of dicts (seq, table_name, row_key, op, changed_at), or None if the entries after
+            `seq` were already compacted away: the caller must rescan its source tables.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""SELECT MIN(seq) AS first_seq, (SELECT seq FROM sqlite_sequence WHERE name = 'change_log') AS high_water
+                              FROM change_log""")
+            bounds = cursor.fetchone()
+            high_water = bounds['high_water'] or 0
+            first_seq = bounds['first_seq'] if bounds['first_seq'] is not None else high_water + 1
+            if seq < high_water and seq + 1 < first_seq:
+                return None # Gap: modifiche già compattate
+            sql = "SELECT seq, table_name, row_key, op, changed_at FROM change_log WHERE seq > ?"
+            params: List[Any] = [seq]
+            if tables:
+                sql += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+                params.extend(tables)
+            sql += " ORDER BY seq"
+            if limit:
+                sql += " LIMIT ?"
+                params.append(limit)
+            cursor.execute(sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_changes_since] Error reading change log: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_change_consumer_position(self, name: str) -> int:
+        """Last sequence number acknowledged by a named consumer (0 if unknown)."""
+        conn = self.get_connection()
+        if not conn:
+            return 0
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT last_seq FROM change_log_consumers WHERE name = ?", (name,))
+            row = cursor.fetchone()
+            return row['last_seq'] if row else 0
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.get_change_consumer_position] Error reading consumer '{name}': {e}")
+            return 0
+        finally:
+            cursor.close()
+
+    def set_change_consumer_position(self, name: str, seq: int) -> bool:
+        """Acknowledges the changes up to `seq` for a named consumer (registers it if needed).
+           Compaction never drops entries a registered consumer has not acknowledged, unless they exceed the retention.
+        """
+        conn = self.get_connection()
+        if not conn:
             return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""INSERT INTO change_log_consumers (name, last_seq) VALUES (?, ?)
+                              ON CONFLICT (name) DO UPDATE SET last_seq = excluded.last_seq""", (name, seq))
+            return True
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.set_change_consumer_position] Error saving consumer '{name}': {e}")
+            return False
+        finally:
+            cursor.close()
+
+    def compact_change_log(self, retention_seconds: float = CHANGE_LOG_RETENTION_SECONDS,
+                           max_rows: int = CHANGE_LOG_MAX_ROWS) -> int:
+        """Drops change log entries acknowledged by every consumer, older than the retention, or beyond max_rows.
+
+        Returns:
+            Number of entries removed.
+        """
+        conn = self.get_connection()
+        if not conn:
+            return 0
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT MIN(last_seq) AS min_seq, COUNT(*) AS consumers FROM change_log_consumers")
+            row = cursor.fetchone()
+            acknowledged = row['min_seq'] if row['consumers'] else 0
+            cursor.execute("""DELETE FROM change_log
+                              WHERE seq <= ? OR changed_at < ?
+                                 OR seq <= (SELECT MAX(seq) FROM change_log) - ?""",
+                           (acknowledged, time.time() - retention_seconds, max_rows))
+            removed = cursor.rowcount
+            if removed:
+                print(f"[DatabaseManager.compact_change_log] Removed {removed} change log entries.")
+            return removed
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager.compact_change_log] Error compacting change log: {e}")
+            return 0
         finally:
             cursor.close()
 
@@ -2,7 +2,6 @@ import threading
 import time
 import sys
 from PySide6.QtCore import QObject, Signal
-import psutil
 from src.utils.sync_manager import SyncManager
 
 # --- Platform Specific Imports --- 
@@ -61,6 +60,7 @@ def get_active_window_info_windows():
             _, pid = win32process.GetWindowThreadProcessId(hwnd)
             
             process_name = "Unknown"
+            import psutil # Import lazy: serve solo alla pressione dell'hotkey
             try:
                 process = psutil.Process(pid)
                 process_name = process.name()
@@ -86,6 +86,8 @@ def listener_thread_func():
         if win32gui.RegisterHotKey(None, HOTKEY_ID, hotkey_modifiers, hotkey_vk_code):
             print(f"[HotkeyListener] Hotkey registered successfully.")
             registered_ok = True
+            # Carica psutil qui, fuori dal thread GUI e prima della prima pressione dell'hotkey
+            import psutil
         else:
             last_error = win32api.GetLastError()
             error_message = win32api.FormatMessage(last_error)
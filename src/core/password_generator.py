@@ -1,10 +1,189 @@
+import math
 import secrets
+from array import array
 import string
+import threading
+from dataclasses import dataclass
+from typing import Dict, List
+
+from .wordlist import DEFAULT_WORDLIST_PATH, get_wordlist
 
 DEFAULT_PASSWORD_LENGTH = 32
 MIN_PASSWORD_LENGTH = 16
 MAX_PASSWORD_LENGTH = 64
 
+DEFAULT_SYMBOLS = "!@#$%^&*()-_=+[{]}\\|;:'\",<.>/?"
+
+# Size of each secrets.token_bytes() refill; one call serves many passwords
+RANDOM_BUFFER_SIZE = 64 * 1024
+
+DEFAULT_PASSPHRASE_WORDS = 6
+MIN_PASSPHRASE_WORDS = 3
+MAX_PASSPHRASE_WORDS = 20
+# Capitalization modes for passphrase words
+CAPITALIZATION_MODES = ("lower", "upper", "capitalize", "random")
+
+
+@dataclass(frozen=True)
+class PasswordPolicy:
+    """
+    Describes which passwords the generator may produce.
+
+    Every enabled character class is guaranteed to appear at least once;
+    the remaining characters are drawn uniformly from the union of the classes.
+    """
+    length: int = DEFAULT_PASSWORD_LENGTH
+    use_uppercase: bool = True
+    use_lowercase: bool = True
+    use_digits: bool = True
+    use_symbols: bool = True
+    symbols: str = DEFAULT_SYMBOLS
+
+    def character_classes(self) -> List[str]:
+        """Returns the enabled character classes, in a stable order."""
+        classes = []
+        if self.use_uppercase:
+            classes.append(string.ascii_uppercase)
+        if self.use_lowercase:
+            classes.append(string.ascii_lowercase)
+        if self.use_digits:
+            classes.append(string.digits)
+        if self.use_symbols and self.symbols:
+            classes.append(self.symbols)
+        return classes
+
+    @property
+    def alphabet(self) -> str:
+        return "".join(self.character_classes())
+
+    @property
+    def entropy_bits(self) -> float:
+        """Approximate entropy of a generated password (uniform draw over the full alphabet)."""
+        size = len(set(self.alphabet))
+        return self.length * math.log2(size) if size > 1 else 0.0
+
+    def validate(self):
+        """
+        Raises:
+            ValueError: If the policy cannot be satisfied.
+        """
+        classes = self.character_classes()
+        if not classes:
+            raise ValueError("At least one character set must be selected.")
+        if not self.symbols.isascii():
+            raise ValueError("Symbols must be ASCII characters.")
+        if self.length < len(classes):
+            raise ValueError(f"Length {self.length} is too short to include all {len(classes)} selected character sets.")
+        if self.length > MAX_PASSWORD_LENGTH:
+            raise ValueError(f"Length {self.length} exceeds the maximum of {MAX_PASSWORD_LENGTH} characters.")
+        if len(self.alphabet) > 256:
+            raise ValueError("Alphabet is too large.")
+
+
+class _UniformPool:
+    """
+    Uniform draws from a fixed alphabet of at most 256 byte values.
+
+    Random bytes come from one bulk secrets.token_bytes() buffer; bytes that would
+    bias the modulo (>= the largest multiple of the alphabet size) are rejected.
+    Mapping and rejection happen in a single bytes.translate() call.
+    """
+
+    def __init__(self, alphabet: bytes):
+        size = len(alphabet)
+        limit = 256 - (256 % size)
+        self._table = bytes(alphabet[value % size] if value < limit else 0 for value in range(256))
+        self._rejected = bytes(range(limit, 256))
+        self._buffer = b""
+        self._position = 0
+
+    def draw(self, count: int) -> bytes:
+        end = self._position + count
+        if end > len(self._buffer):
+            remaining = self._buffer[self._position:]
+            while len(remaining) < count:
+                remaining += secrets.token_bytes(RANDOM_BUFFER_SIZE).translate(self._table, self._rejected)
+            self._buffer, self._position, end = remaining, 0, count
+        chunk = self._buffer[self._position:end]
+        self._position = end
+        return chunk
+
+
+class _PoolRegistry:
+    """Caches one _UniformPool per alphabet (and per integer range used for positions)."""
+
+    def __init__(self):
+        self._pools: Dict[bytes, _UniformPool] = {}
+        self.lock = threading.Lock()
+
+    def pool(self, alphabet: bytes) -> _UniformPool:
+        pool = self._pools.get(alphabet)
+        if pool is None:
+            pool = self._pools[alphabet] = _UniformPool(alphabet)
+        return pool
+
+    def index_pool(self, upper: int) -> _UniformPool:
+        """Pool of integers uniformly distributed in [0, upper)."""
+        return self.pool(bytes(range(upper)))
+
+
+_registry = _PoolRegistry()
+
+
+def _random_indices(count: int, upper: int) -> List[int]:
+    """Returns `count` integers uniform in [0, upper), from bulk random bytes with rejection sampling."""
+    limit = (1 << 32) - ((1 << 32) % upper)
+    indices: List[int] = []
+    while len(indices) < count:
+        values = array("I", secrets.token_bytes(4 * (count - len(indices) + 8)))
+        indices.extend(value % upper for value in values if value < limit)
+    return indices[:count]
+
+
+def _generate_batch(policy: PasswordPolicy, count: int) -> List[str]:
+    """Generates `count` passwords satisfying `policy` in one pass each (no retries)."""
+    policy.validate()
+    classes = [cls.encode("ascii") for cls in policy.character_classes()]
+    filler_length = policy.length - len(classes)
+
+    with _registry.lock:
+        full_pool = _registry.pool(policy.alphabet.encode("ascii"))
+        class_pools = [_registry.pool(cls) for cls in classes]
+        # Required characters are inserted one by one into a growing list,
+        # so the k-th insertion picks a position in [0, filler_length + k]
+        position_pools = [_registry.index_pool(filler_length + k + 1) for k in range(len(classes))]
+
+        passwords = []
+        for _ in range(count):
+            chars = bytearray(full_pool.draw(filler_length))
+            for class_pool, position_pool in zip(class_pools, position_pools):
+                chars.insert(position_pool.draw(1)[0], class_pool.draw(1)[0])
+            passwords.append(chars.decode("ascii"))
+    return passwords
+
+
+def generate_password(policy: PasswordPolicy) -> str:
+    """
+    Generates one password that satisfies the given policy.
+
+    Raises:
+        ValueError: If the policy cannot be satisfied.
+    """
+    return _generate_batch(policy, 1)[0]
+
+
+def generate_many(n: int, policy: PasswordPolicy) -> List[str]:
+    """
+    Generates `n` policy-compliant passwords (e.g. for bulk rotation jobs).
+
+    Raises:
+        ValueError: If the policy cannot be satisfied.
+    """
+    if n <= 0:
+        return []
+    return _generate_batch(policy, n)
+
+
 def generate_secure_password(
     length: int = DEFAULT_PASSWORD_LENGTH,
     use_uppercase: bool = True,
@@ -29,38 +208,105 @@ def generate_secure_password(
         ValueError: If no character sets are selected.
     """
     length = max(MIN_PASSWORD_LENGTH, min(length, MAX_PASSWORD_LENGTH))
-    
-    character_set = ""
-    if use_uppercase:
-        character_set += string.ascii_uppercase
-    if use_lowercase:
-        character_set += string.ascii_lowercase
-    if use_digits:
-        character_set += string.digits
-    if use_symbols:
-        # Consider adding more symbols if needed
-        character_set += "!@#$%^&*()-_=+[{]}\\|;:'\",<.>/?" 
-
-    if not character_set:
-        raise ValueError("At least one character set must be selected.")
-
-    # Ensure the password contains at least one character from each selected set
-    password_chars = []
-    if use_uppercase:
-        password_chars.append(secrets.choice(string.ascii_uppercase))
-    if use_lowercase:
-        password_chars.append(secrets.choice(string.ascii_lowercase))
-    if use_digits:
-        password_chars.append(secrets.choice(string.digits))
-    if use_symbols:
-        password_chars.append(secrets.choice("!@#$%^&*()-_=+[{]}\\|;:'\",<.>/?"))
-
-    # Fill the rest of the password length
-    remaining_length = length - len(password_chars)
-    for _ in range(remaining_length):
-        password_chars.append(secrets.choice(character_set))
-
-    # Shuffle the list to ensure randomness
-    secrets.SystemRandom().shuffle(password_chars)
-
-    return "".join(password_chars) 
\ No newline at end of file
+    return generate_password(PasswordPolicy(
+        length=length,
+        use_uppercase=use_uppercase,
+        use_lowercase=use_lowercase,
+        use_digits=use_digits,
+        use_symbols=use_symbols,
+    ))
+
+
+@dataclass(frozen=True)
+class PassphrasePolicy:
+    """
+    Describes a diceware-style passphrase: words drawn uniformly from a wordlist.
+
+    capitalization is one of CAPITALIZATION_MODES; "random" upper-cases the
+    first letter of each word with probability 1/2 (one extra bit per word).
+    """
+    word_count: int = DEFAULT_PASSPHRASE_WORDS
+    separator: str = "-"
+    capitalization: str = "lower"
+    append_digit: bool = False
+    wordlist_path: str = DEFAULT_WORDLIST_PATH
+
+    @property
+    def entropy_bits(self) -> float:
+        """Entropy provided by this mode (independent of the separator, which is public)."""
+        bits = self.word_count * math.log2(len(get_wordlist(self.wordlist_path)))
+        if self.capitalization == "random":
+            bits += self.word_count
+        if self.append_digit:
+            bits += math.log2(10)
+        return bits
+
+    def validate(self):
+        """
+        Raises:
+            ValueError: If the policy is invalid.
+        """
+        if not MIN_PASSPHRASE_WORDS <= self.word_count <= MAX_PASSPHRASE_WORDS:
+            raise ValueError(f"Word count must be between {MIN_PASSPHRASE_WORDS} and {MAX_PASSPHRASE_WORDS}.")
+        if self.capitalization not in CAPITALIZATION_MODES:
+            raise ValueError(f"Unknown capitalization mode: {self.capitalization}")
+
+
+def generate_passphrases(n: int, policy: PassphrasePolicy) -> List[str]:
+    """
+    Generates `n` passphrases (e.g. for bulk rotation jobs).
+
+    Raises:
+        ValueError: If the policy is invalid.
+    """
+    policy.validate()
+    if n <= 0:
+        return []
+    wordlist = get_wordlist(policy.wordlist_path)
+    word_count = policy.word_count
+    indices = _random_indices(n * word_count, len(wordlist))
+    randbelow = secrets.randbelow
+
+    passphrases = []
+    for start in range(0, n * word_count, word_count):
+        words = [wordlist[index] for index in indices[start:start + word_count]]
+        if policy.capitalization == "upper":
+            words = [word.upper() for word in words]
+        elif policy.capitalization == "capitalize":
+            words = [word.capitalize() for word in words]
+        elif policy.capitalization == "random":
+            flags = randbelow(1 << word_count)
+            words = [word.capitalize() if flags >> i & 1 else word for i, word in enumerate(words)]
+        if policy.append_digit:
+            words[-1] += str(randbelow(10))
+        passphrases.append(policy.separator.join(words))
+    return passphrases
+
+
+def generate_passphrase(
+    word_count: int = DEFAULT_PASSPHRASE_WORDS,
+    separator: str = "-",
+    capitalization: str = "lower",
+    append_digit: bool = False
+) -> str:
+    """
+    Generates a diceware passphrase from the EFF large wordlist (7776 words, ~12.9 bits per word).
+
+    Args:
+        word_count: Number of words. Must be between MIN and MAX_PASSPHRASE_WORDS.
+        separator: String placed between words.
+        capitalization: One of CAPITALIZATION_MODES.
+        append_digit: Append a random digit to the last word.
+
+    Returns:
+        The passphrase string.
+
+    Raises:
+        ValueError: If the options are invalid.
+    """
+    return generate_passphrases(1, PassphrasePolicy(
+        word_count=word_count,
+        separator=separator,
+        capitalization=capitalization,
+        append_digit=append_digit,
+    ))[0]
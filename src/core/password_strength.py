@@ -0,0 +1,279 @@
+"""
+Stima della robustezza delle password: entropia, penalità per parole comuni,
+pattern di tastiera/sequenze/ripetizioni e stima del tempo di cracking.
+
+I risultati sono memorizzati in una cache LRU indicizzata dall'impronta HMAC della
+password (chiave casuale per processo), così le password invariate non vengono
+mai rivalutate e la cache non contiene password in chiaro.
+"""
+
+import hashlib
+import hmac
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# --- Constants ---
+SECURE_MIN_SCORE = 3 # Punteggio minimo (0-4) perché una password sia considerata sicura
+GUESSES_PER_SECOND = 1e10 # Attacco offline su hash veloce (GPU)
+STRENGTH_CACHE_SIZE = 16384
+
+SCORE_LABELS = ("Molto debole", "Debole", "Discreta", "Forte", "Molto forte")
+# Soglie (bit di entropia effettiva) per i punteggi 1..4
+SCORE_THRESHOLDS = (28.0, 36.0, 60.0, 80.0)
+
+SYMBOL_POOL_SIZE = 33
+MIN_PATTERN_LENGTH = 3 # Lunghezza minima di una sequenza/ripetizione penalizzata
+MIN_WORD_LENGTH = 4
+MAX_WORD_LENGTH = 10
+
+KEYBOARD_ROWS = ("1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm", "qwertzuiop", "azertyuiop", "yxcvbnm")
+
+LEET_TABLE = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s", "!": "i"})
+
+# Password e parole più comuni (lowercase, normalizzate come la password valutata)
+COMMON_WORDS = frozenset(word.translate(LEET_TABLE) for word in (
+    "password", "passw0rd", "qwerty", "admin", "welcome", "letmein", "monkey", "dragon",
+    "master", "login", "abc123", "iloveyou", "sunshine", "princess", "football", "baseball",
+    "shadow", "superman", "batman", "trustno1", "hello", "freedom", "whatever", "starwars",
+    "secret", "computer", "internet", "michael", "jennifer", "charlie", "summer", "winter",
+    "spring", "autumn", "love", "money", "pass", "test", "user", "guest", "root",
+    "ciao", "amore", "casa", "juventus", "inter", "milan", "roma", "napoli", "italia",
+    "forza", "calcio", "tesoro", "angelo", "stella", "mario", "giuseppe", "francesco",
+    "changeme", "default", "access", "matrix", "cookie", "pokemon", "ninja", "mustang",
+    "soccer", "hockey", "killer", "hunter", "ranger", "buster", "thomas", "jordan",
+    "harley", "george", "andrea", "daniel", "robert", "family", "friend", "secure",
+))
+
+# Mappa carattere -> (riga, posizione) per riconoscere caratteri adiacenti sulla tastiera
+_KEYBOARD_POSITIONS = {}
+for _row_index, _row in enumerate(KEYBOARD_ROWS):
+    for _col_index, _char in enumerate(_row):
+        _KEYBOARD_POSITIONS.setdefault(_char, []).append((_row_index, _col_index))
+
+
+@dataclass
+class StrengthResult:
+    """Risultato della valutazione di una password."""
+    score: int # 0 (molto debole) .. 4 (molto forte)
+    entropy_bits: float # Entropia effettiva dopo le penalità
+    crack_time_seconds: float
+    crack_time_display: str
+    label: str
+    feedback: List[str] = field(default_factory=list)
+
+    @property
+    def is_secure(self) -> bool:
+        return self.score >= SECURE_MIN_SCORE
+
+
+def _pool_size(password: str) -> int:
+    """Dimensione dell'alfabeto stimata dalle classi di caratteri presenti."""
+    has_lower = has_upper = has_digit = has_symbol = has_other = False
+    for char in password:
+        if "a" <= char <= "z": has_lower = True
+        elif "A" <= char <= "Z": has_upper = True
+        elif "0" <= char <= "9": has_digit = True
+        elif char.isascii(): has_symbol = True
+        else: has_other = True
+    return (26 * has_lower + 26 * has_upper + 10 * has_digit +
+            SYMBOL_POOL_SIZE * has_symbol + 100 * has_other)
+
+
+def _is_keyboard_adjacent(a: str, b: str) -> bool:
+    for row_a, col_a in _KEYBOARD_POSITIONS.get(a, ()):
+        for row_b, col_b in _KEYBOARD_POSITIONS.get(b, ()):
+            if row_a == row_b and abs(col_a - col_b) == 1:
+                return True
+    return False
+
+
+def _pattern_penalties(lowered: str) -> Tuple[int, List[str]]:
+    """
+    Conta i caratteri "prevedibili" (ripetizioni, sequenze alfabetiche/numeriche,
+    camminate sulla tastiera) con una sola scansione lineare.
+
+    Returns:
+        (numero di caratteri prevedibili, lista di suggerimenti)
+    """
+    predictable = 0
+    feedback = []
+    repeat_run = seq_run = keyboard_run = 1
+    found_repeat = found_seq = found_keyboard = False
+
+    for previous, current in zip(lowered, lowered[1:]):
+        delta = ord(current) - ord(previous)
+        repeat_run = repeat_run + 1 if delta == 0 else 1
+        seq_run = seq_run + 1 if delta in (1, -1) else 1
+        keyboard_run = keyboard_run + 1 if _is_keyboard_adjacent(previous, current) else 1
+
+        # Conta ogni carattere al massimo una volta, dal momento in cui un run diventa un pattern
+        if repeat_run >= MIN_PATTERN_LENGTH:
+            predictable += MIN_PATTERN_LENGTH - 1 if repeat_run == MIN_PATTERN_LENGTH else 1
+            found_repeat = True
+        elif seq_run >= MIN_PATTERN_LENGTH:
+            predictable += MIN_PATTERN_LENGTH - 1 if seq_run == MIN_PATTERN_LENGTH else 1
+            found_seq = True
+        elif keyboard_run >= MIN_PATTERN_LENGTH:
+            predictable += MIN_PATTERN_LENGTH - 1 if keyboard_run == MIN_PATTERN_LENGTH else 1
+            found_keyboard = True
+
+    if found_repeat: feedback.append("Evita caratteri ripetuti (es. 'aaa').")
+    if found_seq: feedback.append("Evita sequenze come 'abc' o '123'.")
+    if found_keyboard: feedback.append("Evita sequenze di tasti vicini (es. 'qwerty').")
+    return predictable, feedback
+
+
+def _dictionary_penalty(lowered: str) -> int:
+    """Restituisce la lunghezza della parola comune più lunga contenuta nella password (anche in leet)."""
+    normalized = lowered.translate(LEET_TABLE)
+    longest = 0
+    length = len(normalized)
+    for start in range(length - MIN_WORD_LENGTH + 1):
+        for size in range(min(MAX_WORD_LENGTH, length - start), max(MIN_WORD_LENGTH, longest + 1) - 1, -1):
+            if normalized[start:start + size] in COMMON_WORDS:
+                longest = size
+                break
+    return longest
+
+
+def _format_crack_time(seconds: float) -> str:
+    if seconds < 1:
+        return "istantaneo"
+    for unit_seconds, unit_name in ((31536000 * 100, "secoli"), (31536000, "anni"), (86400, "giorni"),
+                                    (3600, "ore"), (60, "minuti")):
+        if seconds >= unit_seconds:
+            value = seconds / unit_seconds
+            if unit_name == "secoli" and value >= 1e6:
+                return "milioni di secoli+"
+            return f"{value:.0f} {unit_name}"
+    return f"{seconds:.0f} secondi"
+
+
+def _score_for_entropy(entropy_bits: float) -> int:
+    score = 0
+    for threshold in SCORE_THRESHOLDS:
+        if entropy_bits >= threshold:
+            score += 1
+    return score
+
+
+def _evaluate(password: str) -> StrengthResult:
+    """Valuta una password senza usare la cache."""
+    length = len(password)
+    pool = _pool_size(password)
+    bits_per_char = math.log2(pool) if pool > 1 else 0.0
+    lowered = password.lower()
+
+    predictable_chars, feedback = _pattern_penalties(lowered)
+    word_length = _dictionary_penalty(lowered)
+    if word_length:
+        feedback.append("Contiene una parola o password comune.")
+
+    # I caratteri prevedibili valgono ~1 bit; una parola comune vale come un elemento di un dizionario (~10 bit)
+    penalized_chars = min(length, predictable_chars + word_length)
+    entropy_bits = (length - penalized_chars) * bits_per_char + predictable_chars * 1.0 + (10.0 if word_length else 0.0)
+    entropy_bits = min(entropy_bits, length * bits_per_char)
+
+    # Tempo medio: metà dello spazio delle combinazioni
+    crack_time_seconds = (2.0 ** entropy_bits) / 2.0 / GUESSES_PER_SECOND
+    score = _score_for_entropy(entropy_bits)
+
+    if score < SECURE_MIN_SCORE:
+        if length < 10:
+            feedback.append("Usa almeno 10 caratteri.")
+        if pool < 62:
+            feedback.append("Combina maiuscole, minuscole, numeri e simboli.")
+    return StrengthResult(
+        score=score,
+        entropy_bits=round(entropy_bits, 1),
+        crack_time_seconds=crack_time_seconds,
+        crack_time_display=_format_crack_time(crack_time_seconds),
+        label=SCORE_LABELS[score],
+        feedback=feedback,
+    )
+
+
+class _StrengthCache:
+    """Cache LRU thread-safe dei risultati, indicizzata da un'impronta HMAC della password."""
+
+    def __init__(self, max_size: int = STRENGTH_CACHE_SIZE):
+        self.max_size = max_size
+        self._key = os.urandom(32) # Chiave per processo: le impronte non sono riutilizzabili altrove
+        self._entries: "OrderedDict[bytes, StrengthResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, password: str) -> bytes:
+        return hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    def get(self, fingerprint: bytes) -> Optional[StrengthResult]:
+        with self._lock:
+            result = self._entries.get(fingerprint)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return result
+
+    def put(self, fingerprint: bytes, result: StrengthResult):
+        with self._lock:
+            self._entries[fingerprint] = result
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache = _StrengthCache()
+
+
+def estimate_strength(password: Optional[str]) -> StrengthResult:
+    """
+    Valuta la robustezza di una password, riusando il risultato se già calcolato.
+
+    Args:
+        password: La password in chiaro.
+
+    Returns:
+        StrengthResult con punteggio 0-4, entropia, tempo di cracking stimato e suggerimenti.
+    """
+    if not password:
+        return StrengthResult(score=0, entropy_bits=0.0, crack_time_seconds=0.0,
+                              crack_time_display=_format_crack_time(0.0), label=SCORE_LABELS[0],
+                              feedback=["Inserisci una password."])
+    fingerprint = _cache.fingerprint(password)
+    result = _cache.get(fingerprint)
+    if result is None:
+        result = _evaluate(password)
+        _cache.put(fingerprint, result)
+    return result
+
+
+def is_strong_password(password: Optional[str]) -> bool:
+    """True se la password raggiunge il punteggio minimo considerato sicuro."""
+    return estimate_strength(password).is_secure
+
+
+def get_cache_stats() -> dict:
+    """Statistiche della cache (dimensione, hit, miss)."""
+    return _cache.stats()
+
+
+def clear_strength_cache():
+    """Svuota la cache dei risultati (es. alla chiusura della sessione)."""
+    _cache.clear()
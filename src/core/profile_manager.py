@@ -4,6 +4,7 @@ Ora interagisce con DatabaseManager per lo storage e la crittografia.
 """
 
 import base64
+import bisect
 import hashlib
 import os
 from dataclasses import dataclass, asdict
@@ -12,6 +13,7 @@ from datetime import datetime
 
 from ..utils.sync_manager import SyncManager
 from ..core.database_manager import get_db_manager, DatabaseManager
+from ..utils.crypto import compute_password_fingerprint
 
 from PySide6.QtCore import QObject, Signal
 
@@ -39,7 +41,10 @@ class ProfileManager(QObject):
     Gestisce i profili utente, caricandoli/salvandoli tramite DatabaseManager.
     Mantiene una cache in memoria dei profili caricati.
     """
-    profile_changed = Signal()
+    profile_changed = Signal() # Ricaricamento completo (es. sblocco o cambio master password)
+    profile_added = Signal(int)
+    profile_updated = Signal(int)
+    profile_removed = Signal(int)
     
     def __init__(self):
         """
@@ -91,6 +96,9 @@ class ProfileManager(QObject):
                     except: pass # Ignora errori nel recupero
                     return False 
                     
+                # Le impronte password (e i token appresi del contesto) erano derivate dalla vecchia chiave: non più confrontabili
+                self.db_manager.clear_password_fingerprints()
+                self.db_manager.clear_learned_context_entries()
                 # Non serve più salvare i profili qui (erano salvati dopo decrittografia)
                 # self.save_profiles() 
                 print("[ProfileManager] Master password removed.")
@@ -134,6 +142,10 @@ class ProfileManager(QObject):
              print("[ProfileManager] CRITICAL WARNING: Failed to verify password immediately after setting hash/salt!")
              # Cosa fare? Forse ritornare False?
         
+        # Le impronte password sono keyed dalla master password: verranno ricalcolate (backfill)
+        self.db_manager.clear_password_fingerprints()
+        # Anche i token appresi del contesto, ma non sono ricalcolabili: le associazioni vanno imparate di nuovo
+        self.db_manager.clear_learned_context_entries()
         # Non serve più salvare esplicitamente i profili qui
         # self.save_profiles() 
         print(f"[ProfileManager] Master password set/changed.")
@@ -146,6 +158,12 @@ class ProfileManager(QObject):
         print("[ProfileManager] Delegating password verification to SyncManager...")
         return self.sync_manager._verify_session_master_password(password)
 
+    def _password_fingerprint(self, password: Optional[str]) -> Optional[str]:
+        """Impronta keyed della password per il rilevamento del riutilizzo (None se sessione non sbloccata)."""
+        if not password:
+            return None
+        return compute_password_fingerprint(password, self.sync_manager.get_password_fingerprint_key())
+
     # --- Core Profile Operations (Refactored for DB) ---
     def load_profiles(self):
         """Loads profiles from DatabaseManager and populates the in-memory cache.
@@ -192,30 +210,9 @@ class ProfileManager(QObject):
             temp_profiles = []
             for profile_dict in profiles_data:
                 print(f"[ProfileManager.load_profiles] Processing profile data: {profile_dict.get('id')}, {profile_dict.get('name')}") # Log processing
-                try:
-                    # Ensure all expected keys for Profile dataclass exist, providing None if missing
-                    profile_args = {
-                        'id': profile_dict.get('id'),
-                        'name': profile_dict.get('name'),
-                        'last_name': profile_dict.get('last_name'),
-                        'url': profile_dict.get('url'),
-                        'username': profile_dict.get('username'),
-                        'password': profile_dict.get('password'), # Already decrypted by DBManager
-                        'email': profile_dict.get('email'),
-                        'phone': profile_dict.get('phone'),
-                        'address': profile_dict.get('address'),
-                        'notes': profile_dict.get('notes'),
-                        'created_at': profile_dict.get('created_at'),
-                        'updated_at': profile_dict.get('updated_at')
-                    }
-                    # Filter out None values if the dataclass definition doesn't handle them directly
-                    # Although the current definition seems okay with Optional[str]=None
-                    # filtered_args = {k: v for k, v in profile_args.items() if v is not None}
-                    
-                    temp_profiles.append(Profile(**profile_args))
-                    print(f"    -> Successfully converted profile ID {profile_args['id']} to object.") # Log success
-                except Exception as e:
-                    print(f"[ProfileManager] Error converting DB data to Profile object: {e} - Data: {profile_dict}")
+                profile = self._profile_from_dict(profile_dict)
+                if profile:
+                    temp_profiles.append(profile)
             
             self.profiles = temp_profiles
             print(f"[ProfileManager.load_profiles] Updated cache with {len(self.profiles)} profiles.")
@@ -231,12 +228,53 @@ class ProfileManager(QObject):
                  print("[ProfileManager.load_profiles] Emitting profile_changed (error state).") # Log emit
                  self.profile_changed.emit()
             
+    @staticmethod
+    def _profile_from_dict(profile_dict: Dict[str, Any]) -> Optional[Profile]:
+        """Converte un dizionario restituito da DatabaseManager in un oggetto Profile."""
+        try:
+            # Ensure all expected keys for Profile dataclass exist, providing None if missing
+            return Profile(
+                id=profile_dict.get('id'),
+                name=profile_dict.get('name'),
+                last_name=profile_dict.get('last_name'),
+                url=profile_dict.get('url'),
+                username=profile_dict.get('username'),
+                password=profile_dict.get('password'), # Already decrypted by DBManager
+                email=profile_dict.get('email'),
+                phone=profile_dict.get('phone'),
+                address=profile_dict.get('address'),
+                notes=profile_dict.get('notes'),
+                created_at=profile_dict.get('created_at'),
+                updated_at=profile_dict.get('updated_at')
+            )
+        except Exception as e:
+            print(f"[ProfileManager] Error converting DB data to Profile object: {e} - Data: {profile_dict}")
+            return None
+
+    def _fetch_profile(self, profile_id: int, verified_password: Optional[str], salt_bytes: Optional[bytes]) -> Optional[Profile]:
+        """Legge (e decritta) un solo profilo dal DB."""
+        profile_dict = self.db_manager.get_profile(profile_id, verified_password, salt_bytes)
+        return self._profile_from_dict(profile_dict) if profile_dict else None
+
+    def _index_of(self, profile_id: int) -> Optional[int]:
+        for index, profile in enumerate(self.profiles):
+            if profile.id == profile_id:
+                return index
+        return None
+
+    def _insert_sorted(self, profile: Profile) -> int:
+        """Inserisce il profilo mantenendo l'ordine per nome (lo stesso di get_all_profiles). Ritorna l'indice."""
+        names = [p.name or "" for p in self.profiles]
+        index = bisect.bisect_right(names, profile.name or "")
+        self.profiles.insert(index, profile)
+        return index
+
     # Rimuovi save_profiles - le modifiche sono salvate al momento (add/update/delete)
     # def save_profiles(self):
     #    ...
             
     def add_profile(self, profile: Profile) -> bool:
-        """Adds a new profile via DatabaseManager and reloads the local cache."""
+        """Adds a new profile via DatabaseManager and inserts it in the local cache (emits profile_added)."""
         print(f"[ProfileManager] Attempting to add profile: {profile.name}")
         
         # ID is assigned by DB, ensure it's None or handled appropriately before add
@@ -261,17 +299,22 @@ class ProfileManager(QObject):
             'email': profile.email,
             'phone': profile.phone,
             'address': profile.address,
-            'notes': profile.notes
+            'notes': profile.notes,
+            'password_fingerprint': self._password_fingerprint(profile.password)
         }
         
         try:
             new_id = self.db_manager.add_profile(profile_data, verified_password, salt_bytes)
             if new_id is not None:
-                print(f"[ProfileManager] Profile '{profile.name}' added to DB with ID {new_id}. Reloading profiles...")
-                # Reload all profiles from DB to refresh cache and ensure consistency
-                self.load_profiles() 
-                # The load_profiles method now emits the signal
-            return True
+                print(f"[ProfileManager] Profile '{profile.name}' added to DB with ID {new_id}. Updating cache...")
+                new_profile = self._fetch_profile(new_id, verified_password, salt_bytes)
+                if new_profile is None:
+                    # Fallback: ricarica completa per restare coerenti con il DB
+                    self.load_profiles()
+                    return True
+                self._insert_sorted(new_profile)
+                self.profile_added.emit(new_id)
+                return True
             # Se new_id è None (fallimento DB), esce dall'if e arriva qui
             print(f"[ProfileManager] Failed to add profile '{profile.name}' to DB (DB method returned None).")
             return False
@@ -280,7 +323,7 @@ class ProfileManager(QObject):
             return False
         
     def update_profile(self, profile_id: int, updated_profile: Profile) -> bool:
-        """Updates an existing profile via DatabaseManager and reloads the local cache."""
+        """Updates an existing profile via DatabaseManager and patches the local cache (emits profile_updated)."""
         print(f"[ProfileManager] Attempting to update profile ID: {profile_id}")
 
         verified_password = self.sync_manager._get_verified_password_for_session()
@@ -300,14 +343,23 @@ class ProfileManager(QObject):
             'email': updated_profile.email,
             'phone': updated_profile.phone,
             'address': updated_profile.address,
-            'notes': updated_profile.notes
+            'notes': updated_profile.notes,
+            'password_fingerprint': self._password_fingerprint(updated_profile.password)
         }
         
         try:
             success = self.db_manager.update_profile(profile_id, profile_data, verified_password, salt_bytes)
             if success:
-                print(f"[ProfileManager] Profile ID {profile_id} updated in DB. Reloading profiles...")
-                self.load_profiles()
+                print(f"[ProfileManager] Profile ID {profile_id} updated in DB. Updating cache...")
+                refreshed = self._fetch_profile(profile_id, verified_password, salt_bytes)
+                old_index = self._index_of(profile_id)
+                if refreshed is None or old_index is None:
+                    self.load_profiles()
+                    return True
+                # Il nome può essere cambiato: riposiziona per mantenere l'ordinamento
+                del self.profiles[old_index]
+                self._insert_sorted(refreshed)
+                self.profile_updated.emit(profile_id)
                 return True
             else:
                 print(f"[ProfileManager] Failed to update profile ID {profile_id} in DB (not found or DB error).")
@@ -317,14 +369,16 @@ class ProfileManager(QObject):
             return False
 
     def delete_profile(self, profile_id: int) -> bool:
-        """Deletes a profile via DatabaseManager and reloads the local cache."""
+        """Deletes a profile via DatabaseManager and removes it from the local cache (emits profile_removed)."""
         print(f"[ProfileManager] Attempting to delete profile ID: {profile_id}")
         try:
             success = self.db_manager.delete_profile(profile_id)
             if success:
-                print(f"[ProfileManager] Profile ID {profile_id} deleted from DB. Reloading profiles...")
-                # Reload to update cache and signal UI
-                self.load_profiles()
+                print(f"[ProfileManager] Profile ID {profile_id} deleted from DB. Updating cache...")
+                index = self._index_of(profile_id)
+                if index is not None:
+                    del self.profiles[index]
+                self.profile_removed.emit(profile_id)
                 return True
             else:
                 print(f"[ProfileManager] Failed to delete profile ID {profile_id} from DB (not found or DB error).")
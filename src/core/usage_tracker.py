@@ -0,0 +1,222 @@
+"""
+Tracciamento dell'utilizzo delle credenziali e punteggio "frecency" (frequenza + recenza).
+
+Ogni uso (copia di username/password) aggiunge un peso al punteggio della
+credenziale; il punteggio decade esponenzialmente con un tempo di dimezzamento
+fisso, così le credenziali usate spesso e di recente salgono in cima.
+
+I punteggi vivono in memoria: registrare un uso non tocca mai il disco nel
+thread chiamante. Gli eventi vengono accodati e scritti a blocchi da un thread
+dedicato, con una propria connessione SQLite, in un'unica transazione per blocco.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .credential import Credential
+from .database_manager import DatabaseManager, get_db_manager
+
+# --- Constants ---
+HALF_LIFE_SECONDS = 14 * 86400 # Un uso vale la metà dopo due settimane
+EVENT_WEIGHTS = {
+    "copy_password": 1.0,
+    "copy_username": 0.6,
+}
+DEFAULT_EVENT_WEIGHT = 0.5
+
+FLUSH_INTERVAL_SECONDS = 2.0 # Attesa massima prima di scrivere un blocco di eventi
+MAX_BATCH_SIZE = 256
+MAX_EVENT_ROWS = 5000 # La tabella degli eventi resta piccola: si tengono solo i più recenti
+WRITER_DB_TIMEOUT = 10.0 # Attesa del lock SQLite se la connessione principale sta scrivendo
+
+_STOP = object() # Sentinella per terminare il writer
+
+
+def decayed_score(score: float, last_used_at: float, now: float) -> float:
+    """Valore attuale di un punteggio registrato all'istante last_used_at."""
+    if now <= last_used_at:
+        return score
+    return score * 0.5 ** ((now - last_used_at) / HALF_LIFE_SECONDS)
+
+
+class UsageTracker:
+    """Punteggi frecency in memoria con scrittura asincrona a blocchi su SQLite."""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db_manager = db_manager or get_db_manager()
+        self.db_path = self.db_manager.db_path
+        # {credential_id: (punteggio a last_used_at, last_used_at, numero di usi, profile_id)}
+        self._scores: Dict[int, Tuple[float, float, int, int]] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._loaded = False
+
+    # --- Caricamento ---
+    def ensure_loaded(self):
+        """Carica i punteggi salvati (una sola volta, dalla connessione principale)."""
+        if self._loaded:
+            return
+        rows = self.db_manager.get_frecency_scores()
+        with self._lock:
+            for row in rows:
+                self._scores.setdefault(row['credential_id'],
+                                        (row['score'], row['last_used_at'], row['use_count'], row['profile_id']))
+            self._loaded = True
+        print(f"[UsageTracker] Loaded frecency scores for {len(rows)} credentials.")
+
+    # --- API ---
+    def record(self, credential: Credential, event: str = "copy_password", timestamp: Optional[float] = None):
+        """
+        Registra un uso della credenziale. Aggiorna subito il punteggio in memoria
+        e accoda la scrittura su disco (il chiamante non attende mai l'I/O).
+        """
+        try:
+            credential_id, profile_id = int(credential.id), int(credential.profile_id)
+        except (TypeError, ValueError):
+            return
+        self.ensure_loaded()
+        now = timestamp if timestamp is not None else time.time()
+        weight = EVENT_WEIGHTS.get(event, DEFAULT_EVENT_WEIGHT)
+        with self._lock:
+            score, last_used_at, use_count, _ = self._scores.get(credential_id, (0.0, now, 0, profile_id))
+            entry = (decayed_score(score, last_used_at, now) + weight, now, use_count + 1, profile_id)
+            self._scores[credential_id] = entry
+        self._ensure_writer()
+        self._queue.put(("use", credential_id, profile_id, event, now, entry))
+
+    def forget(self, credential_id):
+        """Rimuove punteggio ed eventi di una credenziale (es. dopo l'eliminazione)."""
+        try:
+            credential_id = int(credential_id)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self._scores.pop(credential_id, None)
+        self._ensure_writer()
+        self._queue.put(("forget", credential_id))
+
+    def score(self, credential_id, now: Optional[float] = None) -> float:
+        """Punteggio frecency attuale (0 se la credenziale non è mai stata usata)."""
+        self.ensure_loaded()
+        try:
+            entry = self._scores.get(int(credential_id))
+        except (TypeError, ValueError):
+            return 0.0
+        if entry is None:
+            return 0.0
+        return decayed_score(entry[0], entry[1], now if now is not None else time.time())
+
+    def rank(self, credentials: Iterable[Credential], now: Optional[float] = None) -> List[Credential]:
+        """
+        Ordina le credenziali per frecency decrescente. L'ordinamento è stabile:
+        a parità di punteggio (es. mai usate) resta l'ordine di partenza.
+        """
+        self.ensure_loaded()
+        now = now if now is not None else time.time()
+        scores = self._scores
+        def sort_key(credential):
+            try:
+                entry = scores.get(int(credential.id))
+            except (TypeError, ValueError):
+                entry = None
+            return -decayed_score(entry[0], entry[1], now) if entry else 0.0
+        return sorted(credentials, key=sort_key)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attende che gli eventi accodati siano scritti. Restituisce False allo scadere del timeout."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Scrive gli eventi in coda e termina il thread di scrittura (chiamare alla chiusura)."""
+        writer = self._writer
+        if writer is None:
+            return
+        self._queue.put(_STOP)
+        writer.join(timeout)
+        self._writer = None
+
+    # --- Writer asincrono ---
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writer_loop, name="UsageTrackerWriter", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=WRITER_DB_TIMEOUT, isolation_level=None)
+        except sqlite3.Error as e:
+            print(f"[UsageTracker] Writer could not open database: {e}")
+            return
+        try:
+            running = True
+            while running:
+                batch = [self._queue.get()]
+                # Raccoglie altri eventi per al massimo FLUSH_INTERVAL_SECONDS: una transazione per blocco
+                deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+                while len(batch) < MAX_BATCH_SIZE and batch[-1] is not _STOP and batch[-1][0] != "flush":
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                if batch[-1] is _STOP:
+                    batch.pop()
+                    running = False
+                    # Svuota anche ciò che è arrivato nel frattempo
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _STOP:
+                            batch.append(item)
+                self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list):
+        uses = [item for item in batch if item[0] == "use"]
+        forgotten = [(item[1],) for item in batch if item[0] == "forget"]
+        if uses or forgotten:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                cursor.executemany(
+                    "INSERT INTO credential_usage (credential_id, profile_id, event, used_at) VALUES (?, ?, ?, ?)",
+                    [(credential_id, profile_id, event, used_at) for _, credential_id, profile_id, event, used_at, _ in uses])
+                # Solo l'ultimo stato di ogni credenziale nel blocco
+                latest = {}
+                for _, credential_id, _, _, _, entry in uses:
+                    latest[credential_id] = entry
+                cursor.executemany(
+                    """INSERT INTO credential_frecency (credential_id, profile_id, score, last_used_at, use_count)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (credential_id) DO UPDATE SET profile_id = excluded.profile_id,
+                           score = excluded.score, last_used_at = excluded.last_used_at, use_count = excluded.use_count""",
+                    [(credential_id, profile_id, score, last_used_at, use_count)
+                     for credential_id, (score, last_used_at, use_count, profile_id) in latest.items()])
+                if forgotten:
+                    cursor.executemany("DELETE FROM credential_frecency WHERE credential_id = ?", forgotten)
+                    cursor.executemany("DELETE FROM credential_usage WHERE credential_id = ?", forgotten)
+                cursor.execute("DELETE FROM credential_usage WHERE id <= (SELECT MAX(id) FROM credential_usage) - ?",
+                               (MAX_EVENT_ROWS,))
+                cursor.execute("COMMIT")
+            except sqlite3.Error as e:
+                print(f"[UsageTracker] Error writing {len(uses)} usage events: {e}")
+                try: cursor.execute("ROLLBACK")
+                except sqlite3.Error: pass
+            finally:
+                cursor.close()
+        for item in batch:
+            if item[0] == "flush":
+                item[1].set()
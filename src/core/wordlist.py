@@ -0,0 +1,140 @@
+"""
+Accesso O(1) a una wordlist tramite un file indice binario mappato in memoria.
+
+La wordlist testuale (una parola per riga) viene compilata una sola volta in
+un file indice (header + tabella di offset + parole concatenate) sotto `data/`.
+Agli avvii successivi il file viene solo mappato con mmap: nessun parsing,
+e la parola i-esima si legge con due letture di offset.
+
+La wordlist predefinita è la EFF Large Wordlist (7776 parole) di Electronic
+Frontier Foundation, distribuita con licenza CC BY 3.0 US:
+https://www.eff.org/dice
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+from typing import Dict, Optional
+
+WORDLIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists")
+DEFAULT_WORDLIST_PATH = os.path.join(WORDLIST_DIR, "eff_large_wordlist.txt")
+INDEX_DIR = "data" # Stessa cartella del database
+
+# Header: magic, versione, numero parole, dimensione e mtime della sorgente (per rilevare modifiche)
+INDEX_MAGIC = b"PSWWLIDX"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQ")
+_OFFSET = struct.Struct("<I")
+
+
+def _index_path_for(source_path: str) -> str:
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(INDEX_DIR, f"{name}.idx")
+
+
+def _build_index(source_path: str) -> bytes:
+    """Compila la wordlist testuale nel formato indice (restituisce i byte del file)."""
+    with open(source_path, "r", encoding="utf-8") as f:
+        words = [line.strip() for line in f]
+    # Ammette anche il formato "dadi<TAB>parola" della lista EFF originale
+    words = [word.split()[-1] for word in words if word and not word.startswith("#")]
+    if not words:
+        raise ValueError(f"Wordlist is empty: {source_path}")
+
+    encoded = [word.encode("utf-8") for word in words]
+    offsets = bytearray()
+    position = 0
+    for word in encoded:
+        offsets += _OFFSET.pack(position)
+        position += len(word)
+    offsets += _OFFSET.pack(position)
+
+    stat = os.stat(source_path)
+    header = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(encoded), stat.st_size, stat.st_mtime_ns)
+    return header + bytes(offsets) + b"".join(encoded)
+
+
+def _index_is_current(index_path: str, source_path: str) -> bool:
+    try:
+        with open(index_path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return False
+        magic, version, _count, size, mtime_ns = _HEADER.unpack(header)
+        stat = os.stat(source_path)
+        return magic == INDEX_MAGIC and version == INDEX_VERSION and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+    except OSError:
+        return False
+
+
+class Wordlist:
+    """Wordlist di sola lettura con accesso casuale O(1) alle parole."""
+
+    def __init__(self, source_path: str = DEFAULT_WORDLIST_PATH, index_path: Optional[str] = None):
+        self.source_path = source_path
+        self.index_path = index_path or _index_path_for(source_path)
+        self._file = None
+        self._data = self._open()
+        magic, version, self._count, _size, _mtime = _HEADER.unpack_from(self._data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Invalid wordlist index: {self.index_path}")
+        self._words_start = _HEADER.size + _OFFSET.size * (self._count + 1)
+        # Vista diretta sulla tabella di offset (little-endian su disco)
+        self._offsets = None
+        if sys.byteorder == "little":
+            self._offsets = memoryview(self._data)[_HEADER.size:self._words_start].cast("I")
+
+    def _open(self):
+        """Mappa l'indice su disco, compilandolo prima se manca o è obsoleto."""
+        if not _index_is_current(self.index_path, self.source_path):
+            data = _build_index(self.source_path)
+            try:
+                os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+                temp_path = self.index_path + ".tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, self.index_path)
+                print(f"[Wordlist] Compiled index for {os.path.basename(self.source_path)} ({self.index_path}).")
+            except OSError as e:
+                # Cartella non scrivibile: si usa l'indice in memoria per questa sessione
+                print(f"[Wordlist] Could not write index file ({e}). Using in-memory index.")
+                return data
+        self._file = open(self.index_path, "rb")
+        return mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError("word index out of range")
+        if self._offsets is not None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+        else:
+            start, end = struct.unpack_from("<II", self._data, _HEADER.size + _OFFSET.size * index)
+        return self._data[self._words_start + start:self._words_start + end].decode("utf-8")
+
+    def close(self):
+        if self._offsets is not None:
+            self._offsets.release()
+            self._offsets = None
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+_wordlists: Dict[str, Wordlist] = {}
+_wordlists_lock = threading.Lock()
+
+
+def get_wordlist(source_path: str = DEFAULT_WORDLIST_PATH) -> Wordlist:
+    """Restituisce (aprendola una sola volta per processo) la wordlist richiesta."""
+    with _wordlists_lock:
+        wordlist = _wordlists.get(source_path)
+        if wordlist is None:
+            wordlist = _wordlists[source_path] = Wordlist(source_path)
+        return wordlist
@@ -40,20 +40,13 @@ class AuthDialog(QDialog):
             "Inserisci la tua master password per accedere alle tue credenziali."
         )
         welcome_label.setWordWrap(True)
-        welcome_label.setStyleSheet("font-size: 14px;")
+        welcome_label.setObjectName("welcomeLabel")
         layout.addWidget(welcome_label)
         
         # Campo password
         self.password_edit = QLineEdit()
         self.password_edit.setPlaceholderText("Password master")
         self.password_edit.setEchoMode(QLineEdit.Password)
-        self.password_edit.setStyleSheet("""
-            QLineEdit {
-                padding: 8px;
-                border: 1px solid #ccc;
-                border-radius: 4px;
-            }
-        """)
         layout.addWidget(self.password_edit)
         
         # Pulsanti
@@ -61,34 +54,12 @@ class AuthDialog(QDialog):
         buttons_layout.setSpacing(10)
         
         self.login_button = QPushButton("Accedi")
-        self.login_button.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                padding: 8px;
-                border: none;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
+        self.login_button.setObjectName("loginButton")
         self.login_button.clicked.connect(self.on_login)
         buttons_layout.addWidget(self.login_button)
         
         self.cancel_button = QPushButton("Annulla")
-        self.cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #f44336;
-                color: white;
-                padding: 8px;
-                border: none;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #da190b;
-            }
-        """)
+        self.cancel_button.setObjectName("cancelButton")
         self.cancel_button.clicked.connect(self.reject)
         buttons_layout.addWidget(self.cancel_button)
         
@@ -3,291 +3,269 @@ Widget che mostra la lista delle credenziali di un profilo.
 """
 
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QFrame, QScrollArea, QCheckBox, QApplication, QStyle,
-    QGraphicsDropShadowEffect, QGridLayout
+    QWidget, QVBoxLayout, QLabel, QFrame, QListView, QApplication, QStyle,
+    QStyledItemDelegate, QStyleOptionButton, QStyleOptionViewItem, QAbstractItemView
 )
-from PySide6.QtCore import Qt, Signal, Property, QPoint, QRectF, QPointF, QPropertyAnimation, QEasingCurve
-from PySide6.QtGui import QFont, QCursor, QColor, QPainter, QPen, QBrush, QPalette
-from typing import List, Optional
-
-# Nuova classe per rappresentare un singolo item credenziale
-class CredentialBox(QFrame):
-    # Segnali per interazione
-    edit_requested = Signal()
-    selected_changed = Signal(bool)
-    
-    def __init__(self, credential, parent=None):
+from PySide6.QtCore import Qt, Signal, QEvent, QModelIndex, QRect, QRectF, QSize
+from PySide6.QtGui import QFont, QFontMetrics, QColor, QPainter, QPen
+from typing import List
+
+from .credential_model import CredentialListModel, CredentialRole
+
+# Colori delle card (stessa palette di MODERN_STYLESHEET)
+CARD_BG_COLOR = QColor("#161B22") # BG_BASE
+CARD_HOVER_COLOR = QColor("#21262D") # BG_SECONDARY
+CARD_BORDER_COLOR = QColor("#30363D")
+CARD_ACCENT_COLOR = QColor("#58A6FF")
+TEXT_PRIMARY_COLOR = QColor("#E6EDF3")
+TEXT_SECONDARY_COLOR = QColor("#C9D1D9")
+TEXT_MUTED_COLOR = QColor("#8B949E")
+BUTTON_COLOR = QColor("#30363D")
+BUTTON_HOVER_COLOR = QColor("#484F58")
+
+# Geometria di una riga (altezza fissa: la vista non misura mai le righe)
+ROW_HEIGHT = 78
+ROW_PADDING = 10
+CHECKBOX_SIZE = 16
+EDIT_BUTTON_SIZE = QSize(60, 24)
+LINE_SPACING = 4
+
+
+class CredentialItemDelegate(QStyledItemDelegate):
+    """
+    Disegna una credenziale come card (checkbox, nome app, bottone "Modifica",
+    username ed email/nome) e gestisce hover, spunta e click senza creare widget:
+    il costo è solo quello delle righe visibili.
+    """
+
+    row_clicked = Signal(QModelIndex) # Click sulla card o su "Modifica" (non sulla checkbox)
+
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.credential = credential
-        self._selected = False
-        
-        self.setObjectName("credentialBox")
-        self.setCursor(Qt.PointingHandCursor)
-        self.setProperty("selected", self._selected)
-        # self.setProperty("class", "cardWidget") # Ereditato da QSS globale o specifico per #credentialBox
-
-        # Imposta colori base e hover (da QSS)
-        self._base_color = QColor("#161B22") # BG_BASE da MODERN_STYLESHEET
-        self._hover_color = QColor("#21262D") # BG_SECONDARY da MODERN_STYLESHEET
-        self._current_bg_color = self._base_color
-        
-        # Abilita autoFillBackground per QPalette
-        self.setAutoFillBackground(True)
-        self.update_background(self._current_bg_color)
+        self._hovered_row = -1 # Riga con il mouse sopra il bottone "Modifica"
+        self._fonts_key = None
+        self._title_font = QFont()
+        self._text_font = QFont()
+        self._title_metrics = QFontMetrics(self._title_font)
+        self._text_metrics = QFontMetrics(self._text_font)
+
+    # --- Geometria ---
+    @staticmethod
+    def _layout(rect: QRect):
+        """Restituisce (checkbox, titolo, bottone modifica, riga 1, riga 2) per la card in `rect`."""
+        inner = rect.adjusted(ROW_PADDING, ROW_PADDING, -ROW_PADDING, -ROW_PADDING)
+        title_height = EDIT_BUTTON_SIZE.height()
+        check_rect = QRect(inner.left(), inner.top() + (title_height - CHECKBOX_SIZE) // 2, CHECKBOX_SIZE, CHECKBOX_SIZE)
+        edit_rect = QRect(inner.right() - EDIT_BUTTON_SIZE.width() + 1, inner.top(),
+                          EDIT_BUTTON_SIZE.width(), EDIT_BUTTON_SIZE.height())
+        text_left = check_rect.right() + 9
+        title_rect = QRect(text_left, inner.top(), edit_rect.left() - 8 - text_left, title_height)
+        line_height = (inner.bottom() - title_rect.bottom() - LINE_SPACING) // 2
+        line1_rect = QRect(text_left + 6, title_rect.bottom() + LINE_SPACING, inner.right() - text_left - 6, line_height)
+        line2_rect = line1_rect.translated(0, line_height)
+        return check_rect, title_rect, edit_rect, line1_rect, line2_rect
+
+    def _update_fonts(self, base_font: QFont):
+        key = base_font.key()
+        if key != self._fonts_key:
+            self._fonts_key = key
+            self._title_font = QFont(base_font)
+            self._title_font.setPointSizeF(10)
+            self._title_font.setBold(True)
+            self._text_font = QFont(base_font)
+            self._text_font.setPointSizeF(9)
+            self._title_metrics = QFontMetrics(self._title_font)
+            self._text_metrics = QFontMetrics(self._text_font)
+
+    # --- QStyledItemDelegate ---
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        return QSize(option.rect.width() or 200, ROW_HEIGHT)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        credential = index.data(CredentialRole)
+        if credential is None:
+            return
+        self._update_fonts(option.font)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        card_rect = option.rect.adjusted(1, 1, -1, -1)
+        check_rect, title_rect, edit_rect, line1_rect, line2_rect = self._layout(option.rect)
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Card
+        painter.setPen(QPen(CARD_ACCENT_COLOR if (selected or hovered) else CARD_BORDER_COLOR, 1.5 if selected else 1.0))
+        painter.setBrush(CARD_HOVER_COLOR if (selected or hovered) else CARD_BG_COLOR)
+        painter.drawRoundedRect(QRectF(card_rect), 6, 6)
+
+        # Checkbox (disegnata dallo stile, nessun widget)
+        check_option = QStyleOptionButton()
+        check_option.rect = check_rect
+        check_option.state = QStyle.StateFlag.State_Enabled
+        checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+        check_option.state |= QStyle.StateFlag.State_On if checked else QStyle.StateFlag.State_Off
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_IndicatorCheckBox, check_option, painter, option.widget)
+
+        # Nome app
+        painter.setFont(self._title_font)
+        painter.setPen(TEXT_PRIMARY_COLOR)
+        painter.drawText(title_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         self._title_metrics.elidedText(credential.app_name or "", Qt.TextElideMode.ElideRight, title_rect.width()))
+
+        # Bottone "Modifica"
+        button_hovered = index.row() == self._hovered_row
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(BUTTON_HOVER_COLOR if button_hovered else BUTTON_COLOR)
+        painter.drawRoundedRect(QRectF(edit_rect), 4, 4)
+        painter.setFont(self._text_font)
+        painter.setPen(TEXT_PRIMARY_COLOR)
+        painter.drawText(edit_rect, Qt.AlignmentFlag.AlignCenter, "Modifica")
+
+        # Dettagli: username, poi email e nome/cognome
+        text_metrics = self._text_metrics
+        if credential.username:
+            painter.setPen(TEXT_MUTED_COLOR)
+            painter.drawText(line1_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                             text_metrics.elidedText(f"Username: {credential.username}", Qt.TextElideMode.ElideRight, line1_rect.width()))
+        full_name = " ".join(part for part in (credential.first_name, credential.last_name) if part)
+        details = "  ·  ".join(part for part in (credential.email, full_name) if part)
+        if details:
+            painter.setPen(TEXT_SECONDARY_COLOR)
+            painter.drawText(line2_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                             text_metrics.elidedText(details, Qt.TextElideMode.ElideRight, line2_rect.width()))
+        painter.restore()
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        event_type = event.type()
+        if event_type == QEvent.Type.MouseMove:
+            _, _, edit_rect, _, _ = self._layout(option.rect)
+            hovered_row = index.row() if edit_rect.contains(event.position().toPoint()) else -1
+            if hovered_row != self._hovered_row:
+                self._hovered_row = hovered_row
+                if isinstance(option.widget, QAbstractItemView):
+                    option.widget.viewport().update() # Ridisegna solo le righe visibili
+            return False
+        if event_type not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease, QEvent.Type.MouseButtonDblClick):
+            return False
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+        check_rect, _, _, _, _ = self._layout(option.rect)
+        if check_rect.adjusted(-4, -4, 4, 4).contains(event.position().toPoint()):
+            # La checkbox non seleziona la riga (come la QCheckBox delle vecchie card)
+            if event_type == QEvent.Type.MouseButtonRelease:
+                checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+                model.setData(index, Qt.CheckState.Unchecked if checked else Qt.CheckState.Checked, Qt.ItemDataRole.CheckStateRole)
+            return True
+        if event_type == QEvent.Type.MouseButtonRelease:
+            self.row_clicked.emit(index)
+        return False
+
+    def clear_hover(self):
+        self._hovered_row = -1
 
-        self.setup_ui()
-        self.setup_background_animation() # Nuova funzione
 
-    def setup_ui(self):
-        box_layout = QVBoxLayout(self)
-        box_layout.setContentsMargins(10, 10, 10, 10) # Padding aggiornato
-        box_layout.setSpacing(5) # Spaziatura interna ridotta
-
-        # Layout superiore (Checkbox, Nome App, Bottone Modifica)
-        top_layout = QHBoxLayout()
-        top_layout.setSpacing(8)
-        top_layout.setContentsMargins(0, 0, 0, 0)
-        
-        # Checkbox (per selezione multipla? Manteniamola per ora)
-        self.checkbox = QCheckBox()
-        # self.checkbox.setStyleSheet("QCheckBox { color: white; }") # Stile da QSS
-        top_layout.addWidget(self.checkbox)
-        
-        # Nome App (più prominente)
-        self.app_name_label = QLabel(self.credential.app_name)
-        self.app_name_label.setObjectName("appNameLabel") 
-        # self.app_name_label.setFont(QFont("Arial", 11, QFont.Bold)) # Stile da QSS
-        top_layout.addWidget(self.app_name_label, 1) # Stretch
-        
-        top_layout.addStretch(0)
-        
-        # Bottone Modifica (più piccolo, icona?)
-        self.edit_btn = QPushButton("Modifica") # O usa icona QStyle.SP_DialogResetButton?
-        self.edit_btn.setObjectName("editBtn") # Per stile specifico se serve
-        self.edit_btn.setFixedSize(60, 24) # Dimensione fissa piccola
-        self.edit_btn.setStyleSheet("QPushButton#editBtn { padding: 2px 5px; font-size: 8pt; min-width: 50px; }") # Stile inline rapido
-        self.edit_btn.clicked.connect(self.edit_requested.emit)
-        top_layout.addWidget(self.edit_btn)
-        
-        box_layout.addLayout(top_layout)
-
-        # Layout inferiore (Nome, Cognome, Email, Username)
-        # Usiamo un layout a griglia per allinearli?
-        info_layout = QGridLayout()
-        info_layout.setContentsMargins(25, 5, 0, 0) # Indenta sotto checkbox
-        info_layout.setSpacing(4)
-        info_layout.setColumnStretch(1, 1) # Colonna valori si espande
-
-        if self.credential.first_name:
-            fn_label = QLabel("Nome:")
-            fn_label.setObjectName("credFirstNameLabel")
-            fn_val = QLabel(self.credential.first_name)
-            info_layout.addWidget(fn_label, 0, 0)
-            info_layout.addWidget(fn_val, 0, 1)
-
-        if self.credential.last_name:
-            ln_label = QLabel("Cognome:")
-            ln_label.setObjectName("credLastNameLabel")
-            ln_val = QLabel(self.credential.last_name)
-            info_layout.addWidget(ln_label, 1, 0)
-            info_layout.addWidget(ln_val, 1, 1)
-
-        if self.credential.email:
-            em_label = QLabel("Email:")
-            em_label.setObjectName("credEmailLabel")
-            em_val = QLabel(self.credential.email)
-            em_val.setToolTip(self.credential.email)
-            info_layout.addWidget(em_label, 2, 0)
-            info_layout.addWidget(em_val, 2, 1)
-
-        if self.credential.username:
-            un_label = QLabel("Username:")
-            un_label.setObjectName("usernameLabel") # Mantiene ID vecchio
-            un_val = QLabel(self.credential.username)
-            un_val.setToolTip(self.credential.username)
-            info_layout.addWidget(un_label, 3, 0)
-            info_layout.addWidget(un_val, 3, 1)
-        
-        box_layout.addLayout(info_layout)
-        
-    def setup_background_animation(self):
-        """Configura l'animazione per il colore di sfondo."""
-        self.bg_color_animation = QPropertyAnimation(self, b"_backgroundColor", self)
-        self.bg_color_animation.setDuration(200) # Durata animazione (ms)
-        self.bg_color_animation.setEasingCurve(QEasingCurve.OutQuad)
-        
-    # --- Property per il colore di sfondo --- 
-    def _get_background_color(self) -> QColor:
-        return self._current_bg_color
-
-    def _set_background_color(self, color: QColor):
-        self._current_bg_color = color
-        self.update_background(color)
-
-    _backgroundColor = Property(QColor, _get_background_color, _set_background_color)
-    # --- Fine Property --- 
-    
-    def update_background(self, color: QColor):
-        """Aggiorna il colore di sfondo usando QPalette."""
-        palette = self.palette()
-        palette.setColor(QPalette.Window, color)
-        self.setPalette(palette)
-
-    def enterEvent(self, event): # Override
-        """Anima il colore di sfondo verso lo stato hover."""
-        # --- RIPRISTINO ANIMAZIONE COLORE SFONDO ---
-        self.bg_color_animation.stop()
-        self.bg_color_animation.setStartValue(self._current_bg_color)
-        self.bg_color_animation.setEndValue(self._hover_color)
-        self.bg_color_animation.start()
-        # --- FINE RIPRISTINO ---
-        super().enterEvent(event)
-
-    def leaveEvent(self, event): # Override
-        """Anima il colore di sfondo verso lo stato base."""
-        # --- RIPRISTINO ANIMAZIONE COLORE SFONDO ---
-        self.bg_color_animation.stop()
-        self.bg_color_animation.setStartValue(self._current_bg_color)
-        self.bg_color_animation.setEndValue(self._base_color)
-        self.bg_color_animation.start()
-        # --- FINE RIPRISTINO ---
-        super().leaveEvent(event)
-
-    def set_selected(self, selected: bool):
-        if self._selected != selected:
-            self._selected = selected
-            self.setProperty("selected", self._selected)
-            self.style().unpolish(self)
-            self.style().polish(self)
-            self.update()
-            self.selected_changed.emit(selected)
-
-    def is_selected(self) -> bool:
-        return self.checkbox.isChecked()
-        
-    def mousePressEvent(self, event):
-        # Emettiamo il segnale di modifica quando si clicca sul box
-        # Questo simula il vecchio comportamento di on_edit_credential
-        self.edit_requested.emit()
-        super().mousePressEvent(event)
-
-# Modifica CredentialList per usare CredentialBox
 class CredentialList(QWidget):
     """Widget che mostra la lista delle credenziali di un profilo."""
-    
+
     credential_selected = Signal(object) # Segnale passa l'oggetto Credential
-    
+
     def __init__(self, profile_name="", parent=None):
         super().__init__(parent)
         self.profile_name = profile_name
-        self.credential_boxes: List[CredentialBox] = [] # Lista di CredentialBox
-        self.selected_credential_box: Optional[CredentialBox] = None # Riferimento al box selezionato
         self.setup_ui()
-        
+
     def setup_ui(self):
         """Configura l'interfaccia del widget."""
         main_layout = QVBoxLayout(self)
         main_layout.setSpacing(0)
         main_layout.setContentsMargins(0, 0, 0, 0)
-        
+
         # Main box che contiene header e lista credenziali
         self.main_box = QFrame()
         self.main_box.setObjectName("mainBox")
         main_box_layout = QVBoxLayout(self.main_box)
         main_box_layout.setSpacing(0)
         main_box_layout.setContentsMargins(0, 0, 0, 0)
-        
+
         # Titolo del profilo
         self.profile_title = QLabel(self.profile_name)
         self.profile_title.setObjectName("profileTitle")
         self.profile_title.setAlignment(Qt.AlignCenter)
         main_box_layout.addWidget(self.profile_title)
-        
-        # Scroll area per la lista credenziali
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.cred_list_widget = QWidget()
-        self.list_layout = QVBoxLayout(self.cred_list_widget)
-        self.list_layout.setSpacing(8)
-        self.list_layout.setContentsMargins(8, 12, 8, 12)
-        self.list_layout.addStretch()
-        self.scroll_area.setWidget(self.cred_list_widget)
-        main_box_layout.addWidget(self.scroll_area)
+
+        # Lista credenziali (model/view: vengono disegnate solo le righe visibili)
+        self.model = CredentialListModel(self, checkable=True)
+        self.delegate = CredentialItemDelegate(self)
+        self.delegate.row_clicked.connect(self.on_row_clicked)
+        self.list_view = QListView()
+        self.list_view.setObjectName("credentialListView")
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setUniformItemSizes(True) # Altezza fissa: nessuna misura per riga
+        self.list_view.setSpacing(4)
+        self.list_view.setMouseTracking(True) # Hover sul bottone "Modifica"
+        self.list_view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.list_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.viewport().installEventFilter(self)
+        main_box_layout.addWidget(self.list_view)
         main_layout.addWidget(self.main_box)
-        
+
+    def eventFilter(self, watched, event):
+        if watched is self.list_view.viewport() and event.type() == QEvent.Type.Leave:
+            self.delegate.clear_hover()
+            self.list_view.viewport().update()
+        return super().eventFilter(watched, event)
+
     def set_profile_name(self, name: str):
         """Imposta il nome del profilo."""
         self.profile_name = name
         self.profile_title.setText(name)
-        
+
+    def set_credentials(self, credentials):
+        """Sostituisce tutte le credenziali in un solo reset del modello."""
+        self.delegate.clear_hover()
+        self.model.set_credentials(credentials)
+
     def add_credential(self, credential):
-        """Aggiunge una CredentialBox alla lista."""
-        cred_box = CredentialBox(credential)
-        cred_box.edit_requested.connect(lambda c=credential, b=cred_box: self.on_edit_credential(c, b))
-        
-        # Inserisce la nuova box in cima alla lista (o in fondo?) - In fondo è più semplice
-        self.list_layout.insertWidget(self.list_layout.count() - 1, cred_box) # Inserisci prima dello stretch
-        self.credential_boxes.append(cred_box)
-        
-    def on_edit_credential(self, credential, box: CredentialBox):
-        # Deseleziona tutte le altre credenziali
-        for other_box in self.credential_boxes:
-            if other_box != box:
-                other_box.set_selected(False)
-        # Seleziona questa credenziale
-        box.set_selected(True)
-        self.selected_credential_box = box
-        # Emetti il segnale con l'oggetto Credential
+        """Aggiunge una credenziale in fondo alla lista."""
+        self.model.append_credential(credential)
+
+    def on_row_clicked(self, index: QModelIndex):
+        """Click su una card: la seleziona ed emette credential_selected."""
+        credential = index.data(CredentialRole)
+        if credential is None:
+            return
+        self.list_view.setCurrentIndex(index)
         self.credential_selected.emit(credential)
-        
+
+    def selected_credential(self):
+        """Credenziale attualmente selezionata (evidenziata), o None."""
+        index = self.list_view.currentIndex()
+        return index.data(CredentialRole) if index.isValid() else None
+
     def copy_password(self, credential):
         """Copia la password negli appunti."""
-        clipboard = self.window().clipboard()
+        clipboard = QApplication.clipboard()
         if clipboard:
             clipboard.setText(credential.password)
-            
+
     def copy_to_clipboard(self, value):
         clipboard = QApplication.clipboard()
         clipboard.setText(value)
-        
+
     def clear(self):
-        """Rimuove tutte le CredentialBox dalla lista."""
-        # Rimuovi i widget dal layout
-        while self.list_layout.count() > 1: # Lascia lo stretch
-            item = self.list_layout.takeAt(0)
-            if item and item.widget():
-                item.widget().deleteLater()
-        # Pulisci la lista di riferimenti
-        self.credential_boxes = []
-        self.selected_credential_box = None
-        
+        """Rimuove tutte le credenziali dalla lista."""
+        self.delegate.clear_hover()
+        self.model.clear()
+
     def get_selected_credentials(self) -> List[object]: # Ora ritorna oggetti Credential
         """Restituisce la lista delle credenziali selezionate tramite checkbox."""
-        selected_creds = []
-        for box in self.credential_boxes:
-            if box.is_selected(): # Usa il metodo is_selected della box
-                selected_creds.append(box.credential)
-        return selected_creds 
-        
+        return self.model.checked_credentials()
+
     def clearSelection(self):
-        """Deseleziona la CredentialBox attualmente selezionata (se esiste)."""
-        if self.selected_credential_box:
-            self.selected_credential_box.set_selected(False)
-            self.selected_credential_box = None
-            
-    # --- Metodi update_item_display e copy_password rimossi o da adattare --- 
-    # def update_item_display(self, updated_credential):
-    #     # Trova la box corrispondente e aggiorna le sue label
-    #     for box in self.credential_boxes:
-    #         if box.credential.id == updated_credential.id:
-    #             box.credential = updated_credential # Aggiorna dati interni
-    #             # Aggiorna le label (richiede accesso alle label dentro box)
-    #             box.app_name_label.setText(updated_credential.app_name)
-    #             # ... aggiorna le altre label ...
-    #             break
-
-    # def copy_password(self, credential): ...
-    # def copy_to_clipboard(self, value): ... (questo può stare in ProfileWidget) 
\ No newline at end of file
+        """Deseleziona la credenziale attualmente selezionata (se esiste)."""
+        self.list_view.selectionModel().clear()
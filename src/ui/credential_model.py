@@ -0,0 +1,173 @@
+"""
+Modello Qt (model/view) per le liste di credenziali e proxy di filtro per la ricerca.
+"""
+
+from typing import List, Optional, Set
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+
+from ..core.credential import Credential
+
+# Ruolo custom per ottenere l'oggetto Credential da un indice del modello
+CredentialRole = Qt.ItemDataRole.UserRole
+SearchKeyRole = Qt.ItemDataRole.UserRole + 1
+
+
+def credential_search_key(credential: Credential) -> str:
+    """Chiave di ricerca lowercase (app + username), calcolata una sola volta per credenziale."""
+    return f"{credential.app_name or ''}\n{credential.username or ''}".lower()
+
+
+class CredentialListModel(QAbstractListModel):
+    """Lista di credenziali con chiavi di ricerca precalcolate (e spunta opzionale per la selezione multipla)."""
+
+    def __init__(self, parent=None, checkable: bool = False):
+        super().__init__(parent)
+        self._credentials: List[Credential] = []
+        self._search_keys: List[str] = []
+        self._checkable = checkable
+        self._checked: Set[int] = set() # Righe spuntate
+        self.generation = 0 # Incrementato a ogni reset: invalida i filtri calcolati sul contenuto precedente
+
+    # --- API di QAbstractListModel ---
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._credentials)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        credential = self._credentials[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{credential.app_name}  ({credential.username})"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return credential.email or credential.username
+        if role == CredentialRole:
+            return credential
+        if role == SearchKeyRole:
+            return self._search_keys[index.row()]
+        if role == Qt.ItemDataRole.CheckStateRole and self._checkable:
+            return Qt.CheckState.Checked if index.row() in self._checked else Qt.CheckState.Unchecked
+        return None
+
+    def flags(self, index: QModelIndex):
+        flags = super().flags(index)
+        if self._checkable and index.isValid():
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index: QModelIndex, value, role=Qt.ItemDataRole.EditRole) -> bool:
+        if role != Qt.ItemDataRole.CheckStateRole or not self._checkable or not index.isValid():
+            return False
+        # PySide può passare l'enum o il suo valore intero
+        if value == Qt.CheckState.Checked or value == Qt.CheckState.Checked.value:
+            self._checked.add(index.row())
+        else:
+            self._checked.discard(index.row())
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        return True
+
+    # --- API applicativa ---
+    def set_credentials(self, credentials: List[Credential]):
+        """Sostituisce l'intero contenuto del modello."""
+        self.beginResetModel()
+        self._credentials = list(credentials)
+        self._search_keys = [credential_search_key(cred) for cred in self._credentials]
+        self._checked.clear()
+        self.generation += 1
+        self.endResetModel()
+
+    def append_credential(self, credential: Credential):
+        """Aggiunge una credenziale in coda (notifica solo la riga inserita)."""
+        row = len(self._credentials)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._credentials.append(credential)
+        self._search_keys.append(credential_search_key(credential))
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_credentials([])
+
+    def credential_at(self, row: int) -> Optional[Credential]:
+        if 0 <= row < len(self._credentials):
+            return self._credentials[row]
+        return None
+
+    def credentials(self) -> List[Credential]:
+        return list(self._credentials)
+
+    def checked_credentials(self) -> List[Credential]:
+        """Credenziali spuntate, nell'ordine della lista."""
+        return [self._credentials[row] for row in sorted(self._checked)]
+
+    def row_of(self, credential_id) -> int:
+        """Riga della credenziale con l'ID indicato (-1 se assente)."""
+        for row, credential in enumerate(self._credentials):
+            if credential.id == credential_id:
+                return row
+        return -1
+
+    def search_keys(self) -> List[str]:
+        return self._search_keys
+
+
+class CredentialFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filtro per sottostringa su app/username.
+
+    Le righe accettate sono calcolate in blocco in Python sulle chiavi precalcolate
+    (e solo sulle righe già visibili quando il testo si allunga); filterAcceptsRow
+    legge poi il risultato, evitando una chiamata a data() per riga.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._search_text = ""
+        self._accepted: Optional[List[bool]] = None # None = nessun filtro attivo
+        self._generation = -1 # Generazione del modello sorgente su cui è calcolato _accepted
+
+    def _compute_accepted(self, text: str, narrow: bool) -> Optional[List[bool]]:
+        if not text:
+            return None
+        model = self.sourceModel()
+        self._generation = model.generation
+        keys = model.search_keys()
+        if narrow and self._accepted is not None and len(self._accepted) == len(keys):
+            return [visible and text in key for visible, key in zip(self._accepted, keys)]
+        return [text in key for key in keys]
+
+    def search_text(self) -> str:
+        return self._search_text
+
+    def set_search_text(self, text: str):
+        """Applica il testo di ricerca (case-insensitive)."""
+        text = text.lower()
+        if text == self._search_text or self.sourceModel() is None:
+            return
+        # Se il nuovo testo estende il precedente basta restringere le righe già visibili
+        narrow = bool(self._search_text) and text.startswith(self._search_text)
+        if hasattr(self, "beginFilterChange"): # Qt >= 6.10
+            self.beginFilterChange()
+            self._search_text = text
+            self._accepted = self._compute_accepted(text, narrow)
+            self.endFilterChange(QSortFilterProxyModel.Direction.Rows)
+        else:
+            self._search_text = text
+            self._accepted = self._compute_accepted(text, narrow)
+            self.invalidateRowsFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if not self._search_text:
+            return True
+        model = self.sourceModel()
+        if self._generation != model.generation:
+            # Il modello è stato ricaricato: ricalcola il filtro una volta per tutte le righe
+            self._accepted = self._compute_accepted(self._search_text, narrow=False)
+        accepted = self._accepted
+        if source_row < len(accepted):
+            return accepted[source_row]
+        # Riga aggiunta dopo il calcolo (append_credential)
+        return self._search_text in model.search_keys()[source_row]
+
+    def credential_at(self, proxy_row: int) -> Optional[Credential]:
+        source_index = self.mapToSource(self.index(proxy_row, 0))
+        return self.sourceModel().credential_at(source_index.row()) if source_index.isValid() else None
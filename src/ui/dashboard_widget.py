@@ -2,19 +2,29 @@
 Widget della dashboard che mostra statistiche e informazioni utili.
 """
 
+import threading
+from typing import List
+
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QFrame, QGridLayout, QPushButton
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal, QTimer
 from PySide6.QtGui import QFont, QColor
 from ..core.profile_manager import ProfileManager
 from ..core.credential_manager import CredentialManager
 
+STATS_PLACEHOLDER = "…" # Mostrato finché la statistica non è stata calcolata
+PROFILES_PER_STEP = 25 # Profili di cui raccogliere le credenziali per ciclo di eventi
+UPDATE_DEBOUNCE_MS = 300
+
 class DashboardWidget(QWidget):
     """
     Widget della dashboard che mostra statistiche e informazioni utili.
     """
+
+    # (generazione, (sicure, compromesse) oppure None in caso di errore) dal thread di calcolo
+    _password_stats_ready = Signal(int, object)
     
     def __init__(self, profile_manager: ProfileManager, credential_manager: CredentialManager):
         """Inizializza il widget della dashboard."""
@@ -27,11 +37,26 @@ class DashboardWidget(QWidget):
             "Profili": None,
             "Credenziali": None,
             "Password Sicure": None,
-            "Password Compromesse": None
+            "Password Compromesse": None,
+            "Password Riutilizzate": None
         }
         
+        # Stato dell'aggiornamento asincrono
+        self._generation = 0
+        self._pending_profile_ids: List[int] = []
+        self._collected_credentials = 0
+        self._collected_passwords: List[str] = []
+        self._collect_timer = QTimer(self)
+        self._collect_timer.setInterval(0)
+        self._collect_timer.timeout.connect(self._collect_step)
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(UPDATE_DEBOUNCE_MS)
+        self._update_timer.timeout.connect(self.update_stats)
+        self._password_stats_ready.connect(self._on_password_stats_ready)
+        
+        # Le statistiche non vengono calcolate qui: la finestra chiama update_stats() dopo il primo paint
         self.setup_ui()
-        self.update_stats()
         
     def setup_ui(self):
         """Configura l'interfaccia della dashboard."""
@@ -51,7 +76,7 @@ class DashboardWidget(QWidget):
         # Statistiche profili
         self.profiles_count = self.create_stat_card(
             "Profili",
-            "0",
+            STATS_PLACEHOLDER,
             "Numero totale di profili salvati"
         )
         stats_grid.addWidget(self.profiles_count, 0, 0)
@@ -59,7 +84,7 @@ class DashboardWidget(QWidget):
         # Statistiche credenziali
         self.credentials_count = self.create_stat_card(
             "Credenziali",
-            "0",
+            STATS_PLACEHOLDER,
             "Numero totale di credenziali salvate"
         )
         stats_grid.addWidget(self.credentials_count, 0, 1)
@@ -67,7 +92,7 @@ class DashboardWidget(QWidget):
         # Statistiche password sicure
         self.secure_passwords = self.create_stat_card(
             "Password Sicure",
-            "0",
+            STATS_PLACEHOLDER,
             "Password che soddisfano i criteri di sicurezza"
         )
         stats_grid.addWidget(self.secure_passwords, 1, 0)
@@ -75,11 +100,19 @@ class DashboardWidget(QWidget):
         # Statistiche password compromesse
         self.compromised_passwords = self.create_stat_card(
             "Password Compromesse",
-            "0",
+            STATS_PLACEHOLDER,
             "Password trovate in violazioni di dati note"
         )
         stats_grid.addWidget(self.compromised_passwords, 1, 1)
         
+        # Statistiche password riutilizzate
+        self.reused_passwords = self.create_stat_card(
+            "Password Riutilizzate",
+            STATS_PLACEHOLDER,
+            "Credenziali e profili che condividono la stessa password"
+        )
+        stats_grid.addWidget(self.reused_passwords, 2, 0, 1, 2)
+        
         layout.addLayout(stats_grid)
         
         # Sezione azioni rapide - Rimuovere o commentare
@@ -107,23 +140,15 @@ class DashboardWidget(QWidget):
         """
         card = QFrame()
         card.setFrameShape(QFrame.StyledPanel)
-        card.setStyleSheet("""
-            QFrame {
-                background-color: #2b2b2b;
-                border-radius: 10px;
-                padding: 15px;
-            }
-        """)
         
         layout = QVBoxLayout(card)
         
+        # Font e colori da QSS (QLabel#statTitleLabel / #statValueLabel in style.py)
         title_label = QLabel(title)
-        title_label.setFont(QFont("Arial", 14, QFont.Bold))
-        title_label.setStyleSheet("color: #ffffff;")
+        title_label.setObjectName("statTitleLabel")
         
         value_label = QLabel(value)
-        value_label.setFont(QFont("Arial", 24, QFont.Bold))
-        value_label.setStyleSheet("color: #4CAF50;")
+        value_label.setObjectName("statValueLabel")
         
         # Salva il riferimento al label del valore
         self.value_labels[title] = value_label
@@ -131,7 +156,6 @@ class DashboardWidget(QWidget):
         desc_label = QLabel(description)
         # Use object name for QSS targeting
         desc_label.setObjectName("statDescLabel") 
-        # desc_label.setStyleSheet("color: #aaaaaa;") # Removed, handled globally
         desc_label.setWordWrap(True)
         
         layout.addWidget(title_label)
@@ -140,101 +164,110 @@ class DashboardWidget(QWidget):
         
         # Set object name for the card itself for QSS
         card.setObjectName("statCard") 
-        # card.setFrameShape(QFrame.StyledPanel) # Shape might conflict with QSS border-radius
-        # card.setStyleSheet(""" # Removed, handled globally by #statCard or .glassPane
-        #     QFrame {
-        #         background-color: #2b2b2b;
-        #         border-radius: 10px;
-        #         padding: 15px;
-        #     }
-        # """)
         card.setProperty("class", "glassPane") # Apply the glassPane class
         
         return card
         
+    def _set_value(self, title: str, value: str):
+        label = self.value_labels.get(title)
+        if label:
+            label.setText(value)
+        else:
+            print(f"[DashboardWidget] Warning: Label for '{title}' not found in value_labels.")
+
+    def schedule_update(self):
+        """Richiede un aggiornamento: le modifiche ravvicinate producono un solo ricalcolo."""
+        self._update_timer.start()
+
     def update_stats(self):
-        """Aggiorna le statistiche mostrate usando i metodi pubblici dei manager."""
+        """
+        Avvia l'aggiornamento delle statistiche senza bloccare la UI.
+
+        Il numero di profili è immediato; le credenziali vengono raccolte a blocchi di
+        profili tra un ciclo di eventi e l'altro, e la classificazione delle password
+        (controllo HaveIBeenPwned via rete + robustezza) gira in un thread separato.
+        Fino al primo risultato le card mostrano un segnaposto.
+        """
         print("[DashboardWidget] Updating stats...")
+        self._update_timer.stop()
+        self._generation += 1 # Invalida eventuali calcoli ancora in corso
         
         # --- Profile Stats --- 
         try:
             # Use public getter for profiles
             all_profiles = self.profile_manager.get_all_profiles()
-            total_profiles = len(all_profiles)
-            if self.value_labels.get("Profili"):
-                self.value_labels["Profili"].setText(str(total_profiles))
-            else:
-                 print("[DashboardWidget] Warning: Label for 'Profili' not found in value_labels.")
+            self._set_value("Profili", str(len(all_profiles)))
         except Exception as e:
             print(f"[DashboardWidget] Error updating profile stats: {e}")
-            if self.value_labels.get("Profili"):
-                self.value_labels["Profili"].setText("Errore")
+            self._set_value("Profili", "Errore")
+            all_profiles = []
 
-        # --- Credential Stats --- 
-        total_credentials = 0
-        secure_count = 0
-        compromised_count = 0
-        weak_count = 0 # Defined as not compromised and not secure
-        
-        try:
-            # --- CORREZIONE: Itera sui profili per ottenere le credenziali --- 
-            all_profiles = self.profile_manager.get_all_profiles()
-            all_credentials = []
-            for profile in all_profiles:
-                 # Assumiamo che Profile abbia un attributo 'id' valido
-                 if profile.id is not None:
-                      creds_for_profile = self.credential_manager.get_profile_credentials(profile.id)
-                      all_credentials.extend(creds_for_profile)
-                 else:
-                      print(f"[DashboardWidget] Warning: Profile '{profile.name}' has no ID, skipping credentials.")
-            # --- FINE CORREZIONE ---
-            
-            total_credentials = len(all_credentials)
+        # --- Credential Stats: raccolta incrementale --- 
+        # Assumiamo che Profile abbia un attributo 'id' valido
+        self._pending_profile_ids = [profile.id for profile in all_profiles if profile.id is not None]
+        self._collected_credentials = 0
+        self._collected_passwords = []
+        self._collect_timer.start()
 
-            # Calculate password stats on the collected credentials
-            for cred in all_credentials:
+    def _collect_step(self):
+        """Raccoglie le credenziali di PROFILES_PER_STEP profili, poi restituisce il controllo alla UI."""
+        try:
+            for _ in range(min(PROFILES_PER_STEP, len(self._pending_profile_ids))):
+                creds_for_profile = self.credential_manager.get_profile_credentials(self._pending_profile_ids.pop())
+                self._collected_credentials += len(creds_for_profile)
                 # La password in 'cred.password' dovrebbe essere già decrittata
-                if cred.password: # Check if password exists (non None or empty)
-                    if self.credential_manager.is_password_compromised(cred.password):
-                        compromised_count += 1
-                    elif self.credential_manager.is_password_secure(cred.password):
-                        secure_count += 1
-                    else:
-                         weak_count += 1 # Neither compromised nor secure = weak
-                # else: Potremmo contare le password vuote o mancanti se necessario
-
-            # Update Labels using the references stored in self.value_labels
-            if self.value_labels.get("Credenziali"):
-                self.value_labels["Credenziali"].setText(str(total_credentials))
-            else:
-                 print("[DashboardWidget] Warning: Label for 'Credenziali' not found in value_labels.")
-                 
-            if self.value_labels.get("Password Sicure"):
-                 # Note: The card title is "Password Sicure" but logic calculates `secure_count`
-                self.value_labels["Password Sicure"].setText(str(secure_count))
-            else:
-                 print("[DashboardWidget] Warning: Label for 'Password Sicure' not found in value_labels.")
-                 
-            if self.value_labels.get("Password Compromesse"):
-                 # Note: The card title is "Password Compromesse", logic calculates `compromised_count`
-                self.value_labels["Password Compromesse"].setText(str(compromised_count))
-            else:
-                 print("[DashboardWidget] Warning: Label for 'Password Compromesse' not found in value_labels.")
-                 
-            # Optional: Update a label for weak passwords if you add a card for it
-            # if self.value_labels.get("Password Deboli"):
-            #    self.value_labels["Password Deboli"].setText(str(weak_count))
-
+                self._collected_passwords.extend(cred.password for cred in creds_for_profile if cred.password)
         except Exception as e:
             print(f"[DashboardWidget] Error updating credential stats: {e}")
-            # Set relevant labels to "Errore" on failure
-            if self.value_labels.get("Credenziali"):
-                self.value_labels["Credenziali"].setText("Errore")
-            if self.value_labels.get("Password Sicure"):
-                self.value_labels["Password Sicure"].setText("Errore")
-            if self.value_labels.get("Password Compromesse"):
-                self.value_labels["Password Compromesse"].setText("Errore")
+            self._collect_timer.stop()
+            for title in ("Credenziali", "Password Sicure", "Password Compromesse"):
+                self._set_value(title, "Errore")
+            return
+        if self._pending_profile_ids:
+            return # Prossimo blocco al prossimo ciclo di eventi
+        self._collect_timer.stop()
+        self._set_value("Credenziali", str(self._collected_credentials))
         
+        # --- Reused Password Stats (fingerprint index, no decryption of all rows) ---
+        try:
+            self._set_value("Password Riutilizzate", str(self.credential_manager.count_reused_passwords()))
+        except Exception as e:
+            print(f"[DashboardWidget] Error updating reused password stats: {e}")
+            self._set_value("Password Riutilizzate", "Errore")
+
+        # --- Password Stats: rete e calcolo fuori dal thread GUI ---
+        passwords, self._collected_passwords = self._collected_passwords, []
+        threading.Thread(target=self._classify_passwords, args=(self._generation, passwords),
+                         name="DashboardStats", daemon=True).start()
+
+    def _classify_passwords(self, generation: int, passwords: List[str]):
+        """(Thread di lavoro) Conta password compromesse e sicure; il risultato torna via segnale."""
+        secure_count = 0
+        compromised_count = 0
+        try:
+            for password in passwords:
+                if generation != self._generation:
+                    return # Nel frattempo è partito un aggiornamento più recente
+                if self.credential_manager.is_password_compromised(password):
+                    compromised_count += 1
+                elif self.credential_manager.is_password_secure(password):
+                    secure_count += 1
+                # Neither compromised nor secure = weak
+            self._password_stats_ready.emit(generation, (secure_count, compromised_count))
+        except Exception as e:
+            print(f"[DashboardWidget] Error computing password stats: {e}")
+            self._password_stats_ready.emit(generation, None)
+
+    def _on_password_stats_ready(self, generation: int, result):
+        if generation != self._generation:
+            return # Risultato superato da un aggiornamento successivo
+        if result is None:
+            self._set_value("Password Sicure", "Errore")
+            self._set_value("Password Compromesse", "Errore")
+            return
+        secure_count, compromised_count = result
+        self._set_value("Password Sicure", str(secure_count))
+        self._set_value("Password Compromesse", str(compromised_count))
         print("[DashboardWidget] Stats update complete.")
 
     # def show_add_profile(self):
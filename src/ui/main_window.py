@@ -2,6 +2,10 @@
 Finestra principale dell'applicazione PsW.
 """
 
+import threading
+import time
+from typing import Optional
+
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QStackedWidget, QFrame,
@@ -10,10 +14,12 @@ from PySide6.QtWidgets import (
     QMenuBar, QMenu, QToolBar, QButtonGroup, QStyle, QToolButton, QScrollBar
 )
 from PySide6.QtGui import QAction, QIcon, QFont, QCursor
-from PySide6.QtCore import Qt, Slot, QPropertyAnimation, QEasingCurve, Property
+from PySide6.QtCore import Qt, Slot, QPropertyAnimation, QEasingCurve, Property, QTimer
 from ..core.profile_manager import ProfileManager
 from ..core.credential_manager import CredentialManager
-from ..utils.sync_manager import SyncManager
+from ..core.database_manager import CHANGE_LOG_COMPACT_INTERVAL_SECONDS
+from ..utils.sync_manager import SyncManager, sync_signal_emitter
+from ..utils import timing
 from .settings_dialog import SettingsDialog
 from .dashboard_widget import DashboardWidget
 from .profile_widget import ProfileWidget
@@ -26,434 +32,6 @@ from .auth_dialog import AuthDialog
 from .registration_dialog import RegistrationDialog
 from PySide6.QtWidgets import QGraphicsOpacityEffect
 
-# --- Define the QSS Stylesheet --- 
-# Palette:
-# BG_BASE = "#161B22"
-# BG_SECONDARY = "#21262D"
-# BG_TERTIARY = "#30363D"
-# TEXT_PRIMARY = "#E6EDF3"
-# TEXT_SECONDARY = "#8B949E"
-# ACCENT_PRIMARY = "#58A6FF" # Blu brillante
-# ACCENT_HOVER = "#79C0FF"
-# ACCENT_PRESSED = "#388BFD"
-# BORDER_PRIMARY = "#30363D"
-# BORDER_SECONDARY = "rgba(139, 148, 158, 0.3)"
-# ERROR_COLOR = "#F85149"
-# SUCCESS_COLOR = "#3FB950"
-
-MODERN_STYLESHEET = """
-/* === Global Styles === */
-QWidget {
-    background-color: #161B22; /* BG_BASE */
-    color: #E6EDF3; /* TEXT_PRIMARY */
-    font-family: "Segoe UI", system-ui, sans-serif;
-    font-size: 10pt;
-    /* Disabilita outline di focus generico, lo gestiamo noi */
-    outline: 0;
-}
-
-/* === Layout & Containers === */
-QFrame {
-    background-color: transparent;
-    border: none;
-}
-
-QFrame#header {
-    background-color: #21262D; /* BG_SECONDARY */
-    border-bottom: 1px solid #30363D; /* BORDER_PRIMARY */
-    padding: 8px 15px; /* Aggiusta padding */
-}
-
-QScrollArea {
-    border: none;
-    background-color: transparent;
-}
-
-QSplitter::handle {
-    background-color: #30363D; 
-}
-QSplitter::handle:horizontal { width: 1px; }
-QSplitter::handle:vertical { height: 1px; }
-QSplitter::handle:hover { background-color: #58A6FF; }
-
-QGroupBox {
-    color: #E6EDF3;
-    font-size: 11pt;
-    font-weight: bold;
-    border: 1px solid #30363D;
-    border-radius: 8px; /* Aumenta radius */
-    margin-top: 12px; /* Aumenta margine */
-    padding: 25px 15px 15px 15px; /* Aumenta padding top */
-    background-color: #21262D;
-}
-QGroupBox::title {
-    subcontrol-origin: margin;
-    subcontrol-position: top left;
-    left: 15px; /* Sposta titolo */
-    padding: 0 8px; /* Aumenta padding titolo */
-    background-color: #161B22;
-    color: #79C0FF; /* ACCENT_HOVER (più leggibile?) */
-    font-size: 10pt;
-    font-weight: bold;
-}
-
-/* === Sidebar === */
-QFrame#sidebarFrame {
-    background-color: #0D1117; /* Più scuro per staccare */
-    border-right: 1px solid #30363D;
-    min-width: 200px; /* Leggermente più larga */
-    max-width: 200px;
-}
-
-#sidebarFrame QToolButton {
-    background-color: transparent;
-    border: none; 
-    color: #C9D1D9; /* TEXT_SECONDARY chiaro */
-    padding: 10px 20px; /* Padding uniforme */
-    text-align: left;
-    border-radius: 6px; 
-    font-size: 10pt; 
-    font-weight: 500;
-    /* Imposta dimensione icona esplicita */
-    qproperty-iconSize: 20px 20px; /* O usa QSize(20, 20) nel codice */
-    margin: 2px 5px; /* Margine tra bottoni */
-}
-
-#sidebarFrame QToolButton:hover {
-    background-color: #21262D;
-    color: #E6EDF3;
-}
-
-#sidebarFrame QToolButton:checked {
-    background-color: rgba(88, 166, 255, 0.1); /* Sfondo accento più tenue */
-    color: #79C0FF; /* Testo Accento */
-    font-weight: bold;
-    /* Indicatore selezione a sinistra */
-    border-left: 3px solid #58A6FF; 
-    padding-left: 17px; /* Compensa per il bordo aggiunto */
-}
-
-/* === Text & Labels === */
-QLabel {
-    background-color: transparent; 
-    padding: 2px;
-    color: #C9D1D9; 
-}
-QLabel#titleLabel { 
-    font-size: 16pt;
-    font-weight: 600; 
-    padding: 10px 15px;
-    color: #E6EDF3; 
-}
-QLabel#headerLabel { 
-    font-size: 12pt;
-    font-weight: bold;
-    color: #E6EDF3;
-    padding-bottom: 8px; /* Aumenta spazio sotto */
-    border-bottom: 1px solid #30363D;
-    margin-bottom: 12px; /* Aumenta margine sotto */
-}
-
-/* === Input Fields === */
-QLineEdit, QTextEdit, QSpinBox {
-    background-color: #0D1117;
-    color: #E6EDF3;
-    border: 1px solid #30363D;
-    border-radius: 6px;
-    padding: 9px 12px; /* Aumenta padding */
-    font-size: 10pt;
-}
-
-QLineEdit:focus, QTextEdit:focus, QSpinBox:focus {
-    border: 1px solid #58A6FF;
-    background-color: #161B22;
-}
-
-QLineEdit:disabled, QTextEdit:disabled, QSpinBox:disabled {
-    background-color: #21262D;
-    color: #8B949E;
-    border-color: #30363D;
-}
-
-QTextEdit { 
-    min-height: 70px; /* Leggermente più alto */
-}
-
-/* === Buttons === */
-QPushButton {
-    background-color: #21262D;
-    color: #79C0FF; /* Colore accento più brillante */
-    border: 1px solid #30363D;
-    padding: 9px 18px; /* Padding leggermente aumentato */
-    border-radius: 6px;
-    font-size: 10pt;
-    font-weight: 500;
-    min-width: 90px; /* Leggermente più largo */
-    outline: none; 
-}
-QPushButton:hover {
-    background-color: #30363D;
-    border-color: #8B949E;
-    color: #E6EDF3; /* Testo primario su hover */
-}
-QPushButton:pressed {
-    background-color: #388BFD;
-    color: #FFFFFF;
-    border-color: #58A6FF;
-}
-QPushButton:disabled {
-    background-color: rgba(33, 38, 45, 0.7);
-    color: #8B949E;
-    border-color: rgba(48, 54, 61, 0.5);
-}
-
-/* Pulsante Primario (es. Salva, OK, Conferma) */
-QPushButton#primaryButton,
-QPushButton[primary="true"],
-QPushButton#saveButton, 
-QPushButton#confirmButton,
-QPushButton#confirmNewPasswordBtn,
-QPushButton#okButton {
-    background-color: #238636; /* Verde GitHub più scuro */
-    color: #FFFFFF;
-    border-color: rgba(46, 160, 67, 0.7);
-    font-weight: bold;
-}
-QPushButton#primaryButton:hover,
-QPushButton[primary="true"]:hover,
-QPushButton#saveButton:hover, 
-QPushButton#confirmButton:hover,
-QPushButton#confirmNewPasswordBtn:hover,
-QPushButton#okButton:hover {
-    background-color: #2EA043;
-    border-color: #238636;
-}
-QPushButton#primaryButton:pressed,
-QPushButton[primary="true"]:pressed,
-QPushButton#saveButton:pressed, 
-QPushButton#confirmButton:pressed,
-QPushButton#confirmNewPasswordBtn:pressed,
-QPushButton#okButton:pressed {
-    background-color: #238636;
-}
-
-/* Pulsante Eliminazione */
-QPushButton#deleteButton, QPushButton#deleteBtn {
-    background-color: transparent;
-    color: #DA3633; /* Rosso GitHub */
-    border: 1px solid rgba(218, 54, 51, 0.7);
-}
-QPushButton#deleteButton:hover, QPushButton#deleteBtn:hover {
-    background-color: rgba(218, 54, 51, 0.1);
-    color: #F85149;
-    border-color: #F85149;
-}
-QPushButton#deleteButton:pressed, QPushButton#deleteBtn:pressed {
-    background-color: rgba(218, 54, 51, 0.2);
-    color: #FFFFFF;
-}
-
-/* Pulsante Annulla/Indietro */
-QPushButton#cancelButton, QPushButton#backBtn {
-    background-color: #30363D; /* Sfondo leggermente più visibile */
-    color: #C9D1D9;
-    border: 1px solid #30363D;
-}
-QPushButton#cancelButton:hover, QPushButton#backBtn:hover {
-    background-color: #484F58;
-    color: #E6EDF3;
-    border-color: #8B949E;
-}
-QPushButton#cancelButton:pressed, QPushButton#backBtn:pressed {
-    background-color: #40464E;
-}
-
-/* Pulsanti piccoli/icone (Visibilità, Copia, Genera) */
-QPushButton#visibilityToggleBtn {
-    background-color: transparent;
-    border: none;
-    color: #8B949E;
-    padding: 5px;
-    margin: 0;
-    min-width: 30px;
-    max-width: 30px;
-    font-size: 14pt;
-}
-QPushButton#visibilityToggleBtn:hover { 
-    background-color: #30363D;
-    color: #E6EDF3;
-    border-radius: 4px; /* Arrotonda hover */
-}
-QPushButton#visibilityToggleBtn:checked {
-    background-color: #58A6FF;
-    color: #161B22;
-    border-radius: 4px;
-}
-QPushButton#copyButton {
-    background-color: #21262D; /* Sfondo per distinguerlo */
-    border: 1px solid #30363D;
-    color: #8B949E;
-    padding: 5px;
-    margin: 0 0 0 5px;
-    min-width: 30px;
-    max-width: 30px;
-    font-size: 11pt;
-    border-radius: 4px;
-}
-QPushButton#copyButton:hover { 
-    background-color: #30363D;
-    border-color: #58A6FF;
-    color: #E6EDF3;
-}
-QPushButton#copyButton:pressed { 
-    background-color: #388BFD;
-    color: #FFFFFF;
-}
-QPushButton#generatePasswordBtn, QPushButton#generatePasswordEditBtn {
-    background-color: #21262D;
-    color: #C9D1D9;
-    border: 1px solid #30363D;
-    font-size: 9pt;
-    padding: 7px 14px;
-    min-width: auto;
-}
-QPushButton#generatePasswordBtn:hover, QPushButton#generatePasswordEditBtn:hover {
-    background-color: #30363D;
-    border-color: #8B949E;
-    color: #E6EDF3;
-}
-
-/* === Scrollbar === */
-QScrollBar:vertical {
-    border: none;
-    background: #0D1117; /* Sfondo molto scuro */
-    width: 10px; /* Larghezza ridotta */
-    margin: 0px 0px 0px 0px;
-}
-QScrollBar::handle:vertical {
-    background: #30363D; /* Grigio scuro handle */
-    min-height: 20px;
-    border-radius: 5px; /* Arrotonda handle */
-}
-QScrollBar::handle:vertical:hover {
-    background: #484F58; /* Handle più chiaro su hover */
-}
-QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-    border: none;
-    background: none;
-    height: 0px;
-}
-QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-    background: none;
-}
-/* Stili simili per QScrollBar:horizontal se necessario */
-QScrollBar:horizontal { /* ... */ }
-QScrollBar::handle:horizontal { /* ... */ }
-/* ... */
-
-/* === Card Specific Styles === */
-.cardWidget, 
-QFrame#statCard, 
-QWidget#credentialDetailWidget,
-QDialog 
-{
-    background-color: #161B22; /* Usa BG_BASE per più contrasto */
-    border: 1px solid #30363D;
-    border-radius: 8px;
-    padding: 18px; /* Padding aumentato */
-}
-.cardWidget:hover,
-QFrame#statCard:hover 
-{
-    border-color: #58A6FF;
-    background-color: #21262D; /* BG_SECONDARY su hover */
-}
-
-/* === Profile Box === */
-QFrame#profileBox {
-    background-color: #161B22; /* BG_BASE */
-    border: 1px solid #30363D;
-    border-radius: 8px;
-    padding: 12px 15px; /* Padding rivisto */
-    min-width: 220px; /* Assicura larghezza minima */
-}
-QFrame#profileBox:hover {
-    border-color: #58A6FF;
-    background-color: #21262D;
-}
-QFrame#profileBox[selected="true"] { 
-    border: 1.5px solid #58A6FF; 
-    background-color: #21262D;
-}
-
-/* Elementi dentro ProfileBox */
-#profileBox QLabel#profileNameLabel { 
-    font-size: 11pt; /* Ridotto leggermente */
-    font-weight: bold; 
-    color: #E6EDF3; 
-    margin-bottom: 1px; /* Spazio ridotto */
-}
-#profileBox QLabel#profileLastNameLabel {
-    font-size: 10pt; /* Ridotto */
-    color: #C9D1D9;
-    margin-bottom: 4px;
-}
-#profileBox QLabel#profileEmailLabel { 
-    color: #8B949E; 
-    font-size: 9pt; 
-    margin-top: 4px; /* Spazio sopra email */
-}
-
-/* === Credential Box === */
-QFrame#credentialBox {
-    background-color: #161B22; /* BG_BASE */
-    border: 1px solid #30363D;
-    border-radius: 6px; /* Meno arrotondato */
-    padding: 10px 12px;
-}
-QFrame#credentialBox:hover {
-    border-color: #58A6FF;
-    background-color: #21262D;
-}
-QFrame#credentialBox[selected="true"] {
-    border: 1.5px solid #58A6FF; 
-    background-color: #21262D;
-}
-
-/* Credential List Items - Labels */
-#credentialBox QLabel { margin-bottom: 2px; } /* Spazio sotto ogni label */
-
-#credentialBox QLabel#appNameLabel {
-    font-weight: bold; 
-    font-size: 10pt; /* Ridotto */
-    color: #E6EDF3;
-    margin-bottom: 5px; /* Più spazio sotto nome app */
-}
-#credentialBox QLabel#credFirstNameLabel, 
-#credentialBox QLabel#credLastNameLabel, 
-#credentialBox QLabel#credEmailLabel {
-    color: #C9D1D9;
-    font-size: 9pt;
-}
-#credentialBox QLabel#usernameLabel {
-    color: #8B949E; 
-    font-size: 9pt; /* Ridotto */
-    margin-top: 3px; /* Spazio sopra username */
-}
-
-/* Statistiche Dashboard */
-QLabel#statTitleLabel { font-size: 11pt; font-weight: bold; color: #C9D1D9; margin-bottom: 4px;}
-QLabel#statValueLabel { font-size: 20pt; font-weight: bold; color: #58A6FF; padding-top: 2px; }
-QLabel#statDescLabel { color: #8B949E; font-size: 9pt; padding-top: 8px; }
-
-/* Quick Dialog Specific */
-QuickCredentialDialog {
-    /* Esempio: bordo più evidente? */
-    /* border: 1px solid #58A6FF; */
-}
-
-"""
-# --- End Stylesheet --- 
 
 class MainWindow(QMainWindow):
     """
@@ -482,9 +60,6 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("PsW - Password Manager")
         self.setGeometry(100, 100, 1200, 700)
         
-        # Apply the global stylesheet
-        self.setStyleSheet(MODERN_STYLESHEET)
-        
         # Setup dell'interfaccia
         self.setup_ui()
         self.setup_menu()
@@ -492,8 +67,18 @@ class MainWindow(QMainWindow):
         
         # Connect to the hotkey signal
         signal_emitter.hotkey_pressed.connect(self.handle_hotkey_press)
+        # Modifiche arrivate da altri dispositivi (emesso dal thread di sync, consegnato nel thread UI)
+        sync_signal_emitter.remote_changes_applied.connect(self.handle_remote_changes)
         
         self.quick_dialog_instance = None # Keep track of the dialog instance
+        self._first_paint_done = False
+        # Pre-costruisce il dialogo di accesso rapido appena il loop eventi è libero
+        QTimer.singleShot(0, self._ensure_quick_dialog)
+        # Compattazione periodica del change log (le voci già elaborate o troppo vecchie)
+        self._change_log_timer = QTimer(self)
+        self._change_log_timer.setInterval(CHANGE_LOG_COMPACT_INTERVAL_SECONDS * 1000)
+        self._change_log_timer.timeout.connect(self.credential_manager.db_manager.compact_change_log)
+        self._change_log_timer.start()
         
     def setup_ui(self):
         """Configura l'interfaccia principale con Sidebar + StackedWidget + Animazione."""
@@ -567,28 +152,26 @@ class MainWindow(QMainWindow):
         self.stack_fade_animation.setEasingCurve(QEasingCurve.InOutQuad) # Curva morbida
         # --- Fine Setup Animazione --- 
 
-        # --- Popola lo Stack Widget (come prima) ---
-        # Dashboard
-        self.dashboard = DashboardWidget(self.profile_manager, self.credential_manager)
-        self.stack.addWidget(self.dashboard)
-        
-        # Profili
-        self.profiles = ProfileWidget(self.profile_manager, self.credential_manager)
-        self.stack.addWidget(self.profiles)
-        
-        # Impostazioni
-        self.settings = SettingsDialog(self)
-        self.stack.addWidget(self.settings)
+        # --- Popola lo Stack Widget ---
+        # Le sezioni vengono costruite al primo show_section: all'avvio serve solo la dashboard,
+        # che mostra dei segnaposto finché le statistiche non sono calcolate (dopo il primo paint)
+        self.dashboard: Optional[DashboardWidget] = None
+        self.profiles: Optional[ProfileWidget] = None
+        self.settings: Optional[SettingsDialog] = None
         
         # Imposta la sezione iniziale (Dashboard)
-        self.stack.setCurrentWidget(self.dashboard)
+        self.stack.setCurrentWidget(self._section_widget("dashboard"))
         
         # --- CORRECT SIGNAL CONNECTIONS --- 
         # Connect signals using .connect() instead of assignment
         # Collego segnali custom per aggiornare la dashboard
         if hasattr(self.profile_manager, 'profile_changed') and self.profile_manager.profile_changed:
             self.profile_manager.profile_changed.connect(self.update_dashboard)
-            print("[MainWindow] Connected profile_manager.profile_changed to update_dashboard.")
+            # Incremental profile changes carry the profile ID, not needed by the dashboard
+            self.profile_manager.profile_added.connect(lambda _profile_id: self.update_dashboard())
+            self.profile_manager.profile_updated.connect(lambda _profile_id: self.update_dashboard())
+            self.profile_manager.profile_removed.connect(lambda _profile_id: self.update_dashboard())
+            print("[MainWindow] Connected profile_manager signals to update_dashboard.")
         else:
              print("[MainWindow] WARNING: profile_manager has no profile_changed signal.")
              
@@ -622,20 +205,7 @@ class MainWindow(QMainWindow):
     def setup_toolbar(self):
         """Configura la barra degli strumenti."""
         toolbar = QToolBar()
-        toolbar.setStyleSheet("""
-            QToolBar {
-                background-color: #2b2b2b;
-                border: none;
-            }
-            QToolButton {
-                background-color: transparent;
-                border: none;
-                padding: 6px;
-            }
-            QToolButton:hover {
-                background-color: #3c3c3c;
-            }
-        """)
+        toolbar.setObjectName("mainToolBar")
         self.addToolBar(toolbar)
         
         # Pulsante Sincronizza
@@ -650,10 +220,7 @@ class MainWindow(QMainWindow):
         Args:
             section: Nome della sezione da mostrare ("dashboard", "profiles", "settings")
         """
-        newWidget = None
-        if section == "dashboard": newWidget = self.dashboard
-        elif section == "profiles": newWidget = self.profiles
-        elif section == "settings": newWidget = self.settings
+        newWidget = self._section_widget(section)
 
         # Esegui solo se il widget è diverso e valido
         if newWidget and self.stack.currentWidget() != newWidget:
@@ -674,6 +241,27 @@ class MainWindow(QMainWindow):
             self.stack_fade_animation.setEndValue(0.0)
             self.stack_fade_animation.start()
             
+    def _section_widget(self, section: str) -> Optional[QWidget]:
+        """Restituisce il widget della sezione, costruendolo (e aggiungendolo allo stack) al primo uso."""
+        if section == "dashboard":
+            if self.dashboard is None:
+                self.dashboard = DashboardWidget(self.profile_manager, self.credential_manager)
+                self.stack.addWidget(self.dashboard)
+            return self.dashboard
+        if section == "profiles":
+            if self.profiles is None:
+                start = time.perf_counter()
+                self.profiles = ProfileWidget(self.profile_manager, self.credential_manager)
+                self.stack.addWidget(self.profiles)
+                print(f"[MainWindow] Built profiles section in {(time.perf_counter() - start) * 1000:.1f} ms.")
+            return self.profiles
+        if section == "settings":
+            if self.settings is None:
+                self.settings = SettingsDialog(self)
+                self.stack.addWidget(self.settings)
+            return self.settings
+        return None
+
     def _on_fade_out_finished(self):
         """Slot chiamato al termine dell'animazione di fade-out."""
         # Disconnetti subito per evitare chiamate multiple durante fade-in
@@ -691,10 +279,21 @@ class MainWindow(QMainWindow):
             self.stack_fade_animation.start()
             
     def sync_data(self):
-        """Sincronizza i dati con Google Drive."""
+        """Sincronizza i dati con lo storage configurato (Google Drive o cartella di rete)."""
         if self.sync_manager.sync_enabled:
-            # Implementa la logica di sincronizzazione
-            pass
+            # Autenticazione e cartella nel thread UI (possono aprire il browser e scrivono le impostazioni),
+            # lo scambio delle modifiche in background
+            if self.sync_manager.uses_google_drive():
+                if not self.sync_manager.drive_service and not self.sync_manager.authenticate_google_drive():
+                    QMessageBox.warning(self, "Sincronizzazione", "Autenticazione con Google Drive non riuscita.")
+                    return
+                if not self.sync_manager.ensure_drive_folder_exists():
+                    QMessageBox.warning(self, "Sincronizzazione", "Impossibile accedere alla cartella su Google Drive.")
+                    return
+            elif self.sync_manager.get_storage_backend() is None:
+                QMessageBox.warning(self, "Sincronizzazione", "Cartella di sincronizzazione non disponibile.")
+                return
+            threading.Thread(target=self.sync_manager.sync_now, name="ManualSync", daemon=True).start()
         else:
             QMessageBox.information(
                 self,
@@ -713,19 +312,34 @@ class MainWindow(QMainWindow):
             "Proteggi le tue credenziali con crittografia AES-256."
         )
         
+    @Slot(int)
+    def handle_remote_changes(self, count: int):
+        """Ricarica i dati dopo che la sincronizzazione ha applicato modifiche di altri dispositivi."""
+        print(f"[MainWindow] Sync applied {count} remote changes. Reloading profiles and credentials...")
+        self.credential_manager.clear_cache()
+        self.credential_manager.context_matcher.load()
+        self.credential_manager.backfill_password_fingerprints()
+        self.profile_manager.load_profiles() # Emette profile_changed: profili e dashboard si aggiornano
+
     def update_dashboard(self):
-        """Aggiorna le statistiche della dashboard."""
-        self.dashboard.update_stats() 
+        """Aggiorna le statistiche della dashboard (ricalcolo asincrono, raggruppando le modifiche ravvicinate)."""
+        if self.dashboard is not None and self._first_paint_done:
+            self.dashboard.schedule_update()
 
     # --- Hotkey Handler Slot --- 
+    def _ensure_quick_dialog(self) -> QuickCredentialDialog:
+        """Crea il dialogo di accesso rapido una sola volta e lo tiene nascosto per i riusi."""
+        if self.quick_dialog_instance is None:
+            self.quick_dialog_instance = QuickCredentialDialog(self.profile_manager, self.credential_manager, self)
+            self.quick_dialog_instance.winId() # Crea subito la finestra nativa: il primo show è più rapido
+            self.credential_manager.context_matcher.ensure_loaded() # Indice contesto pronto per il primo hotkey
+        return self.quick_dialog_instance
+
     @Slot(str, str)
     def handle_hotkey_press(self, process_name, window_title):
+        received_at = time.perf_counter()
         print(f"---> MainWindow received hotkey signal: Proc='{process_name}', Title='{window_title}'")
-        
-        # Porta la finestra principale (dietro le quinte) in uno stato utilizzabile
-        self.showNormal() 
-        self.activateWindow() 
-        # Non usare self.raise_() qui, vogliamo che il nuovo dialogo sia in cima
+        # La finestra principale resta dov'è: porta in primo piano solo il dialogo
 
         # Se il dialogo è già aperto, portalo solo in primo piano
         if self.quick_dialog_instance and self.quick_dialog_instance.isVisible():
@@ -734,25 +348,27 @@ class MainWindow(QMainWindow):
              print("QuickDialog already open, bringing to front.")
              return
 
-        # Crea e mostra il nuovo dialogo di accesso rapido
-        # Passa i manager necessari
-        self.quick_dialog_instance = QuickCredentialDialog(self.profile_manager, self.credential_manager, self)
+        dialog = self._ensure_quick_dialog()
         
         # Prova a posizionare il dialogo vicino al cursore o al centro dello schermo
         cursor_pos = QCursor.pos()
-        dialog_geom = self.quick_dialog_instance.geometry()
+        dialog_geom = dialog.geometry()
         # TODO: Aggiustare posizione per assicurarsi che sia sullo schermo
-        self.quick_dialog_instance.move(cursor_pos.x() - dialog_geom.width() // 2, cursor_pos.y() - dialog_geom.height() // 2)
-        
-        # Mostra il dialogo
-        # Usare exec() lo rende modale all'applicazione, show() no.
-        # Dato che è frameless e gestiamo la chiusura, show() è ok.
-        self.quick_dialog_instance.show()
-        self.quick_dialog_instance.activateWindow() # Assicura focus iniziale
-
-        # Rimuovere il QMessageBox di debug
-        # QMessageBox.information(self, "Hotkey Premuto", 
-        #                         f"Rilevata app: {process_name}\nTitolo: {window_title}\n\n(Logica di ricerca e pop-up da implementare)")
+        dialog.move(cursor_pos.x() - dialog_geom.width() // 2, cursor_pos.y() - dialog_geom.height() // 2)
+        
+        # Mostra il dialogo (non modale: è frameless e gestiamo la chiusura)
+        dialog.show_for_hotkey(received_at, process_name, window_title) # Preseleziona in base alla finestra attiva
+
+    def paintEvent(self, event):
+        """Registra il primo paint della finestra per il report dei tempi di avvio."""
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            timing.mark("first paint")
+            QTimer.singleShot(0, timing.report)
+            # Statistiche della dashboard solo a finestra già visibile e interattiva
+            if self.dashboard is not None:
+                QTimer.singleShot(0, self.dashboard.update_stats)
 
     def closeEvent(self, event):
         """Gestisce l'evento di chiusura della finestra."""
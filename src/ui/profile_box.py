@@ -7,7 +7,7 @@ from PySide6.QtWidgets import (
     QFrame, QPushButton, QStyle, QApplication, QCheckBox, QGridLayout, QSizePolicy,
     QGraphicsOpacityEffect, QGraphicsDropShadowEffect
 )
-from PySide6.QtCore import Qt, Signal, QEvent, Property, QPoint, QPropertyAnimation, QEasingCurve
+from PySide6.QtCore import Qt, Signal, QEvent, Property, QPoint, QPropertyAnimation, QEasingCurve, QAbstractAnimation
 from PySide6.QtGui import QMouseEvent, QIcon, QFont, QCursor, QColor, QPalette
 from ..core.profile_manager import Profile
 from ..core.credential import Credential
@@ -54,10 +54,10 @@ class ProfileBox(QFrame):
         top_row_layout.addWidget(self.select_checkbox, 0, Qt.AlignTop)
         
         # Colonna nome profilo 
-        name_label = QLabel(self.profile.name)
-        name_label.setObjectName("profileNameLabel")
-        name_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
-        top_row_layout.addWidget(name_label, 1)
+        self.name_label = QLabel()
+        self.name_label.setObjectName("profileNameLabel")
+        self.name_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        top_row_layout.addWidget(self.name_label, 1)
 
         # Pulsante di modifica (a destra del nome)
         edit_btn = QPushButton()
@@ -72,7 +72,6 @@ class ProfileBox(QFrame):
         edit_btn.setIcon(icon)
         edit_btn.setFixedSize(22, 22)
         edit_btn.setToolTip("Modifica Profilo")
-        edit_btn.setStyleSheet("QPushButton#editProfileBtn { background: transparent; border: none; padding: 0;} QPushButton#editProfileBtn:hover { background: #444; border-radius: 3px; }")
         edit_btn.clicked.connect(lambda: self.edit_profile.emit(self.profile))
         top_row_layout.addWidget(edit_btn, 0, Qt.AlignTop)
         
@@ -89,45 +88,76 @@ class ProfileBox(QFrame):
         # Email
         email_label = QLabel("Email:")
         email_label.setObjectName("infoLabel")
-        email_value = QLabel(self.profile.email or "-")
-        email_value.setObjectName("infoValue")
-        email_value.setToolTip(self.profile.email or "")
+        self.email_value = QLabel()
+        self.email_value.setObjectName("infoValue")
         info_layout.addWidget(email_label, 0, 0)
-        info_layout.addWidget(email_value, 0, 1)
+        info_layout.addWidget(self.email_value, 0, 1)
 
         # Username
         username_label = QLabel("Username:")
         username_label.setObjectName("infoLabel")
-        username_value = QLabel(self.profile.username or "-")
-        username_value.setObjectName("infoValue")
-        username_value.setToolTip(self.profile.username or "")
+        self.username_value = QLabel()
+        self.username_value.setObjectName("infoValue")
         info_layout.addWidget(username_label, 1, 0)
-        info_layout.addWidget(username_value, 1, 1)
+        info_layout.addWidget(self.username_value, 1, 1)
         
         # Telefono
         phone_label = QLabel("Tel:")
         phone_label.setObjectName("infoLabel")
-        phone_value = QLabel(self.profile.phone or "-")
-        phone_value.setObjectName("infoValue")
-        phone_value.setToolTip(self.profile.phone or "")
+        self.phone_value = QLabel()
+        self.phone_value.setObjectName("infoValue")
         info_layout.addWidget(phone_label, 0, 2)
-        info_layout.addWidget(phone_value, 0, 3)
+        info_layout.addWidget(self.phone_value, 0, 3)
 
         # Via (Indirizzo)
         address_label = QLabel("Via:")
         address_label.setObjectName("infoLabel")
-        address_text = self.profile.address[:20] + "..." if self.profile.address and len(self.profile.address) > 20 else (self.profile.address or "-")
-        address_value = QLabel(address_text)
-        address_value.setObjectName("infoValue")
-        address_value.setToolTip(self.profile.address or "")
+        self.address_value = QLabel()
+        self.address_value.setObjectName("infoValue")
         info_layout.addWidget(address_label, 1, 2)
-        info_layout.addWidget(address_value, 1, 3)
+        info_layout.addWidget(self.address_value, 1, 3)
 
         layout.addWidget(info_container)
+        self._update_labels()
         
         # Ensure the main frame respects the size policy of the layout
         self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Maximum)
         
+    def _update_labels(self):
+        """Scrive i dati del profilo corrente nelle label (senza ricreare i widget)."""
+        profile = self.profile
+        self.name_label.setText(profile.name)
+        self.email_value.setText(profile.email or "-")
+        self.email_value.setToolTip(profile.email or "")
+        self.username_value.setText(profile.username or "-")
+        self.username_value.setToolTip(profile.username or "")
+        self.phone_value.setText(profile.phone or "-")
+        self.phone_value.setToolTip(profile.phone or "")
+        address_text = profile.address[:20] + "..." if profile.address and len(profile.address) > 20 else (profile.address or "-")
+        self.address_value.setText(address_text)
+        self.address_value.setToolTip(profile.address or "")
+
+    def set_profile(self, profile: Profile):
+        """
+        Aggiorna il box con un profilo, riusando i widget esistenti. Se il box viene
+        ricollegato a un altro profilo (pool della griglia) lo stato visivo torna quello iniziale.
+        """
+        rebound = profile.id != self.profile.id
+        self.profile = profile
+        self._update_labels()
+        if rebound:
+            self._reset_visual_state()
+
+    def _reset_visual_state(self):
+        """Azzera hover, selezione e spunta lasciati dal profilo mostrato in precedenza (solo se diversi: chiamato a ogni scroll)."""
+        target = self._hover_color if self.underMouse() else self._base_color
+        if self._current_bg_color != target or self.bg_color_animation.state() == QAbstractAnimation.Running:
+            self.bg_color_animation.stop()
+            self._set_background_color(target)
+        self.set_checked(False)
+        if self.property("selected"):
+            self.set_selected(False)
+        
     def setup_background_animation(self):
         """Configura l'animazione per il colore di sfondo."""
         self.bg_color_animation = QPropertyAnimation(self, b"_backgroundColor", self)
@@ -190,4 +220,11 @@ class ProfileBox(QFrame):
         self.setProperty("selected", selected)
         self.style().unpolish(self)
         self.style().polish(self)
-        self.update() 
\ No newline at end of file
+        self.update()
+
+    def set_checked(self, checked: bool):
+        """Imposta la spunta della checkbox senza emettere selected_changed (box riciclati dalla griglia)."""
+        if self.select_checkbox.isChecked() != checked:
+            self.select_checkbox.blockSignals(True)
+            self.select_checkbox.setChecked(checked)
+            self.select_checkbox.blockSignals(False)
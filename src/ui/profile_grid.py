@@ -0,0 +1,181 @@
+"""
+Griglia di profili virtualizzata: crea ProfileBox solo per le righe visibili
+e li riusa (ricollegandoli a un altro profilo) durante lo scroll e gli aggiornamenti.
+"""
+
+import time
+from typing import List, Optional, Set
+
+from PySide6.QtWidgets import QScrollArea, QWidget, QFrame
+from PySide6.QtCore import Qt, Signal, QTimer
+
+from ..core.profile_manager import Profile
+from ..core.credential import Credential
+from .profile_box import ProfileBox
+
+PROFILE_GRID_COLUMNS = 3 # Number of columns in the profile grid
+GRID_SPACING = 15 # Spacing between grid items
+GRID_MARGIN = 16
+BUFFER_ROWS = 2 # Righe extra sopra/sotto il viewport, per uno scroll senza buchi
+
+
+class ProfileGrid(QScrollArea):
+    """
+    Griglia a colonne fisse di ProfileBox con altezza di riga uniforme.
+
+    I box sono posizionati a mano nel contenitore (nessun layout): la griglia ne
+    tiene solo quanti servono a coprire il viewport e li riassegna ai profili
+    quando si scorre o quando la lista cambia. Lo stato di selezione (checkbox)
+    è conservato per ID profilo, non nel widget.
+    """
+
+    # Segnali dei ProfileBox, inoltrati
+    double_clicked = Signal(Profile)
+    add_credential = Signal(Profile)
+    delete_credential = Signal(Credential)
+    edit_profile = Signal(Profile)
+    selected_changed = Signal(Profile, bool)
+
+    def __init__(self, columns: int = PROFILE_GRID_COLUMNS, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self._profiles: List[Profile] = []
+        self._selected_ids: Set[int] = set()
+        self._boxes: List[ProfileBox] = [] # Pool di box (visibili o nascosti)
+        self._row_height = 0 # Misurata sul primo box creato
+        self._visible_start = -1 # Primo indice profilo attualmente assegnato ai box
+        self.last_refresh_ms = 0.0 # Durata dell'ultimo refresh completo (set_profiles)
+
+        self.setWidgetResizable(True)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setFrameShape(QFrame.NoFrame)
+        self.container = QWidget()
+        self.setWidget(self.container)
+        self.verticalScrollBar().valueChanged.connect(lambda _value: self._update_visible_boxes())
+
+    # --- API ---
+    def set_profiles(self, profiles: List[Profile]):
+        """Sostituisce tutti i profili (refresh completo, riusando i box esistenti)."""
+        start = time.perf_counter()
+        self._profiles = list(profiles)
+        present_ids = {profile.id for profile in self._profiles}
+        self._selected_ids &= present_ids
+        self._relayout(force=True)
+        self.last_refresh_ms = (time.perf_counter() - start) * 1000.0
+
+    def insert_profile(self, index: int, profile: Profile):
+        """Inserisce un profilo: vengono riassegnati solo i box visibili dalla posizione `index` in poi."""
+        index = max(0, min(index, len(self._profiles)))
+        self._profiles.insert(index, profile)
+        self._relayout(force=True, from_index=index)
+
+    def update_profile(self, old_index: int, new_index: int, profile: Profile):
+        """Aggiorna un profilo, spostandolo se l'ordinamento è cambiato."""
+        del self._profiles[old_index]
+        new_index = max(0, min(new_index, len(self._profiles)))
+        self._profiles.insert(new_index, profile)
+        self._relayout(force=True, from_index=min(old_index, new_index))
+
+    def remove_profile(self, index: int):
+        """Rimuove un profilo e compatta la griglia."""
+        profile = self._profiles.pop(index)
+        self._selected_ids.discard(profile.id)
+        self._relayout(force=True, from_index=index)
+
+    def index_of(self, profile_id) -> Optional[int]:
+        for index, profile in enumerate(self._profiles):
+            if profile.id == profile_id:
+                return index
+        return None
+
+    def profiles(self) -> List[Profile]:
+        return list(self._profiles)
+
+    def selected_profiles(self) -> List[Profile]:
+        """Profili spuntati (anche quelli non visibili al momento)."""
+        return [profile for profile in self._profiles if profile.id in self._selected_ids]
+
+    def box_count(self) -> int:
+        """Numero di ProfileBox effettivamente creati (per diagnostica)."""
+        return len(self._boxes)
+
+    # --- Geometria ---
+    def _measure_row_height(self):
+        if not self._row_height:
+            box = self._take_box(0)
+            self._row_height = box.sizeHint().height()
+
+    def _cell_width(self) -> int:
+        available = self.viewport().width() - 2 * GRID_MARGIN - GRID_SPACING * (self.columns - 1)
+        return max(1, available // self.columns)
+
+    def _row_pitch(self) -> int:
+        return self._row_height + GRID_SPACING
+
+    def _relayout(self, force: bool = False, from_index: int = 0):
+        if self._profiles:
+            self._measure_row_height()
+        rows = (len(self._profiles) + self.columns - 1) // self.columns
+        height = 2 * GRID_MARGIN + rows * self._row_pitch() - (GRID_SPACING if rows else 0)
+        self.container.setMinimumHeight(height)
+        self._update_visible_boxes(force=force, from_index=from_index)
+
+    def _take_box(self, slot: int) -> ProfileBox:
+        """Restituisce il box del pool per lo slot indicato, creandolo se serve."""
+        while len(self._boxes) <= slot:
+            box = ProfileBox(Profile(id=-1, name=""), self.container)
+            box.double_clicked.connect(self.double_clicked.emit)
+            box.add_credential.connect(self.add_credential.emit)
+            box.delete_credential.connect(self.delete_credential.emit)
+            box.edit_profile.connect(self.edit_profile.emit)
+            box.selected_changed.connect(self._on_box_selected_changed)
+            box.hide()
+            self._boxes.append(box)
+        return self._boxes[slot]
+
+    def _update_visible_boxes(self, force: bool = False, from_index: int = 0):
+        """Assegna i box del pool ai profili delle righe visibili (più BUFFER_ROWS)."""
+        if not self._profiles:
+            for box in self._boxes:
+                box.hide()
+            self._visible_start = -1
+            return
+        pitch = self._row_pitch()
+        scroll_y = self.verticalScrollBar().value()
+        first_row = max(0, (scroll_y - GRID_MARGIN) // pitch - BUFFER_ROWS)
+        last_row = (scroll_y + self.viewport().height() - GRID_MARGIN) // pitch + BUFFER_ROWS
+        start = first_row * self.columns
+        end = min(len(self._profiles), (last_row + 1) * self.columns)
+        if not force and start == self._visible_start and end - start <= len(self._boxes):
+            return # Stesse righe già assegnate
+
+        cell_width = self._cell_width()
+        for slot, index in enumerate(range(start, end)):
+            box = self._take_box(slot)
+            profile = self._profiles[index]
+            row, column = divmod(index, self.columns)
+            box.setGeometry(GRID_MARGIN + column * (cell_width + GRID_SPACING),
+                            GRID_MARGIN + row * pitch, cell_width, self._row_height)
+            # Ricollega i dati solo se il box mostrava un altro profilo o se la posizione è stata toccata dalla modifica
+            if box.profile is not profile or (force and index >= from_index):
+                box.set_profile(profile)
+                box.set_checked(profile.id in self._selected_ids)
+            if box.isHidden():
+                box.show()
+        for box in self._boxes[end - start:]:
+            if not box.isHidden():
+                box.hide()
+        self._visible_start = start
+
+    # --- Eventi ---
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Dopo il resize del viewport il contenitore ha la nuova larghezza
+        QTimer.singleShot(0, lambda: self._update_visible_boxes(force=True))
+
+    def _on_box_selected_changed(self, profile: Profile, selected: bool):
+        if selected:
+            self._selected_ids.add(profile.id)
+        else:
+            self._selected_ids.discard(profile.id)
+        self.selected_changed.emit(profile, selected)
@@ -280,7 +280,7 @@ class ProfileManager(QWidget):
         """Gestisce il doppio click su un profilo."""
         self.current_profile = profile
         self.credential_list.clear()
-        credentials = self.credential_manager.get_profile_credentials(profile)
+        credentials = self.credential_manager.get_profile_credentials(profile.id)
         for credential in credentials:
             self.credential_list.add_credential(credential)
         self.show_credentials()
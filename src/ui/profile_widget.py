@@ -14,8 +14,10 @@ from ..core.profile_manager import ProfileManager, Profile
 from ..core.credential_manager import CredentialManager, Credential
 from ..core.password_generator import generate_secure_password, MIN_PASSWORD_LENGTH, MAX_PASSWORD_LENGTH, DEFAULT_PASSWORD_LENGTH
 from .profile_box import ProfileBox
+from .profile_grid import ProfileGrid
 from .credential_list import CredentialList
 from datetime import datetime
+from typing import Optional
 import uuid
 
 class ProfileWidget(QWidget):
@@ -28,7 +30,6 @@ class ProfileWidget(QWidget):
         super().__init__()
         self.profile_manager = profile_manager
         self.credential_manager = credential_manager
-        self.profile_boxes = []
         self.current_profile = None
         self.current_credential = None
         self.editing_profile = None
@@ -36,24 +37,7 @@ class ProfileWidget(QWidget):
         self.setObjectName("profileWidgetContainer") # Name for the root widget if needed
         self.setup_ui()
         self.load_profiles()
-        
-        # --- Connect Signals for UI Update After Decryption/Changes --- 
-        try:
-             if hasattr(self.profile_manager, 'profile_changed') and self.profile_manager.profile_changed is not None:
-                 self.profile_manager.profile_changed.connect(self._on_profiles_updated)
-                 print("[ProfileWidget] Connected profile_changed signal.")
-             else:
-                  print("[ProfileWidget] WARNING: ProfileManager has no profile_changed signal or it is None.")
-            
-             # Assuming MainWindow sets the signal on CredentialManager like ProfileManager
-             if hasattr(self.credential_manager, 'credential_changed') and self.credential_manager.credential_changed is not None:
-                 self.credential_manager.credential_changed.connect(self._on_credentials_updated)
-                 print("[ProfileWidget] Connected credential_changed signal.")
-             else:
-                  print("[ProfileWidget] WARNING: CredentialManager has no credential_changed signal or it is None.")
-        except Exception as e:
-             print(f"[ProfileWidget] Error connecting signals: {e}")
-        # --- End Signal Connection ---
+        # Signals are connected in _connect_manager_signals() at the end of setup_ui()
         
     def setup_ui(self):
         """Configura l'interfaccia del widget."""
@@ -67,7 +51,6 @@ class ProfileWidget(QWidget):
         # Header
         self.header = QFrame()
         self.header.setObjectName("header")
-        self.header.setStyleSheet("background-color: #232323; border-bottom: 1px solid #333;")
         header_layout = QHBoxLayout(self.header)
         header_layout.setContentsMargins(16, 12, 16, 12)
         
@@ -79,7 +62,7 @@ class ProfileWidget(QWidget):
         
         # Titolo
         self.title_label = QLabel("Profili")
-        self.title_label.setStyleSheet("font-size: 20px; font-weight: bold;")
+        self.title_label.setObjectName("profilesTitleLabel")
         header_layout.addWidget(self.title_label)
         header_layout.addStretch()
         
@@ -113,19 +96,14 @@ class ProfileWidget(QWidget):
         profiles_layout.setContentsMargins(0, 0, 0, 0)
         
         # Lista profili (sinistra)
-        self.profiles_scroll_area = QScrollArea() # Use a scroll area
-        self.profiles_scroll_area.setWidgetResizable(True)
+        # Griglia virtualizzata: crea box solo per le righe visibili e li riusa
+        self.profiles_scroll_area = ProfileGrid()
         self.profiles_scroll_area.setObjectName("profilesScrollArea")
-        self.profiles_scroll_area.setStyleSheet("QScrollArea#profilesScrollArea { border: none; }")
-
-        self.profiles_list_container = QWidget() # Container for the grid
-        self.profiles_scroll_area.setWidget(self.profiles_list_container)
-        
-        # Use QGridLayout instead of QVBoxLayout
-        self.profiles_layout = QGridLayout(self.profiles_list_container)
-        self.profiles_layout.setSpacing(15) # Spacing between grid items
-        self.profiles_layout.setContentsMargins(16, 16, 16, 16)
-        # self.profiles_layout.addStretch() # Not typically used with grid like this
+        self.profiles_scroll_area.double_clicked.connect(self.on_profile_double_clicked)
+        self.profiles_scroll_area.add_credential.connect(self.show_new_credential_dialog)
+        self.profiles_scroll_area.delete_credential.connect(self.delete_credential)
+        self.profiles_scroll_area.edit_profile.connect(self.on_edit_profile)
+        self.profiles_scroll_area.selected_changed.connect(self.on_profile_selection_changed)
         
         # profiles_layout in the main view should contain the scroll area
         profiles_layout.addWidget(self.profiles_scroll_area, 1) # Add scroll area with stretch factor 1
@@ -254,7 +232,7 @@ class ProfileWidget(QWidget):
         self.username_copy_btn = QPushButton("📄")
         self.username_copy_btn.setObjectName("copyButton")
         self.username_copy_btn.setToolTip("Copia username")
-        self.username_copy_btn.clicked.connect(lambda: self.copy_to_clipboard(self.cred_username_edit.text()))
+        self.username_copy_btn.clicked.connect(lambda: self.copy_credential_field(self.cred_username_edit.text(), "copy_username"))
         detail_grid_layout.addWidget(cred_username_label, 4, 0)
         detail_grid_layout.addWidget(self.cred_username_edit, 4, 1)
         detail_grid_layout.addWidget(self.username_copy_btn, 4, 2)
@@ -282,7 +260,7 @@ class ProfileWidget(QWidget):
         self.password_copy_btn = QPushButton("📄")
         self.password_copy_btn.setObjectName("copyButton")
         self.password_copy_btn.setToolTip("Copia password")
-        self.password_copy_btn.clicked.connect(lambda: self.copy_to_clipboard(self.password_edit.text()))
+        self.password_copy_btn.clicked.connect(lambda: self.copy_credential_field(self.password_edit.text(), "copy_password"))
         password_hbox.addWidget(self.password_copy_btn) 
         
         password_edit_layout.addLayout(password_hbox)
@@ -366,7 +344,11 @@ class ProfileWidget(QWidget):
          try:
              if hasattr(self.profile_manager, 'profile_changed') and self.profile_manager.profile_changed is not None:
                  self.profile_manager.profile_changed.connect(self._on_profiles_updated)
-                 print("[ProfileWidget] Connected profile_changed signal.")
+                 # Fine-grained updates: only the affected ProfileBox is touched
+                 self.profile_manager.profile_added.connect(self._on_profile_added)
+                 self.profile_manager.profile_updated.connect(self._on_profile_updated)
+                 self.profile_manager.profile_removed.connect(self._on_profile_removed)
+                 print("[ProfileWidget] Connected profile signals.")
              else:
                   print("[ProfileWidget] WARNING: ProfileManager has no profile_changed signal or it is None.")
             
@@ -381,46 +363,19 @@ class ProfileWidget(QWidget):
         
     def load_profiles(self):
         """Carica i profili nella griglia, ensuring data is decrypted if possible."""
-        # Clear existing items from grid layout
-        while self.profiles_layout.count():
-            item = self.profiles_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        self.profile_boxes.clear()
-        
-        COLUMNS = 3 # Number of columns in the grid
-        row = 0
-        col = 0
-        
         # Get profiles - the manager handles decryption internally now
         profiles_to_display = self.profile_manager.get_all_profiles()
-        print(f"[ProfileWidget.load_profiles] Displaying {len(profiles_to_display)} profiles.")
-        
-        # Rimosso il check per is_encrypted_in_memory, non più presente
-        # if profiles_to_display and profiles_to_display[0].is_encrypted_in_memory:
-        #     print("[ProfileWidget.load_profiles] WARNING: Profiles are still encrypted...")
-             
-        # Add new profile boxes to the grid
-        for index, profile in enumerate(profiles_to_display):
-            box = ProfileBox(profile)
-            # Connect signals
-            box.double_clicked.connect(self.on_profile_double_clicked)
-            box.add_credential.connect(self.show_new_credential_dialog)
-            box.delete_credential.connect(self.delete_credential)
-            box.edit_profile.connect(self.on_edit_profile)
-            box.selected_changed.connect(self.on_profile_selection_changed)
-            
-            self.profiles_layout.addWidget(box, row, col) # Add to grid at row, col
-            self.profile_boxes.append(box)
-            
-            col += 1
-            if col >= COLUMNS:
-                col = 0
-                row += 1
-                
-        # Add vertical stretch at the bottom of the grid? Might not be needed
-        # self.profiles_layout.setRowStretch(row + 1, 1)
+        # La griglia riusa i box esistenti e ne crea solo per le righe visibili
+        self.profiles_scroll_area.set_profiles(profiles_to_display)
+        print(f"[ProfileWidget.load_profiles] Displaying {len(profiles_to_display)} profiles "
+              f"(grid refresh {self.profiles_scroll_area.last_refresh_ms:.1f} ms, "
+              f"{self.profiles_scroll_area.box_count()} boxes).")
+
+    def _manager_index(self, profile_id: int) -> Optional[int]:
+        for index, profile in enumerate(self.profile_manager.profiles):
+            if profile.id == profile_id:
+                return index
+        return None
 
     def show_new_profile_dialog(self):
         """Mostra il dialog per creare un nuovo profilo."""
@@ -438,8 +393,8 @@ class ProfileWidget(QWidget):
                 created_at=datetime.now().isoformat(),
                 updated_at=datetime.now().isoformat()
             )
+            # The grid is updated by the profile_added signal
             self.profile_manager.add_profile(profile)
-            self.load_profiles()
             
     def show_new_credential_dialog(self, profile: Profile):
         """Mostra il dialog per creare una nuova credenziale."""
@@ -497,6 +452,7 @@ class ProfileWidget(QWidget):
             
         # Crea il container per la sidebar sinistra
         sidebar_container = QWidget()
+        sidebar_container.setObjectName("credentialSidebar") # Stile dei pulsanti Nuova/Elimina in style.py
         sidebar_layout = QVBoxLayout(sidebar_container)
         sidebar_layout.setContentsMargins(8, 8, 8, 8)
         sidebar_layout.setSpacing(8)
@@ -508,40 +464,12 @@ class ProfileWidget(QWidget):
         # Pulsante nuova credenziale
         new_cred_btn = QPushButton("Nuova")
         new_cred_btn.setObjectName("newBtn")
-        new_cred_btn.setStyleSheet("""
-            QPushButton#newBtn {
-                background-color: #0d6efd;
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 4px;
-                font-size: 12px;
-                min-width: 80px;
-            }
-            QPushButton#newBtn:hover {
-                background-color: #0b5ed7;
-            }
-        """)
         new_cred_btn.clicked.connect(lambda: self.show_new_credential_dialog(profile))
         buttons_layout.addWidget(new_cred_btn)
         
         # Pulsante elimina selezionate
         delete_btn = QPushButton("Elimina")
         delete_btn.setObjectName("deleteBtn")
-        delete_btn.setStyleSheet("""
-            QPushButton#deleteBtn {
-                background-color: #dc3545;
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 4px;
-                font-size: 12px;
-                min-width: 80px;
-            }
-            QPushButton#deleteBtn:hover {
-                background-color: #bb2d3b;
-            }
-        """)
         delete_btn.clicked.connect(lambda: self.delete_selected_credentials())
         buttons_layout.addWidget(delete_btn)
         
@@ -560,12 +488,11 @@ class ProfileWidget(QWidget):
             # print(f"    DEBUG Cred {i}: ID={cred.id}, App='{cred.app_name}', User='{cred.username[:5]}...', Pwd='{cred.password[:5]}...', EncryptedInMemory={cred.is_encrypted_in_memory}")
         # --- END DEBUG --- 
         
-        # Aggiungi le credenziali del profilo
+        # Aggiungi le credenziali del profilo (un solo reset del modello)
         if not credentials_to_display:
              print("[ProfileWidget.show_credentials] No credentials found to display.")
         else:
-             for credential in credentials_to_display:
-                 self.credential_list.add_credential(credential)
+             self.credential_list.set_credentials(credentials_to_display)
             
         # Collega solo il segnale di selezione credenziale
         self.credential_list.credential_selected.connect(self.on_credential_selected)
@@ -575,15 +502,15 @@ class ProfileWidget(QWidget):
         
         # Aggiungi il container alla sidebar
         self.credentials_splitter.insertWidget(0, sidebar_container)
-        self.selected_credential_box = None
         self.stack.setCurrentWidget(self.credentials_widget)
         
         # Explicitly populate the credential detail if one was selected previously (might be needed after refresh)
-        if self.credential_list and self.selected_credential_box:
+        selected_credential = self.credential_list.selected_credential() if self.credential_list else None
+        if selected_credential:
              # Find the credential object again in the new list
-             selected_cred_id = self.selected_credential_box.credential.id
+             selected_cred_id = selected_credential.id
              found_cred = None
-             for cred in self.credential_manager.get_profile_credentials(profile):
+             for cred in credentials_to_display:
                   if cred.id == selected_cred_id:
                        found_cred = cred
                        break
@@ -625,13 +552,7 @@ class ProfileWidget(QWidget):
         
     def on_credential_selected(self, credential: Credential):
         """Mostra i dettagli della credenziale selezionata con animazione."""
-        # Deseleziona le altre
-        for box in getattr(self, 'credential_boxes', []):
-            if box.credential == credential:
-                box.set_selected(True)
-                self.selected_credential_box = box
-            else:
-                box.set_selected(False)
+        # La selezione nella lista è gestita dalla vista (CredentialList)
         self.current_credential = credential
         
         # Popola i campi PRIMA di mostrare/animare
@@ -767,7 +688,7 @@ class ProfileWidget(QWidget):
     def delete_selected_profile(self):
         """Elimina i profili selezionati."""
         # Ottieni i profili selezionati
-        selected_profiles = [box.profile for box in self.profile_boxes if box.is_selected()]
+        selected_profiles = self.profiles_scroll_area.selected_profiles()
         
         if not selected_profiles:
             QMessageBox.warning(self, "Nessun profilo selezionato", 
@@ -786,16 +707,15 @@ class ProfileWidget(QWidget):
         if reply == QMessageBox.Yes:
             for profile in selected_profiles:
                 # Elimina tutte le credenziali associate al profilo
-                credentials = self.credential_manager.get_profile_credentials(profile)
+                credentials = self.credential_manager.get_profile_credentials(profile.id)
                 for credential in credentials:
                     self.credential_manager.delete_credential(credential)
                 
                 # Elimina il profilo
                 self.profile_manager.delete_profile(profile.id)
             
-            # Aggiorna l'interfaccia
+            # Aggiorna l'interfaccia (i box sono rimossi dal segnale profile_removed)
             self.current_profile = None
-            self.load_profiles()
             self.show_profiles()
             
             QMessageBox.information(self, "Eliminazione completata", 
@@ -814,6 +734,12 @@ class ProfileWidget(QWidget):
         clipboard = QApplication.clipboard()
         clipboard.setText(value)
 
+    def copy_credential_field(self, value, event: str):
+        """Copia username/password della credenziale aperta e ne registra l'uso (ranking frecency)."""
+        self.copy_to_clipboard(value)
+        if self.current_credential and value:
+            self.credential_manager.record_usage(self.current_credential, event)
+
     # --- New methods for password generation in edit mode ---
     def toggle_edit_password_visibility(self, checked):
         """Toggles the echo mode of the main password field in edit view."""
@@ -864,6 +790,37 @@ class ProfileWidget(QWidget):
         # If self.current_profile:
         #    self.on_profile_selection_changed(self.current_profile, True) # Re-trigger display
         
+    @Slot(int)
+    def _on_profile_added(self, profile_id: int):
+        """Inserisce solo il nuovo profilo: la griglia riassegna i box visibili successivi."""
+        index = self._manager_index(profile_id)
+        if index is None:
+            return
+        self.profiles_scroll_area.insert_profile(index, self.profile_manager.profiles[index])
+
+    @Slot(int)
+    def _on_profile_updated(self, profile_id: int):
+        """Aggiorna in place il profilo modificato (riposizionandolo se cambia l'ordinamento)."""
+        grid_index = self.profiles_scroll_area.index_of(profile_id)
+        new_index = self._manager_index(profile_id)
+        if grid_index is None or new_index is None:
+            self.load_profiles()
+            return
+        profile = self.profile_manager.profiles[new_index]
+        self.profiles_scroll_area.update_profile(grid_index, new_index, profile)
+        if self.current_profile is not None and self.current_profile.id == profile_id:
+            self.current_profile = profile
+
+    @Slot(int)
+    def _on_profile_removed(self, profile_id: int):
+        """Rimuove solo il profilo eliminato e compatta la griglia."""
+        index = self.profiles_scroll_area.index_of(profile_id)
+        if index is None:
+            return
+        self.profiles_scroll_area.remove_profile(index)
+        if self.current_profile is not None and self.current_profile.id == profile_id:
+            self.current_profile = None
+
     @Slot()
     def _on_credentials_updated(self):
         """Slot called when credentials potentially change (add, delete, decrypt)."""
@@ -5,17 +5,22 @@
 Dialogo per l'inserimento rapido delle credenziali.
 """
 import sys
+import time
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, 
     QComboBox, QCompleter, QMessageBox, QScrollArea, QWidget, QSizePolicy,
-    QFrame, QListWidget, QListWidgetItem, QApplication
+    QFrame, QListView, QApplication
 )
 from PySide6.QtGui import QIcon, QAction, QFont, Qt
-from PySide6.QtCore import Qt as QtCoreQt, Signal
+from PySide6.QtCore import Qt as QtCoreQt, Signal, QTimer, QModelIndex
 import os
 
 from ..core.profile_manager import ProfileManager, Profile
 from ..core.credential_manager import CredentialManager, Credential
+from .credential_model import CredentialListModel, CredentialFilterProxyModel, CredentialRole
+
+FILTER_DEBOUNCE_MS = 80 # Attesa dopo l'ultimo tasto prima di applicare il filtro
+SHOW_LATENCY_TARGET_MS = 50.0 # Obiettivo hotkey -> dialogo visibile
 
 class QuickCredentialDialog(QDialog):
     """Dialog per ricerca e copia rapida credenziali."""
@@ -25,6 +30,10 @@ class QuickCredentialDialog(QDialog):
         self.profile_manager = profile_manager
         self.credential_manager = credential_manager
         self.current_profile_credentials = []
+        self._selected_credential = None
+        # Cache per il calcolo incrementale dell'altezza
+        self._row_height = 0
+        self._last_height = None
 
         self.setWindowTitle("Accesso Rapido Credenziali")
         self.setWindowFlags(Qt.WindowType.Dialog | Qt.WindowType.FramelessWindowHint | Qt.WindowType.NoDropShadowWindowHint | Qt.WindowType.WindowStaysOnTopHint) # Finestra senza bordi, sempre in cima
@@ -36,93 +45,21 @@ class QuickCredentialDialog(QDialog):
 
         self._offset = None # Per trascinare la finestra
 
+        # Il dialogo viene creato una volta e riusato: i dati si ricaricano solo se cambiati
+        self._data_dirty = False
+        self._show_requested_at = None # perf_counter() alla ricezione dell'hotkey
+        self.last_show_latency_ms = None
+        # Finestra attiva al momento dell'hotkey e punteggi delle credenziali associate
+        self._context = (None, None)
+        self._context_scores = {}
+
         self.setup_ui()
         self.load_profiles()
+        self._connect_data_signals()
 
     def setup_ui(self):
         """Configura l'interfaccia."""
-        # Stile specifico per questo dialogo (angoli arrotondati, sfondo, etc)
-        # Potrebbe sovrascrivere/integrare lo stile globale
-        self.setStyleSheet("""
-            #quickCredentialDialog {
-                background-color: rgba(40, 42, 45, 0.92); /* Sfondo scuro semi-trasparente */
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                border-radius: 12px;
-            }
-            QLabel {
-                color: #e0e0e0;
-                background-color: transparent;
-                font-size: 10pt;
-            }
-            QComboBox {
-                padding: 6px 10px;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                border-radius: 4px;
-                background-color: rgba(50, 52, 55, 0.9);
-                color: #e0e0e0;
-                min-height: 2em; /* Altezza minima */
-            }
-            QComboBox::drop-down {
-                border: none;
-            }
-            QComboBox::down-arrow {
-                image: url(icons/down_arrow.png); /* Sostituire con icona valida */
-                width: 12px;
-                height: 12px;
-                padding-right: 10px;
-            }
-            QComboBox QAbstractItemView { /* Stile menu dropdown */
-                background-color: #25272a;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                selection-background-color: #0d6efd;
-                color: #e0e0e0;
-                padding: 4px;
-            }
-            QLineEdit#searchLineEdit {
-                padding: 7px 10px;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-                border-radius: 4px;
-                background-color: rgba(30, 31, 32, 0.9);
-                color: #e0e0e0;
-            }
-            QListWidget {
-                border: 1px solid rgba(255, 255, 255, 0.15);
-                background-color: rgba(30, 31, 32, 0.85);
-                border-radius: 4px;
-                padding: 5px;
-                outline: 0;
-            }
-            QListWidget::item {
-                padding: 6px 8px;
-                color: #ccc;
-                border-radius: 3px;
-                margin: 1px 0;
-            }
-            QListWidget::item:hover {
-                background-color: rgba(70, 72, 75, 0.9);
-                color: #fff;
-            }
-            QListWidget::item:selected {
-                background-color: rgba(13, 110, 253, 0.7);
-                color: white;
-                border: none;
-            }
-             QPushButton#copyUsernameBtn, QPushButton#copyPasswordBtn {
-                 background-color: #565e64; /* Grigio */
-                 color: white;
-                 border: 1px solid rgba(255, 255, 255, 0.1);
-                 padding: 6px 10px;
-                 border-radius: 4px;
-                 font-size: 9pt;
-                 min-width: 100px;
-             }
-             QPushButton#copyUsernameBtn:hover, QPushButton#copyPasswordBtn:hover {
-                 background-color: #495057;
-             }
-             QLabel#detailAppNameLabel { font-weight: bold; font-size: 11pt; color: #f0f0f0; }
-             QLabel#detailUsernameLabel { color: #bbb; font-size: 10pt; }
-        """)
-
+        # Lo stile del dialogo (#quickCredentialDialog ...) è nel foglio di stile dell'applicazione (style.py)
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(15, 10, 15, 15) # Margini interni
         self.main_layout.setSpacing(10)
@@ -132,10 +69,10 @@ class QuickCredentialDialog(QDialog):
         header_layout = QHBoxLayout(header_widget)
         header_layout.setContentsMargins(0, 0, 0, 0)
         title_label = QLabel("Accesso Rapido PsW")
-        title_label.setStyleSheet("color: #aaa; font-size: 8pt;") # Titolo piccolo
+        title_label.setObjectName("quickTitleLabel") # Titolo piccolo
         close_button = QPushButton("X") # Pulsante chiusura
         close_button.setFixedSize(20, 20)
-        close_button.setStyleSheet("QPushButton { color: #aaa; background-color: transparent; border: none; font-size: 12pt; font-weight: bold; } QPushButton:hover { color: red; }")
+        close_button.setObjectName("quickCloseButton")
         close_button.clicked.connect(self.reject) # Chiude il dialogo
         header_layout.addWidget(title_label)
         header_layout.addStretch()
@@ -156,17 +93,27 @@ class QuickCredentialDialog(QDialog):
         self.search_edit = QLineEdit()
         self.search_edit.setObjectName("searchLineEdit")
         self.search_edit.setPlaceholderText("Cerca credenziale (App/User)...")
-        self.search_edit.textChanged.connect(self.filter_credentials)
+        # Debounce: il filtro parte solo quando l'utente smette di digitare per FILTER_DEBOUNCE_MS
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self._filter_timer.timeout.connect(lambda: self.filter_credentials(self.search_edit.text()))
+        self.search_edit.textChanged.connect(self._filter_timer.start)
         self.search_edit.setVisible(False) # Nascondi finché profilo non selezionato
         self.main_layout.addWidget(self.search_edit)
 
-        # Lista Credenziali
-        self.credential_list_widget = QListWidget()
-        self.credential_list_widget.setVisible(False) # Nascondi finché profilo non selezionato
-        self.credential_list_widget.currentItemChanged.connect(self.on_credential_item_selected)
-        self.credential_list_widget.setMinimumHeight(100) # Altezza minima lista
-        self.credential_list_widget.setMaximumHeight(250) # Altezza massima lista
-        self.main_layout.addWidget(self.credential_list_widget)
+        # Lista Credenziali (model/view: il filtro non ricrea item)
+        self.credential_model = CredentialListModel(self)
+        self.filter_model = CredentialFilterProxyModel(self)
+        self.filter_model.setSourceModel(self.credential_model)
+        self.credential_list_view = QListView()
+        self.credential_list_view.setModel(self.filter_model)
+        self.credential_list_view.setUniformItemSizes(True) # Evita di misurare ogni riga
+        self.credential_list_view.setVisible(False) # Nascondi finché profilo non selezionato
+        self.credential_list_view.selectionModel().currentChanged.connect(self.on_credential_index_selected)
+        self.credential_list_view.setMinimumHeight(100) # Altezza minima lista
+        self.credential_list_view.setMaximumHeight(250) # Altezza massima lista
+        self.main_layout.addWidget(self.credential_list_view)
 
         # Dettaglio/Azioni Credenziale Selezionata
         self.detail_widget = QWidget()
@@ -196,6 +143,100 @@ class QuickCredentialDialog(QDialog):
         self.setFixedSize(380, 100) # Dimensione iniziale minima, si espanderà
         self.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Maximum)
 
+    # --- Riuso del dialogo ---
+
+    def _connect_data_signals(self):
+        """Segna i dati come obsoleti quando profili o credenziali cambiano."""
+        for signal_name in ("profile_changed", "profile_added", "profile_updated", "profile_removed"):
+            signal = getattr(self.profile_manager, signal_name, None)
+            if signal is not None:
+                signal.connect(self.mark_data_dirty)
+        credential_changed = getattr(self.credential_manager, "credential_changed", None)
+        if credential_changed is not None:
+            credential_changed.connect(self.mark_data_dirty)
+
+    def mark_data_dirty(self, *args):
+        """Slot: i profili verranno ricaricati alla prossima apertura (non subito)."""
+        self._data_dirty = True
+
+    def reset_state(self):
+        """Riporta il dialogo allo stato iniziale (nessun profilo, ricerca vuota)."""
+        self._filter_timer.stop()
+        self._offset = None
+        self._context = (None, None)
+        self._context_scores = {}
+        if self.profile_combo.currentIndex() != 0:
+            self.profile_combo.setCurrentIndex(0) # on_profile_selected svuota lista e ricerca
+        else:
+            self._selected_credential = None
+            self.detail_widget.setVisible(False)
+            self.adjust_dialog_height()
+
+    def show_for_hotkey(self, requested_at=None, process_name=None, window_title=None):
+        """
+        Mostra il dialogo (già costruito) in risposta all'hotkey.
+
+        Args:
+            requested_at: time.perf_counter() alla ricezione del segnale, per misurare la latenza.
+            process_name: Processo in primo piano, per preselezionare le credenziali associate.
+            window_title: Titolo della finestra in primo piano.
+        """
+        self._show_requested_at = requested_at
+        if self._data_dirty:
+            self._data_dirty = False
+            self.load_profiles() # Torna anche al placeholder
+        self.apply_context(process_name, window_title)
+        self.show()
+        self.raise_()
+        self.activateWindow() # Assicura focus iniziale
+        self.profile_combo.setFocus()
+
+    def apply_context(self, process_name, window_title):
+        """Seleziona il profilo della credenziale più probabile per la finestra attiva e la mette in cima."""
+        self._context = (process_name, window_title)
+        self._context_scores = {}
+        if not process_name and not window_title:
+            return
+        profile_rows = {}
+        for row in range(self.profile_combo.count()):
+            profile = self.profile_combo.itemData(row)
+            if profile is not None:
+                profile_rows[profile.id] = row
+        start = time.perf_counter()
+        matches = self.credential_manager.match_context(process_name, window_title, list(profile_rows))
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        if not matches:
+            print(f"[QuickCredentialDialog] No context match for '{process_name}' ({elapsed_ms:.3f} ms).")
+            return
+        best_profile_id = matches[0].profile_id
+        # Solo le credenziali del profilo preselezionato vengono mostrate
+        self._context_scores = {m.credential_id: m.score for m in matches if m.profile_id == best_profile_id}
+        print(f"[QuickCredentialDialog] {len(matches)} context matches for '{process_name}' ({elapsed_ms:.3f} ms).")
+        if self.profile_combo.currentIndex() == profile_rows[best_profile_id]:
+            self.on_profile_selected(profile_rows[best_profile_id]) # Riordina anche se il profilo è già selezionato
+        else:
+            self.profile_combo.setCurrentIndex(profile_rows[best_profile_id])
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._show_requested_at is not None:
+            # Misura dopo che l'evento di show è stato elaborato dal loop eventi
+            QTimer.singleShot(0, self._report_show_latency)
+
+    def _report_show_latency(self):
+        if self._show_requested_at is None:
+            return
+        self.last_show_latency_ms = (time.perf_counter() - self._show_requested_at) * 1000.0
+        self._show_requested_at = None
+        status = "OK" if self.last_show_latency_ms <= SHOW_LATENCY_TARGET_MS else f"over {SHOW_LATENCY_TARGET_MS:.0f} ms target"
+        print(f"[QuickCredentialDialog] Hotkey-to-visible latency: {self.last_show_latency_ms:.1f} ms ({status})")
+
+    def hideEvent(self, event):
+        # Reset a dialogo nascosto: il lavoro non pesa sulla prossima apertura
+        # e nessuna credenziale resta selezionata tra un uso e l'altro
+        super().hideEvent(event)
+        self.reset_state()
+
     # --- Funzioni Logiche --- 
 
     def load_profiles(self):
@@ -208,44 +249,50 @@ class QuickCredentialDialog(QDialog):
     def on_profile_selected(self, index):
         """Chiamato quando un profilo viene selezionato."""
         selected_profile = self.profile_combo.itemData(index)
-        self.credential_list_widget.clear()
         self.detail_widget.setVisible(False)
-        self.search_edit.clear()
         self._selected_credential = None # Resetta credenziale selezionata
 
         if selected_profile:
-            self.current_profile_credentials = self.credential_manager.get_profile_credentials(selected_profile)
+            self.current_profile_credentials = self.credential_manager.get_profile_credentials(selected_profile.id)
             self.search_edit.setVisible(True)
-            self.credential_list_widget.setVisible(True)
-            self.filter_credentials("") # Mostra tutte le credenziali del profilo
-            self.adjust_dialog_height() # Adatta altezza
+            self.credential_list_view.setVisible(True)
         else:
             self.current_profile_credentials = []
             self.search_edit.setVisible(False)
-            self.credential_list_widget.setVisible(False)
-            self.setFixedHeight(100) # Torna ad altezza minima
+            self.credential_list_view.setVisible(False)
+
+        # Più usate di recente in cima, poi (ordinamento stabile) quelle associate alla finestra attiva
+        self.current_profile_credentials = self.credential_manager.rank_by_usage(self.current_profile_credentials)
+        if self._context_scores:
+            scores = self._context_scores
+            self.current_profile_credentials.sort(key=lambda cred: -scores.get(cred.id, 0.0))
+        self.credential_model.set_credentials(self.current_profile_credentials)
+        self._row_height = 0 # Ricalcolata sul nuovo contenuto
+        # Svuota la ricerca senza attendere il debounce
+        self.search_edit.blockSignals(True)
+        self.search_edit.clear()
+        self.search_edit.blockSignals(False)
+        self._filter_timer.stop()
+        self.filter_credentials("") # Mostra tutte le credenziali del profilo
+        if self._context_scores and self.current_profile_credentials \
+                and self.current_profile_credentials[0].id in self._context_scores:
+            # Preseleziona la più probabile: basta copiarla, senza digitare
+            self.credential_list_view.setCurrentIndex(self.filter_model.index(0, 0))
 
     def filter_credentials(self, text):
-        """Filtra la lista delle credenziali in base al testo di ricerca."""
-        self.credential_list_widget.clear()
-        self.detail_widget.setVisible(False)
-        self._selected_credential = None
-        search_term = text.lower()
-
-        for credential in self.current_profile_credentials:
-            app_name_lower = credential.app_name.lower()
-            username_lower = credential.username.lower()
-            if search_term in app_name_lower or search_term in username_lower:
-                item_text = f"{credential.app_name}  ({credential.username})"
-                list_item = QListWidgetItem(item_text)
-                list_item.setData(Qt.ItemDataRole.UserRole, credential) # Associa oggetto Credential
-                self.credential_list_widget.addItem(list_item)
+        """Filtra la lista delle credenziali in base al testo di ricerca (nessun item ricreato)."""
+        self.filter_model.set_search_text(text)
+        if self._selected_credential is not None and not self.credential_list_view.currentIndex().isValid():
+            # La credenziale selezionata è stata esclusa dal filtro
+            self._selected_credential = None
+            self.detail_widget.setVisible(False)
         self.adjust_dialog_height()
 
-    def on_credential_item_selected(self, current_item, previous_item):
+    def on_credential_index_selected(self, current: QModelIndex, previous: QModelIndex):
         """Chiamato quando una credenziale è selezionata nella lista."""
-        if current_item:
-            self._selected_credential = current_item.data(Qt.ItemDataRole.UserRole)
+        credential = current.data(CredentialRole) if current.isValid() else None
+        if credential:
+            self._selected_credential = credential
             self.detail_app_name_label.setText(self._selected_credential.app_name)
             self.detail_username_label.setText(f"Username: {self._selected_credential.username}")
             self.detail_widget.setVisible(True)
@@ -259,6 +306,8 @@ class QuickCredentialDialog(QDialog):
         if hasattr(self, '_selected_credential') and self._selected_credential:
             clipboard = QApplication.clipboard()
             clipboard.setText(self._selected_credential.username)
+            self.credential_manager.record_usage(self._selected_credential, "copy_username")
+            self._record_context_use()
             # self.flash_button(self.copy_username_button)
             # print(f"Username '{self._selected_credential.username}' copiato!")
             self.close_after_copy()
@@ -273,12 +322,20 @@ class QuickCredentialDialog(QDialog):
             if password_decrypted:
                 clipboard = QApplication.clipboard()
                 clipboard.setText(password_decrypted)
+                self.credential_manager.record_usage(self._selected_credential, "copy_password")
+                self._record_context_use()
                 # self.flash_button(self.copy_password_button)
                 # print("Password copiata!")
                 self.close_after_copy()
             else:
                 print("Errore: impossibile decriptare la password per la copia.")
 
+    def _record_context_use(self):
+        """Insegna all'indice che la credenziale copiata appartiene alla finestra attiva."""
+        process_name, window_title = self._context
+        if self._selected_credential and (process_name or window_title):
+            self.credential_manager.record_context_use(self._selected_credential, process_name, window_title)
+
     def close_after_copy(self):
         """Chiude il dialogo dopo un breve ritardo."""
         # Potrebbe essere utile dare un feedback visivo prima di chiudere
@@ -286,31 +343,36 @@ class QuickCredentialDialog(QDialog):
         self.accept() # Chiude immediatamente per ora
 
     def adjust_dialog_height(self):
-        """Adatta l'altezza del dialogo al contenuto."""
-        # Calcola l'altezza necessaria basata sui widget visibili
-        base_height = self.main_layout.contentsMargins().top() + \
-                      self.main_layout.contentsMargins().bottom() + \
-                      self.main_layout.spacing() * (self.main_layout.count() -1) + \
-                      self.main_layout.itemAt(0).widget().sizeHint().height() # Header
-        
-        height = base_height + self.profile_combo.sizeHint().height()
-        
-        if self.search_edit.isVisible():
+        """Adatta l'altezza del dialogo al contenuto (resize solo se l'altezza cambia davvero)."""
+        if self.credential_list_view.isHidden() and self.search_edit.isHidden():
+            height = 100 # Altezza minima (nessun profilo selezionato)
+        else:
+            # Calcola l'altezza necessaria basata sui widget visibili
+            height = self.main_layout.contentsMargins().top() + \
+                     self.main_layout.contentsMargins().bottom() + \
+                     self.main_layout.spacing() * (self.main_layout.count() -1) + \
+                     self.main_layout.itemAt(0).widget().sizeHint().height() # Header
+            height += self.profile_combo.sizeHint().height()
             height += self.search_edit.sizeHint().height() + self.main_layout.spacing()
-        
-        if self.credential_list_widget.isVisible():
-            # Calcola altezza lista basata sugli item, ma limitata
-            list_content_height = self.credential_list_widget.sizeHintForRow(0) * self.credential_list_widget.count() + 10 # Aggiunge padding
-            list_height = min(max(list_content_height, 50), self.credential_list_widget.maximumHeight()) # Min 50, max 250
+
+            # Altezza lista: righe uniformi, quindi basta misurarne una per contenuto
+            row_count = self.filter_model.rowCount()
+            if not self._row_height and row_count:
+                self._row_height = self.credential_list_view.sizeHintForRow(0)
+            list_content_height = self._row_height * row_count + 10 # Aggiunge padding
+            list_height = min(max(list_content_height, 50), self.credential_list_view.maximumHeight()) # Min 50, max 250
             height += list_height + self.main_layout.spacing()
-            
-        if self.detail_widget.isVisible():
-            height += self.detail_widget.sizeHint().height() + self.main_layout.spacing()
-            
-        # Aggiungi un po' di padding extra in basso
-        height += 10 
-            
-        self.setFixedHeight(int(height))
+
+            if not self.detail_widget.isHidden(): # isHidden: valido anche prima che il dialog sia mostrato
+                height += self.detail_widget.sizeHint().height() + self.main_layout.spacing()
+
+            # Aggiungi un po' di padding extra in basso
+            height += 10
+
+        height = int(height)
+        if height != self._last_height:
+            self._last_height = height
+            self.setFixedHeight(height)
 
     # --- Gestione Finestra Frameless --- 
     def mousePressEventHeader(self, event):
@@ -361,8 +423,12 @@ if __name__ == '__main__':
             '2': [Credential(id='c3', profile_id='2', app_name='Steam', username='gamer', password='pwd-steam'),
                   Credential(id='c4', profile_id='2', app_name='Google', username='me@gmail', password='pwd-google-pers')]
         }
-        def get_profile_credentials(self, profile):
-            return self.creds.get(profile.id, [])
+        def get_profile_credentials(self, profile_id):
+            return self.creds.get(profile_id, [])
+        def rank_by_usage(self, credentials):
+            return list(credentials)
+        def record_usage(self, credential, event):
+            pass
         # def decrypt_password(self, encrypted_pass):
         #     return encrypted_pass # Dummy decryption
 
@@ -4,10 +4,12 @@ Dialog per la registrazione della password master.
 
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QMessageBox, QApplication
+    QPushButton, QMessageBox, QApplication, QProgressBar
 )
 from PySide6.QtCore import Qt, Signal, QTimer
 from PySide6.QtGui import QClipboard, QFont
+from ..core.password_strength import estimate_strength
+from .style import set_style_property
 
 class RegistrationDialog(QDialog):
     """Dialog per la registrazione della password master."""
@@ -20,7 +22,7 @@ class RegistrationDialog(QDialog):
         self.setModal(True)
         self.setObjectName("RegistrationDialog")
         self.setProperty("class", "glassPane")
-        self.setFixedSize(400, 300)
+        self.setFixedSize(400, 360)
         self.setup_ui()
         
     def setup_ui(self):
@@ -37,15 +39,28 @@ class RegistrationDialog(QDialog):
             "La password verrà copiata automaticamente negli appunti."
         )
         warning_label.setWordWrap(True)
-        warning_label.setStyleSheet("color: #ff4444; font-weight: bold;")
+        warning_label.setObjectName("registrationWarningLabel")
         layout.addWidget(warning_label)
         
         # Campo password
         self.password_edit = QLineEdit()
         self.password_edit.setPlaceholderText("Inserisci la password master")
         self.password_edit.setEchoMode(QLineEdit.Password)
+        self.password_edit.textChanged.connect(self.update_strength_meter)
         layout.addWidget(self.password_edit)
         
+        # Misuratore di robustezza (aggiornato mentre si digita)
+        self.strength_bar = QProgressBar()
+        self.strength_bar.setRange(0, 5)
+        self.strength_bar.setValue(0)
+        self.strength_bar.setTextVisible(False)
+        self.strength_bar.setFixedHeight(8)
+        layout.addWidget(self.strength_bar)
+        
+        self.strength_label = QLabel("")
+        self.strength_label.setWordWrap(True)
+        layout.addWidget(self.strength_label)
+        
         # Campo conferma password
         self.confirm_edit = QLineEdit()
         self.confirm_edit.setPlaceholderText("Conferma la password master")
@@ -57,40 +72,34 @@ class RegistrationDialog(QDialog):
         buttons_layout.setSpacing(10)
         
         self.register_button = QPushButton("Registra")
-        self.register_button.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                padding: 8px;
-                border: none;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
+        self.register_button.setObjectName("registerButton")
         self.register_button.clicked.connect(self.on_register)
         buttons_layout.addWidget(self.register_button)
         
         self.cancel_button = QPushButton("Annulla")
-        self.cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #f44336;
-                color: white;
-                padding: 8px;
-                border: none;
-                border-radius: 4px;
-            }
-            QPushButton:hover {
-                background-color: #da190b;
-            }
-        """)
+        self.cancel_button.setObjectName("cancelButton")
         self.cancel_button.clicked.connect(self.reject)
         buttons_layout.addWidget(self.cancel_button)
         
         layout.addLayout(buttons_layout)
         self.setLayout(layout)
         
+    def update_strength_meter(self, password: str):
+        """Aggiorna barra ed etichetta di robustezza per la password digitata."""
+        if not password:
+            self.strength_bar.setValue(0)
+            self.strength_label.setText("")
+            return
+        result = estimate_strength(password)
+        self.strength_bar.setValue(result.score + 1)
+        # Colore per punteggio definito nel QSS ([strength="0"] ... [strength="4"])
+        set_style_property(self.strength_bar, "strength", str(result.score))
+        text = f"{result.label} - tempo stimato per forzarla: {result.crack_time_display}"
+        if result.feedback:
+            text += f"\n{result.feedback[0]}"
+        self.strength_label.setText(text)
+        set_style_property(self.strength_label, "strength", str(result.score))
+        
     def on_register(self):
         """Gestisce il click sul pulsante di registrazione."""
         password = self.password_edit.text()
@@ -1,21 +1,25 @@
 """
-Finestra di impostazioni per la gestione della sincronizzazione con Google Drive.
+Finestra di impostazioni per la gestione della sincronizzazione (Google Drive o cartella locale/di rete).
 """
 
+import os
+
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QCheckBox, QFormLayout, QLineEdit,
-    QMessageBox, QSpacerItem, QSizePolicy, QToolButton, QApplication, QStyle
+    QMessageBox, QSpacerItem, QSizePolicy, QToolButton, QApplication, QStyle,
+    QComboBox, QFileDialog
 )
 from PySide6.QtCore import Qt, Signal, QObject, QEvent
 from PySide6.QtGui import QFont, QKeyEvent, QKeySequence, QIcon
 from typing import Optional # Needed for type hint
 
-from ..utils.sync_manager import SyncManager
+from ..utils.sync_manager import SyncManager, preload_google_api, SYNC_BACKEND_DRIVE, SYNC_BACKEND_LOCAL
 # Import Profile Manager to call password methods
 from ..core.profile_manager import ProfileManager
 # Import Master Password Dialog for verification step during change/remove
 from .master_password_dialog import MasterPasswordDialog
+from .style import set_style_property
 
 # Import hotkey_listener to call update function
 from ..core import hotkey_listener
@@ -120,6 +124,7 @@ class SettingsDialog(QDialog):
         self.setProperty("class", "glassPane") 
         
         self.sync_manager = SyncManager()
+        preload_google_api() # La sezione sync può servire a breve: carica lo stack Google in background
         # Store pending hotkey state derived from UI
         self.pending_modifiers = 0 
         self.pending_vk_code = 0   
@@ -228,13 +233,28 @@ class SettingsDialog(QDialog):
         sync_form_layout.setRowWrapPolicy(QFormLayout.WrapLongRows)
         sync_form_layout.setLabelAlignment(Qt.AlignRight)
 
-        sync_title_label = QLabel("Sincronizzazione Google Drive")
+        sync_title_label = QLabel("Sincronizzazione")
         sync_title_label.setFont(QFont("Arial", 12, QFont.Bold))
         sync_group_layout.addWidget(sync_title_label)
 
         self.sync_enabled = QCheckBox("Abilita sincronizzazione")
         self.sync_enabled.stateChanged.connect(self.on_sync_toggled)
         sync_form_layout.addRow(self.sync_enabled)
+
+        # Storage: Google Drive oppure una cartella locale o di rete (es. condivisione NAS)
+        self.sync_backend_combo = QComboBox()
+        self.sync_backend_combo.addItem("Google Drive", SYNC_BACKEND_DRIVE)
+        self.sync_backend_combo.addItem("Cartella locale o di rete (NAS)", SYNC_BACKEND_LOCAL)
+        sync_form_layout.addRow("Storage:", self.sync_backend_combo)
+
+        sync_path_layout = QHBoxLayout()
+        self.sync_local_path = QLineEdit()
+        self.sync_local_path.setPlaceholderText("Es. \\\\nas\\psw o Z:\\psw")
+        sync_path_layout.addWidget(self.sync_local_path)
+        self.sync_local_path_btn = QPushButton("Sfoglia...")
+        self.sync_local_path_btn.clicked.connect(self.choose_sync_folder)
+        sync_path_layout.addWidget(self.sync_local_path_btn)
+        sync_form_layout.addRow("Cartella:", sync_path_layout)
         
         self.client_id = QLineEdit()
         sync_form_layout.addRow("Client ID:", self.client_id)
@@ -242,6 +262,7 @@ class SettingsDialog(QDialog):
         self.client_secret = QLineEdit()
         self.client_secret.setEchoMode(QLineEdit.Password) 
         sync_form_layout.addRow("Client Secret:", self.client_secret)
+        self.sync_backend_combo.currentIndexChanged.connect(self.on_sync_backend_changed)
 
         sync_group_layout.addLayout(sync_form_layout)
         main_layout.addLayout(sync_group_layout)
@@ -414,30 +435,29 @@ class SettingsDialog(QDialog):
         self.pending_vk_code = vk_code
 
         status_msg = ""
-        style_sheet = "" 
+        hotkey_state = "" # Property "hotkeyState" del campo tasto (colore definito nel QSS)
         is_valid = False
         has_conflict = False
 
         if force_invalid: # e.g., unmapped key entered
             is_valid = False
             status_msg = "<font color='red'>Tasto non valido o non supportato.</font>"
-            style_sheet = "background-color: #FFCCCC;" # Style only the key input?
-            self.main_key_input.setStyleSheet(style_sheet)
+            set_style_property(self.main_key_input, "hotkeyState", "invalid") # Style only the key input
         elif vk_code == 0: # No main key set
             is_valid = True # Valid state: no hotkey
             status_msg = "<font color='grey'>Nessun hotkey impostato (seleziona i modificatori e premi un tasto nel campo 'Tasto').</font>"
-            self.main_key_input.setStyleSheet("") # Clear style
+            set_style_property(self.main_key_input, "hotkeyState", "") # Clear style
         else:
             # Valid main key exists, check conflict
             has_conflict = self.check_hotkey_conflict(modifiers, vk_code)
             is_valid = not has_conflict
             if is_valid:
                 status_msg = "<font color='green'>Hotkey valido.</font>"
-                style_sheet = "background-color: #CCFFCC;" # Greenish background for key input
+                hotkey_state = "valid" # Greenish background for key input
             else:
                 status_msg = "<font color='red'>Conflitto rilevato! Hotkey già in uso.</font>"
-                style_sheet = "background-color: #FFCCCC;" # Red background for key input
-            self.main_key_input.setStyleSheet(style_sheet)
+                hotkey_state = "invalid" # Red background for key input
+            set_style_property(self.main_key_input, "hotkeyState", hotkey_state)
 
         self.current_hotkey_valid = is_valid
         self.hotkey_status_label.setText(status_msg)
@@ -451,6 +471,10 @@ class SettingsDialog(QDialog):
         # Use the new getter method for client secret
         retrieved_secret = self.sync_manager.get_client_secret() 
         self.client_secret.setText(retrieved_secret if retrieved_secret else "")
+        backend_index = self.sync_backend_combo.findData(self.sync_manager.sync_backend)
+        self.sync_backend_combo.setCurrentIndex(max(backend_index, 0))
+        self.sync_local_path.setText(self.sync_manager.sync_local_path or "")
+        self.on_sync_backend_changed()
 
         # Load Hotkey settings
         if PYWIN32_AVAILABLE:
@@ -547,6 +571,12 @@ class SettingsDialog(QDialog):
         
     def save_settings(self):
         """Salva le impostazioni."""
+        sync_backend = self.sync_backend_combo.currentData()
+        sync_local_path = self.sync_local_path.text().strip()
+        if sync_backend == SYNC_BACKEND_LOCAL and not os.path.isdir(sync_local_path):
+            QMessageBox.warning(self, "Cartella di sincronizzazione",
+                                "Seleziona una cartella esistente (locale o condivisione di rete) per la sincronizzazione.")
+            return
 
         # --- Save Hotkey ---
         if PYWIN32_AVAILABLE:
@@ -595,6 +625,8 @@ class SettingsDialog(QDialog):
         self.sync_manager.sync_enabled = self.sync_enabled.isChecked()
         self.sync_manager.client_id = self.client_id.text()
         self.sync_manager.client_secret = self.client_secret.text()
+        self.sync_manager.sync_backend = sync_backend
+        self.sync_manager.sync_local_path = sync_local_path
         
         try:
             # Save Drive credentials (if changed - handled internally by SyncManager)
@@ -673,6 +705,20 @@ class SettingsDialog(QDialog):
     def on_sync_toggled(self, state):
         pass # Placeholder
 
+    def on_sync_backend_changed(self, index: int = -1):
+        """Abilita i campi dello storage selezionato: cartella per quello locale, credenziali OAuth per Drive."""
+        local = self.sync_backend_combo.currentData() == SYNC_BACKEND_LOCAL
+        self.sync_local_path.setEnabled(local)
+        self.sync_local_path_btn.setEnabled(local)
+        self.client_id.setEnabled(not local)
+        self.client_secret.setEnabled(not local)
+
+    def choose_sync_folder(self):
+        """Sceglie la cartella (locale o di rete) in cui salvare i file della sincronizzazione."""
+        folder = QFileDialog.getExistingDirectory(self, "Cartella di sincronizzazione", self.sync_local_path.text())
+        if folder:
+            self.sync_local_path.setText(os.path.normpath(folder))
+
     def update_hotkey_state(self, force_invalid=False):
         """Updates the pending state and UI based on current hotkey UI state."""
         if not PYWIN32_AVAILABLE:
@@ -688,30 +734,29 @@ class SettingsDialog(QDialog):
         self.pending_vk_code = vk_code
 
         status_msg = ""
-        style_sheet = "" 
+        hotkey_state = "" # Property "hotkeyState" del campo tasto (colore definito nel QSS)
         is_valid = False
         has_conflict = False
 
         if force_invalid: # e.g., unmapped key entered
             is_valid = False
             status_msg = "<font color='red'>Tasto non valido o non supportato.</font>"
-            style_sheet = "background-color: #FFCCCC;" # Style only the key input?
-            self.main_key_input.setStyleSheet(style_sheet)
+            set_style_property(self.main_key_input, "hotkeyState", "invalid") # Style only the key input
         elif vk_code == 0: # No main key set
             is_valid = True # Valid state: no hotkey
             status_msg = "<font color='grey'>Nessun hotkey impostato (seleziona i modificatori e premi un tasto nel campo 'Tasto').</font>"
-            self.main_key_input.setStyleSheet("") # Clear style
+            set_style_property(self.main_key_input, "hotkeyState", "") # Clear style
         else:
             # Valid main key exists, check conflict
             has_conflict = self.check_hotkey_conflict(modifiers, vk_code)
             is_valid = not has_conflict
             if is_valid:
                 status_msg = "<font color='green'>Hotkey valido.</font>"
-                style_sheet = "background-color: #CCFFCC;" # Greenish background for key input
+                hotkey_state = "valid" # Greenish background for key input
             else:
                 status_msg = "<font color='red'>Conflitto rilevato! Hotkey già in uso.</font>"
-                style_sheet = "background-color: #FFCCCC;" # Red background for key input
-            self.main_key_input.setStyleSheet(style_sheet)
+                hotkey_state = "invalid" # Red background for key input
+            set_style_property(self.main_key_input, "hotkeyState", hotkey_state)
 
         self.current_hotkey_valid = is_valid
         self.hotkey_status_label.setText(status_msg)
@@ -0,0 +1,608 @@
+"""
+Foglio di stile unico dell'applicazione.
+
+Tutto lo stile passa da qui ed è applicato una sola volta sulla QApplication:
+i widget si agganciano con objectName e property dinamiche invece di chiamare
+setStyleSheet per istanza (ogni chiamata obbliga Qt a riparsare il QSS e a
+ripolire il widget e i suoi figli).
+"""
+
+from PySide6.QtWidgets import QApplication, QWidget
+
+# --- Define the QSS Stylesheet --- 
+# Palette:
+# BG_BASE = "#161B22"
+# BG_SECONDARY = "#21262D"
+# BG_TERTIARY = "#30363D"
+# TEXT_PRIMARY = "#E6EDF3"
+# TEXT_SECONDARY = "#8B949E"
+# ACCENT_PRIMARY = "#58A6FF" # Blu brillante
+# ACCENT_HOVER = "#79C0FF"
+# ACCENT_PRESSED = "#388BFD"
+# BORDER_PRIMARY = "#30363D"
+# BORDER_SECONDARY = "rgba(139, 148, 158, 0.3)"
+# ERROR_COLOR = "#F85149"
+# SUCCESS_COLOR = "#3FB950"
+
+MODERN_STYLESHEET = """
+/* === Global Styles === */
+QWidget {
+    background-color: #161B22; /* BG_BASE */
+    color: #E6EDF3; /* TEXT_PRIMARY */
+    font-family: "Segoe UI", system-ui, sans-serif;
+    font-size: 10pt;
+    /* Disabilita outline di focus generico, lo gestiamo noi */
+    outline: 0;
+}
+
+/* === Layout & Containers === */
+QFrame {
+    background-color: transparent;
+    border: none;
+}
+
+QFrame#header {
+    background-color: #21262D; /* BG_SECONDARY */
+    border-bottom: 1px solid #30363D; /* BORDER_PRIMARY */
+    padding: 8px 15px; /* Aggiusta padding */
+}
+
+QScrollArea {
+    border: none;
+    background-color: transparent;
+}
+
+QSplitter::handle {
+    background-color: #30363D; 
+}
+QSplitter::handle:horizontal { width: 1px; }
+QSplitter::handle:vertical { height: 1px; }
+QSplitter::handle:hover { background-color: #58A6FF; }
+
+QGroupBox {
+    color: #E6EDF3;
+    font-size: 11pt;
+    font-weight: bold;
+    border: 1px solid #30363D;
+    border-radius: 8px; /* Aumenta radius */
+    margin-top: 12px; /* Aumenta margine */
+    padding: 25px 15px 15px 15px; /* Aumenta padding top */
+    background-color: #21262D;
+}
+QGroupBox::title {
+    subcontrol-origin: margin;
+    subcontrol-position: top left;
+    left: 15px; /* Sposta titolo */
+    padding: 0 8px; /* Aumenta padding titolo */
+    background-color: #161B22;
+    color: #79C0FF; /* ACCENT_HOVER (più leggibile?) */
+    font-size: 10pt;
+    font-weight: bold;
+}
+
+/* === Sidebar === */
+QFrame#sidebarFrame {
+    background-color: #0D1117; /* Più scuro per staccare */
+    border-right: 1px solid #30363D;
+    min-width: 200px; /* Leggermente più larga */
+    max-width: 200px;
+}
+
+#sidebarFrame QToolButton {
+    background-color: transparent;
+    border: none; 
+    color: #C9D1D9; /* TEXT_SECONDARY chiaro */
+    padding: 10px 20px; /* Padding uniforme */
+    text-align: left;
+    border-radius: 6px; 
+    font-size: 10pt; 
+    font-weight: 500;
+    /* Imposta dimensione icona esplicita */
+    qproperty-iconSize: 20px 20px; /* O usa QSize(20, 20) nel codice */
+    margin: 2px 5px; /* Margine tra bottoni */
+}
+
+#sidebarFrame QToolButton:hover {
+    background-color: #21262D;
+    color: #E6EDF3;
+}
+
+#sidebarFrame QToolButton:checked {
+    background-color: rgba(88, 166, 255, 0.1); /* Sfondo accento più tenue */
+    color: #79C0FF; /* Testo Accento */
+    font-weight: bold;
+    /* Indicatore selezione a sinistra */
+    border-left: 3px solid #58A6FF; 
+    padding-left: 17px; /* Compensa per il bordo aggiunto */
+}
+
+/* === Toolbar === */
+QToolBar#mainToolBar {
+    background-color: #2b2b2b;
+    border: none;
+}
+QToolBar#mainToolBar QToolButton {
+    background-color: transparent;
+    border: none;
+    padding: 6px;
+}
+QToolBar#mainToolBar QToolButton:hover {
+    background-color: #3c3c3c;
+}
+
+/* === Text & Labels === */
+QLabel {
+    background-color: transparent; 
+    padding: 2px;
+    color: #C9D1D9; 
+}
+QLabel#titleLabel { 
+    font-size: 16pt;
+    font-weight: 600; 
+    padding: 10px 15px;
+    color: #E6EDF3; 
+}
+QLabel#headerLabel { 
+    font-size: 12pt;
+    font-weight: bold;
+    color: #E6EDF3;
+    padding-bottom: 8px; /* Aumenta spazio sotto */
+    border-bottom: 1px solid #30363D;
+    margin-bottom: 12px; /* Aumenta margine sotto */
+}
+
+/* === Input Fields === */
+QLineEdit, QTextEdit, QSpinBox {
+    background-color: #0D1117;
+    color: #E6EDF3;
+    border: 1px solid #30363D;
+    border-radius: 6px;
+    padding: 9px 12px; /* Aumenta padding */
+    font-size: 10pt;
+}
+
+QLineEdit:focus, QTextEdit:focus, QSpinBox:focus {
+    border: 1px solid #58A6FF;
+    background-color: #161B22;
+}
+
+QLineEdit:disabled, QTextEdit:disabled, QSpinBox:disabled {
+    background-color: #21262D;
+    color: #8B949E;
+    border-color: #30363D;
+}
+
+QTextEdit { 
+    min-height: 70px; /* Leggermente più alto */
+}
+
+/* === Buttons === */
+QPushButton {
+    background-color: #21262D;
+    color: #79C0FF; /* Colore accento più brillante */
+    border: 1px solid #30363D;
+    padding: 9px 18px; /* Padding leggermente aumentato */
+    border-radius: 6px;
+    font-size: 10pt;
+    font-weight: 500;
+    min-width: 90px; /* Leggermente più largo */
+    outline: none; 
+}
+QPushButton:hover {
+    background-color: #30363D;
+    border-color: #8B949E;
+    color: #E6EDF3; /* Testo primario su hover */
+}
+QPushButton:pressed {
+    background-color: #388BFD;
+    color: #FFFFFF;
+    border-color: #58A6FF;
+}
+QPushButton:disabled {
+    background-color: rgba(33, 38, 45, 0.7);
+    color: #8B949E;
+    border-color: rgba(48, 54, 61, 0.5);
+}
+
+/* Pulsante Primario (es. Salva, OK, Conferma) */
+QPushButton#primaryButton,
+QPushButton[primary="true"],
+QPushButton#saveButton, 
+QPushButton#confirmButton,
+QPushButton#confirmNewPasswordBtn,
+QPushButton#okButton {
+    background-color: #238636; /* Verde GitHub più scuro */
+    color: #FFFFFF;
+    border-color: rgba(46, 160, 67, 0.7);
+    font-weight: bold;
+}
+QPushButton#primaryButton:hover,
+QPushButton[primary="true"]:hover,
+QPushButton#saveButton:hover, 
+QPushButton#confirmButton:hover,
+QPushButton#confirmNewPasswordBtn:hover,
+QPushButton#okButton:hover {
+    background-color: #2EA043;
+    border-color: #238636;
+}
+QPushButton#primaryButton:pressed,
+QPushButton[primary="true"]:pressed,
+QPushButton#saveButton:pressed, 
+QPushButton#confirmButton:pressed,
+QPushButton#confirmNewPasswordBtn:pressed,
+QPushButton#okButton:pressed {
+    background-color: #238636;
+}
+
+/* Pulsante Eliminazione */
+QPushButton#deleteButton, QPushButton#deleteBtn {
+    background-color: transparent;
+    color: #DA3633; /* Rosso GitHub */
+    border: 1px solid rgba(218, 54, 51, 0.7);
+}
+QPushButton#deleteButton:hover, QPushButton#deleteBtn:hover {
+    background-color: rgba(218, 54, 51, 0.1);
+    color: #F85149;
+    border-color: #F85149;
+}
+QPushButton#deleteButton:pressed, QPushButton#deleteBtn:pressed {
+    background-color: rgba(218, 54, 51, 0.2);
+    color: #FFFFFF;
+}
+
+/* Pulsante Annulla/Indietro */
+QPushButton#cancelButton, QPushButton#backBtn {
+    background-color: #30363D; /* Sfondo leggermente più visibile */
+    color: #C9D1D9;
+    border: 1px solid #30363D;
+}
+QPushButton#cancelButton:hover, QPushButton#backBtn:hover {
+    background-color: #484F58;
+    color: #E6EDF3;
+    border-color: #8B949E;
+}
+QPushButton#cancelButton:pressed, QPushButton#backBtn:pressed {
+    background-color: #40464E;
+}
+
+/* Pulsanti piccoli/icone (Visibilità, Copia, Genera) */
+QPushButton#visibilityToggleBtn {
+    background-color: transparent;
+    border: none;
+    color: #8B949E;
+    padding: 5px;
+    margin: 0;
+    min-width: 30px;
+    max-width: 30px;
+    font-size: 14pt;
+}
+QPushButton#visibilityToggleBtn:hover { 
+    background-color: #30363D;
+    color: #E6EDF3;
+    border-radius: 4px; /* Arrotonda hover */
+}
+QPushButton#visibilityToggleBtn:checked {
+    background-color: #58A6FF;
+    color: #161B22;
+    border-radius: 4px;
+}
+QPushButton#copyButton {
+    background-color: #21262D; /* Sfondo per distinguerlo */
+    border: 1px solid #30363D;
+    color: #8B949E;
+    padding: 5px;
+    margin: 0 0 0 5px;
+    min-width: 30px;
+    max-width: 30px;
+    font-size: 11pt;
+    border-radius: 4px;
+}
+QPushButton#copyButton:hover { 
+    background-color: #30363D;
+    border-color: #58A6FF;
+    color: #E6EDF3;
+}
+QPushButton#copyButton:pressed { 
+    background-color: #388BFD;
+    color: #FFFFFF;
+}
+QPushButton#generatePasswordBtn, QPushButton#generatePasswordEditBtn {
+    background-color: #21262D;
+    color: #C9D1D9;
+    border: 1px solid #30363D;
+    font-size: 9pt;
+    padding: 7px 14px;
+    min-width: auto;
+}
+QPushButton#generatePasswordBtn:hover, QPushButton#generatePasswordEditBtn:hover {
+    background-color: #30363D;
+    border-color: #8B949E;
+    color: #E6EDF3;
+}
+
+/* === Scrollbar === */
+QScrollBar:vertical {
+    border: none;
+    background: #0D1117; /* Sfondo molto scuro */
+    width: 10px; /* Larghezza ridotta */
+    margin: 0px 0px 0px 0px;
+}
+QScrollBar::handle:vertical {
+    background: #30363D; /* Grigio scuro handle */
+    min-height: 20px;
+    border-radius: 5px; /* Arrotonda handle */
+}
+QScrollBar::handle:vertical:hover {
+    background: #484F58; /* Handle più chiaro su hover */
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    border: none;
+    background: none;
+    height: 0px;
+}
+QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
+    background: none;
+}
+/* Stili simili per QScrollBar:horizontal se necessario */
+QScrollBar:horizontal { /* ... */ }
+QScrollBar::handle:horizontal { /* ... */ }
+/* ... */
+
+/* === Card Specific Styles === */
+.cardWidget, 
+QFrame#statCard, 
+QWidget#credentialDetailWidget,
+QDialog 
+{
+    background-color: #161B22; /* Usa BG_BASE per più contrasto */
+    border: 1px solid #30363D;
+    border-radius: 8px;
+    padding: 18px; /* Padding aumentato */
+}
+.cardWidget:hover,
+QFrame#statCard:hover 
+{
+    border-color: #58A6FF;
+    background-color: #21262D; /* BG_SECONDARY su hover */
+}
+
+/* === Profile Box === */
+QFrame#profileBox {
+    background-color: #161B22; /* BG_BASE */
+    border: 1px solid #30363D;
+    border-radius: 8px;
+    padding: 12px 15px; /* Padding rivisto */
+    min-width: 220px; /* Assicura larghezza minima */
+}
+QFrame#profileBox:hover {
+    border-color: #58A6FF;
+    background-color: #21262D;
+}
+QFrame#profileBox[selected="true"] { 
+    border: 1.5px solid #58A6FF; 
+    background-color: #21262D;
+}
+
+/* Elementi dentro ProfileBox */
+#profileBox QLabel#profileNameLabel { 
+    font-size: 11pt; /* Ridotto leggermente */
+    font-weight: bold; 
+    color: #E6EDF3; 
+    margin-bottom: 1px; /* Spazio ridotto */
+}
+#profileBox QLabel#profileLastNameLabel {
+    font-size: 10pt; /* Ridotto */
+    color: #C9D1D9;
+    margin-bottom: 4px;
+}
+#profileBox QLabel#profileEmailLabel { 
+    color: #8B949E; 
+    font-size: 9pt; 
+    margin-top: 4px; /* Spazio sopra email */
+}
+
+/* Pulsante modifica dentro ProfileBox */
+QPushButton#editProfileBtn {
+    background: transparent;
+    border: none;
+    padding: 0;
+    min-width: 0;
+}
+QPushButton#editProfileBtn:hover {
+    background: #444;
+    border-radius: 3px;
+}
+
+/* === Profile Widget === */
+QWidget#profileWidgetContainer QFrame#header {
+    background-color: #232323;
+    border-bottom: 1px solid #333;
+}
+QLabel#profilesTitleLabel { font-size: 20px; font-weight: bold; }
+QScrollArea#profilesScrollArea { border: none; }
+
+/* Pulsanti della barra credenziali */
+#credentialSidebar QPushButton#newBtn,
+#credentialSidebar QPushButton#deleteBtn {
+    color: white;
+    border: none;
+    padding: 6px 12px;
+    border-radius: 4px;
+    font-size: 12px;
+    min-width: 80px;
+}
+#credentialSidebar QPushButton#newBtn { background-color: #0d6efd; }
+#credentialSidebar QPushButton#newBtn:hover { background-color: #0b5ed7; }
+#credentialSidebar QPushButton#deleteBtn { background-color: #dc3545; }
+#credentialSidebar QPushButton#deleteBtn:hover { background-color: #bb2d3b; }
+
+/* === Credential List === */
+/* Le card delle credenziali sono disegnate da CredentialItemDelegate (credential_list.py) */
+QListView#credentialListView {
+    background: transparent;
+    border: none;
+    padding: 8px 4px;
+}
+
+/* Statistiche Dashboard */
+QFrame#statCard, QFrame#statCard:hover {
+    background-color: #2b2b2b;
+    border-radius: 10px;
+    padding: 15px;
+}
+QLabel#statTitleLabel { font-family: Arial; font-size: 14pt; font-weight: bold; color: #ffffff; }
+QLabel#statValueLabel { font-family: Arial; font-size: 24pt; font-weight: bold; color: #4CAF50; }
+QLabel#statDescLabel { color: #8B949E; font-size: 9pt; padding-top: 8px; }
+
+/* === Login / Registrazione === */
+QLabel#welcomeLabel { font-size: 14px; }
+QLabel#registrationWarningLabel { color: #ff4444; font-weight: bold; }
+QDialog#AuthDialog QLineEdit {
+    padding: 8px;
+    border: 1px solid #ccc;
+    border-radius: 4px;
+}
+QDialog#AuthDialog QPushButton#loginButton,
+QDialog#RegistrationDialog QPushButton#registerButton,
+QDialog#AuthDialog QPushButton#cancelButton,
+QDialog#RegistrationDialog QPushButton#cancelButton {
+    background-color: #4CAF50;
+    color: white;
+    padding: 8px;
+    border: none;
+    border-radius: 4px;
+}
+QDialog#AuthDialog QPushButton#loginButton:hover,
+QDialog#RegistrationDialog QPushButton#registerButton:hover { background-color: #45a049; }
+QDialog#AuthDialog QPushButton#cancelButton,
+QDialog#RegistrationDialog QPushButton#cancelButton { background-color: #f44336; }
+QDialog#AuthDialog QPushButton#cancelButton:hover,
+QDialog#RegistrationDialog QPushButton#cancelButton:hover { background-color: #da190b; }
+
+/* Misuratore di robustezza: property "strength" = punteggio 0-4 (rosso -> verde) */
+QProgressBar[strength="0"]::chunk { background-color: #f44336; }
+QProgressBar[strength="1"]::chunk { background-color: #ff9800; }
+QProgressBar[strength="2"]::chunk { background-color: #ffc107; }
+QProgressBar[strength="3"]::chunk { background-color: #8bc34a; }
+QProgressBar[strength="4"]::chunk { background-color: #4CAF50; }
+QLabel[strength="0"] { color: #f44336; }
+QLabel[strength="1"] { color: #ff9800; }
+QLabel[strength="2"] { color: #ffc107; }
+QLabel[strength="3"] { color: #8bc34a; }
+QLabel[strength="4"] { color: #4CAF50; }
+
+/* === Impostazioni: campo tasto dell'hotkey (property "hotkeyState") === */
+QLineEdit[hotkeyState="valid"] { background-color: #CCFFCC; }
+QLineEdit[hotkeyState="invalid"] { background-color: #FFCCCC; }
+
+/* === Quick Credential Dialog === */
+QDialog#quickCredentialDialog {
+    background-color: rgba(40, 42, 45, 0.92); /* Sfondo scuro semi-trasparente */
+    border: 1px solid rgba(255, 255, 255, 0.2);
+    border-radius: 12px;
+}
+#quickCredentialDialog QLabel {
+    color: #e0e0e0;
+    background-color: transparent;
+    font-size: 10pt;
+}
+#quickCredentialDialog QComboBox {
+    padding: 6px 10px;
+    border: 1px solid rgba(255, 255, 255, 0.2);
+    border-radius: 4px;
+    background-color: rgba(50, 52, 55, 0.9);
+    color: #e0e0e0;
+    min-height: 2em; /* Altezza minima */
+}
+#quickCredentialDialog QComboBox::drop-down {
+    border: none;
+}
+#quickCredentialDialog QComboBox::down-arrow {
+    image: url(icons/down_arrow.png); /* Sostituire con icona valida */
+    width: 12px;
+    height: 12px;
+    padding-right: 10px;
+}
+#quickCredentialDialog QComboBox QAbstractItemView { /* Stile menu dropdown */
+    background-color: #25272a;
+    border: 1px solid rgba(255, 255, 255, 0.2);
+    selection-background-color: #0d6efd;
+    color: #e0e0e0;
+    padding: 4px;
+}
+#quickCredentialDialog QLineEdit#searchLineEdit {
+    padding: 7px 10px;
+    border: 1px solid rgba(255, 255, 255, 0.2);
+    border-radius: 4px;
+    background-color: rgba(30, 31, 32, 0.9);
+    color: #e0e0e0;
+}
+#quickCredentialDialog QListView {
+    border: 1px solid rgba(255, 255, 255, 0.15);
+    background-color: rgba(30, 31, 32, 0.85);
+    border-radius: 4px;
+    padding: 5px;
+    outline: 0;
+}
+#quickCredentialDialog QListView::item {
+    padding: 6px 8px;
+    color: #ccc;
+    border-radius: 3px;
+    margin: 1px 0;
+}
+#quickCredentialDialog QListView::item:hover {
+    background-color: rgba(70, 72, 75, 0.9);
+    color: #fff;
+}
+#quickCredentialDialog QListView::item:selected {
+    background-color: rgba(13, 110, 253, 0.7);
+    color: white;
+    border: none;
+}
+#quickCredentialDialog QPushButton#copyUsernameBtn, #quickCredentialDialog QPushButton#copyPasswordBtn {
+    background-color: #565e64; /* Grigio */
+    color: white;
+    border: 1px solid rgba(255, 255, 255, 0.1);
+    padding: 6px 10px;
+    border-radius: 4px;
+    font-size: 9pt;
+    min-width: 100px;
+}
+#quickCredentialDialog QPushButton#copyUsernameBtn:hover, #quickCredentialDialog QPushButton#copyPasswordBtn:hover {
+    background-color: #495057;
+}
+#quickCredentialDialog QLabel#detailAppNameLabel { font-weight: bold; font-size: 11pt; color: #f0f0f0; }
+#quickCredentialDialog QLabel#detailUsernameLabel { color: #bbb; font-size: 10pt; }
+#quickCredentialDialog QLabel#quickTitleLabel { color: #aaa; font-size: 8pt; }
+#quickCredentialDialog QPushButton#quickCloseButton {
+    color: #aaa;
+    background-color: transparent;
+    border: none;
+    font-size: 12pt;
+    font-weight: bold;
+    padding: 0;
+    min-width: 0;
+}
+#quickCredentialDialog QPushButton#quickCloseButton:hover { color: red; }
+
+"""
+# --- End Stylesheet --- 
+
+
+def apply_app_stylesheet(app: QApplication):
+    """Applica il foglio di stile a tutta l'applicazione (da chiamare una volta, all'avvio)."""
+    app.setStyleSheet(MODERN_STYLESHEET)
+
+
+def set_style_property(widget: QWidget, name: str, value):
+    """
+    Imposta una property usata dai selettori del QSS (es. [hotkeyState="valid"]) e
+    ripolisce solo quel widget, senza un nuovo foglio di stile.
+    """
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
@@ -0,0 +1,206 @@
+"""
+Backup completi del database, deduplicati a chunk sullo storage della sync.
+
+Lo snapshot del database (db_snapshot.py) viene diviso in chunk definiti dal
+contenuto (chunking.py). Ogni chunk è un oggetto a sé, compresso e cifrato
+(sealed_stream.py), con un nome derivato dal contenuto:
+
+    chunk-<HMAC-SHA256(chiave, contenuto)>
+
+L'HMAC con chiave impedisce a chi vede lo storage di verificare se un contenuto
+noto è presente. Un manifest cifrato per backup elenca i chunk in ordine:
+
+    backup-<device_id>-<ms>.manifest
+
+Vengono caricati solo i chunk che lo storage non ha già (il controllo usa il
+listing della sync, nessuna richiesta in più): una piccola modifica a un database
+grande trasferisce pochi chunk, e i backup successivi, anche di dispositivi
+diversi, condividono quelli uguali. Di ogni dispositivo restano le ultime
+BACKUP_GENERATIONS versioni; i chunk non più citati da nessun manifest vengono
+eliminati, ma solo dopo CHUNK_GRACE_SECONDS (un altro dispositivo potrebbe
+averli appena caricati per un manifest non ancora pubblicato).
+"""
+
+import hashlib
+import hmac
+import json
+import re
+import time
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+
+from .chunking import iter_chunks
+from .sealed_stream import SealedStreamError, open_bytes, seal_bytes
+from .sync_storage import RemoteObject, StorageBackend, StorageError
+
+# --- Constants ---
+CHUNK_PREFIX = "chunk-"
+CHUNK_NAME_PATTERN = re.compile(r"^chunk-([0-9a-f]{64})$")
+MANIFEST_NAME_PATTERN = re.compile(r"^backup-([0-9a-f]+)-(\d+)\.manifest$")
+MANIFEST_FORMAT = 1
+BACKUP_GENERATIONS = 7 # Backup conservati per dispositivo
+CHUNK_GRACE_SECONDS = 24 * 3600 # Età minima di un chunk non referenziato prima di eliminarlo
+CHUNK_ID_LABEL = b"PsW backup chunk id v1"
+
+
+def manifest_name(device_id: str, created_ms: int) -> str:
+    return f"backup-{device_id}-{created_ms:013d}.manifest"
+
+
+def parse_manifest_name(name: str) -> Optional[Tuple[str, int]]:
+    """(device_id, timestamp ms) dal nome di un manifest, o None."""
+    match = MANIFEST_NAME_PATTERN.match(name)
+    return (match.group(1), int(match.group(2))) if match else None
+
+
+class ChunkedBackup:
+    """Carica, ripristina e sfoltisce i backup a chunk di un archivio di sync."""
+
+    def __init__(self, store: StorageBackend, key: bytes, device_id: str, metadata: Optional[dict] = None):
+        """
+        Args:
+            store: Storage della sync.
+            key: Chiave dei file cifrati (crypto.derive_sync_stream_key).
+            device_id: Dispositivo che pubblica i backup.
+            metadata: Metadati in chiaro dei manifest (formato, impronta del salt, ...).
+        """
+        self.store = store
+        self.key = key
+        self.device_id = device_id
+        self.metadata = metadata or {}
+        self._id_key = hmac.new(key, CHUNK_ID_LABEL, hashlib.sha256).digest()
+
+    def chunk_name(self, data: bytes) -> str:
+        return CHUNK_PREFIX + hmac.new(self._id_key, data, hashlib.sha256).hexdigest()
+
+    def upload(self, source: BinaryIO, remote_objects: Dict[str, RemoteObject]) -> Tuple[str, Dict[str, int]]:
+        """
+        Carica il contenuto di source come nuovo backup: i chunk mancanti, poi il manifest.
+
+        Args:
+            remote_objects: Listing dello storage per nome (aggiornato con gli oggetti caricati).
+
+        Returns:
+            (nome del manifest, statistiche: 'chunks', 'uploaded_chunks', 'size', 'bytes_uploaded')
+
+        Raises:
+            StorageError, SealedStreamError, OSError
+        """
+        stats = {'chunks': 0, 'uploaded_chunks': 0, 'size': 0, 'bytes_uploaded': 0}
+        chunks: List[List] = []
+        digest = hashlib.sha256()
+        for data in iter_chunks(source):
+            name = self.chunk_name(data)
+            digest.update(data)
+            chunks.append([name[len(CHUNK_PREFIX):], len(data)])
+            stats['chunks'] += 1
+            stats['size'] += len(data)
+            if name in remote_objects:
+                continue
+            sealed = seal_bytes(data, self.key)
+            etag = self.store.put(name, sealed) # Stesso nome, stesso contenuto: una sovrascrittura concorrente è innocua
+            remote_objects[name] = RemoteObject(name, etag, len(sealed), time.time())
+            stats['uploaded_chunks'] += 1
+            stats['bytes_uploaded'] += len(sealed)
+
+        created_ms = int(time.time() * 1000)
+        manifest = {'format': MANIFEST_FORMAT, 'device': self.device_id, 'created_at': created_ms / 1000.0,
+                    'size': stats['size'], 'sha256': digest.hexdigest(), 'chunks': chunks}
+        data = seal_bytes(json.dumps(manifest, separators=(',', ':')).encode('utf-8'), self.key,
+                          dict(self.metadata, count=len(chunks)))
+        name = manifest_name(self.device_id, created_ms)
+        etag = self.store.put(name, data, if_none_match=True)
+        remote_objects[name] = RemoteObject(name, etag, len(data), time.time())
+        stats['bytes_uploaded'] += len(data)
+        return name, stats
+
+    def restore(self, manifest: str, target: BinaryIO) -> int:
+        """
+        Ricostruisce in target il database salvato nel manifest, verificando ogni chunk e l'hash complessivo.
+
+        Returns:
+            Byte scritti.
+
+        Raises:
+            StorageError, SealedStreamError
+        """
+        entries = self.read_manifest(manifest)
+        digest = hashlib.sha256()
+        written = 0
+        for chunk_id, size in entries['chunks']:
+            name = CHUNK_PREFIX + chunk_id
+            data = open_bytes(self.store.get(name), self.key)[1]
+            if len(data) != size or self.chunk_name(data) != name:
+                raise SealedStreamError(f"Chunk {name} does not match the manifest")
+            digest.update(data)
+            target.write(data)
+            written += len(data)
+        if digest.hexdigest() != entries['sha256']:
+            raise SealedStreamError(f"Backup {manifest} does not match its checksum")
+        return written
+
+    def read_manifest(self, manifest: str) -> dict:
+        """Raises: StorageError, SealedStreamError"""
+        try:
+            entries = json.loads(open_bytes(self.store.get(manifest), self.key)[1].decode('utf-8'))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise SealedStreamError(f"Malformed manifest {manifest}: {e}") from e
+        if entries.get('format') != MANIFEST_FORMAT or not isinstance(entries.get('chunks'), list):
+            raise SealedStreamError(f"Unsupported manifest {manifest}")
+        return entries
+
+    def prune(self, remote_objects: Dict[str, RemoteObject]) -> List[str]:
+        """
+        Elimina i backup di questo dispositivo oltre BACKUP_GENERATIONS e i chunk non più
+        referenziati da nessun manifest (di qualsiasi dispositivo).
+
+        Args:
+            remote_objects: Listing dello storage per nome (gli oggetti eliminati vengono tolti).
+
+        Returns:
+            Nomi degli oggetti eliminati.
+        """
+        manifests = sorted((parsed[1], name) for name, parsed in
+                           ((name, parse_manifest_name(name)) for name in remote_objects) if parsed)
+        own = [name for _, name in manifests if parse_manifest_name(name)[0] == self.device_id]
+        expired = own[:-BACKUP_GENERATIONS] if len(own) > BACKUP_GENERATIONS else []
+        if not expired:
+            return []
+        deleted = []
+        for name in expired:
+            try:
+                self.store.delete(name)
+                deleted.append(name)
+                del remote_objects[name]
+            except StorageError as e:
+                print(f"[ChunkedBackup] Could not delete old backup {name}: {e}")
+
+        # Chunk ancora in uso: se un manifest non è leggibile non si elimina nessun chunk
+        referenced: Set[str] = set()
+        for _, name in manifests:
+            if name not in remote_objects:
+                continue # Eliminato qui sopra
+            try:
+                referenced.update(CHUNK_PREFIX + chunk_id for chunk_id, _ in self.read_manifest(name)['chunks'])
+            except (StorageError, SealedStreamError) as e:
+                print(f"[ChunkedBackup] Manifest {name} not readable ({e}): unreferenced chunks are kept.")
+                return deleted
+        cutoff = time.time() - CHUNK_GRACE_SECONDS
+        for name, remote in list(remote_objects.items()):
+            if CHUNK_NAME_PATTERN.match(name) and name not in referenced and remote.modified_at < cutoff:
+                try:
+                    self.store.delete(name)
+                    deleted.append(name)
+                    del remote_objects[name]
+                except StorageError as e:
+                    print(f"[ChunkedBackup] Could not delete unreferenced chunk {name}: {e}")
+        return deleted
+
+
+def latest_manifest(names, device_id: Optional[str] = None) -> Optional[str]:
+    """Manifest più recente (di un dispositivo, o di tutti) tra i nomi dati."""
+    best = None
+    for name in names:
+        parsed = parse_manifest_name(name)
+        if parsed and (device_id is None or parsed[0] == device_id) and (best is None or parsed[1] > best[0]):
+            best = (parsed[1], name)
+    return best[1] if best else None
@@ -0,0 +1,80 @@
+"""
+Suddivisione di un flusso in chunk definiti dal contenuto (FastCDC).
+
+I confini dei chunk vengono scelti da un hash rotante (gear hash) sugli ultimi
+byte letti, non da offset fissi: inserire o togliere dati in un punto sposta solo
+i chunk vicini, gli altri restano identici e possono essere deduplicati.
+
+Implementa FastCDC (Xia et al., 2016) con normalizzazione: prima della dimensione
+media si usa una maschera più selettiva, dopo una più permissiva, così le
+dimensioni si concentrano attorno alla media. Minimo e massimo limitano i casi
+degeneri (dati costanti o casuali).
+
+La tabella gear è derivata da SHA-256 di un'etichetta fissa: cambiarla cambierebbe
+tutti i confini, e quindi la deduplicazione con i chunk già caricati.
+"""
+
+import hashlib
+from typing import BinaryIO, Iterator
+
+# --- Constants ---
+MIN_CHUNK_SIZE = 16 * 1024
+AVG_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+_NORMALIZATION = 2 # Bit di differenza tra le due maschere rispetto a log2(media)
+_MASK64 = (1 << 64) - 1
+
+_GEAR = tuple(int.from_bytes(hashlib.sha256(b"PsW FastCDC gear %d" % i).digest()[:8], 'big') for i in range(256))
+
+
+def _top_mask(bits: int) -> int:
+    """Maschera sui bit alti dell'hash: quelli influenzati dagli ultimi 64 byte letti."""
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+def find_cut(data, start: int, end: int, min_size: int = MIN_CHUNK_SIZE,
+             avg_size: int = AVG_CHUNK_SIZE, max_size: int = MAX_CHUNK_SIZE) -> int:
+    """Lunghezza del prossimo chunk che inizia in data[start] (end: fine dei dati disponibili)."""
+    remaining = end - start
+    if remaining <= min_size:
+        return remaining
+    limit = min(remaining, max_size)
+    normal = min(limit, avg_size)
+    bits = avg_size.bit_length() - 1
+    mask_small, mask_large = _top_mask(bits + _NORMALIZATION), _top_mask(bits - _NORMALIZATION)
+    gear = _GEAR
+    fingerprint = 0
+    i = start + min_size
+    stop = start + normal
+    while i < stop:
+        fingerprint = ((fingerprint << 1) + gear[data[i]]) & _MASK64
+        if not fingerprint & mask_small:
+            return i - start + 1
+        i += 1
+    stop = start + limit
+    while i < stop:
+        fingerprint = ((fingerprint << 1) + gear[data[i]]) & _MASK64
+        if not fingerprint & mask_large:
+            return i - start + 1
+        i += 1
+    return limit
+
+
+def iter_chunks(source: BinaryIO, min_size: int = MIN_CHUNK_SIZE, avg_size: int = AVG_CHUNK_SIZE,
+                max_size: int = MAX_CHUNK_SIZE) -> Iterator[bytes]:
+    """Legge source e restituisce i chunk uno alla volta (in memoria al massimo due chunk massimi)."""
+    buffer = bytearray()
+    eof = False
+    while True:
+        # Almeno max_size byte (o la fine del flusso): il confine non dipende da come arrivano i dati
+        while not eof and len(buffer) < max_size:
+            block = source.read(max_size)
+            if block:
+                buffer += block
+            else:
+                eof = True
+        if not buffer:
+            return
+        cut = find_cut(buffer, 0, len(buffer), min_size, avg_size, max_size)
+        yield bytes(buffer[:cut])
+        del buffer[:cut]
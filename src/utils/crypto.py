@@ -5,11 +5,13 @@ dalla master password dell'utente.
 """
 
 import base64
+import hashlib
+import hmac
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
-from typing import Optional
+from typing import Optional, Dict, Tuple
 
 # Costanti allineate con SyncManager (sebbene il salt qui sia usato solo per KDF)
 PBKDF2_ITERATIONS = 600000 # Numero di iterazioni per PBKDF2
@@ -19,11 +21,27 @@ PBKDF2_ITERATIONS = 600000 # Numero di iterazioni per PBKDF2
 #       dovrebbe essere lo stesso usato per l'hash di verifica della password.
 #       Quindi, le funzioni qui richiederanno il salt (in bytes) come argomento.
 
+# Etichetta di dominio per la chiave HMAC delle impronte password (separata dalla chiave Fernet)
+FINGERPRINT_KEY_LABEL = b"PsW password fingerprint v1"
+# Etichetta della chiave con cui vengono cifrati i file della sincronizzazione (sealed_stream.py)
+SYNC_STREAM_KEY_LABEL = b"PsW sync stream v1"
+
+# Cache delle chiavi derivate per la sessione corrente: PBKDF2 a 600k iterazioni
+# costa centinaia di ms, e senza cache veniva ripetuto per ogni campo cifrato/decifrato.
+_derived_key_cache: Dict[Tuple[str, bytes], bytes] = {}
+
+def clear_key_cache():
+    """Svuota la cache delle chiavi derivate (da chiamare quando la master password cambia o la sessione si chiude)."""
+    _derived_key_cache.clear()
+
 def _derive_fernet_key(password: str, salt: bytes) -> Optional[bytes]:
     """Deriva una chiave Fernet (URL-safe base64 encoded) dalla password e dal salt usando PBKDF2."""
     if not password or not salt:
         print("[_derive_fernet_key] Errore: Password o salt mancanti.")
         return None
+    cached_key = _derived_key_cache.get((password, salt))
+    if cached_key is not None:
+        return cached_key
     try:
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
@@ -35,6 +53,7 @@ def _derive_fernet_key(password: str, salt: bytes) -> Optional[bytes]:
         # La chiave per Fernet deve essere URL-safe base64 encoded
         key = base64.urlsafe_b64encode(kdf.derive(password.encode('utf-8')))
         # print(f"DEBUG: Derived Fernet key: {key[:5]}...{key[-5:]}") # Debugging Key Derivation
+        _derived_key_cache[(password, salt)] = key
         return key
     except Exception as e:
         print(f"[_derive_fernet_key] Errore durante la derivazione della chiave: {e}")
@@ -97,4 +116,49 @@ def decrypt_data(encrypted_text: str, password: str, salt: bytes) -> Optional[st
          return None # Specifico per password errata o dati manomessi
     except Exception as e:
         print(f"[decrypt_data] Errore generico durante la decrittografia: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def derive_fingerprint_key(password: str, salt: bytes) -> Optional[bytes]:
+    """
+    Deriva la chiave HMAC usata per le impronte delle password dalla chiave di sessione.
+
+    Args:
+        password: La master password verificata per la sessione.
+        salt: Il salt (in bytes) associato alla master password.
+
+    Returns:
+        32 byte di chiave HMAC, o None se la chiave di sessione non è derivabile.
+    """
+    return _derive_subkey(password, salt, FINGERPRINT_KEY_LABEL)
+
+def derive_sync_stream_key(password: str, salt: bytes) -> Optional[bytes]:
+    """
+    Deriva la chiave con cui vengono cifrati i file della sincronizzazione (blocchi, snapshot, backup).
+
+    Returns:
+        32 byte di chiave, o None se la chiave di sessione non è derivabile.
+    """
+    return _derive_subkey(password, salt, SYNC_STREAM_KEY_LABEL)
+
+def _derive_subkey(password: str, salt: bytes, label: bytes) -> Optional[bytes]:
+    """Chiave indipendente per un uso specifico (label), derivata dalla chiave di sessione."""
+    fernet_key = _derive_fernet_key(password, salt)
+    if not fernet_key:
+        return None
+    session_key = base64.urlsafe_b64decode(fernet_key)
+    return hmac.new(session_key, label, hashlib.sha256).digest()
+
+def compute_password_fingerprint(plain_password: Optional[str], key: Optional[bytes]) -> Optional[str]:
+    """
+    Calcola l'impronta HMAC-SHA256 (hex) di una password in chiaro.
+
+    Due password uguali producono la stessa impronta con la stessa chiave, quindi il
+    riutilizzo si trova con un GROUP BY senza decifrare nulla. Senza la chiave di
+    sessione l'impronta non permette attacchi a dizionario offline.
+
+    Returns:
+        L'impronta esadecimale, o None se la password è vuota o la chiave manca.
+    """
+    if not plain_password or not key:
+        return None
+    return hmac.new(key, plain_password.encode('utf-8'), hashlib.sha256).hexdigest()
@@ -0,0 +1,69 @@
+"""
+Copie consistenti del database SQLite mentre l'applicazione è in uso.
+
+Il file del database non va mai caricato così com'è: la UI può scriverci durante
+l'upload e la copia remota risulterebbe incoerente. create_snapshot() usa l'API di
+backup di SQLite a passi di poche pagine: il lock in lettura viene rilasciato dopo
+ogni passo e tra un passo e l'altro c'è una breve pausa, quindi le scritture della
+UI non restano bloccate (se il database cambia nel frattempo SQLite riprende la
+copia, che resta consistente). La copia viene poi compattata con VACUUM, che non
+blocca nessuno perché il file è privato.
+
+    with database_snapshot(db_path) as snapshot_path:
+        store.put_file(name, snapshot_path)
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+SNAPSHOT_PAGES_PER_STEP = 256 # Pagine copiate per passo (1 MB con le pagine da 4 KB)
+SNAPSHOT_STEP_PAUSE = 0.005 # Pausa tra i passi (s): finestra per le scritture della UI
+SNAPSHOT_DB_TIMEOUT = 10.0
+
+
+def create_snapshot(db_path: str, dest_path: str, pages_per_step: int = SNAPSHOT_PAGES_PER_STEP,
+                    pause: float = SNAPSHOT_STEP_PAUSE, compact: bool = True) -> int:
+    """
+    Scrive in dest_path una copia consistente del database (compattata se compact).
+
+    Returns:
+        Dimensione della copia in byte.
+
+    Raises:
+        sqlite3.Error, OSError
+    """
+    def progress(status: int, remaining: int, total: int):
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(f"{Path(db_path).absolute().as_uri()}?mode=ro", uri=True, timeout=SNAPSHOT_DB_TIMEOUT)
+    try:
+        target = sqlite3.connect(dest_path, isolation_level=None)
+        try:
+            source.backup(target, pages=pages_per_step, progress=progress)
+            if compact:
+                target.execute("VACUUM")
+        finally:
+            target.close()
+    finally:
+        source.close()
+    return os.path.getsize(dest_path)
+
+
+@contextmanager
+def database_snapshot(db_path: str, directory: Optional[str] = None) -> Iterator[str]:
+    """Crea uno snapshot in un file temporaneo e ne restituisce il percorso; il file viene eliminato all'uscita."""
+    fd, snapshot_path = tempfile.mkstemp(prefix="psw-snapshot-", suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        create_snapshot(db_path, snapshot_path)
+        yield snapshot_path
+    finally:
+        for leftover in (snapshot_path, snapshot_path + "-journal"):
+            try: os.remove(leftover)
+            except OSError: pass
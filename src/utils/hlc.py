@@ -0,0 +1,113 @@
+"""
+Hybrid logical clock (HLC) per ordinare le modifiche tra dispositivi.
+
+Un timestamp HLC combina l'orologio fisico (ms) con un contatore logico e
+l'ID del dispositivo: segue l'ora reale quando gli orologi sono allineati,
+resta monotono se l'orologio locale torna indietro e, dopo aver ricevuto un
+timestamp remoto, genera solo valori successivi. L'ID dispositivo rende ogni
+timestamp unico, quindi il confronto è un ordine totale deterministico.
+
+I timestamp sono stringhe a larghezza fissa ("<ms>:<contatore>:<device>"),
+confrontabili direttamente sia in Python sia in SQL.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+WALL_DIGITS = 13
+COUNTER_DIGITS = 4
+MAX_COUNTER = 10 ** COUNTER_DIGITS - 1
+MAX_FORWARD_DRIFT_MS = 24 * 3600 * 1000 # Timestamp remoti troppo nel futuro non trascinano l'orologio locale
+
+
+def format_hlc(wall_ms: int, counter: int, device_id: str) -> str:
+    return f"{wall_ms:0{WALL_DIGITS}d}:{counter:0{COUNTER_DIGITS}d}:{device_id}"
+
+
+def parse_hlc(stamp: Optional[str]) -> Optional[Tuple[int, int, str]]:
+    """(ms, contatore, device) da un timestamp HLC, o None se non valido."""
+    if not stamp:
+        return None
+    try:
+        wall, counter, device_id = stamp.split(':', 2)
+        return int(wall), int(counter), device_id
+    except ValueError:
+        return None
+
+
+def is_far_future(stamp: Optional[str]) -> bool:
+    """True se il timestamp supera l'ora locale di oltre MAX_FORWARD_DRIFT_MS (orologio remoto sbagliato)."""
+    parsed = parse_hlc(stamp)
+    return parsed is not None and parsed[0] > time.time() * 1000 + MAX_FORWARD_DRIFT_MS
+
+
+def hlc_device(stamp: Optional[str]) -> Optional[str]:
+    parsed = parse_hlc(stamp)
+    return parsed[2] if parsed else None
+
+
+def encode_field_stamps(stamps: Dict[str, str]) -> Optional[str]:
+    """Serializzazione canonica (chiavi ordinate) della mappa campo -> HLC; None se vuota."""
+    return json.dumps(stamps, sort_keys=True, separators=(',', ':')) if stamps else None
+
+
+def decode_field_stamps(encoded: Optional[str]) -> Dict[str, str]:
+    if not encoded:
+        return {}
+    try:
+        return json.loads(encoded)
+    except ValueError:
+        return {}
+
+
+def field_stamps(record_hlc: str, explicit: Dict[str, str], fields) -> Dict[str, str]:
+    """
+    Timestamp di ogni campo. Per compattezza si memorizzano solo i campi con un
+    timestamp diverso da quello del record (record_hlc, il più recente): gli altri
+    sono stati scritti nell'ultima modifica.
+    """
+    return {field: explicit.get(field, record_hlc) for field in fields}
+
+
+def compact_field_stamps(stamps: Dict[str, str]) -> Tuple[str, Optional[str]]:
+    """(HLC del record, mappa esplicita serializzata) dai timestamp completi dei campi."""
+    record_hlc = max(stamps.values())
+    return record_hlc, encode_field_stamps({field: stamp for field, stamp in stamps.items() if stamp != record_hlc})
+
+
+class HybridLogicalClock:
+    """Orologio HLC di un dispositivo (thread-safe: usato dalla UI per le scritture e dal thread di sync)."""
+
+    def __init__(self, device_id: str, last_stamp: Optional[str] = None):
+        self.device_id = device_id
+        self._lock = threading.Lock()
+        parsed = parse_hlc(last_stamp)
+        self._wall, self._counter = (parsed[0], parsed[1]) if parsed else (0, 0)
+
+    def now(self) -> str:
+        """Nuovo timestamp per una modifica locale (sempre maggiore di tutti quelli generati o ricevuti)."""
+        with self._lock:
+            physical = int(time.time() * 1000)
+            if physical > self._wall:
+                self._wall, self._counter = physical, 0
+            elif self._counter < MAX_COUNTER:
+                self._counter += 1
+            else:
+                self._wall, self._counter = self._wall + 1, 0
+            return format_hlc(self._wall, self._counter, self.device_id)
+
+    def update(self, remote_stamp: Optional[str]):
+        """Registra un timestamp ricevuto: le modifiche locali successive saranno ordinate dopo di esso."""
+        parsed = parse_hlc(remote_stamp)
+        if not parsed:
+            return
+        wall, counter, _ = parsed
+        if is_far_future(remote_stamp):
+            # Il motore di sync non applica record con questi timestamp (vedi DeltaSyncEngine.pull)
+            print(f"[HybridLogicalClock] Ignoring remote timestamp far in the future: {remote_stamp}")
+            return
+        with self._lock:
+            if (wall, counter) > (self._wall, self._counter):
+                self._wall, self._counter = wall, counter
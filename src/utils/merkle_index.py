@@ -0,0 +1,209 @@
+"""
+Albero di Merkle sui record sincronizzati, per capire a basso costo se (e dove)
+due repliche divergono.
+
+Struttura (fissa, uguale su tutti i dispositivi):
+
+    ''            radice
+    'h:a'         16 bucket per la prima cifra esadecimale del sync_id
+    'h:ab'        256 bucket per le prime due cifre
+    'p:<sync_id>' partizione di un profilo: il profilo e tutte le sue credenziali
+    't:<sync_id>' partizione di un tombstone
+    's:'          partizione delle impostazioni condivise (figlia diretta della radice)
+
+L'hash di una foglia copre tipo, timestamp HLC (del record e dei singoli campi) e
+contenuto del record (escluse le date di creazione/modifica, che ogni replica
+riscrive localmente); l'hash di un nodo
+copre le coppie (chiave figlio, hash figlio) ordinate. I nodi vuoti non esistono.
+
+I trigger del database segnano come "sporche" le partizioni toccate da ogni
+scrittura (tabella merkle_dirty); refresh() ricalcola solo quelle e risale fino
+alla radice, quindi il costo è proporzionale alle modifiche, non all'archivio.
+Due repliche allineate hanno la stessa radice; altrimenti diff() scende solo nei
+rami diversi e restituisce le partizioni da riparare.
+"""
+
+import hashlib
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..core.database_manager import SYNC_FIELDS
+
+ROOT_KEY = ''
+SETTINGS_PARTITION = 's:'
+HASH_LENGTH = 32 # Cifre esadecimali (128 bit) conservate per nodo
+
+# Campi coperti dall'hash (created_at/updated_at restano fuori: sono riscritti dai trigger locali)
+PROFILE_HASH_FIELDS = SYNC_FIELDS['profiles']
+CREDENTIAL_HASH_FIELDS = SYNC_FIELDS['credentials']
+
+
+def _digest(parts: Iterable[str]) -> str:
+    return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def leaf_hash(record_type: str, record_hlc: Optional[str], field_hlc: Optional[str], fields: list) -> str:
+    """Hash di un record: due repliche con lo stesso record (stessi timestamp HLC) producono lo stesso hash."""
+    return _digest([json.dumps([record_type, record_hlc, field_hlc, fields], ensure_ascii=False, separators=(',', ':'))])
+
+
+def is_partition(node_key: str) -> bool:
+    return node_key == SETTINGS_PARTITION or node_key.startswith(('p:', 't:'))
+
+
+def parent_key(node_key: str) -> Optional[str]:
+    """Chiave del nodo padre (None per la radice)."""
+    if node_key == ROOT_KEY:
+        return None
+    if node_key == SETTINGS_PARTITION:
+        return ROOT_KEY
+    if node_key.startswith(('p:', 't:')):
+        return 'h:' + node_key[2:4]
+    prefix = node_key[2:] # 'h:ab' -> 'h:a' -> radice
+    return 'h:' + prefix[:-1] if len(prefix) > 1 else ROOT_KEY
+
+
+class MerkleSnapshot:
+    """Albero di una replica remota ricevuto come dizionario {chiave nodo: hash} (stessa interfaccia di lettura di MerkleIndex)."""
+
+    def __init__(self, nodes: Dict[str, str]):
+        self.nodes = nodes
+        self._children: Dict[str, Dict[str, str]] = {}
+        for key, node_hash in nodes.items():
+            parent = parent_key(key)
+            if parent is not None:
+                self._children.setdefault(parent, {})[key] = node_hash
+
+    def root_hash(self) -> Optional[str]:
+        return self.nodes.get(ROOT_KEY)
+
+    def children(self, node_key: str) -> Dict[str, str]:
+        return dict(self._children.get(node_key, {}))
+
+
+class MerkleIndex:
+    """Albero di Merkle persistito nella tabella merkle_nodes, su una connessione SQLite data (row_factory = sqlite3.Row)."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    # --- Lettura ---
+    def root_hash(self) -> Optional[str]:
+        """Hash della radice (None se non c'è nulla da sincronizzare). Aggiorna prima le partizioni sporche."""
+        self.refresh()
+        rows = self._fetchall("SELECT hash FROM merkle_nodes WHERE node_key = ?", (ROOT_KEY,))
+        return rows[0]['hash'] if rows else None
+
+    def children(self, node_key: str) -> Dict[str, str]:
+        return {row['node_key']: row['hash']
+                for row in self._fetchall("SELECT node_key, hash FROM merkle_nodes WHERE parent_key = ?", (node_key,))}
+
+    def snapshot(self) -> Dict[str, str]:
+        """Tutti i nodi fino alle partizioni (da pubblicare per il confronto con le altre repliche)."""
+        self.refresh()
+        return {row['node_key']: row['hash'] for row in self._fetchall("SELECT node_key, hash FROM merkle_nodes")}
+
+    def diff(self, remote) -> List[str]:
+        """
+        Partizioni che differiscono da un'altra replica (MerkleIndex o MerkleSnapshot).
+
+        Confronta prima le radici (repliche allineate: un solo confronto), poi scende
+        solo nei sottoalberi con hash diverso.
+        """
+        self.refresh()
+        if self.root_hash() == remote.root_hash():
+            return []
+        differing = []
+        pending = [ROOT_KEY]
+        while pending:
+            node_key = pending.pop()
+            local_children, remote_children = self.children(node_key), remote.children(node_key)
+            for child in set(local_children) | set(remote_children):
+                if local_children.get(child) == remote_children.get(child):
+                    continue
+                if is_partition(child):
+                    differing.append(child)
+                else:
+                    pending.append(child)
+        return sorted(differing)
+
+    # --- Manutenzione incrementale ---
+    def refresh(self) -> int:
+        """Ricalcola le partizioni segnate dai trigger e i loro antenati. Restituisce il numero di partizioni ricalcolate."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT partition FROM merkle_dirty")
+            dirty = [row['partition'] for row in cursor.fetchall()]
+            if not dirty:
+                cursor.execute("COMMIT")
+                return 0
+            level = set()
+            for partition in dirty:
+                leaves = self._partition_leaves(cursor, partition)
+                self._store_node(cursor, partition, _digest(f"{sync_id}:{leaf}" for sync_id, leaf in sorted(leaves)) if leaves else None)
+                level.add(parent_key(partition))
+            # Risale livello per livello: 'h:ab' -> 'h:a' -> radice
+            while level:
+                next_level = set()
+                for node_key in level:
+                    cursor.execute("SELECT node_key, hash FROM merkle_nodes WHERE parent_key = ? ORDER BY node_key", (node_key,))
+                    children = cursor.fetchall()
+                    self._store_node(cursor, node_key, _digest(f"{row['node_key']}:{row['hash']}" for row in children) if children else None)
+                    parent = parent_key(node_key)
+                    if parent is not None:
+                        next_level.add(parent)
+                level = next_level
+            cursor.execute("DELETE FROM merkle_dirty")
+            cursor.execute("COMMIT")
+            return len(dirty)
+        except sqlite3.Error as e:
+            print(f"[MerkleIndex] Error refreshing Merkle tree: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return 0
+        finally:
+            cursor.close()
+
+    def _store_node(self, cursor: sqlite3.Cursor, node_key: str, node_hash: Optional[str]):
+        if node_hash is None:
+            cursor.execute("DELETE FROM merkle_nodes WHERE node_key = ?", (node_key,))
+        else:
+            cursor.execute("INSERT OR REPLACE INTO merkle_nodes (node_key, parent_key, hash) VALUES (?, ?, ?)",
+                           (node_key, parent_key(node_key), node_hash))
+
+    def _partition_leaves(self, cursor: sqlite3.Cursor, partition: str) -> List[Tuple[str, str]]:
+        """(sync_id, hash foglia) dei record di una partizione."""
+        leaves = []
+        if partition == SETTINGS_PARTITION:
+            cursor.execute("""SELECT v.key, v.sync_hlc, s.value
+                              FROM sync_setting_versions v LEFT JOIN settings s ON s.key = v.key""")
+            for row in cursor.fetchall():
+                leaves.append((row['key'], leaf_hash('setting', row['sync_hlc'], None, [row['value']])))
+        elif partition.startswith('t:'):
+            cursor.execute("SELECT sync_id, record_type, sync_hlc FROM sync_tombstones WHERE sync_id = ?", (partition[2:],))
+            for row in cursor.fetchall():
+                leaves.append((row['sync_id'], leaf_hash(row['record_type'] + ':deleted', row['sync_hlc'], None, [])))
+        elif partition.startswith('p:'):
+            cursor.execute(f"SELECT id, sync_id, sync_hlc, sync_field_hlc, {', '.join(PROFILE_HASH_FIELDS)} FROM profiles WHERE sync_id = ?",
+                           (partition[2:],))
+            profile = cursor.fetchone()
+            if profile is None:
+                return leaves # Profilo eliminato: le eventuali credenziali orfane non fanno parte dell'albero
+            leaves.append((profile['sync_id'], leaf_hash('profile', profile['sync_hlc'], profile['sync_field_hlc'],
+                                                         [profile[field] for field in PROFILE_HASH_FIELDS])))
+            cursor.execute(f"SELECT sync_id, sync_hlc, sync_field_hlc, {', '.join(CREDENTIAL_HASH_FIELDS)} FROM credentials WHERE profile_id = ?",
+                           (profile['id'],))
+            for row in cursor.fetchall():
+                leaves.append((row['sync_id'], leaf_hash('credential', row['sync_hlc'], row['sync_field_hlc'],
+                                                         [row[field] for field in CREDENTIAL_HASH_FIELDS])))
+        return leaves
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
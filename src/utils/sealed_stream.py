@@ -0,0 +1,266 @@
+"""
+Compressione e cifratura a flusso dei file della sincronizzazione (blocchi di
+modifiche, snapshot Merkle, backup del database).
+
+Formato (interi big-endian):
+
+    'PSWS' | versione (1) | codec (1) | dimensione chunk (4) | salt del file (16)
+    | lunghezza metadati (4) | metadati JSON | chunk cifrati...
+
+Il contenuto viene compresso (zlib; zstd solo se richiesto esplicitamente) e il
+risultato diviso in chunk di dimensione fissa, cifrati uno a uno con AES-256-GCM
+secondo la costruzione STREAM (Hoang, Reyhanitabar, Rogaway, Vizár): il nonce di
+ogni chunk è il suo numero progressivo più un flag che marca l'ultimo, quindi
+chunk riordinati, duplicati, rimossi o troncati in coda vengono rifiutati. La chiave di ogni file è derivata (HKDF) dalla chiave di sync e dal salt
+casuale del file; l'header, metadati compresi, è il dato associato di ogni chunk.
+
+I metadati restano leggibili senza chiave (read_metadata), ma sono verificati solo
+quando il contenuto viene decifrato. Scrittura e lettura lavorano un chunk alla
+volta: la memoria usata non dipende dalla dimensione del file.
+"""
+
+import io
+import json
+import os
+import struct
+import zlib
+from typing import BinaryIO, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# --- Constants ---
+MAGIC = b"PSWS"
+STREAM_VERSION = 1
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+# I file della sync vengono letti da tutti i dispositivi: zlib è sempre disponibile. zstd (pacchetto
+# opzionale 'zstandard') va richiesto esplicitamente e solo se ogni dispositivo può decomprimerlo.
+DEFAULT_CODEC = CODEC_ZLIB
+CHUNK_SIZE = 64 * 1024 # Byte in chiaro (compressi) per chunk
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_METADATA_SIZE = 64 * 1024
+FILE_SALT_SIZE = 16
+TAG_SIZE = 16 # Tag di autenticazione AES-GCM in coda a ogni chunk
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+DECOMPRESS_STEP = 256 * 1024 # Output massimo per singola chiamata al decompressore
+FILE_KEY_INFO = b"PsW sealed stream file key v1"
+
+_HEADER = struct.Struct(">4sBBI16sI")
+_NONCE = struct.Struct(">7xIB") # 7 byte a zero | contatore del chunk | flag ultimo chunk
+
+
+class SealedStreamError(Exception):
+    """File non valido, troncato, manomesso o cifrato con un'altra chiave."""
+
+
+def is_sealed(data: bytes) -> bool:
+    """True se i byte iniziano con l'header di un file cifrato da questo modulo."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def seal_stream(source: BinaryIO, target: BinaryIO, key: bytes, metadata: Optional[dict] = None,
+                codec: int = DEFAULT_CODEC, chunk_size: int = CHUNK_SIZE, file_salt: Optional[bytes] = None) -> int:
+    """
+    Comprime e cifra il contenuto di source scrivendolo in target.
+
+    Args:
+        key: Chiave di sync (32 byte, vedi crypto.derive_sync_stream_key).
+        metadata: Dizionario JSON scritto in chiaro nell'header (autenticato).
+        file_salt: Salt del file; casuale se None. Un salt derivato dal contenuto rende l'output deterministico.
+
+    Returns:
+        Byte scritti in target.
+    """
+    if codec == CODEC_ZSTD and not ZSTD_AVAILABLE:
+        raise SealedStreamError("zstd compression requested but 'zstandard' is not installed")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise SealedStreamError(f"Invalid chunk size {chunk_size}")
+    file_salt = file_salt or os.urandom(FILE_SALT_SIZE)
+    meta = json.dumps(metadata or {}, separators=(',', ':')).encode('utf-8')
+    if len(file_salt) != FILE_SALT_SIZE or len(meta) > MAX_METADATA_SIZE:
+        raise SealedStreamError("Invalid file salt or metadata too large")
+    header = _HEADER.pack(MAGIC, STREAM_VERSION, codec, chunk_size, file_salt, len(meta)) + meta
+    target.write(header)
+
+    writer = _ChunkWriter(target, AESGCM(_file_key(key, file_salt)), header, chunk_size)
+    compress, flush = _compressor(codec)
+    while True:
+        block = source.read(chunk_size)
+        if not block:
+            break
+        writer.write(compress(block))
+    writer.write(flush())
+    writer.close()
+    return len(header) + writer.written
+
+
+def open_stream(source: BinaryIO, target: BinaryIO, key: bytes) -> dict:
+    """
+    Verifica, decifra e decomprime source scrivendo il contenuto in target.
+
+    Returns:
+        I metadati dell'header.
+
+    Raises:
+        SealedStreamError: file non valido, manomesso, troncato o chiave sbagliata.
+    """
+    header, codec, chunk_size, file_salt, metadata = _read_header(source)
+    aead = AESGCM(_file_key(key, file_salt))
+    decompressor = _Decompressor(codec, target)
+    counter = 0
+    pending = source.read(chunk_size + TAG_SIZE)
+    while True:
+        following = source.read(chunk_size + TAG_SIZE)
+        last = not following
+        try:
+            plain = aead.decrypt(_NONCE.pack(counter, 1 if last else 0), pending, header)
+        except InvalidTag as e:
+            raise SealedStreamError(f"Chunk {counter} failed authentication (wrong key, tampered or truncated file)") from e
+        decompressor.write(plain)
+        if last:
+            break
+        pending = following
+        counter += 1
+    decompressor.finish()
+    return metadata
+
+
+def read_metadata(source: BinaryIO) -> dict:
+    """Metadati dell'header, senza decifrare (non ancora autenticati)."""
+    return _read_header(source)[4]
+
+
+def seal_bytes(data: bytes, key: bytes, metadata: Optional[dict] = None, **options) -> bytes:
+    target = io.BytesIO()
+    seal_stream(io.BytesIO(data), target, key, metadata, **options)
+    return target.getvalue()
+
+
+def open_bytes(data: bytes, key: bytes) -> Tuple[dict, bytes]:
+    """(metadati, contenuto) di un file cifrato tenuto in memoria."""
+    target = io.BytesIO()
+    metadata = open_stream(io.BytesIO(data), target, key)
+    return metadata, target.getvalue()
+
+
+# --- Helpers ---
+def _file_key(key: bytes, file_salt: bytes) -> bytes:
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=file_salt, info=FILE_KEY_INFO).derive(key)
+
+
+def _read_header(source: BinaryIO) -> Tuple[bytes, int, int, bytes, dict]:
+    fixed = source.read(_HEADER.size)
+    if len(fixed) < _HEADER.size:
+        raise SealedStreamError("Truncated header")
+    magic, version, codec, chunk_size, file_salt, meta_length = _HEADER.unpack(fixed)
+    if magic != MAGIC:
+        raise SealedStreamError("Not a sealed sync file")
+    if version != STREAM_VERSION:
+        raise SealedStreamError(f"Unsupported stream version {version}")
+    if codec not in (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD):
+        raise SealedStreamError(f"Unknown codec {codec}")
+    if codec == CODEC_ZSTD and not ZSTD_AVAILABLE:
+        raise SealedStreamError("File compressed with zstd but 'zstandard' is not installed")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE or meta_length > MAX_METADATA_SIZE:
+        raise SealedStreamError("Invalid header")
+    meta = source.read(meta_length)
+    if len(meta) < meta_length:
+        raise SealedStreamError("Truncated header")
+    try:
+        metadata = json.loads(meta.decode('utf-8'))
+    except ValueError as e:
+        raise SealedStreamError(f"Malformed metadata: {e}") from e
+    if not isinstance(metadata, dict):
+        raise SealedStreamError("Malformed metadata")
+    return fixed + meta, codec, chunk_size, file_salt, metadata
+
+
+def _compressor(codec: int):
+    """(compress, flush) per il codec indicato."""
+    if codec == CODEC_ZLIB:
+        compressor = zlib.compressobj(ZLIB_LEVEL)
+        return compressor.compress, compressor.flush
+    if codec == CODEC_ZSTD:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        return compressor.compress, compressor.flush
+    return (lambda data: data), (lambda: b"")
+
+
+class _ChunkWriter:
+    """Divide i byte compressi in chunk di dimensione fissa e li cifra; l'ultimo viene marcato in close()."""
+
+    def __init__(self, target: BinaryIO, aead: AESGCM, header: bytes, chunk_size: int):
+        self.target = target
+        self.aead = aead
+        self.header = header
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.counter = 0
+        self.written = 0
+
+    def write(self, data: bytes):
+        self.buffer += data
+        # Un chunk pieno resta in attesa finché non arrivano altri byte: solo close() sa qual è l'ultimo
+        while len(self.buffer) > self.chunk_size:
+            self._emit(bytes(self.buffer[:self.chunk_size]), last=False)
+            del self.buffer[:self.chunk_size]
+
+    def close(self):
+        self._emit(bytes(self.buffer), last=True)
+        self.buffer = bytearray()
+
+    def _emit(self, chunk: bytes, last: bool):
+        if self.counter > 0xFFFFFFFF:
+            raise SealedStreamError("Stream too long")
+        sealed = self.aead.encrypt(_NONCE.pack(self.counter, 1 if last else 0), chunk, self.header)
+        self.target.write(sealed)
+        self.written += len(sealed)
+        self.counter += 1
+
+
+class _Decompressor:
+    """Decomprime scrivendo in target a pezzi limitati (anche per dati molto comprimibili)."""
+
+    def __init__(self, codec: int, target: BinaryIO):
+        self.codec = codec
+        self.target = target
+        if codec == CODEC_ZLIB:
+            self.zlib = zlib.decompressobj()
+        elif codec == CODEC_ZSTD:
+            self.zstd = zstandard.ZstdDecompressor().stream_writer(target, write_size=DECOMPRESS_STEP, closefd=False)
+
+    def write(self, data: bytes):
+        try:
+            if self.codec == CODEC_ZLIB:
+                while data:
+                    self.target.write(self.zlib.decompress(data, DECOMPRESS_STEP))
+                    data = self.zlib.unconsumed_tail
+            elif self.codec == CODEC_ZSTD:
+                self.zstd.write(data)
+            else:
+                self.target.write(data)
+        except zlib.error as e:
+            raise SealedStreamError(f"Corrupt compressed data: {e}") from e
+        except Exception as e:
+            if ZSTD_AVAILABLE and isinstance(e, zstandard.ZstdError):
+                raise SealedStreamError(f"Corrupt compressed data: {e}") from e
+            raise
+
+    def finish(self):
+        if self.codec == CODEC_ZLIB:
+            self.target.write(self.zlib.flush())
+            if not self.zlib.eof:
+                raise SealedStreamError("Truncated compressed data")
+        elif self.codec == CODEC_ZSTD:
+            self.zstd.flush()
@@ -0,0 +1,187 @@
+"""
+Benchmark della sincronizzazione delta su un backend di storage qualsiasi.
+
+    python -m src.utils.sync_benchmark                       # finto Drive in memoria (latenza e quote simulate)
+    python -m src.utils.sync_benchmark --backend local --path /mnt/nas/psw-bench
+    python -m src.utils.sync_benchmark --profiles 2000 --credentials 4 --latency 0
+
+Crea due database temporanei (dispositivi A e B), genera profili e credenziali su
+A e misura, per ogni fase, tempo, richieste allo storage e byte trasferiti:
+prima sincronizzazione di A (push di tutto), di B (pull di tutto), una modifica
+singola propagata da A a B e una sincronizzazione senza modifiche.
+
+run_benchmark() accetta un qualsiasi StorageBackend, quindi anche GoogleDriveBackend
+(sync_manager.py) con un servizio Drive già autenticato.
+
+    python -m src.utils.sync_benchmark --check-clock-skew
+
+esegue invece un controllo di regressione: un dispositivo con l'orologio avanti di
+giorni non deve imporre le proprie modifiche a quelle successive degli altri.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+from ..core.database_manager import DatabaseManager
+from .hlc import HybridLogicalClock, MAX_FORWARD_DRIFT_MS, format_hlc, is_far_future
+from .sync_engine import DeltaSyncEngine
+from .sync_storage import CountingBackend, FakeDriveBackend, LocalDirectoryBackend, StorageBackend
+
+BENCHMARK_PASSWORD = "benchmark-master-password"
+BENCHMARK_SALT = b"psw-benchmark-16" # 16 byte, come il salt della master password
+
+
+def run_benchmark(backend: StorageBackend, profiles: int = 500, credentials_per_profile: int = 4,
+                  work_dir: str = None) -> List[Dict[str, float]]:
+    """
+    Esegue le fasi del benchmark sul backend dato (che dovrebbe essere vuoto).
+
+    Returns:
+        Una riga per fase: {'phase', 'seconds', 'list', 'get', 'put', 'delete', 'bytes_up', 'bytes_down', ...statistiche sync}
+    """
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="psw-sync-bench-")
+    store = CountingBackend(backend)
+    device_a = DatabaseManager(os.path.join(work_dir, "a", "bench.db"))
+    device_b = DatabaseManager(os.path.join(work_dir, "b", "bench.db"))
+    try:
+        conn = device_a.get_connection()
+        conn.execute("BEGIN")
+        first_credential = None
+        for i in range(profiles):
+            profile_id = device_a.add_profile({'name': f"Profile {i}", 'email': f"user{i}@example.com", 'password': ''},
+                                              BENCHMARK_PASSWORD, BENCHMARK_SALT)
+            for j in range(credentials_per_profile):
+                credential_id = device_a.add_credential({'profile_id': profile_id, 'app_name': f"app{j}.example.com",
+                                                         'username': f"user{i}", 'notes': f"note {i}/{j}"},
+                                                        BENCHMARK_PASSWORD, BENCHMARK_SALT)
+                first_credential = first_credential or credential_id
+        conn.execute("COMMIT")
+
+        def engine(device: DatabaseManager) -> DeltaSyncEngine:
+            return DeltaSyncEngine(device.db_path, store, BENCHMARK_PASSWORD, BENCHMARK_SALT, device.clock)
+
+        results = []
+        def phase(label: str, device: DatabaseManager):
+            store.reset()
+            start = time.perf_counter()
+            stats = engine(device).sync()
+            row = {'phase': label, 'seconds': time.perf_counter() - start, **store.calls,
+                   'bytes_up': store.bytes_uploaded, 'bytes_down': store.bytes_downloaded}
+            row.update({f"sync_{key}": value for key, value in stats.items()})
+            results.append(row)
+
+        phase("initial push (A)", device_a)
+        phase("initial pull (B)", device_b)
+        if first_credential:
+            device_a.update_credential(first_credential, {'username': 'changed'}, BENCHMARK_PASSWORD, BENCHMARK_SALT)
+        phase("single edit push (A)", device_a)
+        phase("single edit pull (B)", device_b)
+        phase("idle sync (B)", device_b)
+        return results
+    finally:
+        device_a.close()
+        device_b.close()
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def check_clock_skew(backend: StorageBackend, work_dir: str = None) -> List[str]:
+    """
+    Dispositivo B con l'orologio tre giorni avanti: A non deve applicarne le modifiche (blocchi
+    in sospeso, non saltati) e le proprie modifiche successive devono restare, sincronizzazione
+    dopo sincronizzazione.
+
+    Returns:
+        Descrizione dei controlli falliti (vuota se tutto va bene).
+    """
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="psw-sync-skew-")
+    device_a = DatabaseManager(os.path.join(work_dir, "a", "skew.db"))
+    device_b = DatabaseManager(os.path.join(work_dir, "b", "skew.db"))
+    failures = []
+    try:
+        def sync(device: DatabaseManager):
+            DeltaSyncEngine(device.db_path, backend, BENCHMARK_PASSWORD, BENCHMARK_SALT, device.clock).sync()
+
+        def profile_row(device: DatabaseManager):
+            return device.get_connection().execute("SELECT id, name, sync_hlc FROM profiles").fetchone()
+
+        device_a.add_profile({'name': 'original', 'password': ''}, BENCHMARK_PASSWORD, BENCHMARK_SALT)
+        sync(device_a)
+        sync(device_b)
+        skew_ms = 3 * MAX_FORWARD_DRIFT_MS
+        device_b.clock = HybridLogicalClock(device_b.device_id,
+                                            format_hlc(int(time.time() * 1000) + skew_ms, 0, device_b.device_id))
+        device_b.update_profile(profile_row(device_b)['id'], {'name': 'fromB'}, BENCHMARK_PASSWORD, BENCHMARK_SALT)
+        sync(device_b)
+        sync(device_a)
+        if profile_row(device_a)['name'] != 'original':
+            failures.append("A applied a change stamped far in the future")
+        device_a.update_profile(profile_row(device_a)['id'], {'name': 'fromA-later'}, BENCHMARK_PASSWORD, BENCHMARK_SALT)
+        for device in (device_a, device_b, device_a, device_b, device_a):
+            sync(device)
+        row = profile_row(device_a)
+        if row['name'] != 'fromA-later':
+            failures.append(f"A's later edit was overwritten (A has {row['name']!r})")
+        if is_far_future(row['sync_hlc']):
+            failures.append("A stores a timestamp far in the future")
+        held = device_a.get_connection().execute("SELECT last_seq FROM sync_peers WHERE device_id = ?",
+                                                 (device_b.device_id,)).fetchone()
+        if held is not None and held['last_seq'] > 0:
+            failures.append("B's far-future batch was skipped instead of being held")
+        return failures
+    finally:
+        device_a.close()
+        device_b.close()
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def format_results(backend_name: str, results: List[Dict[str, float]]) -> str:
+    lines = [f"[SyncBenchmark] Backend: {backend_name}",
+             f"[SyncBenchmark]   {'phase':<22} {'time':>8} {'list':>5} {'get':>5} {'put':>5} {'del':>5} {'up KB':>9} {'down KB':>9}"]
+    for row in results:
+        lines.append(f"[SyncBenchmark]   {row['phase']:<22} {row['seconds']:7.2f}s {row['list']:>5} {row['get']:>5} "
+                     f"{row['put']:>5} {row['delete']:>5} {row['bytes_up'] / 1024:9.1f} {row['bytes_down'] / 1024:9.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della sincronizzazione delta.")
+    parser.add_argument('--backend', choices=('fake', 'local'), default='fake')
+    parser.add_argument('--path', help="Cartella per il backend 'local' (verrà usata una sottocartella nuova)")
+    parser.add_argument('--profiles', type=int, default=500)
+    parser.add_argument('--credentials', type=int, default=4, help="Credenziali per profilo")
+    parser.add_argument('--latency', type=float, default=0.08, help="Latenza per richiesta del finto Drive (s)")
+    parser.add_argument('--check-clock-skew', action='store_true', help="Controllo di regressione con un orologio sbagliato")
+    args = parser.parse_args()
+
+    if args.check_clock_skew:
+        failures = check_clock_skew(FakeDriveBackend(latency=0))
+        for failure in failures:
+            print(f"[SyncBenchmark] FAILED: {failure}")
+        print("[SyncBenchmark] Clock skew check " + ("failed." if failures else "passed."))
+        raise SystemExit(1 if failures else 0)
+
+    if args.backend == 'local':
+        if not args.path:
+            parser.error("--path is required with --backend local")
+        root = os.path.join(args.path, f"psw-sync-bench-{int(time.time())}")
+        backend = LocalDirectoryBackend(root)
+    else:
+        root = None
+        backend = FakeDriveBackend(latency=args.latency)
+    try:
+        print(format_results(backend.name, run_benchmark(backend, args.profiles, args.credentials)))
+    finally:
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,897 @@
+"""
+Motore di sincronizzazione delta a livello di record.
+
+Invece di caricare l'intero database, ogni dispositivo scrive sullo storage remoto
+solo i record cambiati dall'ultima sincronizzazione (profili, credenziali e
+impostazioni condivise), come piccoli blocchi di modifiche numerati:
+
+    delta-<device_id>-<seq>.json
+
+Ogni record porta un sync_id stabile (uguale su tutti i dispositivi) e un timestamp
+HLC (hybrid logical clock, vedi hlc.py) per il record e per ogni campo; le
+cancellazioni viaggiano come tombstone con il proprio timestamp. In ricezione il
+merge è deterministico: per ogni campo vince il timestamp maggiore (last writer
+wins per campo), quindi modifiche concorrenti a campi diversi si combinano, e una
+cancellazione prevale solo sulle modifiche precedenti. L'applicazione è
+idempotente e l'ordine di arrivo dei blocchi non conta. Le modifiche concorrenti
+a campi segreti (password, note) vengono registrate in sync_conflicts.
+
+Ogni file (blocchi, snapshot, backup) viene compresso e cifrato a chunk con una
+chiave derivata dalla master password (sealed_stream.py): i dispositivi che
+condividono un archivio devono usare la stessa master password e lo stesso salt
+(i metadati in chiaro del file riportano un'impronta del salt per rilevarlo).
+
+Oltre ai blocchi, ogni dispositivo pubblica periodicamente l'albero di Merkle dei
+propri record (merkle-<device_id>-<ms>-<blocchi visti>-<radice>.json, vedi
+merkle_index.py): se la radice nel nome coincide con quella locale le repliche
+sono allineate senza scaricare nulla; altrimenti, quando entrambe hanno visto
+tutti i blocchi dell'altra, le partizioni diverse vengono reinviate
+(anti-entropia). Il numero di blocchi visti nel nome basta a scartare senza
+download gli snapshot rimasti indietro rispetto allo storage.
+
+Al massimo una volta al giorno, se i dati sono cambiati, ogni dispositivo carica
+anche un backup completo del proprio database: una copia consistente ottenuta con
+l'API di backup di SQLite (db_snapshot.py), mai il file in uso, divisa in chunk
+definiti dal contenuto e deduplicata (chunked_backup.py): vengono caricati solo i
+chunk che lo storage non ha già, e restano le ultime versioni di ogni dispositivo.
+
+Una sincronizzazione in cui non è cambiato niente, né in locale (high-water mark del
+change_log rispetto alla fine dell'ultima sincronizzazione) né sullo storage (impronta
+dei nomi elencati), si ferma dopo il listing: nessun upload, nessun download.
+
+Il motore usa una propria connessione SQLite: viene eseguito nel thread di sync,
+mentre la connessione principale appartiene al thread della UI.
+"""
+
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..core.database_manager import SYNCED_SETTINGS, SYNC_FIELDS
+from .crypto import decrypt_data, derive_sync_stream_key
+from .hlc import (HybridLogicalClock, MAX_COUNTER, format_hlc, hlc_device, is_far_future, field_stamps,
+                  compact_field_stamps, decode_field_stamps, encode_field_stamps)
+from .merkle_index import MerkleIndex, MerkleSnapshot, SETTINGS_PARTITION
+from .db_snapshot import database_snapshot
+from .chunked_backup import ChunkedBackup
+from .sealed_stream import SealedStreamError, is_sealed, open_bytes, read_metadata, seal_bytes
+from .sync_storage import RemoteObject, StorageBackend, StorageError, PreconditionFailed
+
+# --- Constants ---
+# 2: timestamp HLC per record e per campo. 3: file compressi e cifrati a chunk (sealed_stream.py).
+# I file dei formati 1 e 2 (envelope JSON con payload Fernet) restano leggibili.
+SYNC_FORMAT_VERSION = 3
+BATCH_NAME_PATTERN = re.compile(r"^delta-([0-9a-f]+)-(\d+)\.json$")
+# Il numero di blocchi visti manca negli snapshot delle versioni precedenti
+SNAPSHOT_NAME_PATTERN = re.compile(r"^merkle-([0-9a-f]+)-(\d+)-(?:(\d+)-)?([0-9a-f]+)\.json$")
+SNAPSHOT_ROOT_PREFIX = 16 # Cifre della radice riportate nel nome dello snapshot
+MERKLE_PUBLISH_INTERVAL_SECONDS = 3600 # Al massimo uno snapshot dell'albero all'ora (e solo se lo stato è cambiato)
+DATABASE_BACKUP_INTERVAL_SECONDS = 24 * 3600 # Al massimo un backup completo del database al giorno (e solo se i dati sono cambiati)
+SYNC_DB_TIMEOUT = 10.0 # Attesa del lock SQLite se la connessione principale sta scrivendo
+SYNC_CHANGE_CONSUMER = 'delta_sync' # Posizione nel change_log alla fine dell'ultima sincronizzazione completa
+
+# Campi scambiati per tipo di record (encrypted_password resta cifrata: viaggia così com'è).
+# Il merge avviene sui campi di SYNC_FIELDS; i timestamp di creazione/modifica servono solo ai nuovi record.
+PROFILE_SYNC_FIELDS = SYNC_FIELDS['profiles'] + ('created_at', 'updated_at')
+CREDENTIAL_SYNC_FIELDS = SYNC_FIELDS['credentials'] + ('created_at', 'updated_at')
+RECORD_TABLES = {'profile': 'profiles', 'credential': 'credentials'}
+RECORD_ORDER = {'profile': 0, 'credential': 1, 'setting': 2} # Profili prima delle credenziali che li referenziano
+
+
+def batch_name(device_id: str, seq: int) -> str:
+    return f"delta-{device_id}-{seq:010d}.json"
+
+
+def parse_batch_name(name: str) -> Optional[Tuple[str, int]]:
+    """(device_id, seq) dal nome di un blocco, o None se il file non è un blocco di modifiche."""
+    match = BATCH_NAME_PATTERN.match(name)
+    return (match.group(1), int(match.group(2))) if match else None
+
+
+def snapshot_name(device_id: str, created_ms: int, seen: int, root: str) -> str:
+    """seen: blocchi coperti dallo snapshot (i propri inviati più quelli applicati di ogni altro dispositivo)."""
+    return f"merkle-{device_id}-{created_ms:013d}-{seen}-{root[:SNAPSHOT_ROOT_PREFIX]}.json"
+
+
+def parse_snapshot_name(name: str) -> Optional[Tuple[str, int, Optional[int], str]]:
+    """(device_id, timestamp ms, blocchi visti o None, prefisso radice) dal nome di uno snapshot Merkle, o None."""
+    match = SNAPSHOT_NAME_PATTERN.match(name)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2)), int(match.group(3)) if match.group(3) else None, match.group(4)
+
+
+def legacy_backup_name(device_id: str) -> str:
+    """Backup in un file unico delle versioni precedenti (eliminato dopo il primo backup a chunk)."""
+    return f"backup-{device_id}.db"
+
+
+def salt_id(salt: bytes) -> str:
+    """Impronta (non segreta) del salt: due archivi con salt diversi non possono scambiarsi blocchi."""
+    return hashlib.sha256(salt).hexdigest()[:16]
+
+
+def record_stamp(record: dict) -> str:
+    """Timestamp HLC di un record ricevuto."""
+    stamp = record.get('h')
+    if stamp is None:
+        # Formato 1: solo (versione, dispositivo), ordinati prima di qualsiasi timestamp HLC
+        stamp = format_hlc(0, min(int(record['v']), MAX_COUNTER), record['d'])
+    return stamp
+
+
+class DeltaSyncEngine:
+    """
+    Scambia con lo storage remoto i record cambiati dall'ultima sincronizzazione.
+
+    Lo storage è un qualsiasi StorageBackend (sync_storage.py): Google Drive, una
+    cartella locale o di rete, o il finto Drive in memoria usato per i benchmark.
+    """
+
+    def __init__(self, db_path: str, store: StorageBackend, master_password: str, salt: bytes,
+                 clock: Optional[HybridLogicalClock] = None):
+        self.db_path = db_path
+        self.store = store
+        self.master_password = master_password
+        self.salt = salt
+        self.clock = clock # Orologio del DatabaseManager; se assente viene ricostruito dal database
+        self._stream_key: Optional[bytes] = None # Chiave dei file cifrati (derivata alla prima richiesta)
+        self.conn: Optional[sqlite3.Connection] = None
+        self.device_id: Optional[str] = None
+        self.applied_settings: Dict[str, str] = {} # Impostazioni condivise cambiate da altri dispositivi (ultima sync)
+        self._remote_names: List[str] = [] # Listing dello storage (uno per sincronizzazione)
+        self._remote_objects: Dict[str, RemoteObject] = {} # Lo stesso listing per nome (chunk e manifest dei backup)
+        self._listed = False # True dopo il listing (anche se fallito)
+        self._listed_ok = False
+        self._cycle_complete = False # _sync_steps arrivato in fondo
+        self._retry_needed = False # Qualcosa è rimasto in sospeso (blocchi non applicati, snapshot rimandato o fallito)
+        self._batch_settings: Dict[str, str] = {} # Impostazioni del blocco in corso (confermate solo se il blocco va a buon fine)
+
+    # --- API ---
+    def sync(self) -> Dict[str, int]:
+        """
+        Esegue una sincronizzazione completa: prima applica i blocchi remoti, poi invia le modifiche locali.
+
+        Returns:
+            Statistiche: {'pulled': blocchi applicati, 'applied': record applicati,
+                          'pushed': record inviati, 'bytes_uploaded': byte caricati,
+                          'repaired': partizioni reinviate dall'anti-entropia,
+                          'idle': 1 se niente era cambiato e la sincronizzazione è stata saltata}
+        """
+        stats = {'pulled': 0, 'applied': 0, 'pushed': 0, 'bytes_uploaded': 0, 'repaired': 0, 'idle': 0}
+        self.conn = sqlite3.connect(self.db_path, timeout=SYNC_DB_TIMEOUT, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        try:
+            self.device_id = self._get_setting('sync_device_id')
+            if not self.device_id:
+                print("[DeltaSyncEngine] Device ID missing (database not initialized). Sync aborted.")
+                return stats
+            if self.clock is None:
+                rows = self._fetchall("""SELECT MAX(stamp) AS last_stamp FROM (
+                                           SELECT MAX(sync_hlc) AS stamp FROM profiles UNION ALL SELECT MAX(sync_hlc) FROM credentials
+                                           UNION ALL SELECT MAX(sync_hlc) FROM sync_tombstones UNION ALL SELECT MAX(sync_hlc) FROM sync_setting_versions)""")
+                self.clock = HybridLogicalClock(self.device_id, rows[0]['last_stamp'])
+            # Stato del backend conservato tra le sincronizzazioni (es. cache degli ID dei file su Drive)
+            state_key = f"sync_storage_state_{self.store.name}"
+            saved_state = self._get_setting(state_key)
+            if saved_state:
+                self.store.import_state(saved_state)
+            try:
+                self._sync_steps(stats)
+            finally:
+                self._finish_cycle(state_key, saved_state)
+            return stats
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    def _sync_steps(self, stats: Dict[str, int]):
+        """listing -> (niente di cambiato: fine) -> pull -> push -> anti-entropia (con eventuale reinvio) -> snapshot dell'albero -> backup."""
+        if self._list_remote() and self._is_idle():
+            print("[DeltaSyncEngine] Nothing changed locally or remotely since the last sync.")
+            stats['idle'] = 1
+            self._cycle_complete = True
+            return
+        stats['pulled'], stats['applied'] = self.pull()
+        stats['pushed'], stats['bytes_uploaded'] = self.push()
+        stats['repaired'] = self.check_divergence()
+        if stats['repaired']:
+            pushed, uploaded = self.push()
+            stats['pushed'] += pushed
+            stats['bytes_uploaded'] += uploaded
+        stats['bytes_uploaded'] += self.publish_snapshot()
+        stats['bytes_uploaded'] += self.publish_database_backup()
+        self._cycle_complete = True
+
+    def push(self) -> Tuple[int, int]:
+        """Invia le modifiche locali non ancora sincronizzate come un unico blocco. Restituisce (record, byte)."""
+        records, sent = self._collect_pending()
+        if not records:
+            print("[DeltaSyncEngine] No local changes to push.")
+            return 0, 0
+        payload = json.dumps({'records': records}, separators=(',', ':'), ensure_ascii=False)
+        data = self._envelope(payload, len(records))
+        if data is None:
+            print("[DeltaSyncEngine] Could not encrypt change batch. Push aborted.")
+            return 0, 0
+        # Il numero di blocco è riservato prima dell'upload: un tentativo fallito lascia un buco, mai un nome riusato
+        seq = int(self._get_setting('sync_push_seq') or 0) + 1
+        self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('sync_push_seq', ?)", (str(seq),))
+        name = batch_name(self.device_id, seq)
+        try:
+            self.store.put(name, data, if_none_match=True) # Un blocco pubblicato non viene mai sovrascritto
+        except PreconditionFailed:
+            print(f"[DeltaSyncEngine] Batch {name} already exists (sequence restored from an old backup?). Changes stay pending.")
+            return 0, 0
+        except StorageError as e:
+            print(f"[DeltaSyncEngine] Upload of {name} failed: {e}. Changes stay pending.")
+            return 0, 0
+        self._remote_names.append(name)
+
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            # Solo se il record non è cambiato di nuovo nel frattempo (il timestamp sarebbe più alto)
+            for table, rows in sent.items():
+                if table == 'sync_setting_versions':
+                    cursor.executemany("UPDATE sync_setting_versions SET sync_pending = 0 WHERE key = ? AND sync_hlc = ?", rows)
+                elif table == 'sync_tombstones':
+                    cursor.executemany("UPDATE sync_tombstones SET sync_pending = 0 WHERE sync_id = ? AND sync_hlc = ?", rows)
+                else:
+                    # Valori inviati: la base dei campi segreti diventa quella appena pubblicata
+                    cursor.executemany(f"""UPDATE {table} SET sync_pending = 0, sync_base_field_hlc = NULL
+                                            WHERE sync_id = ? AND sync_hlc = ?""", rows)
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Il blocco è già remoto: al prossimo giro i record verranno reinviati (l'applicazione è idempotente)
+            print(f"[DeltaSyncEngine] Error marking pushed records: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+        finally:
+            cursor.close()
+        print(f"[DeltaSyncEngine] Pushed {len(records)} records as {name} ({len(data)} bytes).")
+        return len(records), len(data)
+
+    def pull(self) -> Tuple[int, int]:
+        """Applica i blocchi degli altri dispositivi non ancora visti. Restituisce (blocchi, record applicati)."""
+        peers = {row['device_id']: row['last_seq'] for row in self._fetchall("SELECT device_id, last_seq FROM sync_peers")}
+        incoming = []
+        if not self._listed:
+            self._list_remote()
+        for name in self._remote_names:
+            parsed = parse_batch_name(name)
+            if not parsed or parsed[0] == self.device_id:
+                continue
+            if parsed[1] > peers.get(parsed[0], 0):
+                incoming.append((parsed[0], parsed[1], name))
+        incoming.sort()
+
+        # Download e decifratura prima della transazione: il lock in scrittura non resta aperto durante la rete
+        downloaded = []
+        blocked_devices = set()
+        for device, seq, name in incoming:
+            if device in blocked_devices:
+                continue # Un blocco precedente non è applicabile: non saltarlo
+            records = self._read_records(name)
+            if records is None:
+                blocked_devices.add(device)
+                continue
+            future_stamp = self._far_future_stamp(records)
+            if future_stamp is not None:
+                # Vincerebbe ogni modifica successiva e l'orologio locale lo ignora: il blocco resta in sospeso
+                # finché l'ora reale non lo raggiunge (o il dispositivo non corregge l'orologio)
+                print(f"[DeltaSyncEngine] Batch {name} has a timestamp far in the future ({future_stamp}). "
+                      f"Changes from device {device} are on hold.")
+                blocked_devices.add(device)
+                continue
+            downloaded.append((device, seq, records))
+        if blocked_devices:
+            self._retry_needed = True # Da riprovare alla prossima sincronizzazione anche se nient'altro cambia
+        if not downloaded:
+            return 0, 0
+
+        # Merge in un'unica transazione, un passaggio lineare sui record; un savepoint per blocco
+        batches = applied = 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            for device, seq, records in downloaded:
+                if device in blocked_devices:
+                    continue
+                self._batch_settings = {}
+                cursor.execute("SAVEPOINT sync_batch")
+                try:
+                    count = self._apply_batch(cursor, device, seq, records)
+                    cursor.execute("RELEASE sync_batch")
+                except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+                    print(f"[DeltaSyncEngine] Error applying batch {seq} from device {device}: {e}")
+                    cursor.execute("ROLLBACK TO sync_batch")
+                    cursor.execute("RELEASE sync_batch")
+                    blocked_devices.add(device)
+                    self._retry_needed = True
+                    continue
+                self.applied_settings.update(self._batch_settings)
+                batches += 1
+                applied += count
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[DeltaSyncEngine] Error merging remote changes: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            self.applied_settings = {}
+            self._retry_needed = True
+            return 0, 0
+        finally:
+            cursor.close()
+        if batches:
+            print(f"[DeltaSyncEngine] Pulled {batches} batches, applied {applied} records.")
+        return batches, applied
+
+    def check_divergence(self) -> int:
+        """
+        Confronta l'albero di Merkle locale con l'ultimo snapshot di ogni altro dispositivo.
+
+        Radici uguali (dal nome del file): nessun download. Se diverse, e se entrambe le
+        repliche hanno applicato tutti i blocchi presenti sullo storage (altrimenti la
+        differenza è solo un ritardo), le partizioni diverse vengono segnate da reinviare:
+        così si recuperano anche blocchi andati persi o non applicabili.
+        Uno snapshot che dal nome risulta indietro rispetto allo storage non viene scaricato;
+        uno confrontato davvero non viene scaricato di nuovo.
+
+        Returns:
+            Numero di partizioni locali segnate da reinviare.
+        """
+        latest: Dict[str, Tuple[int, str, Optional[int], str]] = {}
+        listed_max: Dict[str, int] = {} # Ultimo blocco presente sullo storage per dispositivo
+        for name in self._remote_names:
+            parsed = parse_snapshot_name(name)
+            if parsed and parsed[0] != self.device_id and parsed[1] > latest.get(parsed[0], (0,))[0]:
+                latest[parsed[0]] = (parsed[1], name, parsed[2], parsed[3])
+            parsed_batch = parse_batch_name(name)
+            if parsed_batch:
+                listed_max[parsed_batch[0]] = max(listed_max.get(parsed_batch[0], 0), parsed_batch[1])
+        if not latest:
+            return 0
+
+        def caught_up(positions_map: Dict[str, int], owner: str) -> bool:
+            return all(positions_map.get(device, 0) >= seq for device, seq in listed_max.items() if device != owner)
+
+        index = MerkleIndex(self.conn)
+        root = index.root_hash() or ''
+        peers = {row['device_id']: row for row in self._fetchall("SELECT device_id, last_seq, checked_snapshot FROM sync_peers")}
+        positions = {device: row['last_seq'] for device, row in peers.items()}
+        if not caught_up(positions, self.device_id):
+            return 0 # Blocchi non ancora applicati qui: nessun confronto
+        listed_total = sum(listed_max.values())
+        repaired = 0
+        for device, (_, name, seen, remote_root) in latest.items():
+            if remote_root == root[:SNAPSHOT_ROOT_PREFIX]:
+                continue # Repliche allineate
+            if device in peers and peers[device]['checked_snapshot'] == name:
+                continue
+            if seen is not None and seen < listed_total:
+                continue # Almeno un blocco sullo storage non era coperto dallo snapshot: nessun download
+            snapshot = self._read_payload(name, min_format=SYNC_FORMAT_VERSION) # Le foglie del formato 1 avevano un altro hash
+            if snapshot is None:
+                continue
+            if listed_max.get(device, 0) > snapshot.get('seq', 0):
+                continue # Snapshot più vecchio dell'ultimo blocco di quel dispositivo
+            if not caught_up(snapshot.get('peers', {}), device):
+                continue # Blocchi non ancora applicati dall'altra parte: nessun confronto
+            partitions = index.diff(MerkleSnapshot(snapshot.get('nodes', {})))
+            self._execute("""INSERT INTO sync_peers (device_id, checked_snapshot) VALUES (?, ?)
+                             ON CONFLICT (device_id) DO UPDATE SET checked_snapshot = excluded.checked_snapshot""", (device, name))
+            if partitions:
+                print(f"[DeltaSyncEngine] Replica diverges from device {device} in {len(partitions)} partitions. Re-sending them.")
+                repaired += self._mark_partitions_pending(partitions)
+        return repaired
+
+    def publish_snapshot(self) -> int:
+        """Pubblica l'albero di Merkle locale se lo stato è cambiato e l'ultimo snapshot è più vecchio dell'intervallo. Restituisce i byte caricati."""
+        index = MerkleIndex(self.conn)
+        nodes = index.snapshot()
+        root = nodes.get('')
+        if root is None:
+            return 0
+        push_seq = int(self._get_setting('sync_push_seq') or 0)
+        positions = {row['device_id']: row['last_seq'] for row in self._fetchall("SELECT device_id, last_seq FROM sync_peers")}
+        state = json.dumps([root, push_seq, sorted(positions.items())])
+        now = time.time()
+        if state == self._get_setting('merkle_published_state'):
+            return 0
+        if now - float(self._get_setting('merkle_published_at') or 0) < MERKLE_PUBLISH_INTERVAL_SECONDS:
+            self._retry_needed = True # Rimandato: la prossima sincronizzazione non va saltata
+            return 0
+        payload = json.dumps({'seq': push_seq, 'peers': positions, 'nodes': nodes}, separators=(',', ':'))
+        data = self._envelope(payload, len(nodes))
+        if data is None:
+            return 0
+        name = snapshot_name(self.device_id, int(now * 1000), push_seq + sum(positions.values()), root)
+        try:
+            self.store.put(name, data, if_none_match=True)
+        except StorageError as e:
+            print(f"[DeltaSyncEngine] Upload of Merkle snapshot {name} failed: {e}")
+            self._retry_needed = True
+            return 0
+        self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('merkle_published_state', ?)", (state,))
+        self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('merkle_published_at', ?)", (str(now),))
+        # Gli snapshot precedenti di questo dispositivo non servono più
+        for old_name in list(self._remote_names):
+            parsed = parse_snapshot_name(old_name)
+            if parsed and parsed[0] == self.device_id:
+                try:
+                    self.store.delete(old_name)
+                    self._remote_names.remove(old_name)
+                except StorageError as e:
+                    print(f"[DeltaSyncEngine] Could not delete old Merkle snapshot {old_name}: {e}")
+        self._remote_names.append(name)
+        print(f"[DeltaSyncEngine] Published Merkle snapshot {name} ({len(nodes)} nodes, {len(data)} bytes).")
+        return len(data)
+
+    # --- Idle detection ---
+    def _list_remote(self) -> bool:
+        """Elenca lo storage (una volta per sincronizzazione). False se non è raggiungibile."""
+        self._listed = True
+        try:
+            self._remote_objects = {remote.name: remote for remote in self.store.list()}
+            self._remote_names = list(self._remote_objects)
+        except StorageError as e:
+            print(f"[DeltaSyncEngine] Could not list remote storage: {e}")
+            self._remote_objects = {}
+            self._remote_names = []
+            self._listed_ok = False
+            return False
+        self._listed_ok = True
+        return True
+
+    def _remote_fingerprint(self) -> str:
+        # Blocchi e snapshot non vengono mai riscritti (put con if_none_match): i nomi identificano il contenuto
+        return hashlib.sha256("\n".join(sorted(self._remote_names)).encode('utf-8')).hexdigest()
+
+    def _change_log_high_water(self) -> int:
+        rows = self._fetchall("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        return rows[0]['seq'] if rows else 0
+
+    def _is_idle(self) -> bool:
+        """
+        True se dalla fine dell'ultima sincronizzazione completa non è cambiato niente:
+        né in locale (high-water mark del change_log) né sullo storage (impronta del listing).
+        """
+        due_at = self._get_setting('db_backup_due_at')
+        if due_at and time.time() >= float(due_at):
+            return False # Backup del database rimandato, ora dovuto
+        rows = self._fetchall("SELECT last_seq FROM change_log_consumers WHERE name = ?", (SYNC_CHANGE_CONSUMER,))
+        if not rows or rows[0]['last_seq'] != self._change_log_high_water():
+            return False
+        return self._get_setting('sync_remote_fingerprint') == self._remote_fingerprint()
+
+    def _finish_cycle(self, state_key: str, saved_state: Optional[str]):
+        """
+        Salva lo stato del backend e, se non resta niente in sospeso, la posizione nel change_log
+        e l'impronta dello storage con cui la prossima sincronizzazione può essere saltata.
+
+        Transazione IMMEDIATE: nessuna scrittura della UI può inserirsi tra il controllo dei
+        record da inviare e il salvataggio della posizione.
+        """
+        state = self.store.export_state()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            if state is not None and state != saved_state:
+                cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (state_key, state))
+            cursor.execute("""SELECT EXISTS (SELECT 1 FROM profiles WHERE sync_pending = 1)
+                                  OR EXISTS (SELECT 1 FROM credentials WHERE sync_pending = 1)
+                                  OR EXISTS (SELECT 1 FROM sync_tombstones WHERE sync_pending = 1)
+                                  OR EXISTS (SELECT 1 FROM sync_setting_versions WHERE sync_pending = 1)""")
+            pending = cursor.fetchone()[0]
+            if self._cycle_complete and not self._retry_needed and self._listed_ok and not pending:
+                cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('sync_remote_fingerprint', ?)",
+                               (self._remote_fingerprint(),))
+                cursor.execute("""INSERT INTO change_log_consumers (name, last_seq) VALUES (?, ?)
+                                  ON CONFLICT (name) DO UPDATE SET last_seq = excluded.last_seq""",
+                               (SYNC_CHANGE_CONSUMER, self._change_log_high_water()))
+            else:
+                # Reinvii segnati dall'anti-entropia non passano dal change_log: la prossima sync non va saltata
+                cursor.execute("DELETE FROM change_log_consumers WHERE name = ?", (SYNC_CHANGE_CONSUMER,))
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[DeltaSyncEngine] Error saving sync state: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+        finally:
+            cursor.close()
+
+    def publish_database_backup(self) -> int:
+        """
+        Carica un backup completo del database (snapshot consistente, vedi db_snapshot.py) se i dati
+        sincronizzati sono cambiati dall'ultimo backup e questo è più vecchio dell'intervallo.
+        Restituisce i byte caricati.
+        """
+        root = MerkleIndex(self.conn).root_hash() or ''
+        if root == (self._get_setting('db_backup_root') or ''):
+            return 0
+        now = time.time()
+        due_at = float(self._get_setting('db_backup_at') or 0) + DATABASE_BACKUP_INTERVAL_SECONDS
+        if now < due_at:
+            # Rimandato: la prossima sincronizzazione senza modifiche non va saltata dopo questo istante
+            self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('db_backup_due_at', ?)", (str(due_at),))
+            return 0
+        if not self._listed:
+            self._list_remote()
+        key = self._get_stream_key()
+        if key is None or not self._listed_ok:
+            # Senza listing non si sa quali chunk ha già lo storage
+            self._retry_needed = True
+            return 0
+        backup = ChunkedBackup(self.store, key, self.device_id, self._file_metadata(0))
+        listed = set(self._remote_objects)
+        try:
+            with database_snapshot(self.db_path) as snapshot_path, open(snapshot_path, 'rb') as source:
+                name, backup_stats = backup.upload(source, self._remote_objects)
+        except (sqlite3.Error, OSError, StorageError, SealedStreamError) as e:
+            print(f"[DeltaSyncEngine] Database backup failed: {e}")
+            self._retry_needed = True
+            return 0
+        self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('db_backup_root', ?)", (root,))
+        self._execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('db_backup_at', ?)", (str(now),))
+        self._execute("DELETE FROM settings WHERE key = 'db_backup_due_at'")
+        print(f"[DeltaSyncEngine] Uploaded database backup {name}: {backup_stats['uploaded_chunks']} of "
+              f"{backup_stats['chunks']} chunks new ({backup_stats['bytes_uploaded']} of {backup_stats['size']} bytes).")
+
+        # Generazioni scadute e chunk non più referenziati; il backup in un file unico non serve più
+        backup.prune(self._remote_objects)
+        legacy_name = legacy_backup_name(self.device_id)
+        if legacy_name in self._remote_objects:
+            try:
+                self.store.delete(legacy_name)
+                del self._remote_objects[legacy_name]
+            except StorageError as e:
+                print(f"[DeltaSyncEngine] Could not delete legacy backup {legacy_name}: {e}")
+        current = set(self._remote_objects)
+        self._remote_names = [n for n in self._remote_names if n not in listed or n in current]
+        self._remote_names.extend(sorted(current - listed))
+        return backup_stats['bytes_uploaded']
+
+    def _mark_partitions_pending(self, partitions: List[str]) -> int:
+        """Segna da reinviare i record locali delle partizioni indicate. Restituisce quante erano presenti localmente."""
+        marked = 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            for partition in partitions:
+                if partition == SETTINGS_PARTITION:
+                    cursor.execute("UPDATE sync_setting_versions SET sync_pending = 1")
+                elif partition.startswith('t:'):
+                    cursor.execute("UPDATE sync_tombstones SET sync_pending = 1 WHERE sync_id = ?", (partition[2:],))
+                else:
+                    cursor.execute("UPDATE profiles SET sync_pending = 1 WHERE sync_id = ?", (partition[2:],))
+                    cursor.execute("""UPDATE credentials SET sync_pending = 1
+                                      WHERE profile_id = (SELECT id FROM profiles WHERE sync_id = ?)""", (partition[2:],))
+                marked += 1 if cursor.rowcount > 0 else 0
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[DeltaSyncEngine] Error marking partitions for re-send: {e}")
+            try: cursor.execute("ROLLBACK")
+            except sqlite3.Error: pass
+            return 0
+        finally:
+            cursor.close()
+        return marked
+
+    # --- Push helpers ---
+    def _collect_pending(self) -> Tuple[List[dict], Dict[str, List[Tuple]]]:
+        """Record locali da inviare e, per tabella, le coppie (chiave, versione) da marcare come inviate."""
+        records: List[dict] = []
+        sent: Dict[str, List[Tuple]] = {'profiles': [], 'credentials': [], 'sync_tombstones': [], 'sync_setting_versions': []}
+
+        columns = ', '.join(PROFILE_SYNC_FIELDS)
+        for row in self._fetchall(f"SELECT sync_id, sync_hlc, sync_field_hlc, {columns} FROM profiles WHERE sync_pending = 1"):
+            records.append(self._record('profile', row, {field: row[field] for field in PROFILE_SYNC_FIELDS}))
+            sent['profiles'].append((row['sync_id'], row['sync_hlc']))
+
+        columns = ', '.join(f"c.{field}" for field in CREDENTIAL_SYNC_FIELDS)
+        for row in self._fetchall(f"""SELECT c.sync_id, c.sync_hlc, c.sync_field_hlc, p.sync_id AS profile_sync_id, {columns}
+                                     FROM credentials c JOIN profiles p ON p.id = c.profile_id
+                                     WHERE c.sync_pending = 1"""):
+            fields = {field: row[field] for field in CREDENTIAL_SYNC_FIELDS}
+            fields['profile_sync_id'] = row['profile_sync_id']
+            records.append(self._record('credential', row, fields))
+            sent['credentials'].append((row['sync_id'], row['sync_hlc']))
+
+        for row in self._fetchall("SELECT sync_id, record_type, sync_hlc FROM sync_tombstones WHERE sync_pending = 1"):
+            records.append({'type': row['record_type'], 'id': row['sync_id'], 'h': row['sync_hlc'], 'deleted': True})
+            sent['sync_tombstones'].append((row['sync_id'], row['sync_hlc']))
+
+        for row in self._fetchall("""SELECT v.key, v.sync_hlc, s.value
+                                    FROM sync_setting_versions v JOIN settings s ON s.key = v.key
+                                    WHERE v.sync_pending = 1"""):
+            if row['key'] in SYNCED_SETTINGS:
+                records.append({'type': 'setting', 'id': row['key'], 'h': row['sync_hlc'], 'f': {'value': row['value']}})
+            sent['sync_setting_versions'].append((row['key'], row['sync_hlc']))
+        return records, sent
+
+    def _envelope(self, payload: str, count: int) -> Optional[bytes]:
+        """Comprime e cifra il payload, con i metadati in chiaro necessari al destinatario."""
+        key = self._get_stream_key()
+        if key is None:
+            return None
+        return seal_bytes(payload.encode('utf-8'), key, self._file_metadata(count))
+
+    def _file_metadata(self, count: int) -> dict:
+        return {
+            'format': SYNC_FORMAT_VERSION,
+            'device': self.device_id,
+            'created_at': time.time(),
+            'salt_id': salt_id(self.salt),
+            'count': count,
+        }
+
+    def _get_stream_key(self) -> Optional[bytes]:
+        if self._stream_key is None:
+            self._stream_key = derive_sync_stream_key(self.master_password, self.salt)
+        return self._stream_key
+
+    @staticmethod
+    def _record(record_type: str, row: sqlite3.Row, fields: dict) -> dict:
+        record = {'type': record_type, 'id': row['sync_id'], 'h': row['sync_hlc'], 'f': fields}
+        field_hlc = decode_field_stamps(row['sync_field_hlc'])
+        if field_hlc:
+            record['fh'] = field_hlc # Solo i campi più vecchi del record
+        return record
+
+    # --- Pull helpers ---
+    def _read_records(self, name: str) -> Optional[List[dict]]:
+        """Scarica e decifra un blocco remoto. None se non è leggibile (e non va saltato)."""
+        payload = self._read_payload(name)
+        if payload is None:
+            return None
+        if 'records' not in payload:
+            print(f"[DeltaSyncEngine] Malformed batch {name}: no records.")
+            return None
+        return payload['records']
+
+    def _read_payload(self, name: str, min_format: int = 1) -> Optional[dict]:
+        """Scarica, verifica e decifra un file remoto (blocco o snapshot). None se non è leggibile."""
+        try:
+            data = self.store.get(name)
+            sealed = is_sealed(data)
+            # Formato 3: metadati nell'header del file cifrato; formati 1 e 2: envelope JSON
+            envelope = read_metadata(io.BytesIO(data)) if sealed else json.loads(data.decode('utf-8'))
+        except Exception as e:
+            print(f"[DeltaSyncEngine] Could not read batch {name}: {e}")
+            return None
+        if not isinstance(envelope.get('format'), int) or not min_format <= envelope['format'] <= SYNC_FORMAT_VERSION:
+            print(f"[DeltaSyncEngine] Batch {name} has unsupported format {envelope.get('format')}.")
+            return None
+        if envelope.get('salt_id') != salt_id(self.salt):
+            print(f"[DeltaSyncEngine] Batch {name} was encrypted with a different master password salt. Skipping device.")
+            return None
+        if sealed:
+            payload = None
+            key = self._get_stream_key()
+            if key is not None:
+                try:
+                    payload = open_bytes(data, key)[1].decode('utf-8')
+                except (SealedStreamError, UnicodeDecodeError) as e:
+                    print(f"[DeltaSyncEngine] {name}: {e}")
+        else:
+            payload = decrypt_data(envelope.get('payload', ''), self.master_password, self.salt)
+        if payload is None:
+            print(f"[DeltaSyncEngine] Could not decrypt batch {name} (different master password?).")
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError as e:
+            print(f"[DeltaSyncEngine] Malformed file {name}: {e}")
+            return None
+
+    @staticmethod
+    def _far_future_stamp(records: List[dict]) -> Optional[str]:
+        """Primo timestamp (di record o di campo) troppo nel futuro per essere applicato, o None."""
+        for record in records:
+            if not isinstance(record, dict):
+                continue # Record malformato: gestito dall'applicazione del blocco
+            fields = record.get('fh')
+            stamps = [record.get('h')] + (list(fields.values()) if isinstance(fields, dict) else [])
+            for stamp in stamps:
+                if isinstance(stamp, str) and is_far_future(stamp):
+                    return stamp
+        return None
+
+    def _apply_batch(self, cursor: sqlite3.Cursor, device: str, seq: int, records: List[dict]) -> int:
+        """Applica un blocco (dentro la transazione di pull) e avanza il cursore del dispositivo. Restituisce i record applicati."""
+        # Profili, credenziali, impostazioni e infine cancellazioni: smistamento in un solo passaggio, senza ordinamento
+        buckets: Tuple[List[dict], ...] = ([], [], [], [])
+        for record in records:
+            buckets[3 if record.get('deleted') else RECORD_ORDER.get(record.get('type'), 2)].append(record)
+        applied = 0
+        for bucket in buckets:
+            for record in bucket:
+                if self._apply_record(cursor, record):
+                    applied += 1
+        cursor.execute("""INSERT INTO sync_peers (device_id, last_seq, last_pulled_at) VALUES (?, ?, ?)
+                          ON CONFLICT (device_id) DO UPDATE SET last_seq = excluded.last_seq,
+                              last_pulled_at = excluded.last_pulled_at""",
+                       (device, seq, time.time()))
+        return applied
+
+    def _apply_record(self, cursor: sqlite3.Cursor, record: dict) -> bool:
+        """Unisce un singolo record remoto con la copia locale. True se ha cambiato qualcosa."""
+        record_type, sync_id = record['type'], record['id']
+        stamp = record_stamp(record)
+        self.clock.update(stamp) # Le prossime modifiche locali verranno ordinate dopo questa
+        if record_type == 'setting':
+            return self._apply_setting(cursor, sync_id, stamp, record['f']['value'])
+        table = RECORD_TABLES.get(record_type)
+        if table is None:
+            return False
+
+        cursor.execute(f"""SELECT id, sync_hlc, sync_field_hlc, sync_base_field_hlc, sync_pending, {', '.join(SYNC_FIELDS[table])}
+                           FROM {table} WHERE sync_id = ?""", (sync_id,))
+        local = cursor.fetchone()
+        cursor.execute("SELECT sync_hlc FROM sync_tombstones WHERE sync_id = ?", (sync_id,))
+        tombstone = cursor.fetchone()
+        tombstone_stamp = (tombstone['sync_hlc'] or '') if tombstone is not None else None
+
+        if record.get('deleted'):
+            if tombstone_stamp is not None and tombstone_stamp >= stamp:
+                return False
+            if local is not None and (local['sync_hlc'] or '') > stamp:
+                return False # Modificato qui dopo la cancellazione remota: il record sopravvive
+            cursor.execute("""INSERT OR REPLACE INTO sync_tombstones (sync_id, record_type, sync_version, sync_device, deleted_at, sync_pending, sync_hlc)
+                              VALUES (?, ?, 1, ?, ?, 0, ?)""", (sync_id, record_type, hlc_device(stamp), time.time(), stamp))
+            if local is None:
+                return False
+            self._delete_local(cursor, table, local['id'])
+            return True
+
+        if local is None:
+            if tombstone_stamp is not None and tombstone_stamp >= stamp:
+                return False # Cancellato dopo l'ultima modifica del record
+            return self._insert_record(cursor, table, sync_id, stamp, record, tombstone is not None)
+        return self._merge_record(cursor, table, local, stamp, record)
+
+    def _delete_local(self, cursor: sqlite3.Cursor, table: str, row_id: int):
+        """Elimina un record locale cancellato da un altro dispositivo (e, per un profilo, le sue credenziali)."""
+        if table == 'profiles':
+            cursor.execute("SELECT id FROM credentials WHERE profile_id = ?", (row_id,))
+            credential_ids = [(row['id'],) for row in cursor.fetchall()]
+            cursor.execute("DELETE FROM credentials WHERE profile_id = ?", (row_id,))
+        else:
+            credential_ids = [(row_id,)]
+        # Dati locali derivati dalle credenziali eliminate (indice contesto, utilizzo)
+        for derived_table in ('context_index', 'credential_frecency', 'credential_usage'):
+            cursor.executemany(f"DELETE FROM {derived_table} WHERE credential_id = ?", credential_ids)
+        cursor.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+
+    def _insert_record(self, cursor: sqlite3.Cursor, table: str, sync_id: str, stamp: str, record: dict, had_tombstone: bool) -> bool:
+        fields = dict(record['f'])
+        if table == 'credentials':
+            cursor.execute("SELECT id FROM profiles WHERE sync_id = ?", (fields.pop('profile_sync_id', None),))
+            profile = cursor.fetchone()
+            if profile is None:
+                print(f"[DeltaSyncEngine] Skipping credential {sync_id}: its profile is not present.")
+                return False
+            fields['profile_id'] = profile['id']
+            allowed = CREDENTIAL_SYNC_FIELDS + ('profile_id',)
+        else:
+            allowed = PROFILE_SYNC_FIELDS
+        columns = [column for column in allowed if column in fields]
+        values = [fields[column] for column in columns]
+        # Mappa dei campi ricompattata: stessa rappresentazione su tutte le repliche
+        record_hlc, field_hlc = compact_field_stamps(field_stamps(stamp, record.get('fh') or {}, SYNC_FIELDS[table]))
+        placeholders = ', '.join('?' for _ in columns)
+        cursor.execute(f"""INSERT INTO {table} ({', '.join(columns)}, sync_id, sync_version, sync_device, sync_pending, sync_hlc, sync_field_hlc)
+                           VALUES ({placeholders}, ?, 1, ?, 0, ?, ?)""",
+                       values + [sync_id, hlc_device(record_hlc), record_hlc, field_hlc])
+        if had_tombstone:
+            cursor.execute("DELETE FROM sync_tombstones WHERE sync_id = ?", (sync_id,)) # Ricreato dopo la cancellazione
+        return True
+
+    def _merge_record(self, cursor: sqlite3.Cursor, table: str, local: sqlite3.Row, stamp: str, record: dict) -> bool:
+        """Last writer wins per campo tra la copia locale e quella remota."""
+        remote_fields = record['f']
+        local_stamps = field_stamps(local['sync_hlc'] or '', decode_field_stamps(local['sync_field_hlc']), SYNC_FIELDS[table])
+        remote_stamps = field_stamps(stamp, record.get('fh') or {}, SYNC_FIELDS[table])
+        merged = dict(local_stamps)
+        local_bases = decode_field_stamps(local['sync_base_field_hlc'])
+        bases = dict(local_bases)
+        assignments, values = [], []
+        new_password = local['encrypted_password']
+        local_wins = False
+        for field in SYNC_FIELDS[table]:
+            if field not in remote_fields:
+                continue
+            local_stamp, remote_stamp = local_stamps[field], remote_stamps[field]
+            base = bases.get(field)
+            if base is not None and remote_stamp > base:
+                # Campo segreto modificato qui e, dall'ultima sincronizzazione, anche altrove
+                if remote_fields[field] != local[field]:
+                    self._log_conflict(cursor, table, record['id'], field, local, local_stamp, remote_fields[field], remote_stamp)
+                bases[field] = remote_stamp # Versione remota vista: non è più un conflitto alla prossima ricezione
+            if remote_stamp > local_stamp:
+                merged[field] = remote_stamp
+                bases.pop(field, None) # Il valore locale non modificato è stato sostituito
+                if remote_fields[field] != local[field]:
+                    assignments.append(f"{field} = ?")
+                    values.append(remote_fields[field])
+                    if field == 'encrypted_password':
+                        new_password = remote_fields[field]
+            elif local_stamp > remote_stamp:
+                local_wins = True
+        if merged == local_stamps:
+            if bases != local_bases:
+                cursor.execute(f"UPDATE {table} SET sync_base_field_hlc = ? WHERE id = ?", (encode_field_stamps(bases), local['id']))
+            return False # La copia locale contiene già tutto
+
+        record_hlc, field_hlc = compact_field_stamps(merged)
+        # Ancora da inviare solo se la copia locale aveva campi più recenti non ancora inviati
+        pending = local['sync_pending'] if local_wins else 0
+        assignments.append("sync_hlc = ?, sync_field_hlc = ?, sync_device = ?, sync_pending = ?, sync_base_field_hlc = ?")
+        values.extend([record_hlc, field_hlc, hlc_device(record_hlc), pending, encode_field_stamps(bases) if pending else None])
+        # L'impronta resta valida solo se la password cifrata non è cambiata (altrimenti backfill)
+        cursor.execute(f"""UPDATE {table} SET password_fingerprint = CASE WHEN encrypted_password IS ? THEN password_fingerprint END,
+                              {', '.join(assignments)} WHERE id = ?""",
+                       [new_password] + values + [local['id']])
+        if table == 'credentials' and len(assignments) > 1:
+            # Il nome app può essere cambiato: le voci derivate verranno ricalcolate dal ContextMatcher
+            cursor.execute("DELETE FROM context_index WHERE credential_id = ? AND source != 'learned'", (local['id'],))
+        return True
+
+    def _log_conflict(self, cursor: sqlite3.Cursor, table: str, sync_id: str, field: str, local: sqlite3.Row,
+                      local_stamp: str, remote_value, remote_stamp: str):
+        """
+        Registra un conflitto vero su un campo segreto: valore modificato qui e non
+        ancora inviato, mentre un altro dispositivo lo ha cambiato in modo diverso dopo
+        l'ultima sincronizzazione (il chiamante confronta il timestamp remoto con la base).
+        Il merge resta deterministico; il valore perdente viene conservato per l'utente.
+        """
+        if hlc_device(remote_stamp) == self.device_id:
+            return
+        winner = 'remote' if remote_stamp > local_stamp else 'local'
+        cursor.execute("""INSERT INTO sync_conflicts (record_type, sync_id, field, local_value, local_hlc, remote_value, remote_hlc, winner, detected_at)
+                          SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?
+                          WHERE NOT EXISTS (SELECT 1 FROM sync_conflicts WHERE sync_id = ? AND field = ? AND local_hlc = ? AND remote_hlc = ?)""",
+                       (table[:-1], sync_id, field, local[field], local_stamp, remote_value, remote_stamp, winner, time.time(),
+                        sync_id, field, local_stamp, remote_stamp))
+        if cursor.rowcount > 0:
+            print(f"[DeltaSyncEngine] Conflict on {field} of {table[:-1]} {sync_id}: {winner} value kept, the other is in sync_conflicts.")
+
+    def _apply_setting(self, cursor: sqlite3.Cursor, key: str, stamp: str, value) -> bool:
+        if key not in SYNCED_SETTINGS:
+            return False # Mai sovrascrivere impostazioni locali (password, token, hotkey...)
+        cursor.execute("SELECT sync_hlc FROM sync_setting_versions WHERE key = ?", (key,))
+        local = cursor.fetchone()
+        if local is not None and (local['sync_hlc'] or '') >= stamp:
+            return False
+        cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+        self._batch_settings[key] = value
+        cursor.execute("""INSERT INTO sync_setting_versions (key, sync_version, sync_device, sync_pending, sync_hlc) VALUES (?, 1, ?, 0, ?)
+                          ON CONFLICT (key) DO UPDATE SET sync_version = sync_version + 1, sync_device = excluded.sync_device,
+                              sync_pending = 0, sync_hlc = excluded.sync_hlc""",
+                       (key, hlc_device(stamp), stamp))
+        return True
+
+    # --- DB helpers ---
+    def _get_setting(self, key: str) -> Optional[str]:
+        rows = self._fetchall("SELECT value FROM settings WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else None
+
+    def _execute(self, sql: str, params: tuple = ()):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+        finally:
+            cursor.close()
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
@@ -2,23 +2,19 @@
 Gestore della sincronizzazione con Google Drive e delle impostazioni generali.
 """
 
-import os
+import io
 import json # Import json
 import base64
-import hashlib
 import threading
 import time # For sync loop
 import hmac
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
-# Google API Client Libraries
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
-import io # For MediaIoBaseDownload
+from types import SimpleNamespace
+
+from PySide6.QtCore import QObject, Signal
 
 # Re-add Cryptography imports needed for password verification KDF
 from cryptography.hazmat.primitives import hashes
@@ -27,6 +23,11 @@ from cryptography.hazmat.backends import default_backend
 
 # Import DatabaseManager
 from ..core.database_manager import get_db_manager, DatabaseManager
+from .crypto import clear_key_cache, derive_fingerprint_key
+from . import timing
+from .sync_engine import DeltaSyncEngine
+from .sync_storage import (StorageBackend, StorageError, RemoteObject, ObjectNotFound, PreconditionFailed,
+                           QuotaExceeded, LocalDirectoryBackend)
 
 # --- Constants ---
 # Rimuovi riferimenti a file JSON specifici
@@ -36,6 +37,9 @@ SCOPES = ['https://www.googleapis.com/auth/drive.file']
 DRIVE_FOLDER_NAME = 'PsWCursor Backup'
 DATABASE_FILENAME = "pswcursor_data.db" # Nome del file DB da sincronizzare
 DATABASE_FILE_PATH = f"data/{DATABASE_FILENAME}" # Percorso completo del DB
+# Storage della sync (impostazione 'sync_backend'): Google Drive o una cartella locale/di rete ('sync_local_path')
+SYNC_BACKEND_DRIVE = 'google_drive'
+SYNC_BACKEND_LOCAL = 'local'
 
 # --- Rimuovi Encryption parameters e Utility Functions --- 
 # SALT_SIZE = 16 # Gestito centralmente se necessario, ma Fernet lo include
@@ -45,6 +49,285 @@ DATABASE_FILE_PATH = f"data/{DATABASE_FILENAME}" # Percorso completo del DB
 # def _encrypt_setting(...)
 # def _decrypt_setting(...)
 
+# --- Google API Client Libraries (import lazy) ---
+# Lo stack Google (googleapiclient, google-auth, oauthlib) costa centinaia di ms
+# all'import: viene caricato solo quando la sincronizzazione serve davvero
+# (token, autenticazione, upload), non a ogni avvio.
+_google_api: Optional[SimpleNamespace] = None
+
+def google_api() -> SimpleNamespace:
+    """Importa (una sola volta) le librerie Google API e le restituisce come namespace."""
+    global _google_api
+    if _google_api is None:
+        with timing.measure("import Google API"):
+            from google.oauth2.credentials import Credentials
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            from google.auth.transport.requests import Request
+            from googleapiclient.discovery import build
+            from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload, MediaIoBaseDownload
+        _google_api = SimpleNamespace(Credentials=Credentials, InstalledAppFlow=InstalledAppFlow, Request=Request,
+                                      build=build, MediaFileUpload=MediaFileUpload,
+                                      MediaIoBaseUpload=MediaIoBaseUpload, MediaIoBaseDownload=MediaIoBaseDownload)
+        print("[SyncManager] Google API libraries loaded.")
+    return _google_api
+
+def preload_google_api():
+    """Avvia l'import delle librerie Google in un thread in background (sync attiva o impostazioni aperte)."""
+    if _google_api is not None:
+        return
+    def _load():
+        try:
+            google_api()
+        except ImportError as e:
+            print(f"[SyncManager] Google API libraries not available: {e}")
+    threading.Thread(target=_load, name="GoogleApiPreload", daemon=True).start()
+
+# --- Signal Emitter ---
+class SyncSignalEmitter(QObject):
+    remote_changes_applied = Signal(int) # Numero di record remoti applicati al DB locale (emesso dal thread di sync)
+
+sync_signal_emitter = SyncSignalEmitter()
+
+# --- Drive storage for delta batches ---
+class GoogleDriveBackend(StorageBackend):
+    """
+    Oggetti della sync come file nella cartella di backup su Google Drive.
+
+    L'etag è il campo 'version' del file, che Drive incrementa a ogni modifica.
+    Drive v3 non offre scritture condizionali: if_match/if_none_match vengono
+    verificati sui metadati subito prima della scrittura (non in modo atomico).
+
+    I metadati dei file (fileId, version, md5Checksum, size, modifiedTime) restano
+    in cache e vengono conservati tra le sincronizzazioni (export_state): dopo il
+    primo listing completo la cartella non viene più elencata, list() segue il feed
+    changes() di Drive dal token salvato (una sola richiesta, vuota se non è cambiato
+    niente). Un fileId non più valido (404) viene scartato e il nome cercato di nuovo.
+    """
+
+    name = 'google-drive'
+    FILE_FIELDS = 'id, name, version, size, md5Checksum, modifiedTime'
+    CHANGE_FIELDS = ('nextPageToken, newStartPageToken, '
+                     'changes(fileId, removed, file(id, name, parents, trashed, version, size, md5Checksum, modifiedTime))')
+    CACHED_FIELDS = ('id', 'version', 'size', 'md5Checksum', 'modifiedTime')
+
+    def __init__(self, drive_service, folder_id: str):
+        self.drive_service = drive_service
+        self.folder_id = folder_id
+        self._objects: Dict[str, dict] = {} # nome -> metadati del file (CACHED_FIELDS)
+        self._listed_all = False # True se la cache rispecchia tutta la cartella: un nome assente non esiste
+        self._changes_token: Optional[str] = None # Punto del feed changes() da cui riprendere
+
+    def list(self, prefix: str = '') -> List[RemoteObject]:
+        if not (self._listed_all and self._changes_token and self._follow_changes()):
+            self._list_folder()
+        return [self._remote_object(name, entry) for name, entry in sorted(self._objects.items()) if name.startswith(prefix)]
+
+    def get(self, name: str) -> bytes:
+        return self._on_file(name, lambda file_id: self.drive_service.files().get_media(fileId=file_id).execute())
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        def media():
+            return google_api().MediaIoBaseUpload(io.BytesIO(data), mimetype='application/json', resumable=False)
+        return self._upload(name, media, if_match, if_none_match)
+
+    def put_file(self, name: str, local_path: str, mimetype: str = 'application/octet-stream') -> str:
+        """Carica un file locale con upload resumable (senza leggerlo tutto in memoria). Restituisce il nuovo etag."""
+        return self._upload(name, lambda: google_api().MediaFileUpload(local_path, mimetype=mimetype, resumable=True))
+
+    def delete(self, name: str, if_match: Optional[str] = None) -> bool:
+        def remove(file_id: str):
+            if if_match is not None and self._current_version(file_id) != if_match:
+                raise PreconditionFailed(f"'{name}' changed")
+            self.drive_service.files().delete(fileId=file_id).execute()
+        try:
+            self._on_file(name, remove)
+        except ObjectNotFound:
+            return False
+        self._objects.pop(name, None)
+        return True
+
+    def export_state(self) -> Optional[str]:
+        return json.dumps({'folder_id': self.folder_id, 'changes_token': self._changes_token,
+                           'listed_all': self._listed_all, 'objects': self._objects},
+                          separators=(',', ':'), sort_keys=True)
+
+    def import_state(self, state: str):
+        if self._listed_all or self._objects:
+            return # La cache in memoria è più recente di quella salvata
+        try:
+            saved = json.loads(state)
+        except ValueError:
+            return
+        if not isinstance(saved, dict) or saved.get('folder_id') != self.folder_id:
+            return # Cartella diversa (es. dopo un reset delle impostazioni)
+        self._objects = dict(saved.get('objects') or {})
+        self._changes_token = saved.get('changes_token')
+        self._listed_all = bool(saved.get('listed_all') and self._changes_token)
+
+    def _list_folder(self):
+        """Listing completo della cartella. Il token del feed viene letto prima, così nessuna modifica intermedia va persa."""
+        objects = {}
+        page_token = None
+        try:
+            changes_token = self.drive_service.changes().getStartPageToken().execute().get('startPageToken')
+            while True:
+                response = self.drive_service.files().list(
+                    q=f"'{self.folder_id}' in parents and trashed=false",
+                    spaces='drive',
+                    fields=f'nextPageToken, files({self.FILE_FIELDS})',
+                    pageSize=1000,
+                    pageToken=page_token
+                ).execute()
+                for remote_file in response.get('files', []):
+                    objects[remote_file['name']] = self._entry(remote_file)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except Exception as e:
+            raise self._storage_error('list', e) from e
+        self._objects, self._changes_token, self._listed_all = objects, changes_token, True
+
+    def _follow_changes(self) -> bool:
+        """Applica alla cache le modifiche successive al token salvato. False se il token non è più valido (serve un listing)."""
+        page_token, new_token = self._changes_token, None
+        changes = []
+        try:
+            while page_token:
+                response = self.drive_service.changes().list(
+                    pageToken=page_token,
+                    spaces='drive',
+                    includeRemoved=True,
+                    pageSize=1000,
+                    fields=self.CHANGE_FIELDS
+                ).execute()
+                changes.extend(response.get('changes', []))
+                new_token = response.get('newStartPageToken')
+                page_token = response.get('nextPageToken')
+        except Exception as e:
+            error = self._storage_error('changes', e)
+            if isinstance(error, QuotaExceeded):
+                raise error from e
+            print(f"[GoogleDriveBackend] Changes token no longer usable ({e}), listing the folder again.")
+            return False
+        if not new_token:
+            return False
+
+        names_by_id = {entry.get('id'): name for name, entry in self._objects.items()}
+        for change in changes:
+            old_name = names_by_id.pop(change.get('fileId'), None)
+            if old_name is not None:
+                self._objects.pop(old_name, None)
+            remote_file = change.get('file') or {}
+            if change.get('removed') or remote_file.get('trashed') or self.folder_id not in remote_file.get('parents', []):
+                continue # Eliminato, nel cestino o fuori dalla cartella di backup
+            self._objects[remote_file['name']] = self._entry(remote_file)
+            names_by_id[remote_file['id']] = remote_file['name']
+        self._changes_token = new_token
+        return True
+
+    def _upload(self, name: str, media, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        """Aggiorna il file esistente (fileId in cache) o lo crea. media() costruisce il corpo dell'upload."""
+        file_id = self._file_id(name)
+        if if_none_match and file_id:
+            raise PreconditionFailed(f"'{name}' already exists")
+        if if_match is not None:
+            try:
+                version = self._on_file(name, self._current_version)
+            except ObjectNotFound:
+                version = None
+            if version != if_match:
+                raise PreconditionFailed(f"'{name}' changed")
+        remote_file = None
+        if file_id:
+            try:
+                remote_file = self._on_file(name, lambda file_id: self.drive_service.files().update(
+                    fileId=file_id, media_body=media(), fields=self.FILE_FIELDS).execute())
+            except ObjectNotFound:
+                pass # Eliminato nel frattempo: viene ricreato
+        if remote_file is None:
+            try:
+                remote_file = self.drive_service.files().create(
+                    body={'name': name, 'parents': [self.folder_id]},
+                    media_body=media(),
+                    fields=self.FILE_FIELDS).execute()
+            except Exception as e:
+                raise self._storage_error(name, e) from e
+        self._objects[name] = self._entry(remote_file)
+        return str(remote_file.get('version', ''))
+
+    def _on_file(self, name: str, operation):
+        """
+        Esegue operation(fileId) con l'ID in cache. Se Drive risponde 404 l'ID non è
+        più valido: viene scartato, il nome cercato di nuovo e l'operazione ripetuta una volta.
+        """
+        file_id = self._file_id(name)
+        for retry in (True, False):
+            if not file_id:
+                raise ObjectNotFound(name)
+            try:
+                return operation(file_id)
+            except StorageError:
+                raise
+            except Exception as e:
+                error = self._storage_error(name, e)
+                if not isinstance(error, ObjectNotFound):
+                    raise error from e
+                self._objects.pop(name, None)
+                if not retry:
+                    raise error from e
+            file_id = self._lookup(name)
+
+    def _current_version(self, file_id: str) -> Optional[str]:
+        current = self.drive_service.files().get(fileId=file_id, fields='version').execute()
+        return str(current.get('version', ''))
+
+    def _file_id(self, name: str) -> Optional[str]:
+        """fileId di un nome: dalla cache o, se la cache non copre tutta la cartella, con una ricerca per nome."""
+        if name in self._objects:
+            return self._objects[name].get('id')
+        if self._listed_all:
+            return None
+        return self._lookup(name)
+
+    def _lookup(self, name: str) -> Optional[str]:
+        """Cerca un file per nome nella cartella (solo su cache mancante o fileId non più valido)."""
+        try:
+            response = self.drive_service.files().list(
+                q=f"name='{name}' and '{self.folder_id}' in parents and trashed=false",
+                spaces='drive',
+                fields=f'files({self.FILE_FIELDS})'
+            ).execute()
+        except Exception as e:
+            raise self._storage_error(name, e) from e
+        files = response.get('files', [])
+        if not files:
+            return None
+        self._objects[name] = self._entry(files[0])
+        return files[0]['id']
+
+    @classmethod
+    def _entry(cls, remote_file: dict) -> dict:
+        return {key: remote_file[key] for key in cls.CACHED_FIELDS if key in remote_file}
+
+    @staticmethod
+    def _remote_object(name: str, entry: dict) -> RemoteObject:
+        modified_at = 0.0
+        if entry.get('modifiedTime'):
+            modified_at = datetime.fromisoformat(entry['modifiedTime'].replace('Z', '+00:00')).timestamp()
+        return RemoteObject(name, str(entry.get('version', '')), int(entry.get('size', 0)), modified_at, entry.get('md5Checksum'))
+
+    @staticmethod
+    def _storage_error(name: str, error: Exception) -> StorageError:
+        """Traduce un HttpError delle API Google nell'eccezione corrispondente del backend."""
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+        if status == 404:
+            return ObjectNotFound(name)
+        if status == 412:
+            return PreconditionFailed(f"'{name}': {error}")
+        if status in (403, 429) and ('rateLimitExceeded' in str(error) or 'storageQuotaExceeded' in str(error) or status == 429):
+            return QuotaExceeded(f"'{name}': {error}")
+        return StorageError(f"'{name}': {error}")
+
 # --- SyncManager Class (Singleton) ---
 class SyncManager:
     _instance = None
@@ -67,6 +350,10 @@ class SyncManager:
         # --- Internal State (inizializzati a default sicuri) --- 
         self.sync_enabled: bool = False
         self.sync_interval: int = 300
+        self.sync_backend: str = SYNC_BACKEND_DRIVE
+        self.sync_local_path: str = ''
+        self._storage_backend: Optional[StorageBackend] = None # Backend impostato da codice (test, benchmark)
+        self._drive_backend: Optional[GoogleDriveBackend] = None # Riutilizzato tra le sync: la cache dei fileId resta in memoria
         self.drive_folder_id: Optional[str] = None
         self.client_id: Optional[str] = None
         # self.client_secret viene caricato on-demand da load_settings, non tenuto qui costantemente
@@ -81,9 +368,12 @@ class SyncManager:
         # Session password state
         self._session_master_password: Optional[str] = None
         self._session_password_verified: bool = False
+        # Callbacks invoked when the session is locked or the master password changes
+        self._session_reset_callbacks = []
         # Sync Loop control
         self.last_sync_time = None
-        self.sync_in_progress = False
+        self.sync_in_progress = False # Solo informativo: l'esclusione è garantita da _sync_lock
+        self._sync_lock = threading.Lock() # Una sola sincronizzazione alla volta (loop di sync e azione manuale)
         self.sync_thread = None
         self.stop_event = threading.Event()
 
@@ -106,6 +396,8 @@ class SyncManager:
                 self.sync_interval = 300 # Default se conversione fallisce
                 print("[SyncManager.load_settings] WARNING: Invalid sync_interval in DB, using default 300.")
                 
+            self.sync_backend = self.db_manager.get_setting('sync_backend', SYNC_BACKEND_DRIVE) or SYNC_BACKEND_DRIVE
+            self.sync_local_path = self.db_manager.get_setting('sync_local_path', '') or ''
             self.drive_folder_id = self.db_manager.get_setting('drive_folder_id', '')
             # Hotkey config
             self.hotkey_config = {
@@ -178,6 +470,8 @@ class SyncManager:
          print("[SyncManager._reset_to_defaults] Resetting internal state (preserving session verification)...)")
          self.sync_enabled = False
          self.sync_interval = 300
+         self.sync_backend = SYNC_BACKEND_DRIVE
+         self.sync_local_path = ''
          self.drive_folder_id = None
          self.client_id = None
          self.google_credentials = None
@@ -229,6 +523,8 @@ class SyncManager:
             # Save non-encrypted settings first
             self.db_manager.set_setting('sync_enabled', str(self.sync_enabled).lower())
             self.db_manager.set_setting('sync_interval', str(self.sync_interval))
+            self.db_manager.set_setting('sync_backend', self.sync_backend or SYNC_BACKEND_DRIVE)
+            self.db_manager.set_setting('sync_local_path', self.sync_local_path or '')
             self.db_manager.set_setting('drive_folder_id', self.drive_folder_id or '')
             self.db_manager.set_setting('hotkey_config_str', self.hotkey_config.get('config_str', 'Nessuno'))
             self.db_manager.set_setting('hotkey_modifiers', str(self.hotkey_config.get('modifiers', 0)))
@@ -314,7 +610,7 @@ class SyncManager:
              creds_info = json.loads(token_json)
              # Ensure required keys are present for Credentials object
              if all(k in creds_info for k in ('token', 'refresh_token', 'client_id', 'client_secret', 'scopes')):
-                  creds = Credentials.from_authorized_user_info(creds_info, SCOPES)
+                  creds = google_api().Credentials.from_authorized_user_info(creds_info, SCOPES)
                   print(f"[SyncManager] Loaded Google credentials object from DB JSON.")
              else:
                   print("[SyncManager.load_google_token] ERROR: Token JSON from DB is missing required keys.")
@@ -329,7 +625,7 @@ class SyncManager:
          if creds and creds.expired and creds.refresh_token:
              try:
                  print("[SyncManager] Google token expired. Refreshing...")
-                 creds.refresh(Request())
+                 creds.refresh(google_api().Request())
                  print("[SyncManager] Google token refreshed successfully.")
                  refreshed = True
              except Exception as e:
@@ -348,7 +644,7 @@ class SyncManager:
          # Build service if credentials are valid
          if self.google_credentials and self.google_credentials.valid:
              try:
-                 self.drive_service = build('drive', 'v3', credentials=self.google_credentials)
+                 self.drive_service = google_api().build('drive', 'v3', credentials=self.google_credentials)
                  print("[SyncManager] Google Drive service built successfully after loading token.")
              except Exception as e:
                  print(f"[SyncManager] Error building Google Drive service after loading token: {e}")
@@ -393,7 +689,7 @@ class SyncManager:
             # Rebuild service if creds are valid
             if self.google_credentials and self.google_credentials.valid:
                  try:
-                      self.drive_service = build('drive', 'v3', credentials=self.google_credentials)
+                      self.drive_service = google_api().build('drive', 'v3', credentials=self.google_credentials)
                  except Exception:
                       self.drive_service = None # Silently fail build here?
             else:
@@ -450,7 +746,7 @@ class SyncManager:
              # Ensure drive service is built
              if not self.drive_service:
                   try:
-                       self.drive_service = build('drive', 'v3', credentials=self.google_credentials)
+                       self.drive_service = google_api().build('drive', 'v3', credentials=self.google_credentials)
                   except Exception as e:
                        print(f"[SyncManager.authenticate] Error rebuilding drive service: {e}")
                        self.drive_service = None
@@ -470,7 +766,7 @@ class SyncManager:
                  }
             }
             print("[SyncManager.authenticate] Using client_config dictionary.")
-            flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
+            flow = google_api().InstalledAppFlow.from_client_config(client_config, SCOPES)
             creds = flow.run_local_server(port=0)
             print("[SyncManager] Google Drive authentication successful via OAuth flow.")
             self.save_google_token(creds) # Save the new token to DB (encrypted if possible)
@@ -558,16 +854,9 @@ class SyncManager:
             print("[SyncManager.start_sync_loop] Sync loop already running.")
             return
 
-        # Ensure authentication before starting loop
-        if not self.drive_service:
-             print("[SyncManager.start_sync_loop] Authenticating before starting loop...")
-             if not self.authenticate_google_drive():
-                  print("[SyncManager.start_sync_loop] Authentication failed. Cannot start sync loop.")
-                  return
-
-        # Ensure folder exists
-        if not self.ensure_drive_folder_exists():
-            print("[SyncManager.start_sync_loop] Failed to ensure Drive folder exists. Cannot start sync loop.")
+        # Ensure the storage is reachable before starting loop (Drive: authentication and folder)
+        if self.get_storage_backend() is None:
+            print("[SyncManager.start_sync_loop] Sync storage not available. Cannot start sync loop.")
             return
             
         print("[SyncManager.start_sync_loop] Starting sync loop...")
@@ -611,103 +900,105 @@ class SyncManager:
         print("[SyncManager._sync_cycle] Exiting sync loop function.")
 
     def sync_now(self):
-        """Performs an immediate synchronization (placeholder)."""
+        """
+        Performs an immediate delta synchronization: applies remote change batches, then uploads local changes.
+        Returns at once if another sync (scheduled loop or manual action) is already running.
+        """
         if not self.sync_enabled:
             print("[SyncManager.sync_now] Sync is disabled.")
             return
-        if self.sync_in_progress:
+        if not self._sync_lock.acquire(blocking=False):
             print("[SyncManager.sync_now] Sync already in progress.")
             return
-        if not self.drive_service:
-            print("[SyncManager.sync_now] Drive service not available. Attempting authentication...")
-            if not self.authenticate_google_drive():
-                print("[SyncManager.sync_now] Authentication failed. Sync aborted.")
-                return
-        if not self.drive_folder_id:
-            print("[SyncManager.sync_now] Drive folder ID not set. Ensuring folder exists...")
-            if not self.ensure_drive_folder_exists():
-                print("[SyncManager.sync_now] Could not ensure Drive folder. Sync aborted.")
-                return
+        try:
+            self.sync_in_progress = True
+            self._run_sync()
+        finally:
+            self.sync_in_progress = False
+            self._sync_lock.release()
+
+    def _run_sync(self):
+        """Corpo di sync_now, eseguito con _sync_lock acquisito."""
+        store = self.get_storage_backend()
+        if store is None:
+            print("[SyncManager.sync_now] Sync storage not available. Sync aborted.")
+            return
+
+        verified_pwd = self._get_verified_password_for_session() # Mai un prompt: può girare nel thread di sync
+        salt_bytes = self.get_master_password_salt()
+        if not verified_pwd or not salt_bytes:
+            print("[SyncManager.sync_now] Session not unlocked (password or salt missing). Sync aborted.")
+            return
 
-        self.sync_in_progress = True
         print("[SyncManager.sync_now] Starting immediate sync...")
         try:
-            # --- Sync Logic --- 
-            # TODO: Implement robust 2-way sync logic
-            # 1. Get remote file list (settings.json, profiles.json) with modified times.
-            # 2. Compare with local file modified times.
-            # 3. Download remote changes if newer.
-            # 4. Upload local changes if newer.
-            # 5. Handle potential conflicts (e.g., both modified since last sync).
-
-            # --- Placeholder Implementation: Upload settings.json & profiles.json --- 
-            print(f"[SyncManager.sync_now] Placeholder: Uploading local files...")
-            # Note: We should only upload if local is newer than remote.
-            # Also, profile saving should likely trigger an upload.
-            settings_upload_ok = self._upload_single_file(self.settings_file, self.drive_folder_id)
-            # Assuming ProfileManager uses "data/profiles.json"
-            profiles_file = os.path.join(os.path.dirname(self.settings_file), "profiles.json")
-            profiles_upload_ok = self._upload_single_file(profiles_file, self.drive_folder_id)
-
-            if settings_upload_ok and profiles_upload_ok:
-                print(f"[SyncManager.sync_now] Placeholder: Upload successful.")
+            # Solo i record cambiati dall'ultima sincronizzazione (versione per record + tombstone)
+            engine = DeltaSyncEngine(self.db_manager.db_path, store, verified_pwd, salt_bytes, self.db_manager.clock)
+            stats = engine.sync()
+            if stats['idle']:
+                print("[SyncManager.sync_now] Nothing changed since the last sync.")
             else:
-                print(f"[SyncManager.sync_now] Placeholder: Upload failed for one or more files.")
-            # --- End Placeholder --- 
+                print(f"[SyncManager.sync_now] Pulled {stats['pulled']} batches ({stats['applied']} records applied), "
+                      f"pushed {stats['pushed']} records ({stats['bytes_uploaded']} bytes), "
+                      f"{stats['repaired']} diverging partitions re-sent.")
+            # Impostazioni condivise cambiate altrove: aggiorna lo stato in memoria
+            if 'sync_interval' in engine.applied_settings:
+                try:
+                    self.sync_interval = int(engine.applied_settings['sync_interval'])
+                except ValueError:
+                    pass
+            if 'client_id' in engine.applied_settings:
+                self.client_id = engine.applied_settings['client_id']
+            if stats['applied']:
+                sync_signal_emitter.remote_changes_applied.emit(stats['applied'])
 
             self.last_sync_time = time.monotonic() # Use monotonic time
             print("[SyncManager.sync_now] Sync operation complete.")
 
         except Exception as e:
             print(f"[SyncManager.sync_now] Error during sync operation: {e}")
-        finally:
-            self.sync_in_progress = False
 
-    def _upload_single_file(self, local_file_path: str, drive_folder_id: str) -> bool:
-        """Helper to upload or update a single file on Drive."""
-        if not os.path.exists(local_file_path):
-            print(f"[_upload_single_file] Local file not found: {local_file_path}")
-            return False
+    # --- Storage Backend ---
+    def uses_google_drive(self) -> bool:
+        """True se la sync usa Google Drive (serve l'autenticazione OAuth)."""
+        return self._storage_backend is None and self.sync_backend != SYNC_BACKEND_LOCAL
+
+    def set_storage_backend(self, backend: Optional[StorageBackend]):
+        """Usa un backend esplicito al posto di quello configurato (es. FakeDriveBackend nei benchmark). None ripristina la configurazione."""
+        self._storage_backend = backend
+
+    def get_storage_backend(self) -> Optional[StorageBackend]:
+        """Backend di storage configurato. Per Drive autentica e crea la cartella se serve. None se non disponibile."""
+        if self._storage_backend is not None:
+            return self._storage_backend
+        if self.sync_backend == SYNC_BACKEND_LOCAL:
+            if not self.sync_local_path:
+                print("[SyncManager.get_storage_backend] Local sync folder not set.")
+                return None
+            try:
+                return LocalDirectoryBackend(self.sync_local_path)
+            except OSError as e:
+                print(f"[SyncManager.get_storage_backend] Local sync folder '{self.sync_local_path}' not available: {e}")
+                return None
         if not self.drive_service:
-            print(f"[_upload_single_file] Drive service not initialized.")
-            return False
-            
-        file_name = os.path.basename(local_file_path)
-        mime_type = 'application/json' if file_name.endswith('.json') else 'application/octet-stream'
+            print("[SyncManager.get_storage_backend] Drive service not available. Attempting authentication...")
+            if not self.authenticate_google_drive():
+                print("[SyncManager.get_storage_backend] Authentication failed.")
+                return None
+        if not self.drive_folder_id:
+            print("[SyncManager.get_storage_backend] Drive folder ID not set. Ensuring folder exists...")
+            if not self.ensure_drive_folder_exists():
+                print("[SyncManager.get_storage_backend] Could not ensure Drive folder.")
+                return None
+        return self._get_drive_backend(self.drive_folder_id)
 
-        try:
-            # Check if file already exists in the specific folder
-            response = self.drive_service.files().list(
-                 q=f"name='{file_name}' and '{drive_folder_id}' in parents and trashed=false",
-                 spaces='drive',
-                 fields='files(id, name)'
-             ).execute()
-            existing_files = response.get('files', [])
-
-            file_metadata = {'name': file_name}
-            media = MediaFileUpload(local_file_path, mimetype=mime_type, resumable=True)
-
-            if existing_files:
-                file_id = existing_files[0]['id']
-                print(f"[_upload_single_file] Updating existing file '{file_name}' (ID: {file_id})...")
-                updated_file = self.drive_service.files().update(
-                    fileId=file_id,
-                    media_body=media,
-                    fields='id').execute()
-                return bool(updated_file)
-            else:
-                print(f"[_upload_single_file] Creating new file '{file_name}'...")
-                file_metadata['parents'] = [drive_folder_id]
-                new_file = self.drive_service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id').execute()
-                return bool(new_file)
+    def _get_drive_backend(self, folder_id: str) -> GoogleDriveBackend:
+        """Backend Drive riutilizzato tra le sincronizzazioni; ricreato se cambiano il servizio (nuovo login) o la cartella."""
+        backend = self._drive_backend
+        if backend is None or backend.drive_service is not self.drive_service or backend.folder_id != folder_id:
+            backend = self._drive_backend = GoogleDriveBackend(self.drive_service, folder_id)
+        return backend
 
-        except Exception as e:
-            print(f"[_upload_single_file] Error uploading file '{file_name}': {e}")
-            return False
-            
     # --- Hotkey Methods --- 
     def get_hotkey_config(self) -> dict:
         return self.hotkey_config
@@ -775,6 +1066,9 @@ class SyncManager:
             self._session_master_password = None
             # Reset potentially decrypted client secret cache
             self._client_secret_internal = None 
+            # Derived keys belong to the old password
+            clear_key_cache()
+            self._notify_session_reset()
         except Exception as e:
              print(f"[SyncManager] Error encoding hash/salt to Base64: {e}")
         # Note: save_settings() must be called by caller (like ProfileManager)
@@ -790,8 +1084,34 @@ class SyncManager:
         self._session_master_password = None
         # Reset potentially decrypted client secret cache
         self._client_secret_internal = None 
+        clear_key_cache()
+        self._notify_session_reset()
         # Note: save_settings() must be called by caller (like ProfileManager)
 
+    def register_session_reset_callback(self, callback):
+        """Registers a callable invoked when the session is locked (password cleared, changed or failed verification).
+           Used by managers holding decrypted data in memory to evict it.
+        """
+        if callback not in self._session_reset_callbacks:
+            self._session_reset_callbacks.append(callback)
+
+    def _notify_session_reset(self):
+        for callback in list(self._session_reset_callbacks):
+            try:
+                callback()
+            except Exception as e:
+                print(f"[SyncManager] Error in session reset callback {callback}: {e}")
+
+    def get_password_fingerprint_key(self) -> Optional[bytes]:
+        """Returns the HMAC key for password fingerprints, derived from the verified session password.
+           Returns None if the session is not unlocked (fingerprints cannot be computed).
+        """
+        verified_pwd = self._get_verified_password_for_session()
+        salt_bytes = self.get_master_password_salt()
+        if not verified_pwd or not salt_bytes:
+            return None
+        return derive_fingerprint_key(verified_pwd, salt_bytes)
+
     # --- Password Verification Helper for SyncManager Session ---
     def _verify_session_master_password(self, password_attempt: str) -> bool:
         """Verifies the provided password against the hash/salt stored in the database."""
@@ -821,7 +1141,8 @@ class SyncManager:
                 iterations=600000, # Must match iterations used when setting password
                 backend=default_backend()
             )
-            key_attempt_bytes = kdf_verify.derive(password_attempt.encode('utf-8'))
+            with timing.measure("unlock (master password KDF)"):
+                key_attempt_bytes = kdf_verify.derive(password_attempt.encode('utf-8'))
             
             # Decode the hash retrieved from DB
             stored_hash_bytes = base64.b64decode(stored_hash_b64.encode('utf-8'))
@@ -843,6 +1164,7 @@ class SyncManager:
                 # Clear potentially outdated session state on failure
                 self._session_master_password = None 
                 self._session_password_verified = False
+                self._notify_session_reset()
             return is_valid
         except (TypeError, ValueError, base64.binascii.Error) as e:
             print(f"[SyncManager._verify_session_master_password] Error decoding hash/salt from DB: {e}")
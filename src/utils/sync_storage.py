@@ -0,0 +1,394 @@
+"""
+Backend di storage per la sincronizzazione.
+
+Il motore di sync (sync_engine.py) scambia file con lo storage remoto solo
+attraverso questa interfaccia minima:
+
+    list(prefix)                              oggetti presenti (nome, etag, dimensione, data)
+    get(name)                                 contenuto
+    put(name, data, if_match, if_none_match)  scrittura condizionale, restituisce il nuovo etag
+    delete(name, if_match)
+    put_file(name, local_path)                upload di un file locale (letto a blocchi dove possibile)
+
+L'etag identifica una versione del contenuto: put con if_match riesce solo se
+l'oggetto non è cambiato nel frattempo, con if_none_match solo se non esiste
+ancora (così un blocco di modifiche non viene mai sovrascritto).
+
+Un backend può avere uno stato da conservare tra una sincronizzazione e l'altra
+(es. la cache degli ID dei file su Drive): export_state()/import_state(), che il
+motore salva nelle impostazioni locali.
+
+Implementazioni:
+    GoogleDriveBackend     cartella di backup su Google Drive (sync_manager.py: usa le API Google caricate lazy)
+    LocalDirectoryBackend  cartella locale o condivisa (NAS, NFS, SMB)
+    FakeDriveBackend       storage in memoria con latenza e quote simili a Drive, per test e benchmark offline
+
+CountingBackend avvolge un backend qualsiasi e conta richieste e byte trasferiti.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class RemoteObject:
+    """Un file sullo storage remoto."""
+    name: str
+    etag: str
+    size: int
+    modified_at: float # Unix timestamp
+    md5: Optional[str] = None # Checksum del contenuto, se il backend lo fornisce senza leggerlo
+
+
+class StorageError(Exception):
+    """Errore dello storage remoto (rete, permessi, spazio...)."""
+
+
+class ObjectNotFound(StorageError):
+    """L'oggetto richiesto non esiste."""
+
+
+class PreconditionFailed(StorageError):
+    """Scrittura condizionale rifiutata: l'oggetto è cambiato (if_match) o esiste già (if_none_match)."""
+
+
+class QuotaExceeded(StorageError):
+    """Limite di richieste o di spazio superato: riprovare più tardi."""
+
+
+class StorageBackend:
+    """Interfaccia comune dei backend di sync (le sottoclassi implementano i quattro metodi)."""
+
+    name = 'storage'
+
+    def list(self, prefix: str = '') -> List[RemoteObject]:
+        raise NotImplementedError
+
+    def get(self, name: str) -> bytes:
+        """Contenuto dell'oggetto. Solleva ObjectNotFound se non esiste."""
+        raise NotImplementedError
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        """Crea o sostituisce l'oggetto e ne restituisce il nuovo etag. Solleva PreconditionFailed se la condizione non vale."""
+        raise NotImplementedError
+
+    def delete(self, name: str, if_match: Optional[str] = None) -> bool:
+        """Elimina l'oggetto. False se non esisteva."""
+        raise NotImplementedError
+
+    def put_file(self, name: str, local_path: str) -> str:
+        """Carica il contenuto di un file locale (i backend che possono lo leggono a blocchi). Restituisce il nuovo etag."""
+        try:
+            with open(local_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise StorageError(f"Cannot read '{local_path}': {e}") from e
+        return self.put(name, data)
+
+    def export_state(self) -> Optional[str]:
+        """Stato da conservare fino alla prossima sincronizzazione (stringa serializzata), o None."""
+        return None
+
+    def import_state(self, state: str):
+        """Ripristina lo stato salvato da export_state() (ignorato se non più valido)."""
+
+
+class LocalDirectoryBackend(StorageBackend):
+    """
+    Oggetti come file in una cartella (anche un mount di rete condiviso tra più PC).
+
+    Le scritture passano da un file temporaneo nascosto e da un rename atomico:
+    chi legge vede sempre un file completo. La creazione esclusiva (if_none_match)
+    usa un hard link, atomico anche su NFS; le sostituzioni condizionali sono
+    serializzate da un file di lock accanto all'oggetto.
+    """
+
+    name = 'local'
+    LOCK_TIMEOUT_SECONDS = 5.0
+    LOCK_STALE_SECONDS = 30.0 # Lock lasciato da un processo terminato: viene rimosso
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def list(self, prefix: str = '') -> List[RemoteObject]:
+        objects = []
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    # I file nascosti sono temporanei e lock del backend
+                    if entry.name.startswith('.') or not entry.name.startswith(prefix) or not entry.is_file():
+                        continue
+                    try:
+                        st = os.stat(entry.path) # scandir su Windows non riporta l'inode
+                    except FileNotFoundError:
+                        continue # Eliminato durante il listing
+                    objects.append(RemoteObject(entry.name, self._etag(st), st.st_size, st.st_mtime))
+        except OSError as e:
+            raise StorageError(f"Cannot list '{self.root}': {e}") from e
+        return objects
+
+    def get(self, name: str) -> bytes:
+        try:
+            with open(self._path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError as e:
+            raise ObjectNotFound(name) from e
+        except OSError as e:
+            raise StorageError(f"Cannot read '{name}': {e}") from e
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        return self._write(name, lambda f: f.write(data), if_match, if_none_match)
+
+    def put_file(self, name: str, local_path: str) -> str:
+        def copy(target):
+            with open(local_path, 'rb') as source:
+                shutil.copyfileobj(source, target)
+        return self._write(name, copy)
+
+    # --- Helpers ---
+    def _write(self, name: str, write, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        """Scrive l'oggetto con write(file) in un file temporaneo, poi lo pubblica con un rename atomico."""
+        path = self._path(name)
+        temp_path = os.path.join(self.root, f".{name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            if if_none_match and self._link_exclusive(temp_path, path):
+                return self._etag(os.stat(path))
+            with self._locked(name):
+                current = self._current_etag(path)
+                if if_none_match and current is not None:
+                    raise PreconditionFailed(f"'{name}' already exists")
+                if if_match is not None and current != if_match:
+                    raise PreconditionFailed(f"'{name}' changed (expected {if_match}, found {current})")
+                os.replace(temp_path, path)
+                return self._etag(os.stat(path))
+        except OSError as e:
+            raise StorageError(f"Cannot write '{name}': {e}") from e
+        finally:
+            try: os.remove(temp_path)
+            except OSError: pass
+
+    def delete(self, name: str, if_match: Optional[str] = None) -> bool:
+        path = self._path(name)
+        try:
+            with self._locked(name):
+                current = self._current_etag(path)
+                if current is None:
+                    return False
+                if if_match is not None and current != if_match:
+                    raise PreconditionFailed(f"'{name}' changed (expected {if_match}, found {current})")
+                os.remove(path)
+                return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            raise StorageError(f"Cannot delete '{name}': {e}") from e
+
+    def _path(self, name: str) -> str:
+        if not name or name.startswith('.') or os.path.basename(name) != name:
+            raise StorageError(f"Invalid object name: {name!r}")
+        return os.path.join(self.root, name)
+
+    @staticmethod
+    def _etag(st: os.stat_result) -> str:
+        # Ogni scrittura crea un nuovo file (rename): l'inode cambia anche se mtime ha risoluzione grossolana (NFS)
+        return f"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    def _current_etag(self, path: str) -> Optional[str]:
+        try:
+            return self._etag(os.stat(path))
+        except FileNotFoundError:
+            return None
+
+    def _link_exclusive(self, temp_path: str, path: str) -> bool:
+        """Crea path solo se non esiste (True). False se il filesystem non supporta gli hard link."""
+        try:
+            os.link(temp_path, path)
+            return True
+        except FileExistsError as e:
+            raise PreconditionFailed(f"'{os.path.basename(path)}' already exists") from e
+        except OSError:
+            return False # Es. FAT o alcune condivisioni SMB: si ripiega sul lock
+
+    @contextmanager
+    def _locked(self, name: str):
+        lock_path = os.path.join(self.root, f".{name}.lock")
+        deadline = time.monotonic() + self.LOCK_TIMEOUT_SECONDS
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(lock_path).st_mtime > self.LOCK_STALE_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise StorageError(f"Timed out waiting for lock on '{name}'")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            try: os.remove(lock_path)
+            except OSError: pass
+
+
+class FakeDriveBackend(StorageBackend):
+    """
+    Storage in memoria che si comporta come Google Drive dal punto di vista della sync.
+
+    Ogni richiesta paga una latenza fissa più il tempo di trasferimento (banda),
+    il listing è paginato, e come su Drive ci sono un limite di richieste per
+    finestra di tempo e uno spazio totale: oltre, QuotaExceeded. L'etag è un
+    numero di versione globale, come il campo 'version' dei file Drive.
+    calls e i contatori di byte servono a test e benchmark.
+    """
+
+    name = 'fake-drive'
+
+    def __init__(self, latency: float = 0.08, bandwidth: float = 5_000_000.0, page_size: int = 1000,
+                 requests_per_window: int = 1000, window_seconds: float = 100.0,
+                 storage_quota: int = 15 * 1024 ** 3, sleep: Callable[[float], None] = time.sleep):
+        self.latency = latency # Secondi per richiesta
+        self.bandwidth = bandwidth # Byte al secondo (0 = illimitata)
+        self.page_size = page_size
+        self.requests_per_window = requests_per_window # Drive: 1000 richieste ogni 100 s per utente
+        self.window_seconds = window_seconds
+        self.storage_quota = storage_quota
+        self.sleep = sleep
+        self._objects: Dict[str, Tuple[bytes, str, float]] = {} # nome -> (contenuto, etag, data di modifica)
+        self._version = 0
+        self._used_bytes = 0
+        self._request_times: deque = deque()
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {'list': 0, 'get': 0, 'put': 0, 'delete': 0}
+        self.bytes_uploaded = 0
+        self.bytes_downloaded = 0
+
+    def list(self, prefix: str = '') -> List[RemoteObject]:
+        with self._lock:
+            objects = [RemoteObject(name, etag, len(data), modified_at, hashlib.md5(data).hexdigest())
+                       for name, (data, etag, modified_at) in sorted(self._objects.items()) if name.startswith(prefix)]
+        for _ in range(max(1, -(-len(objects) // self.page_size))): # Una richiesta per pagina
+            self._request('list')
+        return objects
+
+    def get(self, name: str) -> bytes:
+        self._request('get')
+        with self._lock:
+            stored = self._objects.get(name)
+        if stored is None:
+            raise ObjectNotFound(name)
+        self._transfer(len(stored[0]))
+        self.bytes_downloaded += len(stored[0])
+        return stored[0]
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        self._request('put')
+        self._transfer(len(data))
+        with self._lock:
+            current = self._objects.get(name)
+            if if_none_match and current is not None:
+                raise PreconditionFailed(f"'{name}' already exists")
+            if if_match is not None and (current is None or current[1] != if_match):
+                raise PreconditionFailed(f"'{name}' changed")
+            used = self._used_bytes - (len(current[0]) if current else 0) + len(data)
+            if used > self.storage_quota:
+                raise QuotaExceeded("The user's Drive storage quota has been exceeded (storageQuotaExceeded)")
+            self._version += 1
+            etag = str(self._version)
+            self._objects[name] = (bytes(data), etag, time.time())
+            self._used_bytes = used
+            self.bytes_uploaded += len(data)
+            return etag
+
+    def delete(self, name: str, if_match: Optional[str] = None) -> bool:
+        self._request('delete')
+        with self._lock:
+            current = self._objects.get(name)
+            if current is None:
+                return False
+            if if_match is not None and current[1] != if_match:
+                raise PreconditionFailed(f"'{name}' changed")
+            del self._objects[name]
+            self._used_bytes -= len(current[0])
+            return True
+
+    def _request(self, kind: str):
+        now = time.monotonic()
+        with self._lock:
+            while self._request_times and now - self._request_times[0] >= self.window_seconds:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.requests_per_window:
+                raise QuotaExceeded("User rate limit exceeded (userRateLimitExceeded)")
+            self._request_times.append(now)
+            self.calls[kind] += 1
+        if self.latency > 0:
+            self.sleep(self.latency)
+
+    def _transfer(self, size: int):
+        if self.bandwidth > 0 and size:
+            self.sleep(size / self.bandwidth)
+
+
+class CountingBackend(StorageBackend):
+    """Avvolge un backend e conta richieste (per tipo) e byte trasferiti."""
+
+    def __init__(self, inner: StorageBackend):
+        self.inner = inner
+        self.name = inner.name
+        self.calls: Dict[str, int] = {'list': 0, 'get': 0, 'put': 0, 'delete': 0}
+        self.bytes_uploaded = 0
+        self.bytes_downloaded = 0
+
+    def list(self, prefix: str = '') -> List[RemoteObject]:
+        self.calls['list'] += 1
+        return self.inner.list(prefix)
+
+    def get(self, name: str) -> bytes:
+        self.calls['get'] += 1
+        data = self.inner.get(name)
+        self.bytes_downloaded += len(data)
+        return data
+
+    def put(self, name: str, data: bytes, if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        self.calls['put'] += 1
+        etag = self.inner.put(name, data, if_match=if_match, if_none_match=if_none_match)
+        self.bytes_uploaded += len(data)
+        return etag
+
+    def put_file(self, name: str, local_path: str) -> str:
+        self.calls['put'] += 1
+        etag = self.inner.put_file(name, local_path)
+        self.bytes_uploaded += os.path.getsize(local_path)
+        return etag
+
+    def delete(self, name: str, if_match: Optional[str] = None) -> bool:
+        self.calls['delete'] += 1
+        return self.inner.delete(name, if_match=if_match)
+
+    def export_state(self) -> Optional[str]:
+        return self.inner.export_state()
+
+    def import_state(self, state: str):
+        self.inner.import_state(state)
+
+    def reset(self):
+        for kind in self.calls:
+            self.calls[kind] = 0
+        self.bytes_uploaded = self.bytes_downloaded = 0
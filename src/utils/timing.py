@@ -0,0 +1,59 @@
+"""
+Misure dei tempi di avvio (cold start).
+
+Il modulo va importato per primo da main.py: l'istante del suo import fa da
+riferimento (t=0). Le fasi dell'avvio registrano un punto (mark) o una durata
+(measure) e report() stampa il riepilogo una volta mostrata la finestra.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+_START = time.perf_counter()
+_marks: List[Tuple[str, float]] = [] # (nome, ms dall'avvio)
+_durations: Dict[str, float] = {} # nome -> ms (sommati se misurati più volte)
+_reported = False
+
+
+def elapsed_ms() -> float:
+    """Millisecondi trascorsi dall'import del modulo."""
+    return (time.perf_counter() - _START) * 1000.0
+
+
+def mark(name: str):
+    """Registra il raggiungimento di una fase dell'avvio."""
+    _marks.append((name, elapsed_ms()))
+
+
+@contextmanager
+def measure(name: str):
+    """Misura la durata del blocco (es. apertura DB, derivazione della chiave)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _durations[name] = _durations.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+
+
+def get_marks() -> List[Tuple[str, float]]:
+    return list(_marks)
+
+
+def get_durations() -> Dict[str, float]:
+    return dict(_durations)
+
+
+def report(force: bool = False) -> str:
+    """Stampa (una sola volta, salvo force) e restituisce il riepilogo dei tempi di avvio."""
+    global _reported
+    lines = ["[Startup] Timing report:"]
+    for name, at_ms in _marks:
+        lines.append(f"[Startup]   {name:<28} at {at_ms:8.1f} ms")
+    for name, duration_ms in _durations.items():
+        lines.append(f"[Startup]   {name:<28} took {duration_ms:6.1f} ms")
+    text = "\n".join(lines)
+    if force or not _reported:
+        _reported = True
+        print(text)
+    return text